@@ -0,0 +1,427 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import re
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+"""
+Benchmark Suite
+
+Times the hot paths of the simulator and of the error propagation, and writes
+the results as JSON so runs of different releases can be compared:
+
+   python benchmarks.py --output results.json
+   python benchmarks.py --quick --compare results.json
+
+Every benchmark is a setup function registered with @benchmark; it receives one
+set of parameters and returns the callable to time. A case is run once with
+tracemalloc enabled (its allocation peak is reported as "peak_traced_bytes"),
+then timed until min_time seconds or max_repeat calls are reached, asv-style.
+Unless isolation is disabled, every case runs in a fresh process, so
+"peak_rss_bytes" is the peak resident memory of that case alone (setup and
+imports included).
+
+The full parameter grid covers 1-8 qubits and up to 200 layers and takes a while
+on a small machine; --quick runs a reduced grid meant for smoke tests.
+"""
+
+SCHEMA_VERSION = 1
+DEFAULT_MIN_TIME = 0.5
+DEFAULT_MAX_REPEAT = 20
+DEFAULT_THRESHOLD = 1.25
+
+# name -> (setup, full parameter grid, quick parameter grid)
+BENCHMARKS = {}
+
+
+def benchmark(name, params, quick_params=None):
+    """
+    Registers a setup function as a benchmark.
+
+    Args:
+        name (str): Benchmark name used in the results and by --filter
+        params (list): Keyword argument dicts of the full grid
+        quick_params (list): Reduced grid used by --quick; defaults to params
+
+    Returns:
+        function: Decorator registering setup(**params) -> callable
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = (setup, list(params), list(quick_params or params))
+        return setup
+
+    return register
+
+
+def grid(**axes):
+    """Every combination of the given parameter values, as a list of dicts."""
+    cases = [{}]
+    for key, values in axes.items():
+        cases = [dict(case, **{key: value}) for case in cases for value in values]
+    return cases
+
+
+def random_circuit(rng, num_qubits, num_layers):
+    """
+    Random circuit IR mixing single-qubit gates and CNOTs on disjoint qubits.
+    """
+    gate_names = ["X", "Y", "Z", "H", "S", "T"]
+    circuit = []
+    for _ in range(num_layers):
+        qubits = [int(q) for q in rng.permutation(num_qubits)]
+        gates = []
+        while qubits:
+            if len(qubits) > 1 and rng.random() < 0.3:
+                gates.append(["CX", qubits.pop(), qubits.pop()])
+            else:
+                gates.append([str(rng.choice(gate_names)), qubits.pop()])
+        circuit.append({"numRows": num_qubits, "gates": gates})
+    return circuit
+
+
+def ground_state(num_qubits):
+    import qutip as qt
+
+    zero = qt.basis(2, 0) * qt.basis(2, 0).dag()
+    return qt.tensor(*[zero] * num_qubits)
+
+
+@benchmark(
+    "rep_to_evolution",
+    grid(num_qubits=[1, 2, 4, 8], num_layers=[1, 10, 50, 200]),
+    grid(num_qubits=[1, 3], num_layers=[1, 5]),
+)
+def bench_rep_to_evolution(num_qubits, num_layers, engine="auto"):
+    from quantum_simulator import rep_to_evolution
+    from noise_models import LocalNoiseModel
+
+    circuit = random_circuit(np.random.default_rng(0), num_qubits, num_layers)
+    state = ground_state(num_qubits)
+    noise_model = LocalNoiseModel.depolarizing(1e-3, num_qubits)
+    return lambda: rep_to_evolution(circuit, state, noise_model, engine=engine)
+
+
+# The full operator basis holds 4^n operators of size 4^n, so n stops at 5
+@benchmark(
+    "get_depolarizing_ops",
+    grid(num_qubits=[1, 2, 3, 4, 5]),
+    grid(num_qubits=[1, 2]),
+)
+def bench_get_depolarizing_ops(num_qubits):
+    from quantum_simulator import get_depolarizing_ops
+
+    return lambda: get_depolarizing_ops(1e-3, num_qubits)
+
+
+def random_density_matrix(num_qubits):
+    rng = np.random.default_rng(0)
+    dim = 2**num_qubits
+    a = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    rho = a @ a.conj().T
+    return rho / np.trace(rho)
+
+
+@benchmark(
+    "create_density_matrix_plot",
+    grid(num_qubits=[1, 2, 3, 4]),
+    grid(num_qubits=[1]),
+)
+def bench_create_density_matrix_plot(num_qubits):
+    from io import BytesIO
+    from visualizations.Density_Plot import create_density_matrix_plot
+
+    rho = random_density_matrix(num_qubits)
+
+    def render():
+        fig = create_density_matrix_plot(rho)
+        fig.savefig(BytesIO(), format="png")
+
+    return render
+
+
+@benchmark(
+    "render_density_plot",
+    grid(num_qubits=[2, 4, 6, 8]),
+    grid(num_qubits=[2]),
+)
+def bench_render_density_plot(num_qubits):
+    from quantum_simulator import render_density_plot
+
+    rho = random_density_matrix(num_qubits)
+    return lambda: render_density_plot(rho)
+
+
+@benchmark(
+    "propagate_error_layer_through_layer",
+    grid(num_qubits=[16, 64, 256, 1024]),
+    grid(num_qubits=[16]),
+)
+def bench_propagate_error_layer(num_qubits):
+    from error_propagation import ErrorLayer, Layer, propagate_error_layer_through_layer
+
+    rng = np.random.default_rng(0)
+    # An error on every qubit, propagated through a layer touching every qubit
+    errors = [(str(rng.choice(["X", "Y", "Z"])), q) for q in range(num_qubits)]
+    gates = [tuple(gate) for gate in random_circuit(rng, num_qubits, 1)[0]["gates"]]
+    return lambda: propagate_error_layer_through_layer(
+        ErrorLayer(errors, num_qubits), Layer(gates, num_qubits)
+    )
+
+
+@benchmark(
+    "simulate_quantum_circuit",
+    grid(num_qubits=[2, 4, 8], num_layers=[10]),
+    grid(num_qubits=[2], num_layers=[2]),
+)
+def bench_simulate_quantum_circuit(num_qubits, num_layers, output="plot"):
+    from quantum_simulator import simulate_quantum_circuit
+
+    circuit = random_circuit(np.random.default_rng(0), num_qubits, num_layers)
+
+    def simulate():
+        # Resuming from the prefix cache would time cache hits after the warm-up
+        result = simulate_quantum_circuit(circuit, output=output, use_prefix_cache=False)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+    return simulate
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is in kB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def time_case(func, min_time=DEFAULT_MIN_TIME, max_repeat=DEFAULT_MAX_REPEAT):
+    """
+    Measures one benchmark case.
+
+    Args:
+        func (callable): The function to time
+        min_time (float): Timed calls continue until their total reaches this
+        max_repeat (int): Upper bound on the timed calls
+
+    Returns:
+        dict: "repeat", "seconds" (min/median/mean/max) and "peak_traced_bytes"
+    """
+    # The traced call doubles as warm-up (imports, caches)
+    tracemalloc.start()
+    try:
+        func()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    while not times or (sum(times) < min_time and len(times) < max_repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "repeat": len(times),
+        "seconds": {
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.fmean(times),
+            "max": max(times),
+        },
+        "peak_traced_bytes": traced_peak,
+    }
+
+
+def run_case(name, params, min_time=DEFAULT_MIN_TIME, max_repeat=DEFAULT_MAX_REPEAT):
+    """
+    Sets up and times one case of a registered benchmark in this process.
+
+    Returns:
+        dict: The result entry, with "benchmark", "params" and "peak_rss_bytes"
+    """
+    setup = BENCHMARKS[name][0]
+    result = {"benchmark": name, "params": params}
+    result.update(time_case(setup(**params), min_time, max_repeat))
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    return result
+
+
+def _run_isolated(args):
+    return run_case(*args)
+
+
+def run_benchmarks(
+    pattern=None,
+    quick=False,
+    isolate=True,
+    min_time=DEFAULT_MIN_TIME,
+    max_repeat=DEFAULT_MAX_REPEAT,
+    progress=None,
+):
+    """
+    Runs the registered benchmarks.
+
+    Args:
+        pattern (str): Regular expression selecting benchmarks by name
+        quick (bool): Use the reduced parameter grids
+        isolate (bool): Run every case in a fresh process, so its peak RSS is its own
+        min_time (float): Minimum total timed seconds per case
+        max_repeat (int): Maximum timed calls per case
+        progress (callable): Called with every result as it completes
+
+    Returns:
+        dict: {"schema", "machine", "config", "results": [...]}, JSON-serializable
+    """
+    cases = [
+        (name, params)
+        for name, (_, full_params, quick_params) in BENCHMARKS.items()
+        if pattern is None or re.search(pattern, name)
+        for params in (quick_params if quick else full_params)
+    ]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for name, params in cases:
+        if isolate:
+            # One process per case; maxtasksperchild keeps peaks from leaking across cases
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(_run_isolated, ((name, params, min_time, max_repeat),))
+        else:
+            result = run_case(name, params, min_time, max_repeat)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "machine": machine_info(),
+        "config": {
+            "quick": quick,
+            "isolate": isolate,
+            "min_time": min_time,
+            "max_repeat": max_repeat,
+        },
+        "results": results,
+    }
+
+
+def machine_info():
+    import qutip
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "qutip": qutip.__version__,
+    }
+
+
+def _case_key(result):
+    return result["benchmark"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two benchmark runs case by case.
+
+    Args:
+        baseline (dict): Output of an earlier run_benchmarks
+        current (dict): Output of the run to check
+        threshold (float): Median time or peak RSS ratio above which a case regressed
+
+    Returns:
+        list: {"benchmark", "params", "time_ratio", "rss_ratio", "regressed"} for
+            every case present in both runs
+    """
+    previous = {_case_key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        old = previous.get(_case_key(result))
+        if old is None:
+            continue
+        time_ratio = result["seconds"]["median"] / max(old["seconds"]["median"], 1e-12)
+        rss_ratio = result["peak_rss_bytes"] / max(old["peak_rss_bytes"], 1)
+        comparison.append(
+            {
+                "benchmark": result["benchmark"],
+                "params": result["params"],
+                "time_ratio": time_ratio,
+                "rss_ratio": rss_ratio,
+                "regressed": time_ratio > threshold or rss_ratio > threshold,
+            }
+        )
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulator hot paths")
+    parser.add_argument("--filter", help="Regular expression selecting benchmarks by name")
+    parser.add_argument("--quick", action="store_true", help="Run the reduced parameter grids")
+    parser.add_argument(
+        "--no-isolate",
+        action="store_true",
+        help="Run every case in this process (peak RSS is then cumulative)",
+    )
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument("--max-repeat", type=int, default=DEFAULT_MAX_REPEAT)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, full_params, quick_params) in BENCHMARKS.items():
+            print(f"{name}: {len(full_params)} cases ({len(quick_params)} quick)")
+        return 0
+
+    def progress(result):
+        print(
+            f"{result['benchmark']} {result['params']}: "
+            f"{result['seconds']['median'] * 1e3:.2f} ms, "
+            f"peak RSS {result['peak_rss_bytes'] / 2**20:.1f} MiB",
+            file=sys.stderr,
+        )
+
+    results = run_benchmarks(
+        args.filter,
+        quick=args.quick,
+        isolate=not args.no_isolate,
+        min_time=args.min_time,
+        max_repeat=args.max_repeat,
+        progress=progress,
+    )
+
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare_results(json.load(f), results, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    regressions = [case for case in results.get("comparison", []) if case["regressed"]]
+    for case in regressions:
+        print(
+            f"Regression in {case['benchmark']} {case['params']}: "
+            f"time x{case['time_ratio']:.2f}, peak RSS x{case['rss_ratio']:.2f}",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
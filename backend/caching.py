@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import tempfile
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize=128, max_bytes=None, sizeof=None):
+        """
+        Initializes a bounded least-recently-used cache.
+
+        Parameters:
+        maxsize (int): Maximum number of entries kept before the oldest is evicted.
+        max_bytes (int): Optional bound on the total size of the values; the
+                         least recently used entries are evicted beyond it.
+        sizeof (callable): Size in bytes of a value, required with max_bytes.
+
+        Raises:
+        ValueError: If maxsize or max_bytes is not positive, or sizeof is missing.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer.")
+        if max_bytes is not None and (max_bytes <= 0 or sizeof is None):
+            raise ValueError("max_bytes must be a positive integer and needs sizeof.")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under key and marks it as most recently used.
+
+        Parameters:
+        key (hashable): Cache key.
+        default: Value returned when the key is not cached.
+
+        Returns:
+        The cached value, or default on a miss.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores value under key, evicting the least recently used entries if full.
+        With max_bytes, a value larger than the whole budget is not stored.
+
+        Parameters:
+        key (hashable): Cache key.
+        value: Value to store.
+        """
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            if size > self.max_bytes:
+                return
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize or (
+            self.max_bytes is not None and self.nbytes > self.max_bytes
+        ):
+            evicted, _ = self._entries.popitem(last=False)
+            self.nbytes -= self._sizes.pop(evicted, 0)
+
+    def clear(self):
+        """
+        Removes every entry and resets the hit/miss counters.
+        """
+        self._entries.clear()
+        self._sizes.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """
+        Returns the cache statistics.
+
+        Returns:
+        dict: Hits, misses, current size and maximum size, and with max_bytes
+              the total and maximum bytes.
+        """
+        info = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+        if self.max_bytes is not None:
+            info["nbytes"] = self.nbytes
+            info["max_bytes"] = self.max_bytes
+        return info
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"LRUCache({self.info()})"
+
+
+class DiskCache:
+    def __init__(self, directory, max_bytes=256 * 1024**2, ttl=None):
+        """
+        Initializes a size-bounded least-recently-used cache of JSON values on disk.
+
+        Every entry is one file named after its key. The file's access time
+        records the last use (for LRU eviction) and its modification time the
+        write (for the TTL), so no separate index has to be kept in sync
+        between processes sharing the directory.
+
+        Parameters:
+        directory (str): Directory holding the entries; created if missing.
+        max_bytes (int): Total size of the entries kept before the least
+                         recently used ones are evicted.
+        ttl (float): Seconds an entry stays valid after it was written, or None.
+
+        Raises:
+        ValueError: If max_bytes or ttl is not positive.
+        """
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive integer.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive.")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        if not key or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError("DiskCache keys must be lowercase hex digests.")
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _expired(self, stat, now):
+        return self.ttl is not None and now - stat.st_mtime > self.ttl
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under key and marks it as most recently used.
+
+        Parameters:
+        key (str): Hex digest identifying the entry.
+        default: Value returned when the key is not cached or has expired.
+
+        Returns:
+        The cached value, or default on a miss.
+        """
+        path = self._path(key)
+        now = time.time()
+        try:
+            stat = os.stat(path)
+            if self._expired(stat, now):
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r") as f:
+                value = json.load(f)
+            os.utime(path, (now, stat.st_mtime))
+        except (OSError, ValueError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores a JSON-serializable value under key, then evicts entries until
+        the cache fits in max_bytes.
+
+        Parameters:
+        key (str): Hex digest identifying the entry.
+        value: JSON-serializable value to store.
+        """
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        """Returns (path, stat) of every entry."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.path, entry.stat()))
+                    except OSError:
+                        pass
+        return entries
+
+    def evict(self):
+        """
+        Removes expired entries, then least recently used ones above max_bytes.
+        """
+        now = time.time()
+        entries = []
+        for path, stat in self._entries():
+            if self._expired(stat, now):
+                self._remove(path)
+            else:
+                entries.append((path, stat))
+
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in sorted(entries, key=lambda entry: entry[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= stat.st_size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another process evicted it first
+            pass
+
+    def clear(self):
+        """
+        Removes every entry and resets the hit/miss counters.
+        """
+        for path, _ in self._entries():
+            self._remove(path)
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """
+        Returns the cache statistics.
+
+        Returns:
+        dict: Hits, misses, number of entries, their total size and max_bytes.
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __repr__(self):
+        return f"DiskCache({self.directory!r}, {self.info()})"
@@ -0,0 +1,239 @@
+import numpy as np
+
+"""
+Density Matrix Tensor Kernels
+
+Applies operators that act on a few qubits to an n-qubit density matrix without
+building the full 2^n x 2^n operator. The density matrix is viewed as a rank-2n
+tensor (one row and one column axis per qubit, qubit 0 most significant as in
+qutip.tensor) and only the affected axes are contracted, as one matrix product.
+
+Every kernel accepts either a single density matrix of shape (2^n, 2^n) or a
+batch of shape (batch, 2^n, 2^n). Operators are either shared by the whole batch
+(shape (d, d)) or given per batch entry (shape (batch, d, d)).
+
+Batches of statevectors (shape (batch, 2^n)) use the same contraction through
+apply_state_operator.
+"""
+
+def _validate_batch(rho, op):
+    """Validates batch shapes and returns the number of leading batch axes."""
+    if rho.ndim not in (2, 3):
+        raise ValueError("rho must have shape (dim, dim) or (batch, dim, dim).")
+    if op.ndim == 3 and (rho.ndim != 3 or op.shape[0] != rho.shape[0]):
+        raise ValueError("A batched operator requires a density matrix batch of equal size.")
+    return rho.ndim - 2
+
+
+def _apply_on_bits(rho, op, bits, num_qubits):
+    """
+    Contracts op with the listed bits of the flattened (row, column) index.
+
+    Bit b < n is the row bit of qubit b and bit n + b its column bit.
+    """
+    num_batch = _validate_batch(rho, op)
+    return _contract_bits(rho, op, bits, 2 * num_qubits, num_batch)
+
+
+def _contract_bits(array, op, bits, total_bits, num_batch):
+    """
+    Contracts op with the listed bits of an array's flattened trailing index.
+
+    Untouched neighbouring bits are merged into one axis, so the transpose and
+    the matrix product only ever see a handful of axes regardless of the qubit
+    count.
+    """
+    shape = []
+    positions = {}
+    previous = 0
+    for bit in sorted(bits):
+        if bit > previous:
+            shape.append(2 ** (bit - previous))
+        positions[bit] = len(shape)
+        shape.append(2)
+        previous = bit + 1
+    if total_bits > previous:
+        shape.append(2 ** (total_bits - previous))
+
+    tensor = array.reshape(array.shape[:num_batch] + tuple(shape))
+    source = [num_batch + positions[bit] for bit in bits]
+    destination = list(range(num_batch, num_batch + len(bits)))
+
+    moved = np.moveaxis(tensor, source, destination)
+    moved_shape = moved.shape
+    flat = moved.reshape(moved_shape[:num_batch] + (2 ** len(bits), -1))
+    result = np.matmul(op, flat).reshape(moved_shape)
+    return np.moveaxis(result, destination, source).reshape(array.shape)
+
+
+def apply_local_operator(rho, op, qubits, num_qubits, side="left"):
+    """
+    Multiplies a density matrix by an operator acting on a subset of qubits.
+
+    Args:
+        rho (np.ndarray): Density matrix, shape (2^n, 2^n) or (batch, 2^n, 2^n)
+        op (np.ndarray): Operator on the listed qubits, shape (2^k, 2^k) or
+            (batch, 2^k, 2^k), with qubits[0] the most significant
+        qubits (sequence of int): Qubits the operator acts on
+        num_qubits (int): Total number of qubits
+        side (str): "left" computes op @ rho, "right" computes rho @ op
+
+    Returns:
+        np.ndarray: Product with the same shape as rho
+    """
+    if side == "left":
+        return _apply_on_bits(rho, op, list(qubits), num_qubits)
+    if side == "right":
+        # (rho @ op) contracts the column bits with the rows of op
+        return _apply_on_bits(
+            rho, np.swapaxes(op, -1, -2), [num_qubits + q for q in qubits], num_qubits
+        )
+    raise ValueError(f"side must be 'left' or 'right', got {side}")
+
+
+def apply_local_superoperator(rho, superop, qubits, num_qubits):
+    """
+    Applies a superoperator acting on a subset of qubits.
+
+    The superoperator acts on the row-major vectorization of the local block,
+    so a Kraus channel {K} corresponds to sum_k kron(K, K.conj()).
+
+    Args:
+        rho (np.ndarray): Density matrix, shape (2^n, 2^n) or (batch, 2^n, 2^n)
+        superop (np.ndarray): Shape (4^k, 4^k) or (batch, 4^k, 4^k)
+        qubits (sequence of int): Qubits the superoperator acts on
+        num_qubits (int): Total number of qubits
+
+    Returns:
+        np.ndarray: Transformed density matrix with the same shape as rho
+    """
+    bits = list(qubits) + [num_qubits + q for q in qubits]
+    return _apply_on_bits(rho, superop, bits, num_qubits)
+
+
+def apply_kraus_channel(rho, kraus_ops, qubits, num_qubits):
+    """
+    Applies sum_k K_k rho K_k^dag for Kraus operators acting on a subset of qubits.
+
+    The Kraus index is contracted as one more batch axis, so the whole set is
+    applied by two contractions. Unlike apply_local_superoperator this never
+    builds the 4^k x 4^k superoperator, which suits channels on many qubits.
+
+    Args:
+        rho (np.ndarray): Density matrix, shape (2^n, 2^n) or (batch, 2^n, 2^n)
+        kraus_ops (np.ndarray): Shape (K, 2^k, 2^k) or (batch, K, 2^k, 2^k)
+        qubits (sequence of int): Qubits the Kraus operators act on
+        num_qubits (int): Total number of qubits
+
+    Returns:
+        np.ndarray: Transformed density matrix with the same shape as rho
+    """
+    if rho.ndim not in (2, 3):
+        raise ValueError("rho must have shape (dim, dim) or (batch, dim, dim).")
+    if kraus_ops.ndim == 4 and (rho.ndim != 3 or kraus_ops.shape[0] != rho.shape[0]):
+        raise ValueError("Batched Kraus operators require a density matrix batch of equal size.")
+    num_batch = rho.ndim - 1
+    stacked = np.broadcast_to(
+        np.expand_dims(rho, -3), rho.shape[:-2] + (kraus_ops.shape[-3],) + rho.shape[-2:]
+    )
+    left = _contract_bits(stacked, kraus_ops, list(qubits), 2 * num_qubits, num_batch)
+    both = _contract_bits(
+        left, kraus_ops.conj(), [num_qubits + q for q in qubits], 2 * num_qubits, num_batch
+    )
+    return both.sum(axis=-3)
+
+
+def apply_state_operator(states, op, qubits, num_qubits):
+    """
+    Applies an operator acting on a subset of qubits to a batch of statevectors.
+
+    Args:
+        states (np.ndarray): Statevectors, shape (2^n,) or (batch, 2^n)
+        op (np.ndarray): Operator on the listed qubits, shape (2^k, 2^k)
+        qubits (sequence of int): Qubits the operator acts on
+        num_qubits (int): Total number of qubits
+
+    Returns:
+        np.ndarray: op applied to every statevector, same shape as states
+    """
+    if states.ndim not in (1, 2):
+        raise ValueError("states must have shape (dim,) or (batch, dim).")
+    return _contract_bits(states, op, list(qubits), num_qubits, states.ndim - 1)
+
+
+def apply_unitary(rho, unitary, qubits, num_qubits):
+    """
+    Conjugates a density matrix by a unitary acting on a subset of qubits.
+
+    Args:
+        rho (np.ndarray): Density matrix, shape (2^n, 2^n) or (batch, 2^n, 2^n)
+        unitary (np.ndarray): Shape (2^k, 2^k) or (batch, 2^k, 2^k)
+        qubits (sequence of int): Qubits the unitary acts on
+        num_qubits (int): Total number of qubits
+
+    Returns:
+        np.ndarray: U rho U^dag with the same shape as rho
+    """
+    # A unitary is a channel with a single Kraus operator; one superoperator
+    # contraction touches rho once instead of twice
+    superop = kraus_to_superoperator(np.expand_dims(unitary, -3))
+    return apply_local_superoperator(rho, superop, qubits, num_qubits)
+
+
+def kraus_to_superoperator(kraus_ops):
+    """
+    Converts a set of Kraus operators into the matching superoperator.
+
+    Args:
+        kraus_ops (np.ndarray): Shape (K, d, d), or (batch, K, d, d)
+
+    Returns:
+        np.ndarray: sum_k kron(K_k, conj(K_k)), shape (d^2, d^2) or (batch, d^2, d^2)
+    """
+    kraus_ops = np.asarray(kraus_ops, dtype=complex)
+    d = kraus_ops.shape[-1]
+    superop = np.einsum("...kac,...kbd->...abcd", kraus_ops, kraus_ops.conj())
+    return superop.reshape(superop.shape[:-4] + (d * d, d * d))
+
+
+def integrate_linear(
+    generator, rho, duration, norm_bound, shift=0.0, step_norm=4.0, tol=1e-12, max_terms=80
+):
+    """
+    Computes exp(duration * (G - shift)) rho for a linear map G given only by its action.
+
+    Uses a truncated Taylor series on sub-steps short enough that
+    step * norm_bound <= step_norm, so no time-dependent callbacks or adaptive
+    solver are needed. A scalar shift commutes with G and is applied exactly as
+    exp(-shift * step) after every sub-step.
+
+    Args:
+        generator (callable): Maps a density matrix (or batch) to G(rho)
+        rho (np.ndarray): Initial density matrix (or batch)
+        duration (float): Evolution time
+        norm_bound (float): Upper bound on the operator norm of G
+        shift (float): Scalar subtracted from G
+        step_norm (float): Largest step * norm_bound taken per sub-step
+        tol (float): Relative size of the last Taylor term kept
+        max_terms (int): Safety limit on the Taylor order
+
+    Returns:
+        np.ndarray: The evolved density matrix (or batch)
+    """
+    steps = max(1, int(np.ceil(duration * norm_bound / step_norm)))
+    step = duration / steps
+    decay = np.exp(-shift * step)
+    current = np.array(rho, dtype=complex)
+    for _ in range(steps):
+        term = current
+        result = current.copy()
+        scale = max(np.abs(current).max(), 1e-300)
+        for k in range(1, max_terms + 1):
+            term = generator(term) * (step / k)
+            result += term
+            if np.abs(term).max() <= tol * scale:
+                break
+        else:
+            raise RuntimeError("Taylor series did not converge; norm_bound is too small.")
+        current = result * decay
+    return current
@@ -1,20 +1,14 @@
 # backend/propagate_error.py
 import sys
 import json
-import os
 
-# Add the project root directory to Python path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-sys.path.append(project_root)
-
-from backend.utils import *
-from backend.error_propagation import (
+from error_propagation import (
     simplify_propagated_errors,
     propagate_error_layer_through_layer,
     Layer,
     ErrorLayer,
 )
+from pauli_tableau import propagate_all_error_layers
 
 
 def propagate_first_error_layer(circuit_ir):
@@ -101,8 +95,11 @@ def main():
         # Read IR from command line argument
         circuit_ir = json.loads(sys.argv[1])
 
-        # Propagate the first error layer
-        propagated_ir = propagate_first_error_layer(circuit_ir)
+        # Propagate the first error layer, or all of them with --all
+        if len(sys.argv) > 2 and sys.argv[2] == "--all":
+            propagated_ir = propagate_all_error_layers(circuit_ir)
+        else:
+            propagated_ir = propagate_first_error_layer(circuit_ir)
 
         # Output the result
         print(json.dumps(propagated_ir))
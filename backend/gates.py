@@ -0,0 +1,61 @@
+import numpy as np
+
+"""
+Gates
+
+The single-qubit gate tables shared by the simulator, its engines and the
+layer fusion pass. A run of single-qubit gates is evolved under the
+Hamiltonian s * (x)_q G_q, with the generator G_q of every gate and the scaling
+s of the highest-indexed gate of the run; circuit_blocks splits a circuit into
+these runs and its CX gates.
+"""
+
+# Involution generating each named gate; S and T are generated by Z
+_GENERATORS = {
+    "I": np.eye(2, dtype=complex),
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+    "H": np.array([[1, 1], [1, -1]], dtype=complex) / np.sqrt(2),
+}
+GATE_SCALINGS = {
+    "I": 1.0,
+    "X": np.pi / 2,
+    "Y": np.pi / 2,
+    "Z": np.pi / 2,
+    "H": np.pi / 2,
+    "S": np.pi / 4,
+    "T": np.pi / 8,
+}
+GATE_GENERATORS = {name: _GENERATORS.get(name, _GENERATORS["Z"]) for name in GATE_SCALINGS}
+
+
+def circuit_blocks(circuit_ir):
+    """
+    Splits a circuit into the blocks the simulator evolves, in order.
+
+    Args:
+        circuit_ir (list): Circuit layers with "gates"
+
+    Returns:
+        list: ("run", ((qubit, name), ...)) for a run of single-qubit gates and
+            ("cx", control, target) for a CNOT
+    """
+    blocks = []
+    for layer in circuit_ir:
+        run = []
+        for gate in layer["gates"]:
+            if len(gate) == 2:
+                if gate[0] not in GATE_SCALINGS:
+                    raise ValueError(f"Unsupported single-qubit gate: {gate[0]}")
+                run.append((gate[1], gate[0]))
+            elif len(gate) == 3 and gate[0] == "CX":
+                if run:
+                    blocks.append(("run", tuple(run)))
+                    run = []
+                blocks.append(("cx", gate[1], gate[2]))
+            else:
+                raise ValueError(f"Unsupported gate: {gate}")
+        if run:
+            blocks.append(("run", tuple(run)))
+    return blocks
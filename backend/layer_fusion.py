@@ -0,0 +1,308 @@
+import itertools
+import numpy as np
+
+from gates import GATE_GENERATORS, GATE_SCALINGS, circuit_blocks
+
+"""
+Layer Fusion
+
+An optimization pass over the circuit IR run before evolution. The simulator
+evolves every layer as a sequence of blocks: each run of consecutive
+single-qubit gates is one gate window under the Hamiltonian s * (x)_q G_q, where
+s is the scaling of the highest-indexed gate of the run, and each CX is one
+three-pulse window. Every block is one solver call, and one noisy window when an
+error model is present.
+
+Two modes keep the simulated state unchanged:
+
+   noise-aware (default): the sequence of blocks, and so every noisy window,
+      is preserved exactly. Identity gates that do not set the scaling of their
+      run are dropped, empty layers are removed, and consecutive layers are
+      concatenated where a CX already separates their runs.
+
+   noiseless: only the ideal gates matter. Runs that act as a product of named
+      gates are split into single-qubit gates, consecutive gates on a qubit are
+      merged and resynthesized as the shortest equivalent word of named gates
+      (dropped if the identity), adjacent CX pairs cancel, and the result is
+      scheduled as soon as possible into layers whose runs again evaluate to
+      the intended gates: X, Y, Z and H share a run, while S, T and runs that do
+      not factorize (e.g. with an identity setting the scaling) get a run of their
+      own between CX gates.
+
+Results agree up to a global phase, i.e. the density matrices are identical.
+"""
+
+# Ideal unitaries of the named gates (up to phase)
+GATE_UNITARIES = {
+    "X": GATE_GENERATORS["X"],
+    "Y": GATE_GENERATORS["Y"],
+    "Z": GATE_GENERATORS["Z"],
+    "H": GATE_GENERATORS["H"],
+    "S": np.diag([1, 1j]),
+    "T": np.diag([1, np.exp(1j * np.pi / 4)]),
+}
+
+# Gates that can share a run: their scaling is pi/2, so the run is their product
+PRODUCT_GATES = {"X", "Y", "Z", "H"}
+
+MAX_WORD_LENGTH = 3
+
+
+def _phase_key(matrix):
+    """Hashable form of a 2x2 unitary, up to global phase."""
+    pivot = matrix.flat[np.argmax(np.abs(matrix) > 1e-9)]
+    normalized = matrix * (abs(pivot) / pivot)
+    return tuple(np.round(normalized, 8).ravel().tolist())
+
+
+def _word_unitary(word):
+    matrix = np.eye(2, dtype=complex)
+    for name in word:
+        matrix = GATE_UNITARIES[name] @ matrix
+    return matrix
+
+
+def _build_word_table():
+    """Maps every unitary reachable with at most MAX_WORD_LENGTH named gates to its shortest word."""
+    table = {_phase_key(np.eye(2, dtype=complex)): ()}
+    for length in range(1, MAX_WORD_LENGTH + 1):
+        for word in itertools.product(GATE_UNITARIES, repeat=length):
+            table.setdefault(_phase_key(_word_unitary(word)), word)
+    return table
+
+
+_WORD_TABLE = _build_word_table()
+
+
+def _run_scaling(run):
+    return GATE_SCALINGS[max(run)[1]]
+
+
+def run_as_gates(run):
+    """
+    Writes a run as a product of named single-qubit gates, if it is one.
+
+    Args:
+        run (tuple): ((qubit, name), ...)
+
+    Returns:
+        list or None: [(qubit, name), ...] (empty for an identity), or None if
+            the run's unitary is not a product of the named gates
+    """
+    scaling = _run_scaling(run)
+    factors = [(q, name) for q, name in run if name != "I"]
+    if not factors:
+        return []
+    if len(factors) == 1:
+        qubit, name = factors[0]
+        unitary = np.cos(scaling) * np.eye(2) - 1j * np.sin(scaling) * GATE_GENERATORS[name]
+        word = _WORD_TABLE.get(_phase_key(unitary))
+        return None if word is None else [(qubit, gate) for gate in word]
+    if np.isclose(np.cos(scaling), 0):
+        # U = -i P: every factor acts as its generator (S and T act as Z)
+        return [(q, name if name in PRODUCT_GATES else "Z") for q, name in factors]
+    return None
+
+
+def _resynthesize(word):
+    """Shortest named-gate word equal (up to phase) to the product of word."""
+    shortest = _WORD_TABLE.get(_phase_key(_word_unitary(word)))
+    return list(shortest) if shortest is not None and len(shortest) <= len(word) else list(word)
+
+
+def _peephole(blocks):
+    """
+    Merges single-qubit gates and cancels CX pairs.
+
+    Returns:
+        list: ("word", qubit, [names]), ("cx", control, target) or ("opaque", run) operations
+    """
+    ops = []
+    alive = []
+    history = {}  # qubit -> indices of the live ops acting on it
+    pending = {}  # qubit -> names of the gates not yet emitted
+
+    def emit(op, qubits):
+        ops.append(op)
+        alive.append(True)
+        for q in qubits:
+            history.setdefault(q, []).append(len(ops) - 1)
+
+    def flush(q):
+        word = _resynthesize(pending.pop(q, []))
+        if word:
+            emit(("word", q, word), [q])
+
+    for block in blocks:
+        if block[0] == "cx":
+            _, control, target = block
+            flush(control)
+            flush(target)
+            last = [history[q][-1] if history.get(q) else None for q in (control, target)]
+            if last[0] is not None and last[0] == last[1] and ops[last[0]] == block:
+                # CX CX = I; the gates before it may now merge with later ones
+                alive[last[0]] = False
+                for q in (control, target):
+                    history[q].pop()
+                    if history[q] and ops[history[q][-1]][0] == "word":
+                        index = history[q].pop()
+                        alive[index] = False
+                        pending[q] = list(ops[index][2])
+            else:
+                emit(block, [control, target])
+            continue
+
+        gates = run_as_gates(block[1])
+        if gates is None:
+            qubits = [q for q, _ in block[1]]
+            for q in qubits:
+                flush(q)
+            emit(("opaque", block[1]), qubits)
+            continue
+        for q, name in gates:
+            pending.setdefault(q, []).append(name)
+
+    for q in list(pending):
+        flush(q)
+    return [op for op, keep in zip(ops, alive) if keep]
+
+
+class _Layer:
+    """A layer being scheduled: one shared run of product gates and solo runs between CX gates."""
+
+    def __init__(self):
+        self.product_gates = []
+        self.solo_runs = []
+        self.cx_gates = []
+        self.qubits = set()
+
+    def accepts(self, kind):
+        solo_slots = len(self.cx_gates) + (0 if self.product_gates else 1)
+        if kind == "solo":
+            return len(self.solo_runs) < solo_slots
+        if kind == "product":
+            # The shared run takes the slot before the first CX
+            return bool(self.product_gates) or len(self.solo_runs) <= len(self.cx_gates)
+        return True
+
+    def gates(self):
+        gates = sorted(self.product_gates, key=lambda gate: gate[1])
+        solo_runs = list(self.solo_runs)
+        if not self.product_gates and solo_runs:
+            gates.extend(solo_runs.pop(0))
+        for cx in self.cx_gates:
+            gates.append(cx)
+            if solo_runs:
+                gates.extend(solo_runs.pop(0))
+        return gates
+
+
+def _schedule(ops):
+    """Places operations as soon as possible into layers, respecting the run structure."""
+    layers = []
+    ready = {}
+
+    def place(kind, qubits, item):
+        index = max((ready.get(q, 0) for q in qubits), default=0)
+        while index < len(layers) and not layers[index].accepts(kind):
+            index += 1
+        if index == len(layers):
+            layers.append(_Layer())
+        layer = layers[index]
+        if kind == "product":
+            layer.product_gates.append(item)
+        elif kind == "solo":
+            layer.solo_runs.append(item)
+        else:
+            layer.cx_gates.append(item)
+        layer.qubits.update(qubits)
+        for q in qubits:
+            ready[q] = index + 1
+
+    for op in ops:
+        if op[0] == "word":
+            _, q, word = op
+            for name in word:
+                if name in PRODUCT_GATES:
+                    place("product", [q], (name, q))
+                else:
+                    place("solo", [q], [(name, q)])
+        elif op[0] == "cx":
+            place("cx", [op[1], op[2]], ("CX", op[1], op[2]))
+        else:
+            run = op[1]
+            place("solo", [q for q, _ in run], [(name, q) for q, name in run])
+    return [layer.gates() for layer in layers]
+
+
+def _noise_preserving_layers(circuit_ir):
+    """Drops ineffective identities and empty layers, and concatenates CX-separated layers."""
+    layers = []
+    for layer in circuit_ir:
+        gates = []
+        run = []
+        for gate in list(layer["gates"]) + [None]:
+            if gate is not None and len(gate) == 2:
+                run.append(gate)
+                continue
+            if run:
+                scaling_gate = max(run, key=lambda g: g[1])
+                gates.extend(g for g in run if g[0] != "I" or g is scaling_gate)
+                run = []
+            if gate is not None:
+                gates.append(gate)
+        if not gates:
+            continue
+
+        previous = layers[-1] if layers else None
+        separated = previous is not None and (len(previous[-1]) == 3 or len(gates[0]) == 3)
+        disjoint = previous is not None and not (
+            {q for g in previous for q in g[1:]} & {q for g in gates for q in g[1:]}
+        )
+        if separated and disjoint:
+            previous.extend(gates)
+        else:
+            layers.append(gates)
+    return layers
+
+
+def circuit_statistics(circuit_ir):
+    """Layer, gate and evolution-block counts of a circuit."""
+    return {
+        "layers": len(circuit_ir),
+        "gates": sum(len(layer["gates"]) for layer in circuit_ir),
+        "blocks": len(circuit_blocks(circuit_ir)),
+    }
+
+
+def fuse_layers(circuit_ir, noiseless=False):
+    """
+    Optimizes a circuit IR before evolution.
+
+    Args:
+        circuit_ir (list): Circuit layers ({"numRows": int, "gates": [...]})
+        noiseless (bool): Whether the circuit is evolved without noise; enables
+            the full ideal-gate fusion. Otherwise only rewrites that keep every
+            noisy gate window are applied.
+
+    Returns:
+        tuple: (optimized circuit IR, report) where the report holds the
+            before/after "layers", "gates" and "blocks" (solver calls) counts
+    """
+    num_qubits = max(layer["numRows"] for layer in circuit_ir)
+    if noiseless:
+        gate_layers = _schedule(_peephole(circuit_blocks(circuit_ir)))
+    else:
+        circuit_blocks(circuit_ir)  # validates the gates
+        gate_layers = _noise_preserving_layers(circuit_ir)
+
+    # Keep one (empty) layer so the circuit still records its qubit count
+    fused = [{"numRows": num_qubits, "gates": gates} for gates in gate_layers] or [
+        {"numRows": num_qubits, "gates": []}
+    ]
+    report = {
+        "mode": "noiseless" if noiseless else "noise-aware",
+        "before": circuit_statistics(circuit_ir),
+        "after": circuit_statistics(fused),
+    }
+    return fused, report
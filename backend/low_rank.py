@@ -0,0 +1,396 @@
+import numpy as np
+
+from density_kernels import apply_state_operator
+
+"""
+Low-Rank Density Matrices
+
+At small error rates the state of a circuit stays close to pure, yet a dense
+density matrix always stores 4^n entries. A LowRankDensity keeps
+
+   rho = sum_i |v_i><v_i|   (|v_i> = sqrt(lambda_i) |psi_i>)
+
+as r unnormalized vectors, O(r * 2^n) memory, and is updated by the same
+statevector contractions as the trajectories (apply_state_operator):
+
+   - a unitary maps every vector and leaves the rank unchanged;
+   - a Kraus channel {K_k} maps the r vectors to the k * r vectors K_k |v_i>;
+   - compress() rewrites the vectors as eigenvectors of rho, found from the
+     r x r Gram matrix, and drops the smallest eigenvalues as long as their sum
+     stays below tol * trace. The discarded weight is accumulated in
+     truncation_error.
+
+A gate window of the simulator evolves under G = -i[scaling * P, .] + (E - id)
+for a trace-preserving LocalNoiseModel E. evolve_window applies exp(h G) by its
+Taylor series sum_k h^k / k! G^k, on sub-steps h short enough that h times a
+bound on ||G|| stays below step_norm (as density_kernels.integrate_linear does
+for dense states). The commutator maps a term of rank r to one of rank 2r, and
+(E - id) to the directions of its errors; the terms are Hermitian but not
+positive, and are kept as signed vectors sum_i s_i |v_i><v_i| until the sum is
+compressed back to a positive state. There is no splitting of the rotation and
+the noise, so the only errors are the discarded weights in truncation_error.
+Noiseless windows are exact rotations, and single-factor windows whose noise
+commutes with the Hamiltonian (e.g. depolarizing noise) rotate before the noise.
+
+Every noisy window adds the directions of the new errors to rho, so the rank
+grows with the circuit; the representation pays off while r << 2^n, i.e. for
+noiseless circuits and for shallow circuits with few noisy windows. Once the
+rank exceeds max_rank the dense kernels are cheaper: a window whose Taylor terms
+outgrow it leaves the state as it was, and the window and the rest of the
+circuit run densely after to_dense().
+
+With the default tol nothing but numerical noise is ever dropped, so the rank
+counts the error directions: one window of depolarizing noise on an 8-qubit
+layer yields more than DEFAULT_MAX_RANK of them, however small its probability.
+A larger tol drops the least likely directions, each worth about the error
+probability, and so loses up to tol of the trace per compression; it delays the
+dense fallback by a window or two but does not keep deep noisy circuits
+low-rank. Use this engine for noiseless circuits and circuits with few noisy
+windows; otherwise the local engine is faster.
+"""
+
+DEFAULT_TOL = 1e-10
+# Largest step times the norm bound of a window generator per Taylor series,
+# as in density_kernels.integrate_linear
+DEFAULT_STEP_NORM = 2.0
+MAX_TAYLOR_TERMS = 60
+# Compressions cost O(r^2 2^n) and a noisy window runs many of them, so beyond
+# a few dozen vectors the dense kernels are faster
+DEFAULT_MAX_RANK = 32
+
+# Largest entry of rho - |v><v| for which from_dense takes rho as the pure state |v>
+PURITY_ATOL = 1e-12
+
+# Gram eigenvalues below this fraction of the largest carry no usable direction
+GRAM_CUTOFF = 1e-14
+
+
+class LowRankDensity:
+    def __init__(self, vectors, tol=DEFAULT_TOL, max_rank=None):
+        """
+        Initializes a low-rank density matrix sum_i |v_i><v_i|.
+
+        Parameters:
+        vectors (np.ndarray): Unnormalized vectors v_i, shape (r, 2^n).
+        tol (float): Trace fraction that one compression may discard.
+        max_rank (int): Rank beyond which the dense representation is used;
+                        defaults to DEFAULT_MAX_RANK, at most a quarter of
+                        the dimension.
+
+        Raises:
+        ValueError: If the vectors do not describe n qubits.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=complex))
+        dim = vectors.shape[-1]
+        if vectors.ndim != 2 or dim < 2 or dim & (dim - 1):
+            raise ValueError(f"Vectors must have shape (rank, 2^n), got {vectors.shape}.")
+        self.vectors = vectors
+        self.num_qubits = dim.bit_length() - 1
+        self.tol = tol
+        self.max_rank = max(1, min(DEFAULT_MAX_RANK, dim // 4)) if max_rank is None else max_rank
+        self.truncation_error = 0.0
+
+    @classmethod
+    def from_dense(cls, rho, tol=DEFAULT_TOL, max_rank=None):
+        """
+        Creates the low-rank form of a dense density matrix by diagonalizing it.
+
+        A pure state, such as the initial |0...0><0...0| of a simulation, is
+        read off its largest column in O(4^n) instead of diagonalized in O(8^n).
+        """
+        rho = np.asarray(rho, dtype=complex)
+        diagonal = np.real(np.diagonal(rho))
+        column = int(np.argmax(diagonal))
+        if diagonal[column] > 0:
+            vector = rho[:, column] / np.sqrt(diagonal[column])
+            if np.allclose(np.outer(vector, vector.conj()), rho, rtol=0, atol=PURITY_ATOL):
+                return cls(vector, tol=tol, max_rank=max_rank)
+        eigenvalues, eigenvectors = np.linalg.eigh(rho)
+        keep = _kept_eigenvalues(np.abs(eigenvalues), tol * eigenvalues.sum())
+        keep &= eigenvalues > 0
+        state = cls(
+            (eigenvectors[:, keep] * np.sqrt(eigenvalues[keep])).T, tol=tol, max_rank=max_rank
+        )
+        state.truncation_error = float(np.abs(eigenvalues[~keep]).sum())
+        return state
+
+    @property
+    def rank(self):
+        return self.vectors.shape[0]
+
+    @property
+    def exceeds_max_rank(self):
+        return self.rank > self.max_rank
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def trace(self):
+        return float(np.sum(np.abs(self.vectors) ** 2))
+
+    def to_dense(self):
+        """
+        Returns the dense density matrix, shape (2^n, 2^n).
+        """
+        return self.vectors.T @ self.vectors.conj()
+
+    def apply_operator(self, op, qubits):
+        """
+        Maps every vector by an operator acting on the listed qubits.
+        """
+        self.vectors = apply_state_operator(self.vectors, op, qubits, self.num_qubits)
+
+    def apply_kraus(self, kraus_ops, qubits):
+        """
+        Applies the channel rho -> sum_k K_k rho K_k^dag and compresses the result.
+        """
+        self.vectors = _apply_kraus(self.vectors, kraus_ops, qubits, self.num_qubits)
+        self.compress()
+
+    def compress(self):
+        """
+        Rewrites the vectors as eigenvectors of rho and drops the smallest
+        eigenvalues whose sum is at most tol * trace.
+        """
+        self.vectors, _, dropped = _compress(
+            self.vectors, np.ones(self.rank), self.tol * self.trace()
+        )
+        self.truncation_error += dropped
+
+    def __repr__(self):
+        return (
+            f"LowRankDensity({self.num_qubits} qubits, rank={self.rank}, "
+            f"truncation_error={self.truncation_error:.3g})"
+        )
+
+
+def _apply_kraus(vectors, kraus_ops, qubits, num_qubits):
+    return np.concatenate(
+        [apply_state_operator(vectors, k, qubits, num_qubits) for k in kraus_ops]
+    )
+
+
+def _kept_eigenvalues(magnitudes, budget):
+    """Mask of the eigenvalues kept after dropping the smallest ones worth at most budget."""
+    order = np.argsort(magnitudes)
+    dropped = np.cumsum(magnitudes[order]) <= budget
+    keep = np.ones(len(magnitudes), dtype=bool)
+    keep[order[dropped]] = False
+    if len(keep) and not keep.any():
+        keep[order[-1]] = True
+    return keep
+
+
+def _compress(vectors, signs, budget):
+    """
+    Diagonalizes sum_i signs[i] |v_i><v_i| and drops its smallest eigenvalues.
+
+    With the Gram matrix G = V^* V^T = W L W^dag, the vectors u_j = V^T w_j / sqrt(l_j)
+    are orthonormal, and the operator reads sqrt(L) W^dag S W sqrt(L) in that basis.
+
+    Returns:
+        tuple: (vectors sqrt|mu_m| e_m, signs of mu_m, discarded sum of |mu_m|)
+    """
+    gram = vectors.conj() @ vectors.T
+    gram_values, gram_vectors = np.linalg.eigh(gram)
+    usable = gram_values > GRAM_CUTOFF * max(gram_values.max(initial=0), 1e-300)
+    roots = np.sqrt(gram_values[usable])
+    basis = gram_vectors[:, usable]
+
+    reduced = roots[:, None] * ((basis.conj().T * signs) @ basis) * roots[None, :]
+    eigenvalues, eigenvectors = np.linalg.eigh(reduced)
+    keep = _kept_eigenvalues(np.abs(eigenvalues), budget)
+
+    coefficients = (basis / roots) @ eigenvectors[:, keep] * np.sqrt(np.abs(eigenvalues[keep]))
+    return (
+        coefficients.T @ vectors,
+        np.sign(eigenvalues[keep]),
+        float(np.abs(eigenvalues[~keep]).sum()),
+    )
+
+
+def rotate(state, scaling, factors, duration):
+    """
+    Applies exp(-i scaling * P * duration) = cos - i sin P for P = (x)_q factors[q].
+    """
+    angle = scaling * duration
+    p_vectors = state.vectors
+    for qubit, op in factors.items():
+        p_vectors = apply_state_operator(p_vectors, op, [qubit], state.num_qubits)
+    state.vectors = np.cos(angle) * state.vectors - 1j * np.sin(angle) * p_vectors
+
+
+def _generator(vectors, signs, scaling, factors, noise_model, num_qubits, budget):
+    """
+    Applies -i[scaling * P, .] + (E - id) to sum_i s_i |v_i><v_i|, compressed.
+
+    The commutator of a term is s (|a><a| - |b><b|) with a, b = (v -+ i P v) / sqrt(2),
+    and E maps the vectors site by site, compressing after every site.
+
+    Returns:
+        tuple: (vectors, signs, discarded sum of |mu_m|)
+    """
+    parts, part_signs = [], []
+    dropped = 0.0
+    if factors and scaling:
+        p_vectors = vectors
+        for qubit, op in factors.items():
+            p_vectors = apply_state_operator(p_vectors, op, [qubit], num_qubits)
+        root = np.sqrt(abs(scaling) / 2)
+        parts += [root * (vectors - 1j * p_vectors), root * (vectors + 1j * p_vectors)]
+        part_signs += [np.sign(scaling) * signs, -np.sign(scaling) * signs]
+    if noise_model is not None:
+        mapped, mapped_signs = vectors, signs
+        for site, kraus_ops in noise_model.kraus.items():
+            mapped = _apply_kraus(mapped, kraus_ops, site, num_qubits)
+            mapped_signs = np.tile(mapped_signs, len(kraus_ops))
+            mapped, mapped_signs, site_dropped = _compress(mapped, mapped_signs, budget)
+            dropped += site_dropped
+        parts += [mapped, vectors]
+        part_signs += [mapped_signs, -signs]
+    vectors, signs, term_dropped = _compress(
+        np.concatenate(parts), np.concatenate(part_signs), budget
+    )
+    return vectors, signs, dropped + term_dropped
+
+
+def _exponential(state, scaling, factors, noise_model, duration):
+    """
+    Applies exp(duration * (-i[scaling * P, .] + E - id)) by its Taylor series.
+
+    Returns:
+        bool: False, leaving the state unchanged, if a term exceeded twice max_rank
+    """
+    budget = state.tol * state.trace()
+    term, term_signs = state.vectors, np.ones(state.rank)
+    parts, part_signs = [term], [term_signs]
+    dropped = 0.0
+    for k in range(1, MAX_TAYLOR_TERMS + 1):
+        # duration^k / k! G^k rho, from the previous term
+        term, term_signs, term_dropped = _generator(
+            np.sqrt(duration / k) * term,
+            term_signs,
+            scaling,
+            factors,
+            noise_model,
+            state.num_qubits,
+            budget,
+        )
+        # The terms span the directions of the result and its rotation by P
+        if len(term) > 2 * state.max_rank:
+            return False
+        dropped += term_dropped
+        parts.append(term)
+        part_signs.append(term_signs)
+        if np.sum(np.abs(term) ** 2) <= budget:
+            break
+    else:
+        raise RuntimeError("Taylor series did not converge; the step is too long.")
+
+    vectors, signs, sum_dropped = _compress(
+        np.concatenate(parts), np.concatenate(part_signs), budget
+    )
+    # The exact result is positive; negative eigenvalues are truncation errors
+    state.vectors = vectors[signs > 0]
+    state.truncation_error += (
+        dropped + sum_dropped + float(np.sum(np.abs(vectors[signs < 0]) ** 2))
+    )
+    return True
+
+
+def _noise_norm_bound(noise_model):
+    """
+    Upper bound on the operator norm of E - id: with E = (x)_s (id + D_s),
+    ||E - id|| <= prod_s (1 + ||D_s||) - 1.
+    """
+    bound = 1.0
+    for site, kraus_ops in noise_model.kraus.items():
+        if site in noise_model.superops:
+            superop = noise_model.superops[site]
+            bound *= 1 + np.linalg.norm(superop - np.eye(superop.shape[0]), 2)
+        else:
+            bound *= 2 + np.sum(np.linalg.norm(kraus_ops, 2, axis=(-2, -1)) ** 2)
+    return float(bound - 1)
+
+
+def _evolve(state, scaling, factors, noise_model, duration, step_norm):
+    """
+    Applies exp(duration * (-i[scaling * P, .] + E - id)) on sub-steps of at most step_norm.
+
+    Returns:
+        bool: False if the rank outgrew max_rank; earlier sub-steps stay applied
+    """
+    norm_bound = 2 * abs(scaling) + _noise_norm_bound(noise_model)
+    steps = max(1, int(np.ceil(duration * norm_bound / step_norm)))
+    return all(
+        _exponential(state, scaling, factors, noise_model, duration / steps)
+        for _ in range(steps)
+    )
+
+
+def apply_noise(state, noise_model, duration):
+    """
+    Applies exp(duration * (E - id)) for a trace-preserving LocalNoiseModel E.
+
+    Returns:
+        bool: False if the rank outgrew max_rank
+    """
+    return _evolve(state, 0.0, {}, noise_model, duration, DEFAULT_STEP_NORM)
+
+
+def _commutes_with_noise(noise_model, factors):
+    """Whether -i[P, .] commutes with the noise channel, for a single-factor P."""
+    if len(factors) != 1:
+        return False
+    [(qubit, op)] = factors.items()
+    for site in noise_model.kraus:
+        if qubit in site:
+            if site not in noise_model.superops:
+                return False
+            superop = noise_model.superops[site]
+            local_op = np.eye(1)
+            for q in site:
+                local_op = np.kron(local_op, op if q == qubit else np.eye(2))
+            identity = np.eye(local_op.shape[0])
+            # Row-major vectorization: vec(A rho B) = kron(A, B^T) vec(rho)
+            generator = np.kron(local_op, identity) - np.kron(identity, local_op.T)
+            return np.allclose(superop @ generator, generator @ superop)
+    return True
+
+
+def evolve_window(state, scaling, factors, duration, noise_model=None, step_norm=DEFAULT_STEP_NORM):
+    """
+    Evolves a low-rank state through one gate window, in place.
+
+    Parameters:
+    state (LowRankDensity): State to evolve.
+    scaling (float): Scaling factor of the Hamiltonian.
+    factors (dict): Qubit index -> 2x2 involution factor of the Hamiltonian.
+    duration (float): Length of the gate window.
+    noise_model (LocalNoiseModel): Trace-preserving, unbatched error model, or
+                                   None for an ideal gate.
+    step_norm (float): Largest step times the norm bound of the generator
+                       per Taylor series.
+
+    Returns:
+    bool: False if the rank outgrew max_rank during the window; the state is
+          then left as it was before the window.
+
+    Raises:
+    ValueError: If the noise model is batched or not trace-preserving.
+    """
+    if noise_model is None:
+        rotate(state, scaling, factors, duration)
+        return True
+    if noise_model.batch_size is not None or not noise_model.trace_preserving:
+        raise ValueError("Low-rank evolution requires a trace-preserving, unbatched noise model.")
+
+    vectors, truncation_error = state.vectors, state.truncation_error
+    if _commutes_with_noise(noise_model, factors):
+        rotate(state, scaling, factors, duration)
+        scaling = 0.0
+    if _evolve(state, scaling, factors, noise_model, duration, step_norm):
+        return True
+    state.vectors, state.truncation_error = vectors, truncation_error
+    return False
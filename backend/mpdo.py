@@ -0,0 +1,571 @@
+import numpy as np
+
+from caching import LRUCache
+from density_kernels import integrate_linear
+
+"""
+Matrix-Product Density Operators
+
+Every other engine stores 4^n numbers for n qubits. A MatrixProductDensity
+stores a density matrix in locally purified form, rho = X X^dagger, where X is
+a chain of tensors
+
+   X[s_0 k_0, ..., s_(n-1) k_(n-1)] = A_0[s_0 k_0] A_1[s_1 k_1] ... A_(n-1)[s_(n-1) k_(n-1)]
+
+with a physical index s_q and a Kraus index k_q per qubit, and A_q[s k] a
+chi_q x chi_(q+1) matrix. Memory is O(n chi^2 kappa), so weakly entangled,
+weakly correlated states of tens of qubits fit in a laptop. Without noise every
+Kraus index has dimension 1 and X is the matrix-product state of the circuit.
+
+   - A gate on one qubit multiplies its tensor, and a channel on one qubit
+     (Kraus operators K_j) multiplies it by every K_j, stacking the results
+     along the Kraus index.
+   - A gate on two neighbouring qubits contracts both tensors, and the result
+     is split again by an SVD that keeps at most max_bond singular values.
+     A CNOT on distant qubits first moves the target next to the control with
+     SWAPs of neighbouring sites, and moves it back afterwards.
+   - A window on more qubits, exp(-i theta (x)_q G_q) = cos theta - i sin theta
+     (x)_q G_q, is an operator with bond dimension 2 and is followed by a
+     truncation of the bonds it spans.
+
+trace(rho) is the squared norm of X, which the chain keeps in one tensor, its
+orthogonality center. Bonds are truncated at the center, and so are Kraus
+indices, to at most max_kraus, by an eigendecomposition of their Gram matrix.
+Each truncation discards the smallest weights while they stay below cutoff
+times the trace (and more if a limit requires it), rescales the rest to keep
+the trace, and adds the discarded fraction to truncation_error. Unlike a
+truncated vectorization of rho, the truncated state stays positive.
+
+Noise: the dense engines apply a LocalNoiseModel as one jump process of the
+whole register, exp(d (E - id)) with E = (x)_q E_q, which correlates the errors
+of all qubits. Here every qubit has its own rate-1 process, exp(d (E_q - id)),
+so the noise needs no bonds. The two models agree on one qubit but not on a
+register, so a noisy MatrixProductDensity only approximates the dense engines.
+On 4-qubit, 5-layer circuits the density matrices differ by up to 1.6e-2 at
+p = 2e-2 and 1e-3 at p = 2e-3 with the default limits. Most of that comes from
+truncating the Kraus indices (at p = 2e-2, 2e-3 remains with max_kraus = 32),
+and a larger max_kraus costs O(max_kraus^3) per truncation. A window acts on qubits outside its support and on the noise of those qubits
+independently, so their channels are applied once per window. The noise on a
+window on one qubit is exponentiated together with the gate, and noisy windows
+on several qubits are split into Strang steps of at most max_angle, as in
+low_rank.py.
+"""
+
+DEFAULT_MAX_BOND = 64
+DEFAULT_MAX_KRAUS = 8
+# Fraction of the trace one truncation may discard below the limits
+DEFAULT_CUTOFF = 1e-12
+DEFAULT_MAX_ANGLE = np.pi / 16
+
+SWAP = np.eye(4)[[0, 2, 1, 3]]
+
+# Kraus operators of the channels and noisy windows of a SiteNoise
+CHANNEL_CACHE_SIZE = 1024
+
+
+class MatrixProductDensity:
+    def __init__(
+        self,
+        tensors,
+        max_bond=DEFAULT_MAX_BOND,
+        max_kraus=DEFAULT_MAX_KRAUS,
+        cutoff=DEFAULT_CUTOFF,
+    ):
+        """
+        Initializes a matrix-product density operator.
+
+        Parameters:
+        tensors (list): Site tensors of shape (chi_left, 2, kappa, chi_right),
+                        qubit 0 first; the outer bonds have dimension 1.
+        max_bond (int): Largest bond dimension kept by a truncation.
+        max_kraus (int): Largest Kraus dimension kept by a truncation.
+        cutoff (float): Fraction of the trace one truncation may discard.
+
+        Raises:
+        ValueError: If a limit is not positive or the tensors do not chain.
+        """
+        if max_bond < 1 or max_kraus < 1:
+            raise ValueError("max_bond and max_kraus must be positive.")
+        if (
+            tensors[0].shape[0] != 1
+            or tensors[-1].shape[3] != 1
+            or any(left.shape[3] != right.shape[0] for left, right in zip(tensors, tensors[1:]))
+        ):
+            raise ValueError("Site tensors must chain with outer bond dimensions of 1.")
+        self.tensors = [np.asarray(t, dtype=complex) for t in tensors]
+        self.num_qubits = len(tensors)
+        self.max_bond = max_bond
+        self.max_kraus = max_kraus
+        self.cutoff = cutoff
+        self.truncation_error = 0.0
+        # Orthogonality center: every tensor to its left is a left isometry and
+        # every tensor to its right a right isometry; None if unknown
+        self.center = None
+
+    @classmethod
+    def ground_state(cls, num_qubits, **kwargs):
+        """The product state |0...0><0...0|."""
+        state = cls([np.eye(2)[0].reshape(1, 2, 1, 1)] * num_qubits, **kwargs)
+        state.center = 0
+        return state
+
+    @classmethod
+    def from_dense(cls, rho, **kwargs):
+        """
+        Purifies a density matrix with one ancilla qubit per qubit and splits
+        the purification into site tensors by successive SVDs.
+
+        Raises:
+        ValueError: If rho is not positive semidefinite.
+        """
+        rho = np.asarray(rho, dtype=complex)
+        num_qubits = int(np.log2(rho.shape[-1]))
+        eigenvalues, eigenvectors = np.linalg.eigh((rho + rho.conj().T) / 2)
+        if eigenvalues[0] < -1e-10 * max(eigenvalues[-1], 1e-300):
+            raise ValueError("The mpdo engine requires a positive semidefinite density matrix.")
+        purification = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+        # Axes (s_0, ..., s_(n-1), k_0, ..., k_(n-1)) to (s_0, k_0, s_1, k_1, ...)
+        pairs = purification.reshape((2,) * (2 * num_qubits))
+        order = [axis for q in range(num_qubits) for axis in (q, num_qubits + q)]
+        rest = pairs.transpose(order).reshape(1, -1)
+        state = cls([np.zeros((1, 2, 1, 1))] * num_qubits, **kwargs)
+        for q in range(num_qubits - 1):
+            bond = rest.shape[0]
+            u, s, vh = np.linalg.svd(rest.reshape(bond * 4, -1), full_matrices=False)
+            keep, scale = state._truncate(s**2, state.max_bond)
+            state.tensors[q] = u[:, :keep].reshape(bond, 2, 2, keep)
+            rest = (scale * s[:keep, None]) * vh[:keep]
+        state.tensors[-1] = rest.reshape(rest.shape[0], 2, 2, 1)
+        state.center = num_qubits - 1
+        for q in range(num_qubits - 1, -1, -1):
+            state.truncate_kraus(q)
+        return state
+
+    @property
+    def bond_dimensions(self):
+        return [t.shape[3] for t in self.tensors[:-1]]
+
+    @property
+    def kraus_dimensions(self):
+        return [t.shape[2] for t in self.tensors]
+
+    @property
+    def nbytes(self):
+        return sum(t.nbytes for t in self.tensors)
+
+    def _environments(self):
+        """Contractions of X with X^dagger over the sites left of and right of each qubit."""
+        left = [np.ones((1, 1), dtype=complex)]
+        for tensor in self.tensors[:-1]:
+            left.append(np.einsum("ac,askb,cskd->bd", left[-1], tensor, tensor.conj()))
+        right = [np.ones((1, 1), dtype=complex)]
+        for tensor in self.tensors[:0:-1]:
+            right.append(np.einsum("askb,cskd,bd->ac", tensor, tensor.conj(), right[-1]))
+        return left, right[::-1]
+
+    def trace(self):
+        left, _ = self._environments()
+        last = self.tensors[-1]
+        return float(np.einsum("ac,askb,cskb->", left[-1], last, last.conj()).real)
+
+    def qubit_probabilities(self):
+        """
+        Returns the probability of measuring 1 on every qubit.
+        """
+        left, right = self._environments()
+        last = self.tensors[-1]
+        trace = np.einsum("ac,askb,cskb->", left[-1], last, last.conj()).real
+        return [
+            float(
+                np.einsum(
+                    "ac,akb,ckd,bd->", left[q], tensor[:, 1], tensor[:, 1].conj(), right[q]
+                ).real
+                / trace
+            )
+            for q, tensor in enumerate(self.tensors)
+        ]
+
+    def to_dense(self):
+        """
+        Contracts the chain into the 2^n x 2^n density matrix.
+
+        Every site is contracted with its conjugate over the Kraus index as it is
+        added, so memory is bounded by 4^n times the squared bond dimension
+        rather than by the product of the Kraus dimensions.
+        """
+        # Axes (rows, columns, bond of X, bond of X^dagger)
+        array = np.ones((1, 1, 1, 1), dtype=complex)
+        for tensor in self.tensors:
+            array = np.einsum(
+                "rcab,askd,btke->rsctde", array, tensor, tensor.conj(), optimize=True
+            )
+            shape = array.shape
+            array = array.reshape(shape[0] * 2, shape[2] * 2, shape[4], shape[5])
+        return array[:, :, 0, 0]
+
+    def _truncate(self, weights, limit):
+        """
+        Number of descending weights kept under the cutoff and a limit, and the
+        factor that restores the norm of the kept singular values.
+        """
+        total = weights.sum()
+        if total <= 0:
+            return 1, 1.0
+        # tail[k] is the fraction of the weights from k on
+        tail = np.append(np.cumsum(weights[::-1])[::-1] / total, 0.0)
+        keep = min(max(1, int(np.count_nonzero(tail[:-1] > self.cutoff))), limit)
+        if tail[keep] <= 0:
+            return keep, 1.0
+        self.truncation_error += float(tail[keep])
+        return keep, float(np.sqrt(1 / (1 - tail[keep])))
+
+    def _move_center(self, target):
+        """Makes a site the orthogonality center with QR decompositions."""
+        if self.center is None:
+            self._canonicalize(target, target)
+        while self.center < target:
+            self._shift_right(self.center)
+        while self.center > target:
+            self._shift_left(self.center)
+
+    def _shift_right(self, q):
+        tensor = self.tensors[q]
+        q_factor, r_factor = np.linalg.qr(tensor.reshape(-1, tensor.shape[3]))
+        self.tensors[q] = q_factor.reshape(tensor.shape[:3] + (-1,))
+        self.tensors[q + 1] = np.tensordot(r_factor, self.tensors[q + 1], axes=([1], [0]))
+        self.center = q + 1
+
+    def _shift_left(self, q):
+        tensor = self.tensors[q]
+        q_factor, r_factor = np.linalg.qr(tensor.reshape(tensor.shape[0], -1).T)
+        self.tensors[q] = q_factor.T.reshape((-1,) + tensor.shape[1:])
+        self.tensors[q - 1] = np.tensordot(self.tensors[q - 1], r_factor.T, axes=([3], [0]))
+        self.center = q - 1
+
+    def _canonicalize(self, first, last):
+        """
+        Restores the canonical form after the tensors first..last changed,
+        truncating the bonds in between with SVDs; the center ends at first.
+        """
+        if self.center is None:
+            low, high = 0, self.num_qubits - 1
+        else:
+            low, high = min(first, self.center), max(last, self.center)
+        self.center = low
+        while self.center < high:
+            self._shift_right(self.center)
+        for q in range(high, low, -1):
+            tensor = self.tensors[q]
+            u, s, vh = np.linalg.svd(tensor.reshape(tensor.shape[0], -1), full_matrices=False)
+            keep, scale = self._truncate(s**2, self.max_bond)
+            self.tensors[q] = vh[:keep].reshape((keep,) + tensor.shape[1:])
+            self.tensors[q - 1] = np.tensordot(
+                self.tensors[q - 1], u[:, :keep] * (scale * s[:keep]), axes=([3], [0])
+            )
+            self.center = q - 1
+        self._move_center(first)
+
+    def apply_gate(self, qubit, unitary):
+        """
+        Applies a 2 x 2 unitary to one site; the canonical form is kept.
+        """
+        self.tensors[qubit] = np.einsum("st,atkb->askb", unitary, self.tensors[qubit])
+
+    def apply_channel(self, qubit, kraus_ops):
+        """
+        Applies a channel given by its 2 x 2 Kraus operators to one site.
+
+        A trace-preserving channel keeps the isometries of the canonical form;
+        truncate_kraus bounds the grown Kraus index.
+        """
+        tensor = self.tensors[qubit]
+        stacked = np.einsum("jst,atkb->asjkb", np.asarray(kraus_ops), tensor)
+        self.tensors[qubit] = stacked.reshape(tensor.shape[0], 2, -1, tensor.shape[3])
+
+    def truncate_kraus(self, qubit):
+        """
+        Moves the center to a site and truncates its Kraus index.
+        """
+        if self.tensors[qubit].shape[2] == 1:
+            return
+        self._move_center(qubit)
+        tensor = self.tensors[qubit]
+        matrix = tensor.transpose(0, 1, 3, 2).reshape(-1, tensor.shape[2])
+        weights, vectors = np.linalg.eigh(matrix.conj().T @ matrix)
+        weights, vectors = np.clip(weights[::-1], 0, None), vectors[:, ::-1]
+        keep, scale = self._truncate(weights, self.max_kraus)
+        kept = (scale * matrix @ vectors[:, :keep]).reshape(
+            tensor.shape[0], 2, tensor.shape[3], keep
+        )
+        self.tensors[qubit] = kept.transpose(0, 1, 3, 2)
+
+    def apply_two_site_gate(self, site, unitary):
+        """
+        Applies a 4 x 4 unitary to the sites site and site + 1 (the first most
+        significant) and splits them again with a truncated SVD.
+
+        The Kraus indices are first split off both tensors by QR decompositions,
+        so the SVD only spans the bonds and the physical indices.
+        """
+        self._move_center(site)
+        left, right = self.tensors[site], self.tensors[site + 1]
+        chi_left, kraus_left = left.shape[0], left.shape[2]
+        kraus_right, chi_right = right.shape[2], right.shape[3]
+        # left[a s k b] = Q[a k r] R[r s b] and right[b s k c] = R[b s r] Q[r k c]
+        q_left, r_left = np.linalg.qr(left.transpose(0, 2, 1, 3).reshape(chi_left * kraus_left, -1))
+        q_right, r_right = np.linalg.qr(right.reshape(-1, kraus_right * chi_right).T)
+        pair = np.tensordot(
+            r_left.reshape(-1, 2, left.shape[3]),
+            r_right.T.reshape(right.shape[0], 2, -1),
+            axes=([2], [0]),
+        )
+        pair = np.einsum("stuv,ruvx->rstx", np.reshape(unitary, (2, 2, 2, 2)), pair)
+        u, s, vh = np.linalg.svd(pair.reshape(pair.shape[0] * 2, -1), full_matrices=False)
+        keep, scale = self._truncate(s**2, self.max_bond)
+        self.tensors[site] = np.tensordot(
+            q_left.reshape(chi_left, kraus_left, -1),
+            u[:, :keep].reshape(-1, 2, keep),
+            axes=([2], [0]),
+        ).transpose(0, 2, 1, 3)
+        self.tensors[site + 1] = np.tensordot(
+            ((scale * s[:keep, None]) * vh[:keep]).reshape(keep, 2, -1),
+            q_right.T.reshape(-1, kraus_right, chi_right),
+            axes=([2], [0]),
+        )
+        self.center = site + 1
+
+    def apply_operator_sum(self, coefficients, site_ops):
+        """
+        Applies sum_m coefficients[m] (x)_q site_ops[q][m] and truncates the
+        bonds in between.
+
+        Parameters:
+        coefficients (list): Weight of every term m.
+        site_ops (dict): Qubit -> list of 2 x 2 operators, one per term; the
+                         other qubits are left unchanged.
+        """
+        first, last = min(site_ops), max(site_ops)
+        num_terms = len(coefficients)
+        identity = [np.eye(2)] * num_terms
+        for q in range(first, last + 1):
+            tensor = self.tensors[q]
+            terms = [np.einsum("st,atkb->askb", op, tensor) for op in site_ops.get(q, identity)]
+            if q == first:
+                terms = [c * term for c, term in zip(coefficients, terms)]
+            # Terms are kept apart on the bonds inside [first, last]
+            blocks = np.zeros(
+                (1 if q == first else num_terms,) + tensor.shape[:3] + (num_terms, tensor.shape[3]),
+                dtype=complex,
+            )
+            for m, term in enumerate(terms):
+                blocks[0 if q == first else m, :, :, :, m] = term
+            if q == last:
+                blocks = blocks.sum(axis=4, keepdims=True)
+            shape = blocks.shape
+            self.tensors[q] = blocks.reshape(
+                shape[0] * shape[1], 2, shape[3], shape[4] * shape[5]
+            )
+        self._canonicalize(first, last)
+
+    def __repr__(self):
+        return (
+            f"MatrixProductDensity({self.num_qubits} qubits, "
+            f"max bond={max(self.bond_dimensions, default=1)}, "
+            f"max kraus={max(self.kraus_dimensions)}, "
+            f"truncation_error={self.truncation_error:.3g})"
+        )
+
+
+class SiteNoise:
+    def __init__(self, noise_model):
+        """
+        Precomputes the per-site dissipators E_q - id of a noise model.
+
+        Parameters:
+        noise_model (LocalNoiseModel): Trace-preserving, unbatched model of
+                                       single-qubit channels.
+
+        Raises:
+        ValueError: If the model is batched, not trace-preserving, or has a
+                    site on several qubits.
+        """
+        if noise_model.batch_size is not None or not noise_model.trace_preserving:
+            raise ValueError("The mpdo engine requires a trace-preserving, unbatched noise model.")
+        if any(len(site) != 1 for site in noise_model.kraus):
+            raise ValueError("The mpdo engine requires a noise model of single-qubit channels.")
+        self.num_qubits = noise_model.num_qubits
+        self.fingerprint = noise_model.fingerprint()
+        self.num_terms = sum(len(kraus_ops) for kraus_ops in noise_model.kraus.values())
+        self.generators = {}
+        for (qubit,), kraus_ops in noise_model.kraus.items():
+            channel = sum(np.kron(k, k.conj()) for k in kraus_ops)
+            if not np.allclose(channel, np.eye(4), atol=1e-12):
+                self.generators[qubit] = channel - np.eye(4)
+        self.channels = LRUCache(maxsize=CHANNEL_CACHE_SIZE)
+
+    def is_noisy(self, qubit):
+        return qubit in self.generators
+
+    def channel(self, qubit, duration):
+        """Kraus operators of exp(duration (E_q - id))."""
+        key = (qubit, duration)
+        kraus_ops = self.channels.get(key)
+        if kraus_ops is None:
+            kraus_ops = _kraus_operators(_expm(self.generators[qubit], duration))
+            self.channels.put(key, kraus_ops)
+        return kraus_ops
+
+    def window(self, qubit, scaling, op, duration):
+        """Kraus operators of exp(duration (-i scaling [op, .] + E_q - id))."""
+        op = np.asarray(op, dtype=complex)
+        key = (qubit, scaling, op.tobytes(), duration)
+        kraus_ops = self.channels.get(key)
+        if kraus_ops is None:
+            identity = np.eye(2)
+            generator = -1j * scaling * (np.kron(op, identity) - np.kron(identity, op.T))
+            kraus_ops = _kraus_operators(_expm(generator + self.generators[qubit], duration))
+            self.channels.put(key, kraus_ops)
+        return kraus_ops
+
+    def __repr__(self):
+        return f"SiteNoise({self.num_qubits} qubits, noisy qubits={sorted(self.generators)})"
+
+
+def _expm(generator, duration):
+    """exp(duration * generator) of a small matrix."""
+    norm_bound = max(float(np.linalg.norm(generator, 2)), 1e-12)
+    return integrate_linear(
+        lambda x: generator @ x, np.eye(generator.shape[0]), duration, norm_bound
+    )
+
+
+def _kraus_operators(superop, atol=1e-14):
+    """
+    Kraus operators of a completely positive 4 x 4 superoperator (row-major
+    vectorization), from the eigendecomposition of its Choi matrix.
+    """
+    choi = superop.reshape(2, 2, 2, 2).transpose(0, 2, 1, 3).reshape(4, 4)
+    weights, vectors = np.linalg.eigh((choi + choi.conj().T) / 2)
+    return np.array(
+        [np.sqrt(w) * v.reshape(2, 2) for w, v in zip(weights[::-1], vectors.T[::-1]) if w > atol]
+    )
+
+
+def _rotation(angle, op):
+    """exp(-i angle op) for an involution op."""
+    return np.cos(angle) * np.eye(op.shape[0]) - 1j * np.sin(angle) * op
+
+
+def _apply_channels(state, noise, sites, duration):
+    """
+    Applies the noise of a duration to sites (site -> qubit) and truncates
+    their Kraus indices.
+    """
+    noisy = sorted(site for site, qubit in sites.items() if noise.is_noisy(qubit))
+    # Visit the sites from the end nearer to the center, so that the center
+    # only moves through truncated tensors
+    if noisy and state.center is not None and state.center > (noisy[0] + noisy[-1]) / 2:
+        noisy.reverse()
+    for site in noisy:
+        state.apply_channel(site, noise.channel(sites[site], duration))
+        state.truncate_kraus(site)
+
+
+def _rotate(state, angle, factors):
+    """Applies exp(-i angle P) for P = (x)_site factors[site]."""
+    sites = sorted(factors)
+    if len(sites) == 1:
+        state.apply_gate(sites[0], _rotation(angle, np.asarray(factors[sites[0]])))
+    elif len(sites) == 2 and sites[1] == sites[0] + 1:
+        state.apply_two_site_gate(
+            sites[0], _rotation(angle, np.kron(factors[sites[0]], factors[sites[1]]))
+        )
+    elif np.isclose(np.cos(angle), 0):
+        # The rotation is P itself, up to a phase
+        for site in sites:
+            state.apply_gate(site, np.asarray(factors[site]))
+    else:
+        state.apply_operator_sum(
+            [np.cos(angle), -1j * np.sin(angle)],
+            {site: [np.eye(2), np.asarray(op)] for site, op in factors.items()},
+        )
+
+
+def _evolve_sites(state, scaling, factors, duration, noise, sites, max_angle):
+    """
+    Evolves through one window: factors maps sites to the factors of the
+    Hamiltonian, and sites maps every site whose noise acts during the window
+    to its qubit.
+    """
+    if noise is None:
+        if factors:
+            _rotate(state, scaling * duration, factors)
+        return
+    _apply_channels(state, noise, {s: q for s, q in sites.items() if s not in factors}, duration)
+    noisy = {s: q for s, q in sites.items() if s in factors and noise.is_noisy(q)}
+    if not noisy:
+        if factors:
+            _rotate(state, scaling * duration, factors)
+        return
+    if len(factors) == 1:
+        [(site, op)] = factors.items()
+        state.apply_channel(site, noise.window(sites[site], scaling, op, duration))
+        state.truncate_kraus(site)
+        return
+    steps = max(1, int(np.ceil(abs(scaling) * duration / max_angle)))
+    step = duration / steps
+    _apply_channels(state, noise, noisy, step / 2)
+    for i in range(steps):
+        _rotate(state, scaling * step, factors)
+        _apply_channels(state, noise, noisy, step if i < steps - 1 else step / 2)
+
+
+def evolve_window(state, scaling, factors, duration, noise=None, max_angle=DEFAULT_MAX_ANGLE):
+    """
+    Evolves a matrix-product density operator through one gate window, in place.
+
+    Parameters:
+    state (MatrixProductDensity): State to evolve.
+    scaling (float): Scaling factor of the Hamiltonian.
+    factors (dict): Qubit index -> 2x2 involution factor of the Hamiltonian.
+    duration (float): Length of the gate window.
+    noise (SiteNoise): Error model, or None for an ideal gate.
+    max_angle (float): Largest rotation angle per splitting step of a noisy
+                       window on several qubits.
+    """
+    factors = {q: op for q, op in factors.items() if not np.allclose(op, np.eye(2))}
+    sites = {q: q for q in range(state.num_qubits)}
+    _evolve_sites(state, scaling, factors, duration, noise, sites, max_angle)
+
+
+def apply_cnot(state, ctrl_idx, tgt_idx, pulses, noise=None, max_angle=DEFAULT_MAX_ANGLE):
+    """
+    Applies the CNOT pulses to a matrix-product density operator, in place.
+
+    The higher of the two qubits is moved next to the lower one with SWAPs of
+    neighbouring sites, and moved back afterwards.
+
+    Parameters:
+    state (MatrixProductDensity): State to evolve.
+    ctrl_idx (int): Control qubit.
+    tgt_idx (int): Target qubit.
+    pulses (list): (scaling, local_ops, duration) of every pulse, as given by
+                   quantum_simulator.cnot_pulse_generators.
+    noise (SiteNoise): Error model, or None for ideal pulses.
+    max_angle (float): Largest rotation angle per splitting step of a noisy pulse.
+    """
+    low, high = sorted((ctrl_idx, tgt_idx))
+    if noise is not None:
+        duration = sum(pulse[2] for pulse in pulses)
+        idle = {q: q for q in range(state.num_qubits) if q not in (low, high)}
+        _apply_channels(state, noise, idle, duration)
+    for site in range(high - 1, low, -1):
+        state.apply_two_site_gate(site, SWAP)
+    site_of = {low: low, high: low + 1}
+    for scaling, local_ops, duration in pulses:
+        factors = {site_of[q]: op for q, op in local_ops.items()}
+        _evolve_sites(
+            state, scaling, factors, duration, noise, {low: low, low + 1: high}, max_angle
+        )
+    for site in range(low + 1, high):
+        state.apply_two_site_gate(site, SWAP)
@@ -0,0 +1,416 @@
+import hashlib
+import itertools
+import numpy as np
+
+from density_kernels import (
+    apply_kraus_channel,
+    apply_local_operator,
+    apply_local_superoperator,
+    kraus_to_superoperator,
+)
+
+"""
+Local Noise Models
+
+The default error model used to be a list of 4^n collapse operators, one per
+tensor product of single-qubit Kraus operators. Because such a list is a product
+of per-qubit Kraus sets {K_q}, its Lindblad dissipator factorizes:
+
+   D(rho) = E(rho) - 1/2 {M, rho},   E = (x)_q E_q,   M = (x)_q M_q
+
+where E_q(rho) = sum_k K_k rho K_k^dag and M_q = sum_k K_k^dag K_k. A
+LocalNoiseModel stores only the per-site Kraus sets and applies E and M with
+tensor contractions on the affected axes, so memory is O(n) instead of
+O(4^n * 4^n).
+
+A site is one or more qubits; sites must not overlap and qubits without a
+channel are left untouched (E_q = identity, M_q = I). Sites of up to
+SUPEROPERATOR_MAX_QUBITS qubits are applied through their cached superoperator.
+Wider sites, such as an uploaded channel on the whole register, would need a
+16^k superoperator and are applied through their stacked Kraus operators
+instead (apply_kraus_channel).
+
+A model can also describe a batch of error models (e.g. a sweep over noise
+strengths): every site then holds Kraus operators of shape (batch, K, d, d) and
+the channels act on a density matrix batch of shape (batch, 2^n, 2^n).
+"""
+
+SUPEROPERATOR_MAX_QUBITS = 2
+# Widest site whose 4^k Pauli strings pauli_probabilities expands the channel in
+PAULI_CHANNEL_MAX_QUBITS = 4
+
+
+class LocalNoiseModel:
+    def __init__(self, num_qubits, channels):
+        """
+        Initializes a LocalNoiseModel instance.
+
+        Parameters:
+        num_qubits (int): The total number of qubits in the circuit.
+        channels (dict): Maps a qubit index, or a tuple of qubit indices, to a
+                         list of Kraus operators (2^k x 2^k for k qubits, the
+                         first one most significant), or to an array of shape
+                         (batch, K, d, d) for a batched model.
+
+        Raises:
+        ValueError: If a site is out of range, sites overlap, or Kraus operators
+                    have the wrong shape.
+        """
+        self.num_qubits = num_qubits
+        self.batch_size = None
+        self.kraus = {}
+        used_qubits = set()
+
+        for site, kraus_ops in channels.items():
+            site = (site,) if isinstance(site, (int, np.integer)) else tuple(site)
+            if not site or len(set(site)) != len(site):
+                raise ValueError(f"Noise site {site} must list distinct qubits.")
+            if any(q < 0 or q >= num_qubits for q in site):
+                raise ValueError(
+                    f"Noise site {site} contains qubit index out of bounds (0 to {num_qubits - 1})."
+                )
+            if used_qubits.intersection(site):
+                raise ValueError(f"Noise sites overlap on qubit(s) {used_qubits.intersection(site)}.")
+            used_qubits.update(site)
+
+            kraus_ops = np.asarray(kraus_ops, dtype=complex)
+            dim = 2 ** len(site)
+            if kraus_ops.ndim not in (3, 4) or kraus_ops.shape[-2:] != (dim, dim):
+                raise ValueError(
+                    f"Kraus operators for site {site} must have shape (K, {dim}, {dim}) "
+                    f"or (batch, K, {dim}, {dim}), got {kraus_ops.shape}."
+                )
+            if kraus_ops.ndim == 4:
+                if self.batch_size not in (None, kraus_ops.shape[0]):
+                    raise ValueError(
+                        f"Batch size {kraus_ops.shape[0]} of site {site} does not match "
+                        f"batch size {self.batch_size} of the other sites."
+                    )
+                self.batch_size = kraus_ops.shape[0]
+            self.kraus[site] = kraus_ops
+
+        # Unbatched sites of a batched model are shared by every batch entry
+        if self.batch_size is not None:
+            for site, kraus_ops in self.kraus.items():
+                if kraus_ops.ndim == 3:
+                    self.kraus[site] = np.broadcast_to(
+                        kraus_ops, (self.batch_size,) + kraus_ops.shape
+                    )
+
+        self.superops = {
+            site: kraus_to_superoperator(ops)
+            for site, ops in self.kraus.items()
+            if len(site) <= SUPEROPERATOR_MAX_QUBITS
+        }
+        self.completeness = {
+            site: np.einsum("...kba,...kbc->...ac", ops.conj(), ops)
+            for site, ops in self.kraus.items()
+        }
+        self.trace_preserving = self.is_trace_preserving()
+
+    @classmethod
+    def depolarizing(cls, p, num_qubits):
+        """
+        Creates the default error model: a depolarizing channel on every qubit.
+
+        Parameters:
+        p (float or array_like): Depolarizing probability; a 1D array of
+                                 probabilities gives a batched model.
+        num_qubits (int): The total number of qubits in the circuit.
+
+        Returns:
+        LocalNoiseModel: Equivalent to get_depolarizing_ops(p, num_qubits).
+        """
+        return cls.uniform(depolarizing_kraus(p), num_qubits)
+
+    @classmethod
+    def uniform(cls, kraus_ops, num_qubits):
+        """
+        Creates a model applying the same single-qubit channel to every qubit.
+
+        Parameters:
+        kraus_ops (array_like): Shape (K, 2, 2), or (batch, K, 2, 2).
+        num_qubits (int): The total number of qubits in the circuit.
+
+        Returns:
+        LocalNoiseModel: The uniform error model.
+        """
+        return cls(num_qubits, {q: kraus_ops for q in range(num_qubits)})
+
+    @classmethod
+    def from_kraus(cls, kraus_ops, atol=1e-8):
+        """
+        Creates a model applying one channel to the whole register, e.g. an uploaded noise model.
+
+        Parameters:
+        kraus_ops (array_like): Kraus operators of shape (K, 2^n, 2^n).
+        atol (float): Tolerance of the completeness check.
+
+        Returns:
+        LocalNoiseModel: A model with the single site (0, ..., n - 1).
+
+        Raises:
+        ValueError: If the operators are not 2^n x 2^n or sum_k K_k^dag K_k != I.
+        """
+        kraus_ops = np.asarray(kraus_ops, dtype=complex)
+        if kraus_ops.ndim == 2:
+            kraus_ops = kraus_ops[None]
+        dim = kraus_ops.shape[-1]
+        if kraus_ops.ndim != 3 or kraus_ops.shape[-2] != dim or dim < 2 or dim & (dim - 1):
+            raise ValueError(
+                f"Kraus operators must have shape (K, 2^n, 2^n), got {kraus_ops.shape}."
+            )
+        completeness = np.einsum("kba,kbc->ac", kraus_ops.conj(), kraus_ops)
+        deviation = float(np.abs(completeness - np.eye(dim)).max())
+        if deviation > atol:
+            raise ValueError(
+                f"Kraus operators are not trace preserving: sum_k K_k^dag K_k differs "
+                f"from the identity by up to {deviation:.3g}."
+            )
+        num_qubits = dim.bit_length() - 1
+        return cls(num_qubits, {tuple(range(num_qubits)): kraus_ops})
+
+    @classmethod
+    def stack(cls, models):
+        """
+        Combines unbatched models with the same sites into one batched model.
+
+        Sites whose Kraus sets differ in length are padded with zero operators,
+        which leave the channel unchanged.
+
+        Parameters:
+        models (list of LocalNoiseModel): Models to stack, in batch order.
+
+        Returns:
+        LocalNoiseModel: A model with batch_size == len(models).
+
+        Raises:
+        ValueError: If the list is empty, a model is already batched, or the
+                    models differ in qubit count or sites.
+        """
+        if not models:
+            raise ValueError("At least one noise model is required.")
+        num_qubits = models[0].num_qubits
+        sites = set(models[0].kraus)
+        for model in models:
+            if model.batch_size is not None:
+                raise ValueError("Only unbatched noise models can be stacked.")
+            if model.num_qubits != num_qubits or set(model.kraus) != sites:
+                raise ValueError("Stacked noise models must share qubit count and sites.")
+
+        channels = {}
+        for site in sites:
+            num_kraus = max(model.kraus[site].shape[0] for model in models)
+            dim = 2 ** len(site)
+            stacked = np.zeros((len(models), num_kraus, dim, dim), dtype=complex)
+            for i, model in enumerate(models):
+                stacked[i, : model.kraus[site].shape[0]] = model.kraus[site]
+            channels[site] = stacked
+        return cls(num_qubits, channels)
+
+    def is_trace_preserving(self, atol=1e-10):
+        """
+        Returns True if every site satisfies sum_k K_k^dag K_k = I.
+        """
+        return all(
+            np.allclose(m, np.eye(m.shape[-1]), atol=atol)
+            for m in self.completeness.values()
+        )
+
+    def is_noiseless(self, atol=1e-12):
+        """
+        Returns True if every site channel is the identity, i.e. the dissipator vanishes.
+        """
+        for site, kraus_ops in self.kraus.items():
+            if site in self.superops:
+                superop = self.superops[site]
+                if not np.allclose(superop, np.eye(superop.shape[-1]), atol=atol):
+                    return False
+                continue
+            # An identity channel has Kraus operators c_k I with sum |c_k|^2 = 1
+            dim = kraus_ops.shape[-1]
+            scalars = np.trace(kraus_ops, axis1=-2, axis2=-1) / dim
+            if not np.allclose(kraus_ops, scalars[..., None, None] * np.eye(dim), atol=atol):
+                return False
+            if not np.allclose(np.sum(np.abs(scalars) ** 2, axis=-1), 1, atol=atol):
+                return False
+        return True
+
+    def apply_channel(self, rho):
+        """
+        Applies E = (x)_q E_q to a density matrix (or batch of them).
+        """
+        for site, kraus_ops in self.kraus.items():
+            if site in self.superops:
+                rho = apply_local_superoperator(rho, self.superops[site], site, self.num_qubits)
+            else:
+                rho = apply_kraus_channel(rho, kraus_ops, site, self.num_qubits)
+        return rho
+
+    def dissipator(self, rho):
+        """
+        Computes the Lindblad dissipator E(rho) - 1/2 {M, rho}.
+        """
+        if self.trace_preserving:
+            return self.apply_channel(rho) - rho
+        m_rho = rho
+        rho_m = rho
+        for site, m in self.completeness.items():
+            m_rho = apply_local_operator(m_rho, m, site, self.num_qubits, side="left")
+            rho_m = apply_local_operator(rho_m, m, site, self.num_qubits, side="right")
+        return self.apply_channel(rho) - 0.5 * (m_rho + rho_m)
+
+    def channel_norm_bound(self):
+        """
+        Returns an upper bound on the operator norm of E (over the whole batch).
+        """
+        norms = [
+            _max_spectral_norm(self.superops[site])
+            if site in self.superops
+            # ||sum_k K_k X K_k^dag|| <= sum_k ||K_k||^2 ||X||
+            else float(np.max(np.sum(np.linalg.norm(ops, 2, axis=(-2, -1)) ** 2, axis=-1)))
+            for site, ops in self.kraus.items()
+        ]
+        return float(np.prod(norms))
+
+    def dissipator_norm_bound(self):
+        """
+        Returns an upper bound on the operator norm of the dissipator.
+        """
+        completeness_norm = np.prod(
+            [_max_spectral_norm(m) for m in self.completeness.values()]
+        )
+        return self.channel_norm_bound() + float(completeness_norm)
+
+    def to_c_ops(self):
+        """
+        Materializes the equivalent dense collapse-operator list.
+
+        Only feasible for a handful of qubits; used by the "mesolve" and
+        "propagator" engines and to cross-check the local representation.
+
+        Returns:
+        list of qutip.Qobj: One operator per combination of site Kraus operators.
+
+        Raises:
+        ValueError: If the model is batched.
+        """
+        if self.batch_size is not None:
+            raise ValueError("A batched noise model has no single collapse-operator list.")
+        import qutip as qt
+
+        dim = 2**self.num_qubits
+        dims = [[2] * self.num_qubits, [2] * self.num_qubits]
+        sites = list(self.kraus.keys())
+        c_ops = []
+        for combination in itertools.product(*(self.kraus[site] for site in sites)):
+            op = np.eye(dim, dtype=complex)
+            for site, kraus_op in zip(sites, combination):
+                op = apply_local_operator(op, kraus_op, site, self.num_qubits)
+            c_ops.append(qt.Qobj(op, dims=dims))
+        return c_ops
+
+    def pauli_probabilities(self, atol=1e-10):
+        """
+        Returns the error probabilities of every site if each is a Pauli channel.
+
+        Writing K_k = sum_a c_ka P_a in the Pauli basis, a channel is a Pauli
+        channel rho -> sum_a p_a P_a rho P_a exactly when its chi matrix
+        chi_ab = sum_k c_ka c_kb^* is diagonal; p_a is then chi_aa.
+
+        Parameters:
+        atol (float): Tolerance on the off-diagonal chi entries.
+
+        Returns:
+        dict or None: Site -> probabilities of the 4^k Pauli strings on the site,
+                      ordered as pauli_strings(k); None if the model is batched,
+                      not trace-preserving, or some site is not a Pauli channel
+                      or is wider than PAULI_CHANNEL_MAX_QUBITS.
+        """
+        if self.batch_size is not None or not self.trace_preserving:
+            return None
+        probabilities = {}
+        for site, kraus_ops in self.kraus.items():
+            if len(site) > PAULI_CHANNEL_MAX_QUBITS:
+                return None
+            dim = 2 ** len(site)
+            paulis = pauli_strings(len(site))
+            coefficients = np.einsum("aij,kij->ka", paulis.conj(), kraus_ops) / dim
+            chi = coefficients.T @ coefficients.conj()
+            diagonal = np.diag(chi)
+            if not np.allclose(chi - np.diag(diagonal), 0, atol=atol):
+                return None
+            probabilities[site] = np.clip(diagonal.real, 0, None)
+        return probabilities
+
+    def fingerprint(self):
+        """
+        Returns a content hash of the model, used as part of cache keys.
+        """
+        digest = hashlib.sha1(f"{self.num_qubits}/{self.batch_size}".encode())
+        for site in sorted(self.kraus):
+            digest.update(repr(site).encode())
+            digest.update(np.ascontiguousarray(self.kraus[site]).tobytes())
+        return digest.hexdigest()
+
+    @property
+    def nbytes(self):
+        """Memory held by the Kraus operators and their derived superoperators."""
+        return sum(
+            a.nbytes
+            for table in (self.kraus, self.superops, self.completeness)
+            for a in table.values()
+        )
+
+    def __repr__(self):
+        batch = "" if self.batch_size is None else f", batch_size={self.batch_size}"
+        return f"LocalNoiseModel({self.num_qubits} qubits, sites={list(self.kraus.keys())}{batch})"
+
+
+def _max_spectral_norm(matrices):
+    """Largest spectral norm of a matrix or of a stack of matrices."""
+    return float(np.max(np.linalg.norm(matrices, 2, axis=(-2, -1))))
+
+
+def pauli_strings(num_qubits):
+    """
+    Matrices of all Pauli strings on a number of qubits.
+
+    Args:
+        num_qubits (int): Length of the strings
+
+    Returns:
+        np.ndarray: Shape (4^k, 2^k, 2^k). String a has the Pauli a_j on qubit j,
+            where a = sum_j a_j 4^(k-1-j) and a_j = x + 2 z indexes I, X, Z, Y
+            (the first qubit is the most significant factor)
+    """
+    paulis = np.array(
+        [[[1, 0], [0, 1]], [[0, 1], [1, 0]], [[1, 0], [0, -1]], [[0, -1j], [1j, 0]]],
+        dtype=complex,
+    )
+    strings = np.ones((1, 1, 1), dtype=complex)
+    for _ in range(num_qubits):
+        strings = np.einsum("aij,bkl->abikjl", strings, paulis).reshape(
+            4 * strings.shape[0], 2 * strings.shape[1], 2 * strings.shape[2]
+        )
+    return strings
+
+
+def depolarizing_kraus(p):
+    """
+    Kraus operators of the single-qubit depolarizing channel.
+
+    Args:
+        p (float or array_like): Depolarizing probability, or an array of them
+
+    Returns:
+        np.ndarray: Shape p.shape + (4, 2, 2): sqrt(1-p) I, sqrt(p/3) X, sqrt(p/3) Y,
+            sqrt(p/3) Z
+    """
+    paulis = np.array(
+        [[[1, 0], [0, 1]], [[0, 1], [1, 0]], [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]],
+        dtype=complex,
+    )
+    p = np.asarray(p, dtype=float)
+    weights = np.sqrt(np.stack([1 - p, p / 3, p / 3, p / 3], axis=-1))
+    return weights[..., None, None] * paulis
@@ -0,0 +1,218 @@
+import numpy as np
+
+from pauli_tableau import PAULI_BITS, CliffordLayer
+
+"""
+Pauli-Frame Sampling
+
+Monte-Carlo estimate of which Pauli errors reach the end of a Clifford circuit.
+Every shot carries a Pauli frame (the error accumulated so far) as X/Z bits.
+The frames of many shots are packed into the bits of uint8 words, eight shots per
+byte, so x and z have shape (num_qubits, ceil(shots / 8)) and the symplectic
+updates of CliffordLayer move all shots of a qubit with one XOR.
+
+Noise is specified per gate name: after every gate of that name, each qubit it
+acts on independently suffers X, Y or Z with probabilities (p_x, p_y, p_z). A
+single number p means depolarizing noise (p/3, p/3, p/3). Error layers
+({"type": "error", ...}) of a propagation IR are applied to every shot.
+
+Error positions are drawn sparsely, by summing geometric gaps between
+consecutive errors, so the cost grows with the number of errors rather than with
+the number of shots times gates.
+"""
+
+DEFAULT_BATCH_SHOTS = 65536
+
+# Above this probability, drawing one uniform per shot is cheaper than geometric gaps
+DENSE_SAMPLING_THRESHOLD = 0.1
+
+PAULI_LABELS = np.array(["I", "X", "Z", "Y"])  # indexed by x + 2 z
+
+
+def sample_pauli_frames(
+    circuit_ir,
+    error_probabilities,
+    num_shots=100000,
+    qubits=None,
+    batch_shots=DEFAULT_BATCH_SHOTS,
+    seed=None,
+):
+    """
+    Samples the output Pauli errors of a noisy Clifford circuit.
+
+    Args:
+        circuit_ir (list): Circuit layers with "gates" (H, S, CX, X, Y, Z, I), and
+            optionally error layers with "type": "error"
+        error_probabilities (dict): Gate name -> p or (p_x, p_y, p_z); gates not
+            listed are noiseless
+        num_shots (int): Number of shots to sample
+        qubits (list): Qubits whose errors are recorded, defaults to all of them
+        batch_shots (int): Shots propagated together, bounds the memory use
+        seed (int or np.random.Generator): Seed of the random number generator
+
+    Returns:
+        dict: num_shots; histogram, mapping Pauli strings over the recorded
+            qubits (first qubit first) to shot counts, most frequent first;
+            error_rate, the fraction of shots with any recorded error; and
+            qubit_error_rates, the error fraction of every recorded qubit
+
+    Raises:
+        ValueError: For non-Clifford gates, invalid probabilities or arguments
+    """
+    if num_shots < 1 or batch_shots < 1:
+        raise ValueError("num_shots and batch_shots must be positive.")
+    noise = {name: _pauli_probabilities(p) for name, p in error_probabilities.items()}
+
+    layers = []
+    num_qubits = max([layer.get("numRows", 0) for layer in circuit_ir], default=0)
+    for layer in circuit_ir:
+        if layer.get("type") == "error":
+            errors = [(PAULI_BITS[name], qubit) for name, qubit in layer["gates"]]
+            num_qubits = max([num_qubits] + [qubit + 1 for _, qubit in errors])
+            layers.append((None, errors))
+            continue
+        if any(gate[0] == "T" for gate in layer["gates"]):
+            raise ValueError("Pauli-frame sampling requires a Clifford circuit (no T gates).")
+        clifford_layer = CliffordLayer(layer["gates"])
+        num_qubits = max(num_qubits, clifford_layer.num_qubits)
+        layers.append((clifford_layer, _noise_sites(layer["gates"], noise)))
+
+    qubits = list(range(num_qubits)) if qubits is None else list(qubits)
+    if any(q < 0 or q >= num_qubits for q in qubits):
+        raise ValueError(f"Recorded qubits must lie between 0 and {num_qubits - 1}.")
+
+    rng = np.random.default_rng(seed)
+    histogram = {}
+    qubit_errors = np.zeros(len(qubits), dtype=np.int64)
+    for start in range(0, num_shots, batch_shots):
+        shots = min(batch_shots, num_shots - start)
+        x, z = _propagate_frames(layers, num_qubits, shots, rng)
+        x, z = x[qubits], z[qubits]
+        qubit_errors += _popcount(x | z).sum(axis=1)
+        for label, count in _frame_histogram(x, z, shots).items():
+            histogram[label] = histogram.get(label, 0) + count
+
+    identity = "I" * len(qubits)
+    return {
+        "num_shots": num_shots,
+        "histogram": dict(sorted(histogram.items(), key=lambda item: -item[1])),
+        "error_rate": 1.0 - histogram.get(identity, 0) / num_shots,
+        "qubit_error_rates": (qubit_errors / num_shots).tolist(),
+    }
+
+
+def _pauli_probabilities(p):
+    """Normalizes p or (p_x, p_y, p_z) into an array of three probabilities."""
+    probs = np.full(3, p / 3) if np.ndim(p) == 0 else np.asarray(p, dtype=float)
+    if probs.shape != (3,) or np.any(probs < 0) or probs.sum() > 1:
+        raise ValueError(f"Invalid Pauli error probabilities: {p}")
+    return probs
+
+
+def _noise_sites(gates, noise):
+    """Groups the qubits of a layer's noisy gates by their error probabilities."""
+    groups = {}
+    for gate in gates:
+        probs = noise.get(gate[0])
+        if probs is not None and probs.sum() > 0:
+            groups.setdefault(tuple(probs), []).extend(gate[1:])
+    return [(np.array(probs), np.array(sites, dtype=np.intp)) for probs, sites in groups.items()]
+
+
+def _propagate_frames(layers, num_qubits, shots, rng):
+    """Runs one batch of shots through the compiled layers, returns packed (x, z)."""
+    num_bytes = (shots + 7) // 8
+    x = np.zeros((num_qubits, num_bytes), dtype=np.uint8)
+    z = np.zeros((num_qubits, num_bytes), dtype=np.uint8)
+    # Error layers hit every shot, but must leave the padding bits clear
+    all_shots = np.packbits(np.ones(shots, dtype=bool), bitorder="little")
+
+    for clifford_layer, sites in layers:
+        if clifford_layer is None:
+            for (x_bit, z_bit), qubit in sites:
+                x[qubit] ^= all_shots * np.uint8(x_bit)
+                z[qubit] ^= all_shots * np.uint8(z_bit)
+            continue
+        clifford_layer.apply(x, z)
+        for probs, qubits in sites:
+            _inject_errors(x, z, rng, probs, qubits, shots)
+    return x, z
+
+
+def _inject_errors(x, z, rng, probs, qubits, shots):
+    """
+    XORs independent Pauli errors on the given qubits into packed frames.
+
+    The work is proportional to the number of sampled errors: their bits are
+    summed per byte (positions are distinct, so the sum is an OR) and only the
+    touched bytes are updated.
+    """
+    p_error = probs.sum()
+    positions = _bernoulli_positions(rng, len(qubits) * shots, p_error)
+    if positions.size == 0:
+        return
+    # One uniform per error picks X (u < p_x), Y or Z (u >= p_x + p_y)
+    u = rng.random(positions.size) * p_error
+    sites, shot_indices = np.divmod(positions, shots)
+    bits = np.left_shift(np.uint8(1), (shot_indices & 7).astype(np.uint8))
+    # Positions are sorted, so errors sharing a byte are adjacent
+    byte_keys = sites * x.shape[1] + (shot_indices >> 3)
+    starts = np.flatnonzero(np.diff(byte_keys, prepend=-1))
+    rows = qubits[sites[starts]]
+    columns = shot_indices[starts] >> 3
+    x[rows, columns] ^= np.add.reduceat(bits * (u < probs[0] + probs[1]), starts, dtype=np.uint8)
+    z[rows, columns] ^= np.add.reduceat(bits * (u >= probs[0]), starts, dtype=np.uint8)
+
+
+def _bernoulli_positions(rng, size, p):
+    """Sorted indices of the successes among size independent Bernoulli(p) trials."""
+    if p >= DENSE_SAMPLING_THRESHOLD:
+        return np.flatnonzero(rng.random(size) < p)
+    positions = []
+    last = -1
+    expected = size * p
+    while True:
+        gaps = rng.geometric(p, size=int(expected + 5 * np.sqrt(expected) + 16))
+        candidates = last + np.cumsum(gaps)
+        positions.append(candidates[candidates < size])
+        if candidates[-1] >= size:
+            return np.concatenate(positions)
+        last = candidates[-1]
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(packed):
+    """Number of set bits of every byte."""
+    return _POPCOUNT[packed].astype(np.int64)
+
+
+def _frame_histogram(x, z, shots):
+    """Counts the distinct Pauli strings among packed frames of shape (k, bytes)."""
+    num_qubits = x.shape[0]
+    if num_qubits == 0:
+        return {"": shots}
+    # Regroup the bits per shot: (k, shots) -> (shots, ceil(k / 8)) for x and z
+    keys = np.concatenate(
+        [
+            np.packbits(np.unpackbits(bits, axis=1, count=shots, bitorder="little"), axis=0).T
+            for bits in (x, z)
+        ],
+        axis=1,
+    )
+    keys = np.ascontiguousarray(keys)
+    if keys.shape[1] <= 8:
+        # Narrow keys sort much faster as integers
+        padded = np.zeros((shots, 8), dtype=np.uint8)
+        padded[:, : keys.shape[1]] = keys
+        unique_ints, counts = np.unique(padded.view(np.uint64)[:, 0], return_counts=True)
+        unique_keys = unique_ints.view(np.uint8).reshape(-1, 8)[:, : keys.shape[1]]
+    else:
+        unique_keys, counts = np.unique(keys, axis=0, return_counts=True)
+
+    half = unique_keys.shape[1] // 2
+    x_bits = np.unpackbits(unique_keys[:, :half], axis=1, count=num_qubits)
+    z_bits = np.unpackbits(unique_keys[:, half:], axis=1, count=num_qubits)
+    labels = PAULI_LABELS[x_bits + 2 * z_bits]
+    return {"".join(label): int(count) for label, count in zip(labels, counts)}
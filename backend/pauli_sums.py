@@ -0,0 +1,313 @@
+import numpy as np
+
+"""
+Phase-Tracking Pauli Propagation
+
+A PauliSum is an operator sum_k c_k P_k, where every P_k is a Hermitian Pauli
+string stored as X/Z bits (I = (0, 0), X = (1, 0), Y = (1, 1), Z = (0, 1)) and
+c_k is a complex coefficient. Unlike commutation_rules and
+simplify_propagated_errors, phases are kept:
+
+   - Clifford gates map a Pauli to +-1 times another Pauli (the sign rules of
+     Aaronson and Gottesman's CHP tableau);
+   - products of Paulis pick up powers of i (X Y = i Z, ...);
+   - T and T^dag map X and Y to (X +- Y) / sqrt(2), so every term acting with X
+     or Y on the qubit branches into two terms.
+
+Propagating an error E through a gate U gives U E U^dag, the error after U.
+Terms are stored column-wise: x and z have shape (num_qubits, num_terms), so a
+gate updates whole rows and every rule is vectorized over the terms. After
+branching, equal Pauli strings are merged, coefficients below atol are pruned,
+and at most max_terms terms with the largest coefficients are kept. The total
+magnitude of the dropped coefficients is reported as discarded_weight, which
+bounds the error of the truncated sum in operator norm.
+
+Supported gates: 'I', 'X', 'Y', 'Z', 'H', 'S', 'SDG' (S^dag), 'T', 'TDG' (T^dag)
+and 'CX'.
+"""
+
+DEFAULT_MAX_TERMS = 4096
+DEFAULT_ATOL = 1e-12
+
+PAULI_BITS = {"I": (0, 0), "X": (1, 0), "Y": (1, 1), "Z": (0, 1)}
+PAULI_LABELS = np.array(["I", "X", "Z", "Y"])  # indexed by x + 2 z
+
+
+class PauliSum:
+    def __init__(self, x, z, coefficients, max_terms=DEFAULT_MAX_TERMS, atol=DEFAULT_ATOL):
+        """
+        Initializes a PauliSum instance.
+
+        Parameters:
+        x (array_like): X bits, shape (num_qubits, num_terms).
+        z (array_like): Z bits, same shape as x.
+        coefficients (array_like): Complex coefficients, shape (num_terms,).
+        max_terms (int): Number of terms kept after each simplification.
+        atol (float): Coefficients with smaller magnitude are pruned.
+
+        Raises:
+        ValueError: If the shapes do not match or max_terms is not positive.
+        """
+        self.x = np.asarray(x, dtype=bool)
+        self.z = np.asarray(z, dtype=bool)
+        self.coefficients = np.asarray(coefficients, dtype=complex)
+        if (
+            self.x.ndim != 2
+            or self.x.shape != self.z.shape
+            or self.coefficients.shape != (self.x.shape[1],)
+        ):
+            raise ValueError(
+                "x and z must have shape (num_qubits, num_terms) and coefficients (num_terms,)."
+            )
+        if max_terms < 1:
+            raise ValueError("max_terms must be positive.")
+        self.max_terms = max_terms
+        self.atol = atol
+        self.discarded_weight = 0.0
+
+    @classmethod
+    def from_errors(cls, errors, num_qubits, **kwargs):
+        """
+        Creates the single-term sum of a list of Pauli errors.
+
+        Errors are applied in list order, so the operator is P_n ... P_2 P_1 and
+        repeated errors on a qubit contribute their phase (e.g. X then Z gives ZX = iY).
+
+        Parameters:
+        errors (list of tuples): Errors of the form ('X' | 'Y' | 'Z', qubit).
+        num_qubits (int): The total number of qubits.
+        **kwargs: max_terms and atol.
+
+        Returns:
+        PauliSum: The product of the errors.
+        """
+        pauli_sum = cls.identity(num_qubits, **kwargs)
+        pauli_sum.apply_errors(errors)
+        return pauli_sum
+
+    @classmethod
+    def from_label(cls, label, coefficient=1.0, **kwargs):
+        """
+        Creates coefficient * P from a Pauli string such as "XIZ" (qubit 0 first).
+        """
+        if set(label) - set(PAULI_BITS):
+            raise ValueError(f"Invalid Pauli string {label}.")
+        bits = np.array([PAULI_BITS[name] for name in label], dtype=bool).reshape(-1, 2)
+        return cls(bits[:, :1], bits[:, 1:], [coefficient], **kwargs)
+
+    @classmethod
+    def identity(cls, num_qubits, **kwargs):
+        """
+        Creates the identity operator on num_qubits qubits.
+        """
+        return cls(
+            np.zeros((num_qubits, 1), dtype=bool), np.zeros((num_qubits, 1), dtype=bool), [1.0], **kwargs
+        )
+
+    @property
+    def num_qubits(self):
+        return self.x.shape[0]
+
+    @property
+    def num_terms(self):
+        return self.x.shape[1]
+
+    def apply_errors(self, errors):
+        """
+        Left-multiplies every term by the given Pauli errors, in list order.
+
+        Parameters:
+        errors (list of tuples): Errors of the form ('X' | 'Y' | 'Z', qubit).
+        """
+        for error_name, qubit in errors:
+            if error_name not in PAULI_BITS:
+                raise ValueError(f"Invalid error '{error_name}'. Only 'X', 'Y', and 'Z' errors are allowed.")
+            error_x, error_z = PAULI_BITS[error_name]
+            exponent = _product_phase_exponent(error_x, error_z, self.x[qubit], self.z[qubit])
+            self.coefficients = self.coefficients * 1j**exponent
+            self.x[qubit] ^= bool(error_x)
+            self.z[qubit] ^= bool(error_z)
+
+    def apply_gate(self, gate):
+        """
+        Conjugates every term by a gate: P -> U P U^dag.
+
+        Parameters:
+        gate (tuple): Gate of the form ('gate_name', index_1, ...).
+
+        Raises:
+        ValueError: If the gate is not supported.
+        """
+        gate_name, qubits = gate[0], gate[1:]
+        x, z = self.x, self.z
+        if gate_name == "CX":
+            control, target = qubits
+            sign = x[control] & z[target] & ~(x[target] ^ z[control])
+            x[target] ^= x[control]
+            z[control] ^= z[target]
+            self._flip_signs(sign)
+            return
+
+        q = qubits[0]
+        if gate_name == "H":
+            self._flip_signs(x[q] & z[q])
+            x[q], z[q] = z[q].copy(), x[q].copy()
+        elif gate_name == "S":
+            self._flip_signs(x[q] & z[q])
+            z[q] ^= x[q]
+        elif gate_name == "SDG":
+            self._flip_signs(x[q] & ~z[q])
+            z[q] ^= x[q]
+        elif gate_name == "X":
+            self._flip_signs(z[q])
+        elif gate_name == "Y":
+            self._flip_signs(x[q] ^ z[q])
+        elif gate_name == "Z":
+            self._flip_signs(x[q])
+        elif gate_name in ("T", "TDG"):
+            self._branch_t(q, 1 if gate_name == "T" else -1)
+        elif gate_name != "I":
+            raise ValueError(f"Unsupported gate for Pauli propagation: {gate_name}")
+
+    def apply_layer(self, gates):
+        """
+        Conjugates every term by all gates of a layer, then simplifies.
+        """
+        for gate in gates:
+            self.apply_gate(gate)
+        self.simplify()
+
+    def _flip_signs(self, mask):
+        """Negates the coefficients of the selected terms."""
+        self.coefficients = np.where(mask, -self.coefficients, self.coefficients)
+
+    def _branch_t(self, qubit, direction):
+        """
+        Applies T (direction 1) or T^dag (direction -1) on one qubit.
+
+        T X T^dag = (X + Y) / sqrt(2) and T Y T^dag = (Y - X) / sqrt(2): terms with
+        an X or Y on the qubit keep their Pauli with weight 1/sqrt(2) and gain a
+        copy with the Z bit flipped, weighted +-1/sqrt(2).
+        """
+        branching = self.x[qubit]
+        if not branching.any():
+            return
+        scale = np.where(branching, np.sqrt(0.5), 1.0)
+        new_x = self.x[:, branching]
+        new_z = self.z[:, branching]
+        # X -> +Y for T, Y -> -X for T; T^dag reverses both signs
+        new_signs = np.where(new_z[qubit], -direction, direction) * np.sqrt(0.5)
+        new_coefficients = self.coefficients[branching] * new_signs
+        new_z[qubit] ^= True
+
+        self.x = np.concatenate([self.x, new_x], axis=1)
+        self.z = np.concatenate([self.z, new_z], axis=1)
+        self.coefficients = np.concatenate([self.coefficients * scale, new_coefficients])
+
+    def simplify(self):
+        """
+        Merges equal Pauli strings, prunes small coefficients and keeps at most max_terms terms.
+        """
+        if self.num_terms > 1:
+            # Sort the terms by their bits, packed into uint64 words, and sum runs of equal keys
+            packed = np.packbits(np.concatenate([self.x, self.z]), axis=0)
+            num_bytes = -(-packed.shape[0] // 8) * 8
+            keys = np.zeros((self.num_terms, num_bytes), dtype=np.uint8)
+            keys[:, : packed.shape[0]] = packed.T
+            keys = keys.view(np.uint64)
+            order = np.lexsort(keys.T)
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(
+                np.concatenate([[True], np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)])
+            )
+            first = order[starts]
+            coefficients = np.add.reduceat(self.coefficients[order], starts)
+            self.x, self.z, self.coefficients = self.x[:, first], self.z[:, first], coefficients
+
+        magnitudes = np.abs(self.coefficients)
+        keep = magnitudes > self.atol
+        if keep.sum() > self.max_terms:
+            threshold = np.partition(magnitudes, -self.max_terms)[-self.max_terms]
+            keep &= magnitudes >= threshold
+            keep[np.flatnonzero(keep)[self.max_terms :]] = False
+        self.discarded_weight += float(magnitudes[~keep].sum())
+        self.x, self.z, self.coefficients = self.x[:, keep], self.z[:, keep], self.coefficients[keep]
+
+    def terms(self):
+        """
+        Returns the terms as (coefficient, Pauli string) pairs, largest first.
+
+        Returns:
+        list of tuples: Complex coefficient and Pauli string, qubit 0 first.
+        """
+        labels = PAULI_LABELS[self.x.astype(np.intp) + 2 * self.z.astype(np.intp)]
+        order = np.argsort(-np.abs(self.coefficients), kind="stable")
+        return [(complex(self.coefficients[k]), "".join(labels[:, k])) for k in order]
+
+    def to_matrix(self):
+        """
+        Builds the dense 2^n x 2^n operator (qubit 0 is the most significant factor).
+        """
+        paulis = {
+            "I": np.eye(2, dtype=complex),
+            "X": np.array([[0, 1], [1, 0]], dtype=complex),
+            "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+            "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+        }
+        matrix = np.zeros((2**self.num_qubits,) * 2, dtype=complex)
+        for coefficient, label in self.terms():
+            term = np.array([[coefficient]])
+            for name in label:
+                term = np.kron(term, paulis[name])
+            matrix += term
+        return matrix
+
+    def __repr__(self):
+        return f"PauliSum({self.num_qubits} qubits, {self.num_terms} terms)"
+
+
+def _product_phase_exponent(x1, z1, x2, z2):
+    """
+    Power of i in P1 P2 = i^k P3 for Hermitian Paulis, vectorized over terms.
+
+    Follows the g function of Aaronson and Gottesman: X Y = iZ, Y Z = iX, Z X = iY.
+    """
+    x2 = np.asarray(x2, dtype=np.int8)
+    z2 = np.asarray(z2, dtype=np.int8)
+    if x1 and z1:
+        return z2 - x2
+    if x1:
+        return z2 * (2 * x2 - 1)
+    if z1:
+        return x2 * (1 - 2 * z2)
+    return np.zeros_like(x2)
+
+
+def propagate_error_sum(circuit_ir, max_terms=DEFAULT_MAX_TERMS, atol=DEFAULT_ATOL):
+    """
+    Pushes every error layer to the end of the circuit, keeping phases and T branches.
+
+    The phase-tracking counterpart of propagate_all_error_layers: each error is
+    conjugated by every later gate layer, and later errors multiply the
+    accumulated operator from the left.
+
+    Args:
+        circuit_ir (list): Layers with "gates", error layers marked "type": "error"
+        max_terms (int): Bound on the number of terms of the sum
+        atol (float): Pruning threshold of the coefficients
+
+    Returns:
+        PauliSum: The combined error operator at the end of the circuit
+    """
+    num_qubits = max(
+        [layer.get("numRows", 0) for layer in circuit_ir]
+        + [max(gate[1:]) + 1 for layer in circuit_ir for gate in layer["gates"]],
+        default=0,
+    )
+    error_sum = PauliSum.identity(num_qubits, max_terms=max_terms, atol=atol)
+    for layer in circuit_ir:
+        if layer.get("type") == "error":
+            error_sum.apply_errors(layer["gates"])
+        else:
+            error_sum.apply_layer(layer["gates"])
+    return error_sum
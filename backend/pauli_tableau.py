@@ -0,0 +1,181 @@
+import numpy as np
+
+"""
+Symplectic Pauli Propagation
+
+Pauli errors are stored as two bit-vectors, x and z, with one entry per qubit
+(I = (0, 0), X = (1, 0), Y = (1, 1), Z = (0, 1)); phases are dropped, as in
+commutation_rules. Multiplying Paulis is an XOR of their bits, and conjugating by
+a Clifford gate is a linear update of the bits:
+
+   H on q:        swap x[q] and z[q]
+   S on q:        z[q] ^= x[q]
+   CX on (c, t):  x[t] ^= x[c],  z[c] ^= z[t]
+
+The X, Y, Z, I and T gates leave errors unchanged, again matching
+commutation_rules. Gates in a layer act on distinct qubits, so a whole layer is
+applied with a few vectorized index operations.
+
+The qubit is always the first axis of x and z; trailing axes are carried along
+untouched, so the same updates apply to a single error (shape (n,)) or to many
+error frames at once (shape (n, ...)), including bit-packed frames.
+"""
+
+PAULI_BITS = {"I": (0, 0), "X": (1, 0), "Y": (1, 1), "Z": (0, 1)}
+BITS_PAULI = {bits: name for name, bits in PAULI_BITS.items()}
+
+# Gates that leave every Pauli error unchanged (up to a phase, or by convention for T)
+PASS_THROUGH_GATES = {"I", "X", "Y", "Z", "T"}
+
+
+class CliffordLayer:
+    def __init__(self, gates):
+        """
+        Compiles a layer of gates into the index arrays of its symplectic update.
+
+        Parameters:
+        gates (list of tuples): Gates of the form ('gate_name', index_1, ...).
+
+        Raises:
+        ValueError: If a gate is unsupported or a qubit is used twice.
+        """
+        hadamards, phases, controls, targets, others = [], [], [], [], []
+        for gate in gates:
+            gate_name = gate[0]
+            if gate_name == "CX":
+                controls.append(gate[1])
+                targets.append(gate[2])
+            elif gate_name == "H":
+                hadamards.append(gate[1])
+            elif gate_name == "S":
+                phases.append(gate[1])
+            elif gate_name in PASS_THROUGH_GATES:
+                others.append(gate[1])
+            else:
+                raise ValueError(f"Unsupported gate for Pauli propagation: {gate_name}")
+
+        qubits = hadamards + phases + controls + targets + others
+        if len(set(qubits)) != len(qubits):
+            raise ValueError(f"Layer contains overlapping gates: {gates}")
+
+        self.hadamards = np.array(hadamards, dtype=np.intp)
+        self.phases = np.array(phases, dtype=np.intp)
+        self.controls = np.array(controls, dtype=np.intp)
+        self.targets = np.array(targets, dtype=np.intp)
+        self.num_qubits = max(qubits) + 1 if qubits else 0
+
+    def apply(self, x, z):
+        """
+        Conjugates the Pauli frames (x, z) by the layer, in place.
+
+        Parameters:
+        x (np.ndarray): X bits, qubit axis first.
+        z (np.ndarray): Z bits, same shape as x.
+        """
+        if self.hadamards.size:
+            x_bits = x[self.hadamards].copy()
+            x[self.hadamards] = z[self.hadamards]
+            z[self.hadamards] = x_bits
+        if self.phases.size:
+            z[self.phases] ^= x[self.phases]
+        if self.controls.size:
+            x[self.targets] ^= x[self.controls]
+            z[self.controls] ^= z[self.targets]
+
+    def __repr__(self):
+        return (
+            f"CliffordLayer(H={self.hadamards.tolist()}, S={self.phases.tolist()}, "
+            f"CX={list(zip(self.controls.tolist(), self.targets.tolist()))})"
+        )
+
+
+def errors_to_bits(errors, num_qubits):
+    """
+    Converts a list of Pauli errors into X/Z bit-vectors.
+
+    Several errors on one qubit are multiplied, as in simplify_propagated_errors.
+
+    Args:
+        errors (list): Errors of the form ('X' | 'Y' | 'Z', qubit)
+        num_qubits (int): Length of the bit-vectors
+
+    Returns:
+        tuple: (x, z) uint8 arrays of shape (num_qubits,)
+    """
+    x = np.zeros(num_qubits, dtype=np.uint8)
+    z = np.zeros(num_qubits, dtype=np.uint8)
+    for error_name, qubit in errors:
+        if error_name not in PAULI_BITS:
+            raise ValueError(f"Invalid error '{error_name}'. Only 'X', 'Y', and 'Z' errors are allowed.")
+        x_bit, z_bit = PAULI_BITS[error_name]
+        x[qubit] ^= x_bit
+        z[qubit] ^= z_bit
+    return x, z
+
+
+def bits_to_errors(x, z):
+    """
+    Converts X/Z bit-vectors back into a list of Pauli errors, ordered by qubit.
+
+    Args:
+        x (np.ndarray): X bits, shape (num_qubits,)
+        z (np.ndarray): Z bits, shape (num_qubits,)
+
+    Returns:
+        list: Errors of the form ('X' | 'Y' | 'Z', qubit), identities omitted
+    """
+    return [
+        (BITS_PAULI[(int(x[q]), int(z[q]))], int(q))
+        for q in np.flatnonzero(x | z)
+    ]
+
+
+def propagate_all_error_layers(circuit_ir):
+    """
+    Pushes every error layer to the end of the circuit in one pass.
+
+    Equivalent to calling propagate_first_error_layer until all errors have
+    reached the end: each error is conjugated by every later gate layer and the
+    errors are multiplied together.
+
+    Args:
+        circuit_ir (list): Layers of the form {"type": "normal" | "error", "gates": [...]}
+
+    Returns:
+        list: The gate layers in their original order, followed by one error
+            layer holding the combined propagated errors. A circuit without
+            error layers is returned unchanged.
+    """
+    if not any(layer["type"] == "error" for layer in circuit_ir):
+        return circuit_ir
+
+    # Compile the gate layers first, they determine the number of qubits
+    compiled = [
+        CliffordLayer(layer["gates"]) if layer["type"] != "error" else None
+        for layer in circuit_ir
+    ]
+    num_qubits = max(
+        [layer.num_qubits for layer in compiled if layer is not None]
+        + [
+            qubit + 1
+            for layer in circuit_ir
+            if layer["type"] == "error"
+            for _, qubit in layer["gates"]
+        ],
+        # Error layers without gates on a circuit without gates
+        default=0,
+    )
+
+    x = np.zeros(num_qubits, dtype=np.uint8)
+    z = np.zeros(num_qubits, dtype=np.uint8)
+    gate_layers = []
+    for layer, clifford_layer in zip(circuit_ir, compiled):
+        if clifford_layer is None:
+            error_x, error_z = errors_to_bits(layer["gates"], num_qubits)
+            x ^= error_x
+            z ^= error_z
+        else:
+            clifford_layer.apply(x, z)
+            gate_layers.append(layer.copy())
+
+    return gate_layers + [{"type": "error", "gates": bits_to_errors(x, z)}]
@@ -0,0 +1,373 @@
+import numpy as np
+
+from caching import LRUCache
+from density_kernels import integrate_linear
+from noise_models import pauli_strings
+
+"""
+Pauli-Transfer Evolution
+
+A density matrix on n qubits is a real combination of the 4^n Pauli strings,
+
+   rho = sum_Q c_Q Q / 2^n,   c_Q = Tr(Q rho),
+
+and a PauliTransferState stores the coefficients c_Q as an array of shape
+(4,) * n, one axis per qubit indexed I, X, Z, Y (x + 2 z, as pauli_strings).
+The dense matrix is only built by to_dense().
+
+A Pauli channel is diagonal in this basis. A trace-preserving LocalNoiseModel
+E = (x)_sites E_site whose sites are Pauli channels has eigenvalues
+Lambda_Q = prod_sites lambda_site(Q), where lambda = C p for a site with error
+probabilities p and the character table C_ab = (-1)^<a, b> of the symplectic
+product, so its dissipator E - id scales c_Q by D_Q = Lambda_Q - 1. A gate
+window -i[theta P, .] + D for a Pauli string P maps c_Q only to c_Q itself and
+to the coefficient of its partner Q' ~ P Q: commuting strings just decay, and
+every anticommuting pair rotates at frequency 2 theta while decaying at rates
+D_Q and D_Q'. The 2 x 2 exponential of each pair has a closed form, so the
+window is
+
+   c_Q <- a_Q c_Q + b_Q c_Q'
+
+with elementwise factors a and b, which a PauliNoise caches per window. Without
+noise they only depend on the qubits of P: the window is cos(2 theta d) c_Q -
+sin(2 theta d) sign_Q c_Q', a signed permutation at Clifford angles. Every
+CNOT pulse and every run of X, Y, Z, S and T gates has a Pauli string generator.
+
+Windows with H factors are taken to the frame where H = V Z V^dag (V a
+pi/4 rotation about Y), which mixes the X and Z coefficients of those qubits.
+In that frame the generator is again a Pauli string, and the noise is unchanged
+whenever its eigenvalues are symmetric under X <-> Z on the H qubits, as for
+depolarizing noise. Otherwise the window is integrated with integrate_linear.
+"""
+
+# Single-qubit Pauli matrices, indexed I, X, Z, Y
+PAULIS = pauli_strings(1)
+
+# Indices of the Pauli factors a window generator may have
+FACTOR_INDEX = {"I": 0, "X": 1, "Z": 2, "Y": 3}
+
+# (-1)^<a, b>: +1 if the single-qubit Paulis a and b commute
+CHARACTERS = np.array(
+    [[1 if a == 0 or b == 0 or a == b else -1 for b in range(4)] for a in range(4)]
+)
+
+# PHASES[p, a] is the phase w with P_p P_a = w P_(a ^ p)
+PHASES = np.array(
+    [
+        [np.trace(PAULIS[a ^ p].conj().T @ PAULIS[p] @ PAULIS[a]) / 2 for a in range(4)]
+        for p in range(4)
+    ]
+)
+
+# c' = FRAME_ROTATION c are the coefficients of V^dag rho V with V^dag H V = Z
+_R = np.sqrt(0.5)
+FRAME_ROTATION = np.array([[1, 0, 0, 0], [0, _R, -_R, 0], [0, _R, _R, 0], [0, 0, 0, 1]])
+
+# Signed permutation of the coefficients under conjugation by H
+HADAMARD_PERMUTATION = np.array([0, 2, 1, 3])
+HADAMARD_SIGNS = np.array([1, 1, 1, -1])
+
+_HADAMARD = np.array([[1, 1], [1, -1]], dtype=complex) / np.sqrt(2)
+
+# The window factors a, b of a noise model are cached per window; they are
+# small unless the window spans most of the register
+WINDOW_CACHE_SIZE = 256
+WINDOW_CACHE_MAX_BYTES = 64 * 2**20
+
+
+class PauliTransferState:
+    def __init__(self, coefficients):
+        """
+        Initializes a state from its Pauli coefficients.
+
+        Parameters:
+        coefficients (np.ndarray): c_Q = Tr(Q rho), shape (4,) * n.
+        """
+        self.coefficients = coefficients
+        self.num_qubits = coefficients.ndim
+
+    @classmethod
+    def from_dense(cls, rho):
+        """
+        Computes the Pauli coefficients of a density matrix in O(n 4^n).
+
+        The coefficients are real for a Hermitian rho and stored as such.
+        """
+        num_qubits = int(np.log2(rho.shape[-1]))
+        # Pair the row and column bit of every qubit into one axis of size 4
+        pairs = np.asarray(rho).reshape((2,) * (2 * num_qubits))
+        order = [axis for q in range(num_qubits) for axis in (q, num_qubits + q)]
+        coefficients = pairs.transpose(order).reshape((4,) * num_qubits)
+        # c_a = sum_rc P_a[c, r] rho[r, c]
+        transform = PAULIS.transpose(0, 2, 1).reshape(4, 4)
+        for axis in range(num_qubits):
+            coefficients = _apply_on_axis(coefficients, transform, axis)
+        if np.allclose(coefficients.imag, 0):
+            coefficients = np.ascontiguousarray(coefficients.real)
+        return cls(coefficients)
+
+    @property
+    def nbytes(self):
+        return self.coefficients.nbytes
+
+    def trace(self):
+        return self.coefficients.flat[0]
+
+    def to_dense(self):
+        """
+        Returns the density matrix sum_Q c_Q Q / 2^n.
+        """
+        num_qubits = self.num_qubits
+        # rho[r, c] = sum_a P_a[r, c] c_a / 2 per qubit
+        transform = PAULIS.reshape(4, 4).T / 2
+        pairs = self.coefficients.astype(complex)
+        for axis in range(num_qubits):
+            pairs = _apply_on_axis(pairs, transform, axis)
+        pairs = pairs.reshape((2,) * (2 * num_qubits))
+        order = [2 * q for q in range(num_qubits)] + [2 * q + 1 for q in range(num_qubits)]
+        dim = 2**num_qubits
+        return pairs.transpose(order).reshape(dim, dim)
+
+    def __repr__(self):
+        return f"PauliTransferState({self.num_qubits} qubits)"
+
+
+class PauliNoise:
+    def __init__(self, noise_model):
+        """
+        Precomputes the Pauli-transfer eigenvalues of a Pauli noise model.
+
+        Parameters:
+        noise_model (LocalNoiseModel): Trace-preserving, unbatched model whose
+                                       sites are Pauli channels.
+
+        Raises:
+        ValueError: If the model is not a Pauli channel.
+        """
+        probabilities = noise_model.pauli_probabilities()
+        if probabilities is None:
+            raise ValueError(
+                "The pauli engine requires an unbatched, trace-preserving Pauli noise model."
+            )
+        self.num_qubits = noise_model.num_qubits
+        self.fingerprint = noise_model.fingerprint()
+        self.num_terms = sum(int(np.count_nonzero(p)) for p in probabilities.values())
+        # Site -> (qubits in ascending order, eigenvalues - 1 over those qubits)
+        self.sites = {}
+        for site, probs in probabilities.items():
+            eigenvalues = probs.reshape((4,) * len(site))
+            for axis in range(len(site)):
+                eigenvalues = _apply_on_axis(eigenvalues, CHARACTERS, axis)
+            order = np.argsort(site)
+            qubits = tuple(int(site[i]) for i in order)
+            self.sites[site] = (qubits, eigenvalues.transpose(order) - 1)
+        eigenvalues = np.ones((1,) * self.num_qubits)
+        for qubits, rates in self.sites.values():
+            eigenvalues = eigenvalues * _embed(rates + 1, qubits, self.num_qubits)
+        self.rates = np.broadcast_to(eigenvalues, (4,) * self.num_qubits) - 1
+        self.max_rate = float(np.abs(self.rates).max())
+        self._decays = {}
+        self._windows = LRUCache(
+            maxsize=WINDOW_CACHE_SIZE, max_bytes=WINDOW_CACHE_MAX_BYTES, sizeof=_factors_nbytes
+        )
+
+    def decay(self, duration):
+        """exp(D duration), the evolution of the noise alone."""
+        if duration not in self._decays:
+            self._decays[duration] = np.exp(self.rates * duration)
+        return self._decays[duration]
+
+    def window_factors(self, paulis, angle, duration):
+        """
+        Returns the cached factors a, b of a window with a Pauli string generator.
+        """
+        key = (tuple(sorted(paulis.items())), angle, duration)
+        factors = self._windows.get(key)
+        if factors is None:
+            axes = tuple(range(self.num_qubits))
+            factors = _pauli_window_factors(axes, paulis, angle, self.rates * duration)
+            self._windows.put(key, factors)
+        return factors
+
+    def symmetric_under_hadamard(self, qubit):
+        """Whether the eigenvalues are unchanged by exchanging X and Z on a qubit."""
+        for qubits, rates in self.sites.values():
+            if qubit in qubits:
+                axis = qubits.index(qubit)
+                swapped = np.take(rates, HADAMARD_PERMUTATION, axis=axis)
+                if not np.allclose(rates, swapped, atol=1e-12):
+                    return False
+        return True
+
+    def __repr__(self):
+        return f"PauliNoise({self.num_qubits} qubits, sites={list(self.sites)})"
+
+
+def _apply_on_axis(array, matrix, axis):
+    """out[..., b, ...] = sum_a matrix[b, a] array[..., a, ...] on one axis."""
+    return np.moveaxis(np.tensordot(matrix, array, axes=([1], [axis])), 0, axis)
+
+
+def _embed(array, axes, num_axes):
+    """Reshapes an array over ascending axes so it broadcasts against (4,) * num_axes."""
+    shape = [1] * num_axes
+    for axis in axes:
+        shape[axis] = 4
+    return array.reshape(shape)
+
+
+def _factors_nbytes(factors):
+    return factors[0].nbytes + factors[1].nbytes
+
+
+def _factor_name(op):
+    """Name of a 2x2 window factor among I, X, Y, Z and H, or None."""
+    for name in ("I", "X", "Y", "Z"):
+        if np.allclose(op, PAULIS[FACTOR_INDEX[name]]):
+            return name
+    if np.allclose(op, _HADAMARD):
+        return "H"
+    return None
+
+
+def _pauli_window_factors(axes, paulis, angle, rates=None):
+    """
+    Factors a, b of a window with a Pauli string generator, over the given axes.
+
+    Parameters:
+    axes (tuple): Qubits of the factors, ascending; contains the support of P.
+    paulis (dict): Qubit -> index of the Pauli factor of P.
+    angle (float): scaling * duration of the window.
+    rates (np.ndarray): D over the axes times the duration, or None without noise.
+
+    Returns:
+    tuple: (a, b), arrays of shape (4,) * len(axes).
+    """
+    num_axes = len(axes)
+    anticommutes = np.zeros((1,) * num_axes, dtype=bool)
+    phase = np.ones((1,) * num_axes, dtype=complex)
+    for qubit, p in paulis.items():
+        axis = axes.index(qubit)
+        anticommutes = anticommutes ^ _embed(CHARACTERS[p] < 0, [axis], num_axes)
+        phase = phase * _embed(PHASES[p], [axis], num_axes)
+    # Over the window, -i theta [P, Q] contributes beta_Q to the partner P Q / phase
+    beta = np.where(anticommutes, (-2j * angle * phase).real, 0.0)
+
+    if rates is None:
+        a = np.where(anticommutes, np.cos(2 * angle), 1.0)
+        b = -np.sin(2 * abs(angle)) * np.sign(beta)
+    else:
+        positions = {qubit: axes.index(qubit) for qubit in paulis}
+        mean = (rates + _partner(rates, positions, paulis)) / 2
+        delta = rates - mean
+        frequency = np.sqrt((beta**2 - delta**2).astype(complex))
+        sinc = np.sinc(frequency / np.pi).real
+        a = np.exp(mean) * (np.cos(frequency).real + sinc * delta)
+        b = -np.exp(mean) * sinc * beta
+    shape = (4,) * num_axes
+    return np.broadcast_to(a, shape).copy(), np.broadcast_to(b, shape).copy()
+
+
+def _partner(array, axes, paulis):
+    """The array at the partner strings Q ^ P; axes maps the qubits of P to array axes."""
+    for qubit, p in paulis.items():
+        array = np.take(array, np.arange(4) ^ p, axis=axes[qubit])
+    return array
+
+
+def _apply_pauli_window(state, paulis, angle, duration, noise):
+    """Applies a window whose generator is a Pauli string, in place."""
+    coefficients = state.coefficients
+    num_qubits = state.num_qubits
+    if not paulis:
+        if noise is not None:
+            state.coefficients = noise.decay(duration) * coefficients
+        return
+    if noise is None:
+        axes = tuple(sorted(paulis))
+        a, b = _pauli_window_factors(axes, paulis, angle)
+        a, b = _embed(a, axes, num_qubits), _embed(b, axes, num_qubits)
+    else:
+        a, b = noise.window_factors(paulis, angle, duration)
+    partner = _partner(coefficients, {qubit: qubit for qubit in paulis}, paulis)
+    state.coefficients = a * coefficients + b * partner
+
+
+def _rotate_frame(state, qubits, inverse=False):
+    """Maps the coefficients to (or back from) the frame where H becomes Z on the qubits."""
+    rotation = FRAME_ROTATION.T if inverse else FRAME_ROTATION
+    for qubit in qubits:
+        state.coefficients = _apply_on_axis(state.coefficients, rotation, qubit)
+
+
+def _conjugate(state, names):
+    """Applies rho -> P rho P for P = (x)_q names[q], a signed permutation."""
+    coefficients = state.coefficients
+    for qubit, name in names.items():
+        if name == "H":
+            coefficients = np.take(coefficients, HADAMARD_PERMUTATION, axis=qubit)
+            signs = HADAMARD_SIGNS
+        else:
+            signs = CHARACTERS[FACTOR_INDEX[name]]
+        coefficients = coefficients * _embed(signs, [qubit], state.num_qubits)
+    state.coefficients = coefficients
+
+
+def _integrate_window(state, scaling, factors, duration, noise):
+    """Integrates -i[scaling P, .] + D with left and right products on the Pauli axes."""
+    left = {
+        qubit: np.einsum("bij,jk,aki->ba", PAULIS, op, PAULIS) / 2
+        for qubit, op in factors.items()
+    }
+    right = {
+        qubit: np.einsum("bij,ajk,ki->ba", PAULIS, PAULIS, op) / 2
+        for qubit, op in factors.items()
+    }
+    rates = 0.0 if noise is None else noise.rates
+
+    def generator(c):
+        p_c, c_p = c, c
+        for qubit in factors:
+            p_c = _apply_on_axis(p_c, left[qubit], qubit)
+            c_p = _apply_on_axis(c_p, right[qubit], qubit)
+        return -1j * scaling * (p_c - c_p) + rates * c
+
+    norm_bound = 2 * abs(scaling) * np.prod(
+        [np.linalg.norm(op, 2) for op in factors.values()]
+    ) + (0.0 if noise is None else noise.max_rate)
+    evolved = integrate_linear(generator, state.coefficients, duration, norm_bound)
+    state.coefficients = evolved.real if np.isrealobj(state.coefficients) else evolved
+
+
+def evolve_window(state, scaling, factors, duration, noise=None):
+    """
+    Evolves a Pauli-transfer state through one gate window, in place.
+
+    Parameters:
+    state (PauliTransferState): State to evolve.
+    scaling (float): Scaling factor of the Hamiltonian.
+    factors (dict): Qubit index -> 2x2 involution factor of the Hamiltonian.
+    duration (float): Length of the gate window.
+    noise (PauliNoise): Error model, or None for an ideal gate.
+    """
+    names = {qubit: _factor_name(op) for qubit, op in factors.items()}
+    if None in names.values():
+        _integrate_window(state, scaling, factors, duration, noise)
+        return
+    names = {qubit: name for qubit, name in names.items() if name != "I"}
+    hadamards = [qubit for qubit, name in names.items() if name == "H"]
+    angle = scaling * duration
+
+    if hadamards and noise is None and np.isclose(np.cos(angle), 0):
+        # U is proportional to P
+        _conjugate(state, names)
+        return
+    if hadamards and noise is not None:
+        if not all(noise.symmetric_under_hadamard(qubit) for qubit in hadamards):
+            _integrate_window(state, scaling, factors, duration, noise)
+            return
+
+    paulis = {qubit: FACTOR_INDEX["Z" if name == "H" else name] for qubit, name in names.items()}
+    _rotate_frame(state, hadamards)
+    _apply_pauli_window(state, paulis, angle, duration, noise)
+    _rotate_frame(state, hadamards, inverse=True)
@@ -0,0 +1,111 @@
+import json
+import hashlib
+
+from caching import LRUCache
+from result_cache import canonicalize_layer
+
+"""
+Prefix State Cache
+
+Editing a circuit mostly changes its last few layers, yet every simulation
+starts again from |0...0>. A PrefixStateCache keeps the density matrices after
+the layers of recent simulations so that a new request resumes from its longest
+cached prefix and only evolves the remaining layers.
+
+States are keyed by a rolling hash: h_0 hashes the context of the evolution
+(engine, noise model fingerprint, qubit count), and h_{i+1} = sha1(h_i, layer i)
+over the canonical form of each layer (result_cache.canonicalize_layer). Two
+circuits share h_i exactly when their first i layers evolve identically under
+the same noise model; empty layers leave the hash unchanged.
+
+A dense 8-qubit state takes 1 MiB, so the cache is bounded by the total bytes
+of the stored states rather than by their number.
+"""
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+# Entries are bounded by bytes; this only caps the bookkeeping of tiny states
+MAX_ENTRIES = 100_000
+
+
+def prefix_hashes(circuit_rep, context):
+    """
+    Computes the rolling hash of every layer prefix of a circuit.
+
+    Args:
+        circuit_rep (list): Circuit layers with "gates"
+        context (str): Identifies everything besides the layers that the state
+            depends on, e.g. the engine and the noise model fingerprint
+
+    Returns:
+        list: len(circuit_rep) + 1 hex digests; entry i identifies the state
+            after the first i layers
+    """
+    digest = hashlib.sha1(context.encode()).hexdigest()
+    hashes = [digest]
+    for layer in circuit_rep:
+        gates = canonicalize_layer(layer["gates"])
+        if gates:
+            digest = hashlib.sha1(
+                (digest + json.dumps(gates, separators=(",", ":"))).encode()
+            ).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+class PrefixStateCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initializes an empty cache of intermediate density matrices.
+
+        Parameters:
+        max_bytes (int): Total size of the stored states before the least
+                         recently used ones are evicted.
+        """
+        self._states = LRUCache(maxsize=MAX_ENTRIES, max_bytes=max_bytes, sizeof=_nbytes)
+
+    def lookup(self, hashes):
+        """
+        Finds the longest cached prefix.
+
+        Parameters:
+        hashes (list): Prefix hashes, as returned by prefix_hashes.
+
+        Returns:
+        tuple: (number of layers covered, cached state), or (0, None) on a miss.
+               The state is read-only.
+        """
+        for length in range(len(hashes) - 1, 0, -1):
+            if hashes[length] in self._states:
+                return length, self._states.get(hashes[length])
+        self._states.misses += 1
+        return 0, None
+
+    def store(self, digest, state):
+        """
+        Stores a read-only copy of the state reached at a prefix hash.
+        """
+        if digest in self._states:
+            return
+        state = state.copy()
+        state.setflags(write=False)
+        self._states.put(digest, state)
+
+    def clear(self):
+        self._states.clear()
+
+    def info(self):
+        """
+        Returns:
+        dict: Hits, misses, number of states and their total bytes.
+        """
+        return self._states.info()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __repr__(self):
+        return f"PrefixStateCache({self.info()})"
+
+
+def _nbytes(state):
+    return state.nbytes
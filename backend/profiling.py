@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+"""
+Simulation Profiling
+
+Opt-in instrumentation of simulate_quantum_circuit. A Profiler records spans:
+named intervals with their wall time, CPU time (time.process_time) and memory.
+Spans nest, e.g. one "layer" span per circuit layer inside the "evolution"
+stage, and carry free-form arguments such as the number of collapse operators
+and the Hilbert space dimension.
+
+Memory is measured with tracemalloc, which numpy reports its buffers to:
+"allocated_bytes" is the net change of traced memory over the span and
+"peak_bytes" the highest traced memory above its starting point. tracemalloc
+slows allocations down noticeably, so Profiler(memory=False) records times only.
+
+Code paths take a profiler argument that defaults to NULL_PROFILER, whose span()
+returns a shared no-op context, so disabled profiling costs one method call per
+span.
+
+summary() returns the JSON-serializable "profile" of a result, and
+write_chrome_trace() writes the spans in the Chrome trace event format, which
+chrome://tracing and https://ui.perfetto.dev open.
+"""
+
+STAGE = "stage"
+LAYER = "layer"
+
+
+class Profiler:
+    def __init__(self, memory=True):
+        """
+        Initializes an empty profile; timing (and tracemalloc, unless it is
+        already running) starts now. Call close() when done.
+
+        Parameters:
+        memory (bool): Whether to trace allocations with tracemalloc.
+        """
+        self.memory = memory
+        self.spans = []
+        self._stack = []
+        self._owns_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self._origin = time.perf_counter()
+        self._cpu_origin = time.process_time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Stops tracemalloc if this profiler started it.
+        """
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def _traced_memory(self):
+        """Current traced bytes, folding the peak since the last call into every open span."""
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for span in self._stack:
+            span["_peak"] = max(span["_peak"], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def span(self, name, category=STAGE, **args):
+        """
+        Records the enclosed block as one span.
+
+        Parameters:
+        name (str): Span name, e.g. "validation" or "layer".
+        category (str): STAGE or LAYER; summary() groups spans by category.
+        **args: JSON-serializable details stored with the span.
+        """
+        start_memory = self._traced_memory() if self.memory else 0
+        span = {
+            "name": name,
+            "category": category,
+            "depth": len(self._stack),
+            "_start": time.perf_counter(),
+            "_cpu_start": time.process_time(),
+            "_memory_start": start_memory,
+            "_peak": start_memory,
+        }
+        span.update(args)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            end_memory = self._traced_memory() if self.memory else 0
+            self._stack.pop()
+            span["start_seconds"] = span.pop("_start") - self._origin
+            span["wall_seconds"] = time.perf_counter() - self._origin - span["start_seconds"]
+            span["cpu_seconds"] = time.process_time() - span.pop("_cpu_start")
+            memory_start = span.pop("_memory_start")
+            peak = span.pop("_peak")
+            if self.memory:
+                span["allocated_bytes"] = end_memory - memory_start
+                span["peak_bytes"] = peak - memory_start
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        Returns the recorded spans as a JSON-serializable profile.
+
+        Returns:
+        dict: "wall_seconds" and "cpu_seconds" since the profiler was created,
+              "stages" (spans of category STAGE) and "layers" (LAYER), each in
+              start order.
+        """
+        ordered = sorted(self.spans, key=lambda span: (span["start_seconds"], span["depth"]))
+        return {
+            "wall_seconds": time.perf_counter() - self._origin,
+            "cpu_seconds": time.process_time() - self._cpu_origin,
+            "memory": self.memory,
+            "stages": [span for span in ordered if span["category"] == STAGE],
+            "layers": [span for span in ordered if span["category"] == LAYER],
+        }
+
+    def chrome_trace(self):
+        """
+        Returns the spans as a Chrome trace ({"traceEvents": [...]}) of complete events.
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        events = []
+        for span in sorted(self.spans, key=lambda span: (span["start_seconds"], span["depth"])):
+            details = {
+                key: value
+                for key, value in span.items()
+                if key not in ("name", "category", "depth", "start_seconds", "wall_seconds")
+            }
+            events.append(
+                {
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": span["start_seconds"] * 1e6,
+                    "dur": span["wall_seconds"] * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": details,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """
+        Writes chrome_trace() as JSON to a file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def __repr__(self):
+        return f"Profiler({len(self.spans)} spans, memory={self.memory})"
+
+
+class NullProfiler:
+    """Profiler stand-in that records nothing."""
+
+    _span = nullcontext()
+
+    def span(self, name, category=STAGE, **args):
+        return self._span
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
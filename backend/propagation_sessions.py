@@ -0,0 +1,266 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+from caching import LRUCache
+from error_propagation import (
+    ErrorLayer,
+    Layer,
+    propagate_error_layer_through_layer,
+    simplify_propagated_errors,
+)
+
+"""
+Incremental Error Propagation Sessions
+
+The "Propagate Error" button used to send the whole circuit for every step, and
+propagate_first_error_layer copied every layer to move one error layer by one
+position. A PropagationSession keeps the circuit on the server instead:
+
+   - a step follows the rules of propagate_first_error_layer, but only rewrites
+     the two layers involved, and a cursor remembers where the first error
+     layer is, so a step costs O(size of those layers), independent of the
+     circuit length;
+   - propagating an error layer through a gate layer is memoized in an LRU
+     cache keyed by the (error gates, layer gates) pair, shared by all sessions;
+   - edits made in the UI are sent as diffs ("set", "insert" or "delete" one
+     layer) rather than as a new circuit;
+   - trajectory() runs steps until nothing changes and returns every step.
+
+Sessions live in a PropagationSessionStore, bounded in count and idle time.
+"""
+
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_SESSION_TTL = 3600.0
+DEFAULT_MEMO_SIZE = 4096
+
+_propagation_memo = LRUCache(DEFAULT_MEMO_SIZE)
+_memo_lock = threading.Lock()
+
+
+def propagate_errors_memoized(error_gates, gates):
+    """
+    Propagates error gates through a layer of gates, reusing earlier results.
+
+    Args:
+        error_gates (tuple): Errors of the form ('X' | 'Y' | 'Z', qubit)
+        gates (tuple): Gates of the form ('gate_name', index_1, ...)
+
+    Returns:
+        list: The simplified propagated errors, as propagate_error_layer_through_layer
+    """
+    key = (error_gates, gates)
+    with _memo_lock:
+        errors = _propagation_memo.get(key)
+    if errors is None:
+        num_qubits = max(max(gate[1] for gate in layer) + 1 if layer else 0 for layer in key)
+        errors = tuple(
+            tuple(error)
+            for error in propagate_error_layer_through_layer(
+                ErrorLayer(list(error_gates), num_qubits), Layer(list(gates), num_qubits)
+            ).gates
+        )
+        with _memo_lock:
+            _propagation_memo.put(key, errors)
+    return errors
+
+
+def _normalize_layer(layer):
+    """Copies a layer dict with its gates as tuples, so layers can be hashed and compared."""
+    if not isinstance(layer, dict) or "type" not in layer or "gates" not in layer:
+        raise ValueError(f"Invalid layer: {layer}")
+    return {"type": layer["type"], "gates": tuple(tuple(gate) for gate in layer["gates"])}
+
+
+def _layer_to_json(layer):
+    return {"type": layer["type"], "gates": [list(gate) for gate in layer["gates"]]}
+
+
+class PropagationSession:
+    def __init__(self, circuit_ir):
+        """
+        Initializes a session on a copy of the circuit.
+
+        Parameters:
+        circuit_ir (list): Layers of the form {"type": ..., "gates": [...]}.
+        """
+        self.layers = [_normalize_layer(layer) for layer in circuit_ir]
+        self.steps = 0
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        # Every layer before the cursor is known not to be an error layer
+        self._cursor = 0
+
+    def first_error_index(self):
+        """
+        Returns the index of the first error layer, or -1 if there is none.
+        """
+        while self._cursor < len(self.layers) and self.layers[self._cursor]["type"] != "error":
+            self._cursor += 1
+        return self._cursor if self._cursor < len(self.layers) else -1
+
+    def step(self):
+        """
+        Propagates the first error layer by one position.
+
+        Returns:
+        list: Indices of the layers that changed, empty if the step did nothing.
+        """
+        error_index = self.first_error_index()
+        if error_index == -1 or error_index == len(self.layers) - 1:
+            return []
+
+        error_layer = self.layers[error_index]
+        next_layer = self.layers[error_index + 1]
+        if not next_layer["gates"]:
+            new_layers = (
+                {"type": "error", "gates": ()},
+                {"type": "error", "gates": error_layer["gates"]},
+            )
+        elif next_layer["type"] == "error":
+            combined_errors = simplify_propagated_errors(error_layer["gates"] + next_layer["gates"])
+            new_layers = (
+                {"type": "error", "gates": ()},
+                {"type": "error", "gates": tuple(combined_errors)},
+            )
+        else:
+            new_layers = (
+                {"type": "normal", "gates": next_layer["gates"]},
+                {
+                    "type": "error",
+                    "gates": propagate_errors_memoized(error_layer["gates"], next_layer["gates"]),
+                },
+            )
+
+        self.steps += 1
+        if new_layers == (error_layer, next_layer):
+            return []
+        self.layers[error_index : error_index + 2] = new_layers
+        return [error_index, error_index + 1]
+
+    def apply_diff(self, diff):
+        """
+        Applies edits to the session circuit.
+
+        Parameters:
+        diff (list of dicts): Operations {"op": "set" | "insert", "index": int,
+                              "layer": {...}} or {"op": "delete", "index": int}.
+
+        Raises:
+        ValueError: If an operation or index is invalid.
+        """
+        for change in diff:
+            op, index = change.get("op"), change.get("index")
+            limit = len(self.layers) + (op == "insert")
+            if not isinstance(index, int) or not 0 <= index < limit:
+                raise ValueError(f"Invalid layer index in diff: {index}")
+            if op == "set":
+                self.layers[index] = _normalize_layer(change.get("layer"))
+            elif op == "insert":
+                self.layers.insert(index, _normalize_layer(change.get("layer")))
+            elif op == "delete":
+                del self.layers[index]
+            else:
+                raise ValueError(f"Invalid diff operation: {op}")
+            self._cursor = min(self._cursor, index)
+
+    def trajectory(self, max_steps=None):
+        """
+        Steps until the circuit stops changing.
+
+        Parameters:
+        max_steps (int): Optional bound on the number of steps.
+
+        Returns:
+        list of dicts: One {"step": int, "changes": [...]} entry per step that
+                       changed the circuit, as returned by changes().
+        """
+        trajectory = []
+        while max_steps is None or len(trajectory) < max_steps:
+            changed = self.step()
+            if not changed:
+                break
+            trajectory.append({"step": self.steps, "changes": self.changes(changed)})
+        return trajectory
+
+    def changes(self, indices):
+        """
+        Returns the given layers as JSON-serializable {"index": int, "layer": {...}} entries.
+        """
+        return [{"index": i, "layer": _layer_to_json(self.layers[i])} for i in sorted(indices)]
+
+    def circuit(self):
+        """
+        Returns the current circuit as JSON-serializable layers.
+        """
+        return [_layer_to_json(layer) for layer in self.layers]
+
+
+class PropagationSessionStore:
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_SESSION_TTL):
+        """
+        Initializes a bounded store of propagation sessions.
+
+        Parameters:
+        max_sessions (int): Sessions kept before the least recently used is dropped.
+        ttl (float): Seconds a session may stay idle before it is dropped.
+
+        Raises:
+        ValueError: If a limit is not positive.
+        """
+        if max_sessions <= 0 or ttl <= 0:
+            raise ValueError("max_sessions and ttl must be positive.")
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, circuit_ir):
+        """
+        Starts a session on a circuit and returns its id.
+        """
+        session = PropagationSession(circuit_ir)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = session
+            self._evict()
+        return session_id
+
+    def get(self, session_id):
+        """
+        Returns a session and marks it as recently used.
+
+        Raises:
+        KeyError: If the session does not exist or has expired.
+        """
+        with self._lock:
+            self._evict()
+            session = self._sessions[session_id]
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+        return session
+
+    def close(self, session_id):
+        """
+        Removes a session; returns False if it did not exist.
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self):
+        now = time.monotonic()
+        for session_id in [
+            session_id
+            for session_id, session in self._sessions.items()
+            if now - session.last_used > self.ttl
+        ]:
+            del self._sessions[session_id]
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __repr__(self):
+        return f"PropagationSessionStore({len(self)}/{self.max_sessions} sessions)"
@@ -1,246 +1,1438 @@
+import os
 import sys
 import json
-import numpy as np
-from io import BytesIO
 import base64
-import matplotlib.pyplot as plt
-import qutip as qt
-import numpy as np
-import json
-import os
+import hashlib
 import itertools
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+
+# Plots are only rendered to PNG buffers; never let matplotlib probe for a GUI
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from caching import LRUCache
+from density_kernels import apply_local_operator, apply_unitary, integrate_linear
+from gates import GATE_GENERATORS, GATE_SCALINGS, circuit_blocks
+from layer_fusion import fuse_layers
+from low_rank import DEFAULT_TOL as DEFAULT_RANK_TOL
+from low_rank import LowRankDensity, evolve_window
+from mpdo import DEFAULT_MAX_BOND, DEFAULT_MAX_KRAUS, MatrixProductDensity, SiteNoise, apply_cnot
+from mpdo import evolve_window as mpdo_evolve_window
+from noise_models import LocalNoiseModel
+from pauli_transfer import PauliNoise, PauliTransferState
+from pauli_transfer import evolve_window as pauli_evolve_window
+from prefix_cache import PrefixStateCache, prefix_hashes
+from profiling import LAYER, NULL_PROFILER, Profiler
+from stabilizer import (
+    DEFAULT_NUM_SHOTS,
+    CliffordWindow,
+    noise_is_exact,
+    simulate_clifford_windows,
+)
+from trajectories import TrajectorySampler, TrajectoryStatistics
+
+"""
+Quantum Circuit Evolution with Intermediate Representation
+
+This code implements quantum circuit evolution using an intermediate representation
+of quantum circuits. The intermediate representation is a list of layers, where each
+layer is a list of tuples representing quantum gates.
+
+1. Intermediate Representation Format:
+   The circuit is represented as a list of layers: [[layer1], [layer2], ...]
+   Each layer is a list of tuples: [(gate1), (gate2), ...]
+   Each tuple represents a gate: (gate_name, qubit_index) for 1-qubit gates
+                                 (gate_name, control_qubit, target_qubit) for 2-qubit gates
+
+   Supported gates: 'I' (Identity), 'X', 'Y', 'Z', 'H' (Hadamard), 'CX' (CNOT), 'S', 'T'
+
+2. Imports:
+   qutip and matplotlib take seconds to import, so they are only loaded by the
+   code paths that use them: the "mesolve" and "propagator" engines, Qobj inputs
+   and outputs, and plot rendering. Validation errors, the array engines and
+   answers from the result cache never import them. The qutip gate constants
+   (I, X, ..., zero, one, plus, minus, ONE_QUBIT_GATE_MAP) and qt itself are
+   module attributes that are created on first access.
+"""
+
+# Gate map with proper scaling factors: name -> (2x2 generator, rotation angle).
+# S = √Z and T = √S = fourth_root(Z) rotate about Z by pi/4 and pi/8.
+ONE_QUBIT_GATES = {name: (GATE_GENERATORS[name], GATE_SCALINGS[name]) for name in GATE_SCALINGS}
+IDENTITY = GATE_GENERATORS["I"]
+
+# Names of the lazily created qutip constants, see qutip_constants
+QUTIP_CONSTANTS = (
+    "I", "X", "Y", "Z", "H", "S", "T", "zero", "one", "plus", "minus", "ONE_QUBIT_GATE_MAP"
+)
+
+
+@lru_cache(maxsize=None)
+def qutip_constants():
+    """
+    Builds the basic gate set and basis states as qutip objects (imports qutip).
+
+    Returns:
+        dict: Name in QUTIP_CONSTANTS -> Qobj, and ONE_QUBIT_GATE_MAP, the
+            counterpart of ONE_QUBIT_GATES with Qobj generators
+    """
+    import qutip as qt
+
+    constants = {
+        "I": qt.qeye(2),
+        "X": qt.sigmax(),
+        "Y": qt.sigmay(),
+        "Z": qt.sigmaz(),
+        "H": qt.Qobj([[1, 1], [1, -1]]) / np.sqrt(2),
+        # S gate (phase gate): |0⟩ → |0⟩, |1⟩ → i|1⟩
+        "S": qt.Qobj([[1, 0], [0, 1j]]),
+        # T gate (π/8 gate): |0⟩ → |0⟩, |1⟩ → exp(iπ/4)|1⟩
+        "T": qt.Qobj([[1, 0], [0, np.exp(1j * np.pi / 4)]]),
+        "zero": qt.basis(2, 0),
+        "one": qt.basis(2, 1),
+    }
+    constants["plus"] = (constants["zero"] + constants["one"]).unit()
+    constants["minus"] = (constants["zero"] - constants["one"]).unit()
+    constants["ONE_QUBIT_GATE_MAP"] = {
+        name: (qt.Qobj(generator), scaling) for name, (generator, scaling) in ONE_QUBIT_GATES.items()
+    }
+    return constants
+
+
+def __getattr__(name):
+    # Module attributes created on first access (PEP 562), see the module docstring
+    if name == "qt":
+        import qutip
+
+        return qutip
+    if name in QUTIP_CONSTANTS:
+        return qutip_constants()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Output modes of simulate_quantum_circuit and the dtypes of the "data" buffer
+OUTPUT_MODES = ("plot", "data", "both")
+# Per-layer reductions of the state emitted by stream_simulation, see reduce_state
+STREAM_REDUCTIONS = ("density_matrix", "probabilities", "purity", "bloch_vectors")
+STATE_DTYPES = {"complex128": "<c16", "complex64": "<c8"}
+
+# Compiled layer superoperators of the "propagator" engine, keyed on the
+# layer signature and the fingerprint of the collapse operators
+PROPAGATOR_CACHE_SIZE = 256
+propagator_cache = LRUCache(maxsize=PROPAGATOR_CACHE_SIZE)
+# (c_ops list, its operators, fingerprint) of the last list hashed, see c_ops_fingerprint
+_last_c_ops_fingerprint = (None, (), None)
+
+# Uploaded noise models by content hash, see load_noise_model
+NOISE_MODEL_CACHE_SIZE = 16
+noise_model_cache = LRUCache(maxsize=NOISE_MODEL_CACHE_SIZE)
+
+# Pauli-transfer eigenvalues and window factors of the "pauli" engine, keyed
+# on the noise model fingerprint
+PAULI_NOISE_CACHE_SIZE = 4
+pauli_noise_cache = LRUCache(maxsize=PAULI_NOISE_CACHE_SIZE)
+
+# Intermediate states of recent simulations, see evolve_from_cached_prefix
+PREFIX_CACHE_MAX_BYTES = 256 * 2**20
+prefix_state_cache = PrefixStateCache(max_bytes=PREFIX_CACHE_MAX_BYTES)
+
+
+def f_H(t, delta_t, start_time):
+    """
+    Time-dependent coefficient function for Hamiltonian evolution.
+
+    Args:
+        t (float): Current time
+        delta_t (float): Duration of the gate
+        start_time (float): Time at which the gate starts
+
+    Returns:
+        float: 1 if within the gate duration window, 0 otherwise
+    """
+    t0, t1 = start_time, start_time + delta_t
+    return 1 if t0 <= t < t1 else 0
+
+
+def one_qubit_layer_generator(qubit_indices, gate_names):
+    """
+    Describes the Hamiltonian of a layer of single-qubit gates factor by factor.
+
+    Args:
+        qubit_indices (int or list): Qubit(s) the gates act on
+        gate_names (str or list): Gate name(s), one per qubit index
+
+    Returns:
+        tuple: (scaling factor, dict mapping qubit index -> 2x2 array factor);
+               qubits missing from the dict carry the identity
+    """
+    if isinstance(qubit_indices, int):
+        qubit_indices = [qubit_indices]
+        gate_names = [gate_names]
+
+    if len(qubit_indices) != len(gate_names):
+        raise ValueError(
+            "The number of qubit indices must match the number of gate names."
+        )
+
+    for gate_name in gate_names:
+        if gate_name not in ONE_QUBIT_GATES:
+            raise ValueError(
+                f"Invalid gate name. Supported gates are: {', '.join(ONE_QUBIT_GATES.keys())}"
+            )
+
+    local_ops = {}
+    scaling_factor = 1.0
+
+    for qubit_index, gate_name in sorted(zip(qubit_indices, gate_names)):
+        gate_op, gate_scaling = ONE_QUBIT_GATES[gate_name]
+        local_ops[qubit_index] = gate_op
+        scaling_factor = gate_scaling  # Use the scaling factor of the last gate
+
+    return scaling_factor, local_ops
+
+
+def one_qubit_layer_hamiltonian(num_qubits, qubit_indices, gate_names):
+    """
+    Builds the Hamiltonian that implements a layer of single-qubit gates.
+
+    Args:
+        num_qubits (int): Total number of qubits in the circuit
+        qubit_indices (int or list): Qubit(s) the gates act on
+        gate_names (str or list): Gate name(s), one per qubit index
+
+    Returns:
+        qutip.Qobj: The scaled tensor-product Hamiltonian, applied for unit time
+    """
+    import qutip as qt
+
+    scaling_factor, local_ops = one_qubit_layer_generator(qubit_indices, gate_names)
+    qubit_ops = [qt.Qobj(local_ops.get(i, IDENTITY)) for i in range(num_qubits)]
+    return scaling_factor * qt.tensor(*qubit_ops)
+
+
+def physical_one_qubit_evolution(input_state, qubit_indices, gate_names, c_ops):
+    """
+    Applies specified single-qubit gates to selected qubits in a multi-qubit circuit.
+    Modified to handle S and T gates with proper phase evolution.
+    """
+    import qutip as qt
+
+    num_qubits = int(np.log2(input_state.shape[0]))
+    gate_op = one_qubit_layer_hamiltonian(num_qubits, qubit_indices, gate_names)
+
+    td_list = [[gate_op, lambda t, args: f_H(t, 1, 0)]]
+
+    times = np.linspace(0, 1)
+    output_state = qt.mesolve(td_list, input_state, times, c_ops=c_ops).states[-1]
+
+    return output_state
+
+
+def cnot_pulse_generators(ctrl_idx, tgt_idx):
+    """
+    Describes the pulse sequence of IBM's CNOT ansatz factor by factor.
+
+    Args:
+        ctrl_idx (int): Index of the control qubit
+        tgt_idx (int): Index of the target qubit
+
+    Returns:
+        list: (scaling factor, dict mapping qubit index -> 2x2 array factor, duration)
+              triples, in the order they are applied
+    """
+    sq_z_gate_duration = 1
+    sq_x_gate_duration = 1
+    sq_zx_gate_duration = 10
+    theta = np.pi / 4
+    X, Z = GATE_GENERATORS["X"], GATE_GENERATORS["Z"]
+
+    return [
+        # 1. dagger sqrt{Z} gate on control qubit
+        (-theta / sq_z_gate_duration, {ctrl_idx: Z}, sq_z_gate_duration),
+        # 2. sqrt{ZX} gate
+        (theta / sq_zx_gate_duration, {ctrl_idx: Z, tgt_idx: X}, sq_zx_gate_duration),
+        # 3. dagger sqrt{X} gate on target qubit
+        (-theta / sq_x_gate_duration, {tgt_idx: X}, sq_x_gate_duration),
+    ]
+
+
+def cnot_pulse_hamiltonians(num_qubits, ctrl_idx, tgt_idx):
+    """
+    Builds the pulse sequence of IBM's CNOT ansatz.
+
+    Args:
+        num_qubits (int): Total number of qubits in the circuit
+        ctrl_idx (int): Index of the control qubit
+        tgt_idx (int): Index of the target qubit
+
+    Returns:
+        list: (Hamiltonian, duration) pairs, in the order they are applied
+    """
+    import qutip as qt
+
+    return [
+        (
+            scaling * qt.tensor(*[qt.Qobj(local_ops.get(i, IDENTITY)) for i in range(num_qubits)]),
+            duration,
+        )
+        for scaling, local_ops, duration in cnot_pulse_generators(ctrl_idx, tgt_idx)
+    ]
+
+
+def physical_cnot_evolution(input_state, ctrl_idx, tgt_idx, c_ops):
+    """
+    Applies a physical CNOT gate between two qubits and returns the resulting density matrix,
+    evolving the state gate-by-gate.
+
+    This is IBM's ansatz to implement a CNOT gate.
+
+    Args:
+    input_state (qutip.Qobj): The input quantum state (density matrix)
+    ctrl_idx (int): Index of the control qubit
+    tgt_idx (int): Index of the target qubit
+    c_ops (list): Error model/Kraus Operators
+
+    Returns:
+    qutip.Qobj: The resulting density matrix after applying the CNOT gate
+    """
+    import qutip as qt
+
+    num_qubits = int(np.log2(input_state.shape[0]))
+
+    # Initialize the current state
+    current_state = input_state
+
+    for hamiltonian, duration in cnot_pulse_hamiltonians(num_qubits, ctrl_idx, tgt_idx):
+        H_CX_td = [hamiltonian, lambda t, args: f_H(t, duration, 0)]
+        times = np.linspace(0, duration)
+        result = qt.mesolve([H_CX_td], current_state, times, c_ops=c_ops)
+        current_state = result.states[-1]
+
+    return current_state
+
+
+def lindblad_propagator(hamiltonian, c_ops, duration):
+    """
+    Computes the propagator of a constant Hamiltonian and collapse operators.
+
+    Since each gate Hamiltonian is constant across its window, the Lindblad
+    equation can be solved in closed form as exp(L * duration) instead of being
+    integrated step by step.
+
+    Args:
+        hamiltonian (qutip.Qobj): Hamiltonian applied during the window
+        c_ops (list): Error model/Kraus Operators
+        duration (float): Length of the gate window
+
+    Returns:
+        qutip.Qobj: Superoperator mapping the input density matrix to the output
+    """
+    import qutip as qt
+
+    return (qt.liouvillian(hamiltonian, c_ops) * duration).expm()
+
+
+def c_ops_fingerprint(c_ops):
+    """
+    Computes a content hash of a list of collapse operators.
+
+    The propagator engine keys every layer on it, so the hash of the last list
+    is reused while the same list holds the same operators.
+
+    Args:
+        c_ops (list): Error model/Kraus Operators
+
+    Returns:
+        str: Hex digest identifying the operators, used as part of cache keys
+    """
+    global _last_c_ops_fingerprint
+    last_c_ops, last_ops, fingerprint = _last_c_ops_fingerprint
+    if c_ops is last_c_ops and len(c_ops) == len(last_ops) and all(
+        op is last for op, last in zip(c_ops, last_ops)
+    ):
+        return fingerprint
+    digest = hashlib.sha1()
+    for op in c_ops:
+        digest.update(repr(op.dims).encode())
+        digest.update(np.ascontiguousarray(op.full()).tobytes())
+    _last_c_ops_fingerprint = (c_ops, tuple(c_ops), digest.hexdigest())
+    return _last_c_ops_fingerprint[2]
+
+
+def propagator_cache_info():
+    """Return hit/miss counters and size of the compiled propagator cache."""
+    return propagator_cache.info()
+
+
+def clear_propagator_cache():
+    """Drop every compiled propagator and reset the cache counters."""
+    propagator_cache.clear()
+
+
+def propagator_one_qubit_evolution(input_state, qubit_indices, gate_names, c_ops):
+    """
+    Closed-form counterpart of physical_one_qubit_evolution.
+
+    The layer superoperator is compiled once and reused from the propagator
+    cache for every later layer with the same gates and noise model.
+    """
+    num_qubits = int(np.log2(input_state.shape[0]))
+    if isinstance(qubit_indices, int):
+        qubit_indices = [qubit_indices]
+        gate_names = [gate_names]
+
+    key = (
+        "1q",
+        num_qubits,
+        tuple(sorted(zip(qubit_indices, gate_names))),
+        c_ops_fingerprint(c_ops),
+    )
+    superop = propagator_cache.get(key)
+    if superop is None:
+        gate_op = one_qubit_layer_hamiltonian(num_qubits, qubit_indices, gate_names)
+        superop = lindblad_propagator(gate_op, c_ops, 1)
+        propagator_cache.put(key, superop)
+
+    return superop(input_state)
+
+
+def propagator_cnot_evolution(input_state, ctrl_idx, tgt_idx, c_ops):
+    """
+    Closed-form counterpart of physical_cnot_evolution.
+
+    The three pulses are composed into a single cached superoperator.
+    """
+    num_qubits = int(np.log2(input_state.shape[0]))
+
+    key = ("CX", num_qubits, ctrl_idx, tgt_idx, c_ops_fingerprint(c_ops))
+    superop = propagator_cache.get(key)
+    if superop is None:
+        pulses = cnot_pulse_hamiltonians(num_qubits, ctrl_idx, tgt_idx)
+        for hamiltonian, duration in pulses:
+            pulse = lindblad_propagator(hamiltonian, c_ops, duration)
+            superop = pulse if superop is None else pulse * superop
+        propagator_cache.put(key, superop)
+
+    return superop(input_state)
+
+
+def local_lindblad_evolution(rho, scaling, local_ops, noise_model, duration):
+    """
+    Integrates the Lindblad equation with local tensor contractions only.
+
+    The Hamiltonian scaling * (x)_q local_ops[q] and the noise model are both
+    applied factor by factor, so no 2^n x 2^n operator is ever built.
+
+    Args:
+        rho (np.ndarray): Input density matrix, shape (2^n, 2^n) or (batch, 2^n, 2^n)
+        scaling (float): Scaling factor of the Hamiltonian
+        local_ops (dict): Qubit index -> 2x2 factor of the Hamiltonian
+        noise_model (LocalNoiseModel): Error model
+        duration (float): Length of the gate window
+
+    Returns:
+        np.ndarray: The evolved density matrix
+    """
+    num_qubits = noise_model.num_qubits
+    factors = list(local_ops.items())
+
+    # For trace-preserving noise the dissipator is E - id; the identity part
+    # commutes with everything and is applied exactly as a decay factor
+    if noise_model.trace_preserving:
+        noise_action, shift = noise_model.apply_channel, 1.0
+        noise_norm = noise_model.channel_norm_bound()
+    else:
+        noise_action, shift = noise_model.dissipator, 0.0
+        noise_norm = noise_model.dissipator_norm_bound()
+
+    def hamiltonian_product(x, side):
+        for qubit, op in factors:
+            x = apply_local_operator(x, op, [qubit], num_qubits, side=side)
+        return scaling * x
+
+    def generator(x):
+        commutator = hamiltonian_product(x, "left") - hamiltonian_product(x, "right")
+        return -1j * commutator + noise_action(x)
+
+    hamiltonian_norm = abs(scaling) * np.prod(
+        [np.linalg.norm(op, 2) for _, op in factors]
+    )
+    norm_bound = 2 * hamiltonian_norm + noise_norm
+    return integrate_linear(generator, rho, duration, norm_bound, shift=shift)
+
+
+def local_one_qubit_evolution(input_state, qubit_indices, gate_names, noise_model):
+    """
+    Counterpart of physical_one_qubit_evolution for a LocalNoiseModel.
+    Works on density matrices as numpy arrays.
+    """
+    scaling, local_ops = one_qubit_layer_generator(qubit_indices, gate_names)
+    return local_lindblad_evolution(input_state, scaling, local_ops, noise_model, 1)
+
+
+def local_cnot_evolution(input_state, ctrl_idx, tgt_idx, noise_model):
+    """
+    Counterpart of physical_cnot_evolution for a LocalNoiseModel.
+    Works on density matrices as numpy arrays.
+    """
+    current_state = input_state
+    for scaling, local_ops, duration in cnot_pulse_generators(ctrl_idx, tgt_idx):
+        current_state = local_lindblad_evolution(
+            current_state, scaling, local_ops, noise_model, duration
+        )
+    return current_state
+
+
+def involution_exponential(angle, op):
+    """
+    Computes exp(-i * angle * op) for an operator with op @ op = I.
+
+    Every layer Hamiltonian in this simulator is a scaled tensor product of
+    involutions (I, X, Y, Z, H), so its propagator is cos(angle) I - i sin(angle) op.
+    """
+    return np.cos(angle) * np.eye(op.shape[0]) - 1j * np.sin(angle) * op
+
+
+def cnot_unitary(ctrl_idx, tgt_idx):
+    """
+    Returns the 4x4 unitary of the CNOT pulse sequence on (control, target).
+    """
+    unitary = np.eye(4, dtype=complex)
+    for scaling, local_ops, duration in cnot_pulse_generators(ctrl_idx, tgt_idx):
+        pulse_op = np.kron(
+            local_ops.get(ctrl_idx, IDENTITY), local_ops.get(tgt_idx, IDENTITY)
+        )
+        unitary = involution_exponential(scaling * duration, pulse_op) @ unitary
+    return unitary
+
+
+def tensor_one_qubit_evolution(input_state, qubit_indices, gate_names, c_ops=None):
+    """
+    Applies a noiseless layer of single-qubit gates with local tensor contractions.
+
+    The layer Hamiltonian s * P (P a tensor product of involutions) gives the
+    unitary U = cos(s) I - i sin(s) P. A single factor, or s = pi/2 where U is
+    proportional to P itself, is applied qubit by qubit; otherwise
+    U rho U^dag = cos^2 rho + i cos sin (rho P - P rho) + sin^2 P rho P.
+    Works on density matrices as numpy arrays.
+    """
+    num_qubits = int(np.log2(input_state.shape[-1]))
+    scaling, local_ops = one_qubit_layer_generator(qubit_indices, gate_names)
+    factors = list(local_ops.items())
+
+    if len(factors) == 1:
+        qubit, op = factors[0]
+        return apply_unitary(
+            input_state, involution_exponential(scaling, op), [qubit], num_qubits
+        )
+
+    cos, sin = np.cos(scaling), np.sin(scaling)
+    if np.isclose(cos, 0):
+        for qubit, op in factors:
+            input_state = apply_unitary(input_state, op, [qubit], num_qubits)
+        return input_state
+
+    p_rho = input_state
+    for qubit, op in factors:
+        p_rho = apply_local_operator(p_rho, op, [qubit], num_qubits, side="left")
+    rho_p = input_state
+    p_rho_p = p_rho
+    for qubit, op in factors:
+        rho_p = apply_local_operator(rho_p, op, [qubit], num_qubits, side="right")
+        p_rho_p = apply_local_operator(p_rho_p, op, [qubit], num_qubits, side="right")
+    return cos**2 * input_state + 1j * cos * sin * (rho_p - p_rho) + sin**2 * p_rho_p
+
+
+def tensor_cnot_evolution(input_state, ctrl_idx, tgt_idx, c_ops=None):
+    """
+    Applies a noiseless CNOT pulse sequence as one two-qubit contraction.
+    Works on density matrices as numpy arrays.
+    """
+    num_qubits = int(np.log2(input_state.shape[-1]))
+    return apply_unitary(
+        input_state, cnot_unitary(ctrl_idx, tgt_idx), [ctrl_idx, tgt_idx], num_qubits
+    )
+
+
+def lowrank_one_qubit_evolution(input_state, qubit_indices, gate_names, noise_model):
+    """
+    Counterpart of local_one_qubit_evolution for a LowRankDensity, updated in
+    place. A dense numpy state (after the rank grew too large) is passed on to
+    the local or tensor engine, as is a window during which the rank grows too large.
+    """
+    if not isinstance(input_state, LowRankDensity):
+        dense_evolution = (
+            tensor_one_qubit_evolution if noise_model is None else local_one_qubit_evolution
+        )
+        return dense_evolution(input_state, qubit_indices, gate_names, noise_model)
+    scaling, factors = one_qubit_layer_generator(qubit_indices, gate_names)
+    if not evolve_window(input_state, scaling, factors, 1, noise_model):
+        # The rank outgrew max_rank during the window, which restarts densely
+        return local_lindblad_evolution(input_state.to_dense(), scaling, factors, noise_model, 1)
+    return input_state.to_dense() if input_state.exceeds_max_rank else input_state
+
+
+def lowrank_cnot_evolution(input_state, ctrl_idx, tgt_idx, noise_model):
+    """
+    Counterpart of local_cnot_evolution for a LowRankDensity, updated in place.
+    A dense numpy state is passed on to the local or tensor engine.
+    """
+    if not isinstance(input_state, LowRankDensity):
+        dense_evolution = tensor_cnot_evolution if noise_model is None else local_cnot_evolution
+        return dense_evolution(input_state, ctrl_idx, tgt_idx, noise_model)
+    pulses = cnot_pulse_generators(ctrl_idx, tgt_idx)
+    for i, (scaling, factors, duration) in enumerate(pulses):
+        if not evolve_window(input_state, scaling, factors, duration, noise_model):
+            # The rank outgrew max_rank during a pulse, which restarts densely
+            current_state = input_state.to_dense()
+            for scaling, factors, duration in pulses[i:]:
+                current_state = local_lindblad_evolution(
+                    current_state, scaling, factors, noise_model, duration
+                )
+            return current_state
+    return input_state.to_dense() if input_state.exceeds_max_rank else input_state
+
+
+def pauli_one_qubit_evolution(input_state, qubit_indices, gate_names, noise):
+    """
+    Counterpart of local_one_qubit_evolution for a PauliTransferState, updated
+    in place, against a PauliNoise (or None for ideal gates).
+    """
+    scaling, factors = one_qubit_layer_generator(qubit_indices, gate_names)
+    pauli_evolve_window(input_state, scaling, factors, 1, noise)
+    return input_state
+
+
+def pauli_cnot_evolution(input_state, ctrl_idx, tgt_idx, noise):
+    """
+    Counterpart of local_cnot_evolution for a PauliTransferState, updated in place.
+    """
+    for scaling, factors, duration in cnot_pulse_generators(ctrl_idx, tgt_idx):
+        pauli_evolve_window(input_state, scaling, factors, duration, noise)
+    return input_state
+
+
+def mpdo_one_qubit_evolution(input_state, qubit_indices, gate_names, noise):
+    """
+    Counterpart of local_one_qubit_evolution for a MatrixProductDensity,
+    updated in place, against a SiteNoise (or None for ideal gates).
+    """
+    scaling, factors = one_qubit_layer_generator(qubit_indices, gate_names)
+    mpdo_evolve_window(input_state, scaling, factors, 1, noise)
+    return input_state
+
+
+def mpdo_cnot_evolution(input_state, ctrl_idx, tgt_idx, noise):
+    """
+    Counterpart of local_cnot_evolution for a MatrixProductDensity, updated in place.
+    """
+    apply_cnot(input_state, ctrl_idx, tgt_idx, cnot_pulse_generators(ctrl_idx, tgt_idx), noise)
+    return input_state
+
+
+# Evolution engines selectable from rep_to_evolution:
+# name -> (single-qubit layer evolution, CNOT evolution)
+EVOLUTION_ENGINES = {
+    "mesolve": (physical_one_qubit_evolution, physical_cnot_evolution),
+    "propagator": (propagator_one_qubit_evolution, propagator_cnot_evolution),
+    "local": (local_one_qubit_evolution, local_cnot_evolution),
+    "tensor": (tensor_one_qubit_evolution, tensor_cnot_evolution),
+    "lowrank": (lowrank_one_qubit_evolution, lowrank_cnot_evolution),
+    "pauli": (pauli_one_qubit_evolution, pauli_cnot_evolution),
+    "mpdo": (mpdo_one_qubit_evolution, mpdo_cnot_evolution),
+}
+
+# Engines that evolve their own state representation, converted from and to a
+# numpy density matrix around the layer loop
+STATE_REPRESENTATIONS = {
+    "lowrank": LowRankDensity,
+    "pauli": PauliTransferState,
+    "mpdo": MatrixProductDensity,
+}
+
+# Engines that evolve numpy arrays instead of qutip Qobjs
+ARRAY_ENGINES = {"local", "tensor"}
+
+# Engines that evolve qutip Qobjs (and so import qutip)
+QOBJ_ENGINES = {"mesolve", "propagator"}
+
+# Largest circuit simulate_quantum_circuit evolves as a dense density matrix
+# (16^n bytes, 256 MiB at 12 qubits) when the stabilizer engine could run it
+DENSE_MAX_QUBITS = 12
+
+
+def is_noiseless(c_ops):
+    """
+    Returns True if the error model has no effect (no operators, identity-only
+    collapse operators, or a LocalNoiseModel of identity channels).
+    """
+    if c_ops is None:
+        return True
+    if isinstance(c_ops, LocalNoiseModel):
+        return c_ops.is_noiseless()
+    for op in c_ops:
+        matrix = op.full()
+        if not np.allclose(matrix, matrix[0, 0] * np.eye(matrix.shape[0])):
+            return False
+    return True
+
+
+def resolve_engine(engine, c_ops):
+    """
+    Resolves the "auto" engine and adapts the noise model to the chosen engine.
+
+    Args:
+        engine (str): Requested engine name, or "auto"
+        c_ops (list or LocalNoiseModel): Error model
+
+    Returns:
+        tuple: (engine name, error model in the form the engine expects)
+    """
+    is_local = isinstance(c_ops, LocalNoiseModel)
+    if engine == "auto":
+        if is_noiseless(c_ops):
+            engine = "tensor"
+        elif is_local:
+            engine = "pauli" if c_ops.pauli_probabilities() is not None else "local"
+        else:
+            engine = "mesolve"
+    if engine not in EVOLUTION_ENGINES:
+        raise ValueError(
+            f"Unsupported evolution engine: {engine}. "
+            f"Supported engines are: auto, {', '.join(EVOLUTION_ENGINES.keys())}"
+        )
+    if engine == "tensor":
+        if not is_noiseless(c_ops):
+            raise ValueError(
+                "The tensor engine applies ideal gates; use the local engine for noisy circuits."
+            )
+        return engine, None
+    if engine in ("lowrank", "pauli", "mpdo") and is_noiseless(c_ops):
+        return engine, None
+    if engine in ("local", "lowrank", "pauli", "mpdo") and not is_local:
+        raise ValueError(f"The {engine} engine requires a LocalNoiseModel error model.")
+    if engine == "pauli":
+        return engine, pauli_noise(c_ops)
+    if engine == "mpdo":
+        return engine, SiteNoise(c_ops)
+    if engine not in ("local", "lowrank") and is_local:
+        c_ops = c_ops.to_c_ops()
+    return engine, c_ops
+
+
+def pauli_noise(noise_model):
+    """
+    Returns the PauliNoise of a LocalNoiseModel, cached by its fingerprint so
+    that the window factors carry over between simulations.
+
+    Raises:
+        ValueError: If the model is not a Pauli channel
+    """
+    key = noise_model.fingerprint()
+    noise = pauli_noise_cache.get(key)
+    if noise is None:
+        noise = PauliNoise(noise_model)
+        pauli_noise_cache.put(key, noise)
+    return noise
+
+
+def count_c_ops(c_ops):
+    """
+    Number of operators in an error model (Kraus operators for a LocalNoiseModel).
+    """
+    if c_ops is None:
+        return 0
+    if isinstance(c_ops, LocalNoiseModel):
+        return sum(len(kraus_ops) for kraus_ops in c_ops.kraus.values())
+    if isinstance(c_ops, (PauliNoise, SiteNoise)):
+        return c_ops.num_terms
+    return len(c_ops)
+
+
+def evolve_layers(
+    circuit_rep, state, c_ops, one_qubit_evolution, cnot_evolution, profiler=NULL_PROFILER
+):
+    """
+    Runs the layer loop of rep_to_evolution with the given gate evolutions.
+
+    Args:
+        circuit_rep (list): Circuit layers
+        state: Initial state in the representation the evolutions use (a Qobj,
+            a numpy density matrix or batch, or a batch of statevectors)
+        c_ops: Error model in the form the evolutions expect
+        one_qubit_evolution (callable): (state, qubit_indices, gate_names, c_ops) -> state
+        cnot_evolution (callable): (state, ctrl_idx, tgt_idx, c_ops) -> state
+        profiler (Profiler): Records one span per layer
+
+    Returns:
+        The evolved state in the same representation
+    """
+    current_state = state
+    for current_state in iter_layers(
+        circuit_rep, state, c_ops, one_qubit_evolution, cnot_evolution, profiler
+    ):
+        pass
+    return current_state
+
+
+def iter_layers(
+    circuit_rep, state, c_ops, one_qubit_evolution, cnot_evolution, profiler=NULL_PROFILER
+):
+    """
+    Generator form of evolve_layers: yields the state after every layer.
+
+    Engines that update their state in place (a LowRankDensity) yield the same
+    object every time, so each state must be used before the next one is requested.
+    """
+    current_state = state
+    layers = [x["gates"] for x in circuit_rep]
+    layer_details = {}
+    if profiler is not NULL_PROFILER:
+        layer_details = {
+            "num_c_ops": count_c_ops(c_ops),
+            "hilbert_dim": 2 ** max((x.get("numRows", 0) for x in circuit_rep), default=0),
+        }
+    for index, layer in enumerate(layers):
+        with profiler.span("layer", LAYER, index=index, gates=len(layer), **layer_details):
+            current_state = _evolve_layer(
+                current_state, layer, c_ops, one_qubit_evolution, cnot_evolution
+            )
+        yield current_state
+
+
+def _evolve_layer(current_state, layer, c_ops, one_qubit_evolution, cnot_evolution):
+    """Evolves a state through the gates of one layer."""
+    one_qubit_gates = []
+    one_qubit_indices = []
+
+    for gate in layer:
+        if len(gate) == 2:  # Single-qubit gate
+            gate_name, qubit_index = gate
+            if gate_name in ["I", "X", "Y", "Z", "H", "S", "T"]:
+                one_qubit_gates.append(gate_name)
+                one_qubit_indices.append(qubit_index)
+            else:
+                raise ValueError(f"Unsupported single-qubit gate: {gate_name}")
+        elif len(gate) == 3:  # Two-qubit gate (CNOT)
+            gate_name, control, target = gate
+            if gate_name == "CX":
+                if one_qubit_gates:
+                    current_state = one_qubit_evolution(
+                        current_state, one_qubit_indices, one_qubit_gates, c_ops
+                    )
+                    one_qubit_gates = []
+                    one_qubit_indices = []
+                current_state = cnot_evolution(
+                    current_state, control, target, c_ops
+                )
+            else:
+                raise ValueError(f"Unsupported two-qubit gate: {gate_name}")
+        else:
+            raise ValueError(f"Invalid gate format: {gate}")
+
+    if one_qubit_gates:
+        current_state = one_qubit_evolution(
+            current_state, one_qubit_indices, one_qubit_gates, c_ops
+        )
+
+    return current_state
+
+
+def prepare_evolution(circuit_rep, c_ops, engine="auto", fuse=False, profiler=NULL_PROFILER):
+    """
+    Resolves the engine and error model, and fuses the circuit if requested.
+
+    Returns:
+        tuple: (circuit layers, engine name, error model for the engine)
+    """
+    with profiler.span("resolve_engine", requested=engine):
+        engine, c_ops = resolve_engine(engine, c_ops)
+    if fuse:
+        with profiler.span("fusion"):
+            circuit_rep, _ = fuse_layers(circuit_rep, noiseless=is_noiseless(c_ops))
+    return circuit_rep, engine, c_ops
+
+
+def evolve_array(circuit_rep, rho, c_ops, engine, profiler=NULL_PROFILER, state_options=None):
+    """
+    Runs a resolved engine other than QOBJ_ENGINES on a numpy density matrix.
+
+    state_options are passed to from_dense of the engine's STATE_REPRESENTATIONS,
+    e.g. tol and max_rank of a LowRankDensity.
+    """
+    one_qubit_evolution, cnot_evolution = EVOLUTION_ENGINES[engine]
+    if engine in STATE_REPRESENTATIONS:
+        final_state = evolve_layers(
+            circuit_rep,
+            STATE_REPRESENTATIONS[engine].from_dense(rho, **(state_options or {})),
+            c_ops,
+            one_qubit_evolution,
+            cnot_evolution,
+            profiler,
+        )
+        if isinstance(final_state, STATE_REPRESENTATIONS[engine]):
+            final_state = final_state.to_dense()
+        return final_state
+    return evolve_layers(circuit_rep, rho, c_ops, one_qubit_evolution, cnot_evolution, profiler)
+
+
+def rep_to_evolution(
+    circuit_rep, input_state, c_ops, engine="auto", fuse=False, profiler=NULL_PROFILER
+):
+    """
+    Evolves an input state through a quantum circuit.
+    Now properly handles S and T gates with correct phases.
+
+    The engine selects how each gate is evolved: "mesolve" integrates the
+    master equation numerically, "propagator" exponentiates the Liouvillian,
+    "local" integrates it with tensor contractions against a LocalNoiseModel,
+    "tensor" applies ideal gates with tensor contractions, "lowrank" evolves a
+    low-rank factorization of the state (see low_rank.py), "pauli" evolves
+    its Pauli-transfer coefficients against a Pauli LocalNoiseModel (see
+    pauli_transfer.py), and "mpdo" a matrix-product density operator against
+    single-qubit channels applied per qubit (see mpdo.py). "auto" picks "tensor"
+    for a noiseless model, "pauli" for a LocalNoiseModel of Pauli channels (such
+    as the default depolarizing model), "local" for other LocalNoiseModels and
+    "mesolve" otherwise.
+
+    With fuse, the circuit is first optimized by layer_fusion.fuse_layers: the
+    full ideal-gate fusion without noise, only noise-preserving rewrites with it.
+
+    The profiler (see profiling.py) records the engine resolution and one span
+    per layer.
+    """
+    import qutip as qt
+
+    if not input_state.isoper:
+        raise TypeError(
+            "input_state must be a density matrix (Qobj operator), not a ket."
+        )
+    circuit_rep, engine, c_ops = prepare_evolution(circuit_rep, c_ops, engine, fuse, profiler)
+    if engine not in QOBJ_ENGINES:
+        final_state = evolve_array(circuit_rep, input_state.full(), c_ops, engine, profiler)
+        return qt.Qobj(final_state, dims=input_state.dims)
+    return evolve_layers(
+        circuit_rep, input_state, c_ops, *EVOLUTION_ENGINES[engine], profiler
+    )
+
+
+def evolve_density_matrix(
+    circuit_rep, rho, c_ops, engine="auto", fuse=False, profiler=NULL_PROFILER, state_options=None
+):
+    """
+    Numpy counterpart of rep_to_evolution: evolves a density matrix given as an array.
+
+    qutip is only imported when the resolved engine is "mesolve" or "propagator".
+
+    Args:
+        circuit_rep (list): Circuit layers
+        rho (np.ndarray): Input density matrix, shape (2^n, 2^n)
+        c_ops (list or LocalNoiseModel): Error model
+        engine (str): Evolution engine, as for rep_to_evolution
+        fuse (bool): Fuse the circuit first, as for rep_to_evolution
+        profiler (Profiler): Records the engine resolution and one span per layer
+        state_options (dict): Options of the engine's state representation, as
+            for evolve_array
+
+    Returns:
+        np.ndarray: The evolved density matrix
+    """
+    circuit_rep, engine, c_ops = prepare_evolution(circuit_rep, c_ops, engine, fuse, profiler)
+    if engine not in QOBJ_ENGINES:
+        return evolve_array(circuit_rep, rho, c_ops, engine, profiler, state_options)
+
+    import qutip as qt
+
+    num_qubits = int(np.log2(rho.shape[0]))
+    final_state = evolve_layers(
+        circuit_rep,
+        qt.Qobj(rho, dims=[[2] * num_qubits, [2] * num_qubits]),
+        c_ops,
+        *EVOLUTION_ENGINES[engine],
+        profiler,
+    )
+    with profiler.span("to_dense"):
+        return final_state.full()
+
+
+def iter_evolution(circuit_rep, input_state, c_ops, engine="auto", profiler=NULL_PROFILER):
+    """
+    Generator counterpart of rep_to_evolution: yields the state after every layer.
+
+    Inspecting every prefix of a circuit this way costs one evolution. The
+    circuit is not fused, so the i-th state is the output of the first i + 1
+    layers as given.
+
+    Args:
+        circuit_rep (list): Circuit layers
+        input_state (qutip.Qobj or np.ndarray): Input density matrix
+        c_ops (list or LocalNoiseModel): Error model
+        engine (str): Evolution engine, as for rep_to_evolution
+        profiler (Profiler): Records the engine resolution and one span per layer
+
+    Yields:
+        The density matrix after each layer, a Qobj or numpy array like input_state
+    """
+    as_qobj = not isinstance(input_state, np.ndarray)
+    if as_qobj and not input_state.isoper:
+        raise TypeError(
+            "input_state must be a density matrix (Qobj operator), not a ket."
+        )
+    circuit_rep, engine, c_ops = prepare_evolution(circuit_rep, c_ops, engine, profiler=profiler)
 
-from visualizations.Density_Plot import create_density_matrix_plot
+    if engine in QOBJ_ENGINES:
+        import qutip as qt
 
-"""
-Quantum Circuit Evolution with Intermediate Representation
+        if not as_qobj:
+            num_qubits = int(np.log2(input_state.shape[0]))
+            input_state = qt.Qobj(input_state, dims=[[2] * num_qubits, [2] * num_qubits])
+        for state in iter_layers(
+            circuit_rep, input_state, c_ops, *EVOLUTION_ENGINES[engine], profiler
+        ):
+            yield state if as_qobj else state.full()
+        return
 
-This code implements quantum circuit evolution using an intermediate representation
-of quantum circuits. The intermediate representation is a list of layers, where each
-layer is a list of tuples representing quantum gates.
+    if not as_qobj:
+        yield from _iter_array_evolution(circuit_rep, input_state, c_ops, engine, profiler)
+        return
 
-1. Intermediate Representation Format:
-   The circuit is represented as a list of layers: [[layer1], [layer2], ...]
-   Each layer is a list of tuples: [(gate1), (gate2), ...]
-   Each tuple represents a gate: (gate_name, qubit_index) for 1-qubit gates
-                                 (gate_name, control_qubit, target_qubit) for 2-qubit gates
+    import qutip as qt
 
-   Supported gates: 'I' (Identity), 'X', 'Y', 'Z', 'H' (Hadamard), 'CX' (CNOT), 'S', 'T'
-"""
+    for snapshot in _iter_array_evolution(
+        circuit_rep, input_state.full(), c_ops, engine, profiler
+    ):
+        yield qt.Qobj(snapshot, dims=input_state.dims)
 
-# Basic gate set
-I = qt.qeye(2)
-X = qt.sigmax()
-Y = qt.sigmay()
-Z = qt.sigmaz()
-H = qt.Qobj([[1, 1], [1, -1]]) / np.sqrt(2)
-# S gate (phase gate): |0⟩ → |0⟩, |1⟩ → i|1⟩
-S = qt.Qobj([[1, 0], [0, 1j]])
-# T gate (π/8 gate): |0⟩ → |0⟩, |1⟩ → exp(iπ/4)|1⟩
-T = qt.Qobj([[1, 0], [0, np.exp(1j * np.pi / 4)]])
 
-zero, one = qt.basis(2, 0), qt.basis(2, 1)
-plus = (zero + one).unit()
-minus = (zero - one).unit()
+def _iter_array_evolution(circuit_rep, rho, c_ops, engine, profiler, state_options=None):
+    """Yields the numpy density matrix after every layer for a resolved engine."""
+    if engine in QOBJ_ENGINES:
+        import qutip as qt
 
+        num_qubits = int(np.log2(rho.shape[0]))
+        state = qt.Qobj(rho, dims=[[2] * num_qubits, [2] * num_qubits])
+        for state in iter_layers(circuit_rep, state, c_ops, *EVOLUTION_ENGINES[engine], profiler):
+            yield state.full()
+        return
 
-def f_H(t, delta_t, start_time):
+    representation = STATE_REPRESENTATIONS.get(engine)
+    state = rho if representation is None else representation.from_dense(rho, **(state_options or {}))
+    for state in iter_layers(circuit_rep, state, c_ops, *EVOLUTION_ENGINES[engine], profiler):
+        yield state.to_dense() if representation and isinstance(state, representation) else state
+
+
+def noise_fingerprint(c_ops):
     """
-    Time-dependent coefficient function for Hamiltonian evolution.
+    Content hash of an error model in any of its forms, "none" without one.
+    """
+    if c_ops is None:
+        return "none"
+    if isinstance(c_ops, LocalNoiseModel):
+        return c_ops.fingerprint()
+    return c_ops_fingerprint(c_ops)
 
-    Args:
-        t (float): Current time
-        delta_t (float): Duration of the gate
-        start_time (float): Time at which the gate starts
 
-    Returns:
-        float: 1 if within the gate duration window, 0 otherwise
+def prefix_cache_info():
+    """Return hit/miss counters, size and bytes of the prefix state cache."""
+    return prefix_state_cache.info()
+
+
+def clear_prefix_cache():
+    """Drop every cached intermediate state and reset the cache counters."""
+    prefix_state_cache.clear()
+
+
+def evolve_from_cached_prefix(
+    circuit_rep, rho, c_ops, engine="auto", cache=None, profiler=NULL_PROFILER, state_options=None
+):
     """
-    t0, t1 = start_time, start_time + delta_t
-    return 1 if t0 <= t < t1 else 0
+    Evolves a density matrix like evolve_density_matrix, resuming from the
+    longest prefix of the circuit whose output state is cached (see prefix_cache.py).
 
+    The state after every evolved layer is added to the cache, so a later
+    circuit sharing these layers, e.g. the same circuit with its last layers
+    edited, only evolves the layers after the shared prefix.
 
-def physical_one_qubit_evolution(input_state, qubit_indices, gate_names, c_ops):
+    Args:
+        circuit_rep (list): Circuit layers
+        rho (np.ndarray): Input density matrix, shape (2^n, 2^n)
+        c_ops (list or LocalNoiseModel): Error model
+        engine (str): Evolution engine, as for rep_to_evolution
+        cache (PrefixStateCache): Cache to use; defaults to prefix_state_cache
+        profiler (Profiler): Records the engine resolution, the cache lookup
+            ("cached_layers") and one span per evolved layer
+        state_options (dict): Options of the engine's state representation, as
+            for evolve_array; they are part of the cache key
+
+    Returns:
+        np.ndarray: The evolved density matrix
     """
-    Applies specified single-qubit gates to selected qubits in a multi-qubit circuit.
-    Modified to handle S and T gates with proper phase evolution.
+    cache = prefix_state_cache if cache is None else cache
+    fingerprint = noise_fingerprint(c_ops)
+    with profiler.span("resolve_engine", requested=engine):
+        engine, c_ops = resolve_engine(engine, c_ops)
+
+    with profiler.span("prefix_lookup", layers=len(circuit_rep)) as span:
+        initial = hashlib.sha1(np.ascontiguousarray(rho).tobytes()).hexdigest()
+        options = json.dumps(state_options or {}, sort_keys=True)
+        hashes = prefix_hashes(circuit_rep, f"{engine}/{options}/{fingerprint}/{initial}")
+        cached_layers, cached_state = cache.lookup(hashes)
+        if span is not None:
+            span["cached_layers"] = cached_layers
+    state = rho if cached_state is None else cached_state.copy()
+
+    remaining = circuit_rep[cached_layers:]
+    for offset, state in enumerate(
+        _iter_array_evolution(remaining, state, c_ops, engine, profiler, state_options),
+        cached_layers + 1,
+    ):
+        cache.store(hashes[offset], state)
+    return state
+
+
+def simulate_noise_sweep(circuit_ir, noise_params=None, kraus_sets=None, engine="auto"):
     """
-    num_qubits = int(np.log2(input_state.shape[0]))
+    Simulates one circuit under many error models in a single batched evolution.
 
-    if isinstance(qubit_indices, int):
-        qubit_indices = [qubit_indices]
-        gate_names = [gate_names]
+    Exactly one of noise_params or kraus_sets must be given. The circuit is
+    validated and every gate is built once; the whole sweep is evolved as a
+    density matrix batch of shape (batch, 2^n, 2^n) by the array engines.
 
-    if len(qubit_indices) != len(gate_names):
+    Args:
+        circuit_ir (list): Circuit layers, as for simulate_quantum_circuit
+        noise_params (array_like): 1D array of depolarizing probabilities
+        kraus_sets (list): Per sweep point, either a LocalNoiseModel or a set of
+            single-qubit Kraus operators (shape (K, 2, 2)) applied to every qubit
+        engine (str): "auto", "local" or "tensor"
+
+    Returns:
+        np.ndarray: Final density matrices, shape (batch, 2^n, 2^n), starting from |0...0>
+
+    Raises:
+        ValueError: If the arguments, the circuit or the error models are invalid
+    """
+    if (noise_params is None) == (kraus_sets is None):
+        raise ValueError("Provide exactly one of noise_params or kraus_sets.")
+    if engine != "auto" and engine not in ARRAY_ENGINES:
         raise ValueError(
-            "The number of qubit indices must match the number of gate names."
+            f"Noise sweeps require one of the engines: auto, {', '.join(sorted(ARRAY_ENGINES))}"
         )
 
-    # Define gate map with proper scaling factors
-    gate_map = {
-        "I": (I, 1.0),
-        "X": (X, np.pi / 2),
-        "Y": (Y, np.pi / 2),
-        "Z": (Z, np.pi / 2),
-        "H": (H, np.pi / 2),
-        "S": (Z, np.pi / 4),  # S = √Z
-        "T": (Z, np.pi / 8),  # T = √S = fourth_root(Z)
-    }
-
-    for gate_name in gate_names:
-        if gate_name not in gate_map:
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    validate_circuit_layers(circuit_ir)
+
+    if noise_params is not None:
+        noise_params = np.asarray(noise_params, dtype=float)
+        if noise_params.ndim != 1 or noise_params.size == 0:
+            raise ValueError("noise_params must be a non-empty 1D array.")
+        if np.any((noise_params < 0) | (noise_params > 1)):
+            raise ValueError("Depolarizing probabilities must lie in [0, 1].")
+        noise_model = LocalNoiseModel.depolarizing(noise_params, num_qubits)
+    else:
+        noise_model = LocalNoiseModel.stack(
+            [
+                kraus if isinstance(kraus, LocalNoiseModel)
+                else LocalNoiseModel.uniform(kraus, num_qubits)
+                for kraus in kraus_sets
+            ]
+        )
+        if noise_model.num_qubits != num_qubits:
             raise ValueError(
-                f"Invalid gate name. Supported gates are: {', '.join(gate_map.keys())}"
+                f"Noise model is defined for {noise_model.num_qubits} qubits, but the circuit has {num_qubits}"
             )
 
-    qubit_ops = []
-    scaling_factor = 1.0
+    batch_size = noise_model.batch_size
+    engine, noise_model = resolve_engine(engine, noise_model)
 
-    for i in range(num_qubits):
-        if i in qubit_indices:
-            gate_index = qubit_indices.index(i)
-            gate_name = gate_names[gate_index]
-            gate_op, gate_scaling = gate_map[gate_name]
-            qubit_ops.append(gate_op)
-            scaling_factor = gate_scaling  # Use the scaling factor of the last gate
-        else:
-            qubit_ops.append(I)
+    dim = 2**num_qubits
+    initial_states = np.zeros((batch_size, dim, dim), dtype=complex)
+    initial_states[:, 0, 0] = 1
+    return evolve_layers(
+        circuit_ir, initial_states, noise_model, *EVOLUTION_ENGINES[engine]
+    )
 
-    gate_op = scaling_factor * qt.tensor(*qubit_ops)
 
-    td_list = [[gate_op, lambda t, args: f_H(t, 1, 0)]]
+def trajectory_one_qubit_evolution(states, qubit_indices, gate_names, sampler):
+    """
+    Counterpart of local_one_qubit_evolution for a batch of statevector trajectories.
+    """
+    scaling, factors = one_qubit_layer_generator(qubit_indices, gate_names)
+    return sampler.evolve(states, scaling, factors, 1)
 
-    times = np.linspace(0, 1)
-    output_state = qt.mesolve(td_list, input_state, times, c_ops=c_ops).states[-1]
 
-    return output_state
+def trajectory_cnot_evolution(states, ctrl_idx, tgt_idx, sampler):
+    """
+    Counterpart of local_cnot_evolution for a batch of statevector trajectories.
+    """
+    for scaling, factors, duration in cnot_pulse_generators(ctrl_idx, tgt_idx):
+        states = sampler.evolve(states, scaling, factors, duration)
+    return states
+
+
+def simulate_trajectories(
+    circuit_ir,
+    noise_model=None,
+    num_trajectories=1000,
+    observables=(),
+    return_density=True,
+    batch_size=256,
+    seed=None,
+):
+    """
+    Estimates the final state with Monte-Carlo statevector trajectories.
 
+    Each trajectory stores 2^n amplitudes instead of the 4^n entries of a
+    density matrix, and batch_size trajectories are evolved together. Averages
+    match the "local" engine up to the reported standard errors.
 
-def physical_cnot_evolution(input_state, ctrl_idx, tgt_idx, c_ops):
+    Args:
+        circuit_ir (list): Circuit layers, as for simulate_quantum_circuit
+        noise_model (LocalNoiseModel): Trace-preserving error model, or None for
+            ideal gates
+        num_trajectories (int): Number of trajectories to sample
+        observables (sequence of str): Pauli strings (e.g. "ZZI", qubit 0 first)
+            whose expectation values are averaged
+        return_density (bool): Whether to also estimate the density matrix,
+            which needs O(4^n) memory
+        batch_size (int): Trajectories evolved together
+        seed (int): Seed of the random number generator
+
+    Returns:
+        dict: num_trajectories, expectations, expectation_stderr and, if
+            requested, density_matrix and density_matrix_stderr
+
+    Raises:
+        ValueError: If the circuit or the noise model is invalid
     """
-    Applies a physical CNOT gate between two qubits and returns the resulting density matrix,
-    evolving the state gate-by-gate.
+    if num_trajectories <= 0 or batch_size <= 0:
+        raise ValueError("num_trajectories and batch_size must be positive.")
+    if noise_model is not None and not isinstance(noise_model, LocalNoiseModel):
+        raise ValueError("Trajectories require a LocalNoiseModel error model.")
+
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    validate_circuit_layers(circuit_ir)
+    for label in observables:
+        if len(label) != num_qubits:
+            raise ValueError(f"Pauli string {label} must have one entry per qubit.")
+
+    dim = 2**num_qubits
+    sampler = TrajectorySampler(num_qubits, noise_model, seed=seed)
+    statistics = TrajectoryStatistics(dim, observables, track_density=return_density)
+
+    remaining = num_trajectories
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        states = np.zeros((count, dim), dtype=complex)
+        states[:, 0] = 1
+        statistics.add(
+            evolve_layers(
+                circuit_ir,
+                states,
+                sampler,
+                trajectory_one_qubit_evolution,
+                trajectory_cnot_evolution,
+            )
+        )
+        remaining -= count
 
-    This is IBM's ansatz to implement a CNOT gate.
+    return statistics.result()
+
+
+def gate_windows(circuit_rep):
+    """
+    Lists the gate windows the engines evolve, in order.
 
     Args:
-    input_state (qutip.Qobj): The input quantum state (density matrix)
-    ctrl_idx (int): Index of the control qubit
-    tgt_idx (int): Index of the target qubit
-    c_ops (list): Error model/Kraus Operators
+        circuit_rep (list): Circuit layers
 
     Returns:
-    qutip.Qobj: The resulting density matrix after applying the CNOT gate
+        list: (scaling, local_ops, duration) triples, one per run of single-qubit
+            gates (see one_qubit_layer_generator) and three per CNOT (see
+            cnot_pulse_generators)
     """
-    num_qubits = int(np.log2(input_state.shape[0]))
+    windows = []
+    for block in circuit_blocks(circuit_rep):
+        if block[0] == "run":
+            qubit_indices, gate_names = zip(*block[1])
+            scaling, local_ops = one_qubit_layer_generator(list(qubit_indices), list(gate_names))
+            windows.append((scaling, local_ops, 1))
+        else:
+            windows.extend(cnot_pulse_generators(block[1], block[2]))
+    return windows
 
-    sq_z_gate_duration = 1
-    sq_x_gate_duration = 1
-    sq_zx_gate_duration = 10
-    theta = np.pi / 4
 
-    # Initialize the current state
-    current_state = input_state
-    current_t = 0
+def supports_stabilizer(circuit_ir, c_ops):
+    """
+    Returns True if the stabilizer engine can simulate a circuit: every gate
+    window is Clifford, the error model is absent or a Pauli LocalNoiseModel,
+    and the engine does not approximate the noise of any window, e.g. of a
+    CNOT pulse (see stabilizer.noise_is_exact; absent noise stands for the
+    default depolarizing model, under which only noiseless or single-qubit
+    windows qualify).
+    """
+    if c_ops is not None and not (
+        isinstance(c_ops, LocalNoiseModel) and c_ops.pauli_probabilities() is not None
+    ):
+        return False
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    try:
+        windows = [
+            CliffordWindow(scaling, local_ops, duration, num_qubits)
+            for scaling, local_ops, duration in gate_windows(circuit_ir)
+        ]
+    except ValueError:
+        return False
+    if c_ops is None:
+        c_ops = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+    return noise_is_exact(windows, c_ops)
+
+
+def simulate_stabilizer(circuit_ir, noise_model=None, num_shots=DEFAULT_NUM_SHOTS, seed=None):
+    """
+    Simulates a Clifford circuit with a stabilizer tableau (see stabilizer.py).
 
-    # 1. dagger sqrt{Z} gate on control qubit
-    op_list = [I if i != ctrl_idx else Z for i in range(num_qubits)]
-    H_CX_G1 = qt.tensor(*op_list)
-    H_CX_G1 = H_CX_G1 * theta / sq_z_gate_duration
-    H_CX_td1 = [-H_CX_G1, lambda t, args: f_H(t, 1, 0)]
-    times = np.linspace(0, 1)
-    result1 = qt.mesolve([H_CX_td1], current_state, times, c_ops=c_ops)
-    current_state = result1.states[-1]
-    current_t += sq_z_gate_duration
-
-    # 2. sqrt{ZX} gate
-    op_list = [
-        I if i not in [ctrl_idx, tgt_idx] else Z if i == ctrl_idx else X
-        for i in range(num_qubits)
-    ]
-    H_CX_G2 = qt.tensor(*op_list)
-    H_CX_G2 = H_CX_G2 * theta / sq_zx_gate_duration
-    H_CX_td2 = [H_CX_G2, lambda t, args: f_H(t, 10, 0)]
-    times2 = np.linspace(0, 10)
-    result2 = qt.mesolve([H_CX_td2], current_state, times2, c_ops=c_ops)
-    current_state = result2.states[-1]
-    current_t += sq_zx_gate_duration
+    Time and memory grow polynomially with the number of qubits, so circuits
+    on hundreds of qubits are feasible. Instead of a density matrix, the result
+    holds the stabilizer generators of the ideal final state and the
+    distribution of measuring every qubit, sampled from Pauli frames with noise.
 
-    # 3. dagger sqrt{X} gate on target qubit
-    op_list = [I if i != tgt_idx else X for i in range(num_qubits)]
-    H_CX_G3 = qt.tensor(*op_list)
-    H_CX_G3 = H_CX_G3 * theta / sq_x_gate_duration
-    H_CX_td3 = [-H_CX_G3, lambda t, args: f_H(t, 1, 0)]
-    result3 = qt.mesolve([H_CX_td3], current_state, times, c_ops=c_ops)
-    final_state = result3.states[-1]
+    Args:
+        circuit_ir (list): Circuit layers, as for simulate_quantum_circuit
+        noise_model (LocalNoiseModel): Pauli error model, or None for ideal gates
+        num_shots (int): Number of sampled measurement shots
+        seed (int): Seed of the random number generator
+
+    Returns:
+        dict: stabilizers, random_bits, num_shots, histogram, qubit_probabilities
+            and approximate (see stabilizer.simulate_clifford_windows)
 
-    return final_state
+    Raises:
+        ValueError: If the circuit is not Clifford or the noise is not a Pauli channel
+    """
+    if noise_model is not None and not isinstance(noise_model, LocalNoiseModel):
+        raise ValueError("The stabilizer engine requires a LocalNoiseModel error model.")
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    return simulate_clifford_windows(
+        gate_windows(circuit_ir), num_qubits, noise_model, num_shots=num_shots, seed=seed
+    )
 
 
-def rep_to_evolution(circuit_rep, input_state, c_ops):
+def supports_mpdo(c_ops):
     """
-    Evolves an input state through a quantum circuit.
-    Now properly handles S and T gates with correct phases.
+    Returns True if the mpdo engine can simulate with an error model: it is
+    absent or a trace-preserving, unbatched LocalNoiseModel of single-qubit channels.
     """
-    if not input_state.isoper:
-        raise TypeError(
-            "input_state must be a density matrix (Qobj operator), not a ket."
-        )
+    if c_ops is None:
+        return True
+    return (
+        isinstance(c_ops, LocalNoiseModel)
+        and c_ops.batch_size is None
+        and c_ops.trace_preserving
+        and all(len(site) == 1 for site in c_ops.kraus)
+    )
 
-    current_state = input_state
-    layers = [x["gates"] for x in circuit_rep]
-    for layer in layers:
-        one_qubit_gates = []
-        one_qubit_indices = []
 
-        for gate in layer:
-            if len(gate) == 2:  # Single-qubit gate
-                gate_name, qubit_index = gate
-                if gate_name in ["I", "X", "Y", "Z", "H", "S", "T"]:
-                    one_qubit_gates.append(gate_name)
-                    one_qubit_indices.append(qubit_index)
-                else:
-                    raise ValueError(f"Unsupported single-qubit gate: {gate_name}")
-            elif len(gate) == 3:  # Two-qubit gate (CNOT)
-                gate_name, control, target = gate
-                if gate_name == "CX":
-                    if one_qubit_gates:
-                        current_state = physical_one_qubit_evolution(
-                            current_state, one_qubit_indices, one_qubit_gates, c_ops
-                        )
-                        one_qubit_gates = []
-                        one_qubit_indices = []
-                    current_state = physical_cnot_evolution(
-                        current_state, control, target, c_ops
-                    )
-                else:
-                    raise ValueError(f"Unsupported two-qubit gate: {gate_name}")
-            else:
-                raise ValueError(f"Invalid gate format: {gate}")
+def simulate_mpdo(
+    circuit_ir,
+    noise_model=None,
+    max_bond=DEFAULT_MAX_BOND,
+    profiler=NULL_PROFILER,
+    max_kraus=DEFAULT_MAX_KRAUS,
+):
+    """
+    Simulates a circuit with a matrix-product density operator (see mpdo.py).
 
-        if one_qubit_gates:
-            current_state = physical_one_qubit_evolution(
-                current_state, one_qubit_indices, one_qubit_gates, c_ops
-            )
+    Memory grows with the number of qubits times the square of the bond
+    dimension, so weakly entangled circuits on tens of qubits are feasible.
+    Bonds above max_bond and Kraus indices above max_kraus are truncated, and
+    the discarded weight is reported. Each qubit's channel acts as its own
+    error process (see mpdo.py), which is not the joint process of the dense
+    engines, so results with noise are marked approximate.
 
-    return current_state
+    Args:
+        circuit_ir (list): Circuit layers, as for simulate_quantum_circuit
+        noise_model (LocalNoiseModel): Single-qubit error model, or None for ideal gates
+        max_bond (int): Largest bond dimension kept
+        profiler (Profiler): Records one span per layer
+        max_kraus (int): Largest Kraus dimension kept per qubit
+
+    Returns:
+        dict: qubit_probabilities (of measuring 1), bond_dimensions, max_bond,
+            max_kraus, truncation_error (sum of the discarded fractions of the
+            trace) and approximate (whether the noise model was replaced by
+            per-qubit processes)
+
+    Raises:
+        ValueError: If the noise model is not supported (see supports_mpdo)
+    """
+    if not supports_mpdo(noise_model):
+        raise ValueError(
+            "The mpdo engine requires a trace-preserving LocalNoiseModel of single-qubit channels."
+        )
+    engine, noise = resolve_engine("mpdo", noise_model)
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    state = evolve_layers(
+        circuit_ir,
+        MatrixProductDensity.ground_state(num_qubits, max_bond=max_bond, max_kraus=max_kraus),
+        noise,
+        *EVOLUTION_ENGINES[engine],
+        profiler,
+    )
+    return {
+        "qubit_probabilities": state.qubit_probabilities(),
+        "bond_dimensions": state.bond_dimensions,
+        "max_bond": max_bond,
+        "max_kraus": max_kraus,
+        "truncation_error": state.truncation_error,
+        "approximate": not is_noiseless(noise_model),
+    }
 
 
 def get_depolarizing_ops(p, n):
     """
     Generate depolarizing operators for the error model.
     """
+    import qutip as qt
+
+    gates = qutip_constants()
     single_qubit_ops = [
-        np.sqrt(1 - p) * I,
-        np.sqrt(p / 3) * X,
-        np.sqrt(p / 3) * Y,
-        np.sqrt(p / 3) * Z,
+        np.sqrt(1 - p) * gates["I"],
+        np.sqrt(p / 3) * gates["X"],
+        np.sqrt(p / 3) * gates["Y"],
+        np.sqrt(p / 3) * gates["Z"],
     ]
 
     c_ops = [qt.tensor(*ops) for ops in itertools.product(single_qubit_ops, repeat=n)]
     return c_ops
 
 
+def load_noise_model(path):
+    """
+    Loads an uploaded noise model (.npy array of Kraus operators on the whole register).
+
+    The operators are validated and converted into a LocalNoiseModel once per
+    file content; repeated uploads of the same model reuse the cached model.
+
+    Args:
+        path (str): Path to the .npy file
+
+    Returns:
+        LocalNoiseModel: One site on all qubits, applying sum_k K_k rho K_k^dag to the register
+
+    Raises:
+        ValueError: If the file does not hold a trace-preserving Kraus set
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    key = hashlib.sha1(data).hexdigest()
+    noise_model = noise_model_cache.get(key)
+    if noise_model is None:
+        noise_model = LocalNoiseModel.from_kraus(np.load(BytesIO(data)))
+        noise_model_cache.put(key, noise_model)
+    return noise_model
+
+
 def complex_to_serializable(z):
     """Convert a complex number to a serializable dictionary."""
     return {"real": float(np.real(z)), "imag": float(np.imag(z))}
@@ -251,6 +1443,56 @@ def matrix_to_serializable(matrix):
     return [[complex_to_serializable(x) for x in row] for row in matrix]
 
 
+def matrix_to_buffer(matrix, dtype="complex128"):
+    """
+    Encodes a complex matrix as a base64 little-endian buffer with shape metadata.
+
+    Args:
+        matrix (np.ndarray): Complex matrix (or stack of matrices)
+        dtype (str): "complex128" or "complex64"
+
+    Returns:
+        dict: {"encoding": "base64", "dtype": numpy dtype string, "shape": list, "data": str}
+    """
+    if dtype not in STATE_DTYPES:
+        raise ValueError(
+            f"Unsupported dtype: {dtype}. Supported dtypes are: {', '.join(STATE_DTYPES)}"
+        )
+    array = np.ascontiguousarray(matrix, dtype=STATE_DTYPES[dtype])
+    return {
+        "encoding": "base64",
+        "dtype": STATE_DTYPES[dtype],
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def buffer_to_matrix(payload):
+    """
+    Decodes the output of matrix_to_buffer back into a numpy array.
+    """
+    data = base64.b64decode(payload["data"])
+    return np.frombuffer(data, dtype=payload["dtype"]).reshape(payload["shape"])
+
+
+def render_density_plot(matrix):
+    """
+    Renders the density matrix plot as a base64 encoded PNG.
+
+    Small matrices are drawn as 3D bars and larger ones as a heatmap (see
+    plot_density_matrix). matplotlib is only imported here, so callers that skip
+    plotting never load it.
+    """
+    from visualizations.Density_Plot import plot_density_matrix
+
+    fig = plot_density_matrix(matrix)
+    buffer = BytesIO()
+    # Fast zlib level: noisy phase images barely compress further at higher levels
+    fig.savefig(buffer, format="png", pil_kwargs={"compress_level": 1})
+    buffer.seek(0)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
 def validate_circuit_layers(circuit_rep):
     """
     Validates that each layer in the circuit representation has no overlapping qubits.
@@ -294,61 +1536,198 @@ def validate_circuit_layers(circuit_rep):
             used_qubits.update(gate_qubits)
 
 
-def simulate_quantum_circuit(circuit_ir, c_ops=None):
+def check_simulation_inputs(circuit_ir, c_ops):
+    """
+    Validates a circuit and its error model before a simulation.
+
+    Args:
+        circuit_ir (list): Circuit layers
+        c_ops (list or LocalNoiseModel): Error model, or None for the default
+
+    Returns:
+        int: Number of qubits of the circuit
+
+    Raises:
+        ValueError: If the circuit or the error model is invalid
+    """
+    # Quick validation checks first
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+
+    # Early c_ops dimension check
+    if isinstance(c_ops, LocalNoiseModel):
+        if c_ops.num_qubits != num_qubits:
+            raise ValueError(
+                f"Noise model is defined for {c_ops.num_qubits} qubits, but the circuit has {num_qubits}"
+            )
+    elif c_ops is not None:
+        import qutip as qt
+
+        expected_dim = 2**num_qubits
+        for i, op in enumerate(c_ops):
+            if not isinstance(op, qt.Qobj):
+                raise ValueError(f"Invalid Kraus operator format at index {i}")
+            if op.dims != [[expected_dim], [expected_dim]]:
+                raise ValueError(
+                    f"Kraus operator dimensions mismatch. Expected {expected_dim}x{expected_dim} for {num_qubits} qubits, but got {op.dims[0][0]}x{op.dims[1][0]}"
+                )
+
+    try:
+        validate_circuit_layers(circuit_ir)
+    except ValueError as e:
+        raise ValueError(f"Invalid circuit configuration: {str(e)}")
+    return num_qubits
+
+
+def simulate_quantum_circuit(
+    circuit_ir,
+    c_ops=None,
+    engine="auto",
+    output="plot",
+    dtype="complex128",
+    fuse=False,
+    profile=False,
+    trace_path=None,
+    use_prefix_cache=False,
+    max_bond=DEFAULT_MAX_BOND,
+    max_kraus=DEFAULT_MAX_KRAUS,
+    max_rank=None,
+    rank_tol=DEFAULT_RANK_TOL,
+):
     """
     Main simulation function that takes a circuit IR and returns the simulation results.
+
+    c_ops is either a list of collapse operators or a LocalNoiseModel; by default a
+    local depolarizing model is used. The engine is forwarded to
+    evolve_density_matrix, so qutip is only imported by the engines that need it.
+
+    output selects what is returned: "plot" renders the density matrix as a
+    base64 PNG under "plot_image", "data" returns the final density matrix under
+    "density_matrix" as a base64 buffer of the given dtype (see matrix_to_buffer)
+    without rendering anything, and "both" returns both.
+
+    With fuse, the circuit is optimized by layer_fusion.fuse_layers before the
+    evolution, and the before/after layer and gate counts are returned under "fusion".
+
+    Clifford circuits (no T gate setting the scaling of its run) with Pauli
+    noise, such as the default depolarizing model, can run on the "stabilizer"
+    engine (see simulate_stabilizer), which "auto" selects above DENSE_MAX_QUBITS
+    qubits unless the noise of some window, such as a noisy CNOT, would only be
+    approximated (see supports_stabilizer). Its result holds the "stabilizers"
+    of the final state and the measurement "histogram" and "qubit_probabilities"
+    instead of the density matrix or plot, and whether the noise is
+    "approximate"; fuse and use_prefix_cache do not apply.
+
+    Other circuits with single-qubit channels run on the "mpdo" engine (see
+    simulate_mpdo) above DENSE_MAX_QUBITS qubits, keeping bond dimensions up to
+    max_bond and Kraus dimensions up to max_kraus. Its result holds the
+    "qubit_probabilities", the "bond_dimensions" and the "truncation_error"
+    instead of the density matrix or plot, and is "approximate" with noise, as
+    every qubit's channel then acts as its own error process.
+
+    The "lowrank" engine keeps the state as at most max_rank vectors (see
+    low_rank.py), and each compression may discard a trace fraction rank_tol.
+    Above max_rank it continues densely; the default rank_tol discards nothing
+    but numerical noise, so only noiseless and shallow noisy circuits stay low-rank.
+
+    With use_prefix_cache, the evolution resumes from the longest prefix of the
+    circuit simulated before in this process (see evolve_from_cached_prefix),
+    so editing the last layers of a circuit only evolves the edited layers. It
+    is off by default: filling the cache converts the state to a dense matrix
+    after every layer and copies it, which slows down a cold run and keeps
+    4^n * 16 bytes per layer in memory.
+
+    With profile, the wall time, CPU time and traced memory of every stage
+    (validation, noise model, evolution and each of its layers, conversion,
+    serialization, rendering) are returned under "profile" (see profiling.py);
+    trace_path additionally writes them as a Chrome trace file.
     """
+    profiler = Profiler() if profile or trace_path else NULL_PROFILER
     try:
-        # Quick validation checks first
-        num_qubits = max([x["numRows"] for x in circuit_ir])
-
-        # Early c_ops dimension check
-        if c_ops is not None:
-            expected_dim = 2**num_qubits
-            for i, op in enumerate(c_ops):
-                if not isinstance(op, qt.Qobj):
-                    return {
-                        "success": False,
-                        "error": f"Invalid Kraus operator format at index {i}",
-                    }
-                if op.dims != [[expected_dim], [expected_dim]]:
-                    return {
-                        "success": False,
-                        "error": f"Kraus operator dimensions mismatch. Expected {expected_dim}x{expected_dim} for {num_qubits} qubits, but got {op.dims[0][0]}x{op.dims[1][0]}",
-                    }
+        if output not in OUTPUT_MODES:
+            raise ValueError(
+                f"Unsupported output mode: {output}. Supported modes are: {', '.join(OUTPUT_MODES)}"
+            )
+        if dtype not in STATE_DTYPES:
+            raise ValueError(
+                f"Unsupported dtype: {dtype}. Supported dtypes are: {', '.join(STATE_DTYPES)}"
+            )
 
-        try:
-            validate_circuit_layers(circuit_ir)
-        except ValueError as e:
-            raise ValueError(f"Invalid circuit configuration: {str(e)}")
+        with profiler.span("validation"):
+            num_qubits = check_simulation_inputs(circuit_ir, c_ops)
+
+        if engine == "stabilizer" or (
+            engine == "auto"
+            and num_qubits > DENSE_MAX_QUBITS
+            and supports_stabilizer(circuit_ir, c_ops)
+        ):
+            if c_ops is None:
+                with profiler.span("noise_model"):
+                    c_ops = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+            with profiler.span("stabilizer", num_qubits=num_qubits):
+                result = {"success": True, "engine": "stabilizer"}
+                result.update(simulate_stabilizer(circuit_ir, c_ops))
+            return _with_profile(result, profiler, trace_path)
+
+        if engine == "mpdo" or (
+            engine == "auto" and num_qubits > DENSE_MAX_QUBITS and supports_mpdo(c_ops)
+        ):
+            if c_ops is None:
+                with profiler.span("noise_model"):
+                    c_ops = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+            with profiler.span(
+                "mpdo", num_qubits=num_qubits, max_bond=max_bond, max_kraus=max_kraus
+            ):
+                result = {"success": True, "engine": "mpdo"}
+                result.update(
+                    simulate_mpdo(circuit_ir, c_ops, max_bond, profiler, max_kraus=max_kraus)
+                )
+            return _with_profile(result, profiler, trace_path)
 
         # Initialize quantum state with correct dimensions
         dim = 2**num_qubits
-        initial_state = qt.basis(dim, 0) * qt.basis(dim, 0).dag()
-        initial_state.dims = [[2] * num_qubits, [2] * num_qubits]
+        with profiler.span("initial_state", hilbert_dim=dim):
+            initial_state = np.zeros((dim, dim), dtype=complex)
+            initial_state[0, 0] = 1
+
+        if c_ops is None:
+            with profiler.span("noise_model"):
+                c_ops = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+
+        fusion_report = None
+        if fuse:
+            with profiler.span("fusion"):
+                circuit_ir, fusion_report = fuse_layers(
+                    circuit_ir, noiseless=is_noiseless(c_ops)
+                )
 
-        if c_ops == None:
-            c_ops = get_depolarizing_ops(1e-2, num_qubits)
+        state_options = None
+        if engine == "lowrank":
+            state_options = {"tol": rank_tol, "max_rank": max_rank}
 
         try:
-            final_state = rep_to_evolution(circuit_ir, initial_state, c_ops)
+            with profiler.span("evolution", num_c_ops=count_c_ops(c_ops), hilbert_dim=dim):
+                evolve = evolve_from_cached_prefix if use_prefix_cache else evolve_density_matrix
+                final_state_array = evolve(
+                    circuit_ir,
+                    initial_state,
+                    c_ops,
+                    engine=engine,
+                    profiler=profiler,
+                    state_options=state_options,
+                )
         except (TypeError, ValueError) as e:
             raise ValueError(f"Error during quantum evolution: {str(e)}")
-        except qt.QobjError:
-            raise ValueError(
-                "Quantum operator mismatch. This may be due to incompatible gate operations."
-            )
-
-        final_state_array = final_state.full()
 
-        fig = create_density_matrix_plot(final_state_array)
-        buffer = BytesIO()
-        fig.savefig(buffer, format="png")
-        buffer.seek(0)
-        plot_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        plt.close(fig)
-
-        return {"success": True, "plot_image": plot_base64}
+        result = {"success": True}
+        if fusion_report is not None:
+            result["fusion"] = fusion_report
+        if output in ("data", "both"):
+            with profiler.span("serialize", dtype=dtype):
+                result["density_matrix"] = matrix_to_buffer(final_state_array, dtype)
+        if output in ("plot", "both"):
+            with profiler.span("render"):
+                result["plot_image"] = render_density_plot(final_state_array)
+        return _with_profile(result, profiler, trace_path)
 
     except ValueError as e:
         return {"success": False, "error": str(e)}
@@ -364,31 +1743,266 @@ def simulate_quantum_circuit(circuit_ir, c_ops=None):
             "success": False,
             "error": f"Unexpected error during simulation: {str(e)}",
         }
+    finally:
+        profiler.close()
+
+
+def _with_profile(result, profiler, trace_path):
+    """Adds the profile to a result and writes the trace file, if profiling."""
+    if profiler is not NULL_PROFILER:
+        result["profile"] = profiler.summary()
+        if trace_path:
+            profiler.write_chrome_trace(trace_path)
+    return result
+
+
+def reduce_state(rho, reductions=("density_matrix",), dtype="complex128"):
+    """
+    Computes JSON-serializable reductions of a density matrix.
+
+    Args:
+        rho (np.ndarray): Density matrix, shape (2^n, 2^n)
+        reductions (sequence of str): Any of STREAM_REDUCTIONS:
+            "density_matrix" (matrix_to_buffer of rho), "probabilities" (the
+            diagonal), "purity" (tr rho^2) and "bloch_vectors" ([x, y, z] of
+            every qubit's reduced state, qubit 0 first)
+        dtype (str): dtype of the density matrix buffer
+
+    Returns:
+        dict: Reduction name -> value
+    """
+    num_qubits = int(np.log2(rho.shape[0]))
+    values = {}
+    for reduction in reductions:
+        if reduction == "density_matrix":
+            values[reduction] = matrix_to_buffer(rho, dtype)
+        elif reduction == "probabilities":
+            values[reduction] = np.real(np.diagonal(rho)).tolist()
+        elif reduction == "purity":
+            # tr(rho^2) = sum |rho_ij|^2 for a Hermitian rho
+            values[reduction] = float(np.sum(np.abs(rho) ** 2))
+        elif reduction == "bloch_vectors":
+            vectors = []
+            for qubit in range(num_qubits):
+                # Trace out the qubits before and after this one
+                blocks = rho.reshape(2**qubit, 2, -1, 2**qubit, 2, rho.shape[0] // 2 ** (qubit + 1))
+                reduced = np.einsum("aibajb->ij", blocks)
+                vectors.append(
+                    [
+                        float(2 * np.real(reduced[0, 1])),
+                        float(2 * np.imag(reduced[1, 0])),
+                        float(np.real(reduced[0, 0] - reduced[1, 1])),
+                    ]
+                )
+            values[reduction] = vectors
+        else:
+            raise ValueError(
+                f"Unsupported reduction: {reduction}. Supported reductions are: {', '.join(STREAM_REDUCTIONS)}"
+            )
+    return values
+
+
+def stream_simulation(
+    circuit_ir, c_ops=None, engine="auto", reductions=("density_matrix",), dtype="complex128"
+):
+    """
+    Streaming counterpart of simulate_quantum_circuit: yields one record per layer
+    as soon as it is computed.
+
+    The records are JSON-serializable, for JSON lines or server-sent events:
+    {"layer": i, "num_layers": L, <reduction>: ...} after every layer (see
+    reduce_state), then {"success": True, "done": True, "num_layers": L}. An
+    invalid request or a failing layer yields {"success": False, "error": ...}
+    and ends the stream.
+
+    Args:
+        circuit_ir (list): Circuit layers
+        c_ops (list or LocalNoiseModel): Error model; defaults as in simulate_quantum_circuit
+        engine (str): Evolution engine, as for rep_to_evolution
+        reductions (sequence of str): Reductions of the state in every record
+        dtype (str): dtype of the density matrix buffers
+
+    Yields:
+        dict: The records described above
+    """
+    try:
+        if dtype not in STATE_DTYPES:
+            raise ValueError(
+                f"Unsupported dtype: {dtype}. Supported dtypes are: {', '.join(STATE_DTYPES)}"
+            )
+        unknown = [r for r in reductions if r not in STREAM_REDUCTIONS]
+        if unknown:
+            raise ValueError(
+                f"Unsupported reduction: {unknown[0]}. Supported reductions are: {', '.join(STREAM_REDUCTIONS)}"
+            )
+        num_qubits = check_simulation_inputs(circuit_ir, c_ops)
+        if c_ops is None:
+            c_ops = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+
+        dim = 2**num_qubits
+        initial_state = np.zeros((dim, dim), dtype=complex)
+        initial_state[0, 0] = 1
+        num_layers = len(circuit_ir)
+        states = iter_evolution(circuit_ir, initial_state, c_ops, engine=engine)
+        for layer, rho in enumerate(states):
+            record = {"layer": layer, "num_layers": num_layers}
+            record.update(reduce_state(rho, reductions, dtype))
+            yield record
+    except (ValueError, TypeError) as e:
+        yield {"success": False, "error": str(e)}
+        return
+    except MemoryError:
+        yield {
+            "success": False,
+            "error": "Circuit is too large for available memory. Try reducing the number of qubits or gates.",
+        }
+        return
+    yield {"success": True, "done": True, "num_layers": num_layers}
+
+
+# Star imports also export the qutip constants, which are created on first access
+__all__ = [name for name in globals() if not name.startswith("_")] + ["qt", *QUTIP_CONSTANTS]
 
 
 # If running as main script (from API)
 if __name__ == "__main__":
     import argparse
+    from result_cache import cached_simulation
 
     parser = argparse.ArgumentParser()
     parser.add_argument("circuit_ir", type=str)
     parser.add_argument(
         "--noise-model", type=str, help="Path to .npy file containing noise model"
     )
+    parser.add_argument(
+        "--engine",
+        choices=["auto"] + sorted(list(EVOLUTION_ENGINES) + ["stabilizer"]),
+        default="auto",
+        help="Evolution engine used to apply each gate",
+    )
+    parser.add_argument(
+        "--output",
+        choices=OUTPUT_MODES,
+        default="plot",
+        help="Return a rendered plot, the raw density matrix, or both",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=sorted(STATE_DTYPES.keys()),
+        default="complex128",
+        help="Precision of the raw density matrix buffer",
+    )
+    parser.add_argument(
+        "--fuse",
+        action="store_true",
+        help="Fuse gates and layers before the evolution",
+    )
+    parser.add_argument(
+        "--max-bond",
+        type=int,
+        help=f"Largest bond dimension kept by the mpdo engine (default {DEFAULT_MAX_BOND})",
+    )
+    parser.add_argument(
+        "--max-kraus",
+        type=int,
+        help=f"Largest Kraus dimension kept by the mpdo engine (default {DEFAULT_MAX_KRAUS})",
+    )
+    parser.add_argument(
+        "--max-rank",
+        type=int,
+        help="Largest rank kept by the lowrank engine before it continues densely",
+    )
+    parser.add_argument(
+        "--rank-tol",
+        type=float,
+        help=f"Trace fraction a lowrank compression may discard (default {DEFAULT_RANK_TOL})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Return per-stage and per-layer timings and memory under \"profile\"",
+    )
+    parser.add_argument(
+        "--trace", type=str, help="Write the profile as a Chrome trace to this file"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print one JSON line per layer as it is computed (see stream_simulation)",
+    )
+    parser.add_argument(
+        "--reductions",
+        type=str,
+        default="density_matrix",
+        help=f"Comma-separated reductions streamed per layer: {', '.join(STREAM_REDUCTIONS)}",
+    )
     args = parser.parse_args()
 
     # Get circuit IR from command line argument
     circuit_ir = json.loads(args.circuit_ir)
+    # Passed only when given, so that other requests keep their cache keys
+    engine_options = {
+        name: value
+        for name, value in [
+            ("max_bond", args.max_bond),
+            ("max_kraus", args.max_kraus),
+            ("max_rank", args.max_rank),
+            ("rank_tol", args.rank_tol),
+        ]
+        if value is not None
+    }
 
-    # Load noise model if provided
-    c_ops = None
-    if args.noise_model:
-        # Load the numpy array and convert to qutip operators
-        c_ops = np.load(args.noise_model)
-        c_ops = [qt.Qobj(op) for op in c_ops]
+    def run():
+        # Load noise model if provided
+        try:
+            c_ops = load_noise_model(args.noise_model) if args.noise_model else None
+        except (OSError, ValueError) as e:
+            return {"success": False, "error": f"Invalid noise model: {str(e)}"}
+
+        # Run simulation with custom noise model if provided, otherwise uses default
+        return simulate_quantum_circuit(
+            circuit_ir,
+            c_ops,
+            engine=args.engine,
+            output=args.output,
+            dtype=args.dtype,
+            fuse=args.fuse,
+            profile=args.profile,
+            trace_path=args.trace,
+            **engine_options,
+        )
 
-    # Run simulation with custom noise model if provided, otherwise uses default
-    result = simulate_quantum_circuit(circuit_ir, c_ops)
+    if args.stream:
+        try:
+            c_ops = load_noise_model(args.noise_model) if args.noise_model else None
+        except (OSError, ValueError) as e:
+            print(json.dumps({"success": False, "error": f"Invalid noise model: {str(e)}"}))
+            sys.exit(0)
+        for record in stream_simulation(
+            circuit_ir,
+            c_ops,
+            engine=args.engine,
+            reductions=[r for r in args.reductions.split(",") if r],
+            dtype=args.dtype,
+        ):
+            print(json.dumps(record), flush=True)
+        sys.exit(0)
+
+    if args.profile or args.trace:
+        # A profile describes this run, so it is never answered from the cache
+        result = run()
+    else:
+        # Identical requests are answered from the on-disk result cache
+        result = cached_simulation(
+            circuit_ir,
+            args.noise_model,
+            run,
+            engine=args.engine,
+            output=args.output,
+            dtype=args.dtype,
+            fuse=args.fuse,
+            **engine_options,
+        )
 
     # Print result as JSON for API to capture
     print(json.dumps(result))
@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+
+from caching import DiskCache
+
+"""
+Simulation Result Cache
+
+Content-addressed cache in front of simulate_quantum_circuit. The key hashes a
+canonical form of the circuit IR together with the noise model bytes and the
+simulation options, so resubmitting an equivalent circuit is answered from disk
+without running (or importing) qutip.
+
+The canonical form only merges circuits that simulate identically. Within a
+layer, consecutive single-qubit gates are evolved together and a CX splits
+them, so:
+   - gates are sorted by qubit inside each run of single-qubit gates, while
+     the runs and the CX gates keep their order;
+   - an "I" gate is dropped unless it is the highest-indexed gate of its run,
+     since that gate sets the scaling of the run's Hamiltonian and a run of
+     identities still spends one noisy gate window;
+   - empty layers are dropped, they do not evolve the state at all.
+
+The cache directory, size bound and TTL come from the environment:
+   SIMULATION_CACHE_DIR        (default: backend/.simulation_cache)
+   SIMULATION_CACHE_MAX_BYTES  (default: 256 MiB)
+   SIMULATION_CACHE_TTL        (seconds, default: no expiry)
+   SIMULATION_CACHE=0          disables the cache
+"""
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".simulation_cache"
+)
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024**2
+
+_result_cache = None
+
+
+def canonicalize_circuit(circuit_ir):
+    """
+    Returns the canonical form of a circuit IR, as described in the module docstring.
+
+    Args:
+        circuit_ir (list): Circuit layers ({"numRows": int, "gates": [...]})
+
+    Returns:
+        dict: {"num_qubits": int, "layers": list of lists of gate lists}
+    """
+    num_qubits = max([x["numRows"] for x in circuit_ir])
+    layers = []
+    for layer in circuit_ir:
+        canonical_layer = canonicalize_layer(layer["gates"])
+        if canonical_layer:
+            layers.append(canonical_layer)
+    return {"num_qubits": num_qubits, "layers": layers}
+
+
+def canonicalize_layer(gates):
+    """
+    Returns the canonical form of the gates of one layer, as lists.
+    """
+    canonical_layer = []
+    run = []
+    for gate in gates:
+        gate = list(gate)
+        if len(gate) == 2:
+            run.append(gate)
+        else:
+            canonical_layer.extend(_canonicalize_run(run))
+            canonical_layer.append(gate)
+            run = []
+    canonical_layer.extend(_canonicalize_run(run))
+    return canonical_layer
+
+
+def _canonicalize_run(run):
+    """Sorts a run of single-qubit gates and drops the identities that have no effect."""
+    run = sorted(run, key=lambda gate: gate[1])
+    return [gate for i, gate in enumerate(run) if gate[0] != "I" or i == len(run) - 1]
+
+
+def simulation_cache_key(circuit_ir, noise_model_bytes=None, **options):
+    """
+    Hashes a simulation request into a cache key.
+
+    Args:
+        circuit_ir (list): Circuit layers
+        noise_model_bytes (bytes): Raw uploaded noise model, or None for the default model
+        **options: Other arguments that change the result (engine, output, dtype, ...)
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            {"circuit": canonicalize_circuit(circuit_ir), "options": options},
+            sort_keys=True,
+            separators=(",", ":"),
+        ).encode()
+    )
+    digest.update(b"\0noise\0")
+    digest.update(noise_model_bytes if noise_model_bytes is not None else b"default")
+    return digest.hexdigest()
+
+
+def get_result_cache():
+    """
+    Returns the process-wide result cache configured from the environment,
+    or None if caching is disabled.
+    """
+    global _result_cache
+    if os.environ.get("SIMULATION_CACHE", "1") == "0":
+        return None
+    if _result_cache is None:
+        ttl = os.environ.get("SIMULATION_CACHE_TTL")
+        _result_cache = DiskCache(
+            os.environ.get("SIMULATION_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(
+                os.environ.get("SIMULATION_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)
+            ),
+            ttl=float(ttl) if ttl else None,
+        )
+    return _result_cache
+
+
+def read_noise_model_bytes(path):
+    """Returns the raw bytes of an uploaded noise model, or None without one."""
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def cached_simulation(circuit_ir, noise_model_path, simulate, **options):
+    """
+    Returns the cached result of a simulation request, computing and storing it on a miss.
+
+    Only successful results are stored.
+
+    Args:
+        circuit_ir (list): Circuit layers
+        noise_model_path (str): Path of the uploaded noise model, or None
+        simulate (callable): Runs the simulation on a miss, returns the result dict
+        **options: Simulation options that are part of the key
+
+    Returns:
+        dict: The simulation result
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return simulate()
+    try:
+        key = simulation_cache_key(
+            circuit_ir, read_noise_model_bytes(noise_model_path), **options
+        )
+    except (KeyError, TypeError, ValueError):
+        # Malformed requests are left to simulate(), which reports the error
+        return simulate()
+    result = cache.get(key)
+    if result is not None:
+        return result
+    result = simulate()
+    if result.get("success"):
+        cache.put(key, result)
+    return result
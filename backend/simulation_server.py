@@ -0,0 +1,552 @@
+# backend/simulation_server.py
+import sys
+import json
+import queue
+import threading
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from propagation_sessions import PropagationSessionStore
+
+"""
+Persistent Simulation Server
+
+Long-running alternative to spawning `python3 quantum_simulator.py` per API
+request. A pool of warm worker processes keeps qutip, matplotlib and the
+compiled propagator cache loaded between requests, and the Next.js routes talk
+to it over HTTP on the loopback interface.
+
+Endpoints (JSON in, JSON out):
+   POST /simulate   {"circuit_ir": [...], "noise_model_path": str?, "engine": str?,
+                     "output": str?, "dtype": str?, "fuse": bool?, "profile": bool?,
+                     "prefix_cache": bool?, "max_bond": int?, "max_kraus": int?,
+                     "max_rank": int?, "rank_tol": float?}
+   POST /simulate/stream  {"circuit_ir": [...], "noise_model_path": str?, "engine": str?,
+                           "reductions": [str]?, "dtype": str?}
+   POST /propagate  {"circuit_ir": [...], "all": bool?}
+   POST /propagate/session     {"circuit_ir": [...]}
+   POST /propagate/step        {"session_id": str, "diff": [...]?, "steps": int?}
+   POST /propagate/trajectory  {"session_id": str, "diff": [...]?, "max_steps": int?}
+   POST /propagate/close       {"session_id": str}
+   GET  /health
+
+Repeated /simulate requests are answered from the on-disk result cache (see
+result_cache.py) by the request thread itself, and so are the propagation
+session endpoints (see propagation_sessions.py), whose state lives in the server
+process. Requests beyond the worker count wait in a bounded queue; once the
+queue is full the server answers 503, and requests that run longer than the
+timeout answer 504.
+
+/simulate/stream answers with server-sent events, one "data:" record per layer
+as the worker computes it (see quantum_simulator.stream_simulation); the
+timeout then applies to every layer.
+
+A timed out job cannot be interrupted inside its worker: it runs to completion
+and its result is discarded. It keeps its slot until then, so timed out jobs
+still count against the workers + max_queue limit. A worker that dies breaks
+the whole pool; the request it was running answers 500 and the pool is
+restarted for the requests after it.
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _warm_worker():
+    """
+    Import the simulation stack once per worker process.
+
+    quantum_simulator only imports qutip and matplotlib when a request needs
+    them, so they are imported here explicitly for the first request to find them loaded.
+    """
+    import qutip  # noqa: F401
+    import quantum_simulator  # noqa: F401
+    import error_step_propagator  # noqa: F401
+    import visualizations.Density_Plot  # noqa: F401
+
+
+def _ping():
+    return True
+
+
+def simulation_options(payload):
+    """Simulation options of a /simulate request, as passed to simulate_quantum_circuit."""
+    options = {
+        "engine": payload.get("engine", "auto"),
+        "output": payload.get("output", "plot"),
+        "dtype": payload.get("dtype", "complex128"),
+        "fuse": bool(payload.get("fuse", False)),
+    }
+    # Only the mpdo engine reads max_bond and max_kraus and only the lowrank engine
+    # max_rank and rank_tol; other requests keep their cache keys
+    if "max_bond" in payload:
+        options["max_bond"] = int(payload["max_bond"])
+    if "max_kraus" in payload:
+        options["max_kraus"] = int(payload["max_kraus"])
+    if "max_rank" in payload:
+        options["max_rank"] = int(payload["max_rank"])
+    if "rank_tol" in payload:
+        options["rank_tol"] = float(payload["rank_tol"])
+    return options
+
+
+def cached_simulation_result(payload):
+    """
+    Looks up a /simulate request in the result cache without using a worker.
+
+    Args:
+        payload (dict): Request body
+
+    Returns:
+        dict or None: The cached result, or None on a miss
+    """
+    from result_cache import get_result_cache, read_noise_model_bytes, simulation_cache_key
+
+    cache = get_result_cache()
+    if cache is None or payload.get("profile"):
+        return None
+    try:
+        key = simulation_cache_key(
+            payload["circuit_ir"],
+            read_noise_model_bytes(payload.get("noise_model_path")),
+            **simulation_options(payload),
+        )
+    except (KeyError, TypeError, ValueError, OSError):
+        return None
+    return cache.get(key)
+
+
+def run_simulation(payload):
+    """
+    Runs simulate_quantum_circuit for one /simulate request.
+
+    Args:
+        payload (dict): Request body with circuit_ir and optional
+            noise_model_path, engine, output, dtype, fuse, profile and
+            prefix_cache, which resumes from the states of earlier requests
+            in this worker (see quantum_simulator.evolve_from_cached_prefix)
+
+    Returns:
+        dict: The simulation result, as printed by the command line interface
+    """
+    from quantum_simulator import load_noise_model, simulate_quantum_circuit
+    from result_cache import cached_simulation
+
+    noise_model_path = payload.get("noise_model_path")
+    options = simulation_options(payload)
+    profile = bool(payload.get("profile", False))
+    # Does not change the result, so it stays out of the result cache key
+    use_prefix_cache = bool(payload.get("prefix_cache", False))
+
+    def run():
+        try:
+            c_ops = load_noise_model(noise_model_path) if noise_model_path else None
+        except (OSError, ValueError) as e:
+            return {"success": False, "error": f"Invalid noise model: {str(e)}"}
+        return simulate_quantum_circuit(
+            payload["circuit_ir"],
+            c_ops,
+            profile=profile,
+            use_prefix_cache=use_prefix_cache,
+            **options,
+        )
+
+    # A profile describes this run, so profiled requests bypass the result cache
+    if profile:
+        return run()
+    return cached_simulation(payload["circuit_ir"], noise_model_path, run, **options)
+
+
+def run_simulation_stream(payload, records):
+    """
+    Runs stream_simulation for one /simulate/stream request.
+
+    Args:
+        payload (dict): Request body with circuit_ir and optional
+            noise_model_path, engine, reductions and dtype
+        records (queue): Receives every record, then None
+    """
+    from quantum_simulator import load_noise_model, stream_simulation
+
+    try:
+        noise_model_path = payload.get("noise_model_path")
+        try:
+            c_ops = load_noise_model(noise_model_path) if noise_model_path else None
+        except (OSError, ValueError) as e:
+            records.put({"success": False, "error": f"Invalid noise model: {str(e)}"})
+            return
+        for record in stream_simulation(
+            payload["circuit_ir"],
+            c_ops,
+            engine=payload.get("engine", "auto"),
+            reductions=payload.get("reductions", ["density_matrix"]),
+            dtype=payload.get("dtype", "complex128"),
+        ):
+            records.put(record)
+    except Exception as e:
+        records.put({"success": False, "error": str(e)})
+    finally:
+        records.put(None)
+
+
+def run_propagation(payload):
+    """
+    Runs propagate_first_error_layer for one /propagate request, or pushes every
+    error layer to the end when "all" is set.
+
+    Args:
+        payload (dict): Request body with circuit_ir and optionally all
+
+    Returns:
+        dict: The propagated circuit under "data"
+    """
+    if payload.get("all"):
+        from pauli_tableau import propagate_all_error_layers
+
+        return {"data": propagate_all_error_layers(payload["circuit_ir"])}
+
+    from error_step_propagator import propagate_first_error_layer
+
+    return {"data": propagate_first_error_layer(payload["circuit_ir"])}
+
+
+JOBS = {
+    "/simulate": run_simulation,
+    "/simulate/stream": run_simulation_stream,
+    "/propagate": run_propagation,
+}
+
+
+def create_propagation_session(sessions, payload):
+    """Starts a session on payload["circuit_ir"] and returns its id and circuit."""
+    if "circuit_ir" not in payload:
+        raise ValueError("No circuit IR provided")
+    session_id = sessions.create(payload["circuit_ir"])
+    return {"session_id": session_id, "data": sessions.get(session_id).circuit()}
+
+
+def step_propagation_session(sessions, payload):
+    """Applies an optional diff, then propagates the first error layer "steps" times."""
+    session = sessions.get(payload.get("session_id"))
+    with session.lock:
+        session.apply_diff(payload.get("diff", []))
+        changed = set()
+        finished = False
+        for _ in range(int(payload.get("steps", 1))):
+            step_changes = session.step()
+            if not step_changes:
+                finished = True
+                break
+            changed.update(step_changes)
+        return {
+            "session_id": payload["session_id"],
+            "step": session.steps,
+            "changes": session.changes(changed),
+            "finished": finished,
+        }
+
+
+def propagation_session_trajectory(sessions, payload):
+    """Applies an optional diff, then steps until the circuit stops changing."""
+    session = sessions.get(payload.get("session_id"))
+    with session.lock:
+        session.apply_diff(payload.get("diff", []))
+        max_steps = payload.get("max_steps")
+        trajectory = session.trajectory(None if max_steps is None else int(max_steps))
+        return {
+            "session_id": payload["session_id"],
+            "steps": trajectory,
+            "data": session.circuit(),
+        }
+
+
+def close_propagation_session(sessions, payload):
+    """Drops a session."""
+    return {"closed": sessions.close(payload.get("session_id"))}
+
+
+# Cheap, stateful endpoints answered by the request thread
+SESSION_ENDPOINTS = {
+    "/propagate/session": create_propagation_session,
+    "/propagate/step": step_propagation_session,
+    "/propagate/trajectory": propagation_session_trajectory,
+    "/propagate/close": close_propagation_session,
+}
+
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        self._send_json(200, {"status": "ok", "workers": self.server.workers})
+
+    def do_POST(self):
+        job = JOBS.get(self.path)
+        session_endpoint = SESSION_ENDPOINTS.get(self.path)
+        if job is None and session_endpoint is None:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            if not isinstance(payload, dict):
+                raise TypeError("Request body must be a JSON object")
+            if job is not None and "circuit_ir" not in payload:
+                raise ValueError("No circuit IR provided")
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {str(e)}"})
+            return
+
+        if session_endpoint is not None:
+            try:
+                self._send_json(200, session_endpoint(self.server.sessions, payload))
+            except KeyError:
+                self._send_json(404, {"error": "Unknown or expired propagation session"})
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": f"Invalid request: {str(e)}"})
+            return
+
+        # Cache hits are answered directly, without queueing for a worker
+        if self.path == "/simulate":
+            cached = cached_simulation_result(payload)
+            if cached is not None:
+                self._send_json(200, cached)
+                return
+
+        if self.path == "/simulate/stream":
+            self._send_stream(self.server.submit_stream(job, payload))
+            return
+
+        status, body = self.server.submit(job, payload)
+        self._send_json(status, body)
+
+    def _send_stream(self, records):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            for record in records:
+                self.wfile.write(f"data: {json.dumps(record)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        finally:
+            # Frees the worker slot even if the client went away
+            records.close()
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep stdout quiet; the API routes do their own logging
+        pass
+
+
+class SimulationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=2, timeout=60.0, max_queue=32):
+        """
+        Initializes the server and starts the warm worker processes.
+
+        Parameters:
+        address (tuple): (host, port) to bind; port 0 picks a free port.
+        workers (int): Number of worker processes.
+        timeout (float): Seconds a request may take before answering 504.
+        max_queue (int): Requests allowed to wait for a free worker.
+        """
+        super().__init__(address, SimulationRequestHandler)
+        self.workers = workers
+        self.timeout = timeout
+        self._executor_lock = threading.Lock()
+        self.executor = self._start_executor()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self.sessions = PropagationSessionStore()
+        # Carries streamed records from the workers; started on the first stream
+        self._manager = None
+        self._manager_lock = threading.Lock()
+
+    def _start_executor(self):
+        """Starts a worker pool with warm worker processes."""
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Workers are spawned on demand; start them now so the first request is warm
+        for _ in range(self.workers):
+            executor.submit(_ping)
+        return executor
+
+    def _restart_executor(self, broken):
+        """
+        Replaces a worker pool broken by a dead worker.
+
+        Parameters:
+        broken (ProcessPoolExecutor): The pool that raised BrokenProcessPool;
+                                      nothing happens if it was already replaced.
+        """
+        with self._executor_lock:
+            if self.executor is not broken:
+                return
+            self.executor = self._start_executor()
+        broken.shutdown(wait=False)
+
+    def submit(self, job, payload):
+        """
+        Runs a job on the worker pool.
+
+        Parameters:
+        job (callable): One of the JOBS functions.
+        payload (dict): Decoded request body.
+
+        Returns:
+        tuple: (HTTP status, JSON-serializable body)
+        """
+        if not self._slots.acquire(blocking=False):
+            return 503, {"success": False, "error": "Simulation server is busy"}
+        try:
+            future = self._submit_holding_slot(job, payload)
+        except Exception as e:
+            return 500, {"success": False, "error": str(e)}
+        try:
+            return 200, future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            return 504, {
+                "success": False,
+                "error": f"Request timed out after {self.timeout} seconds",
+            }
+        except Exception as e:
+            return 500, {"success": False, "error": str(e)}
+
+    def submit_stream(self, job, payload):
+        """
+        Runs a streaming job on the worker pool.
+
+        Parameters:
+        job (callable): Called as job(payload, records) in a worker; puts
+                        records on the queue and None when done.
+        payload (dict): Decoded request body.
+
+        Returns:
+        generator: The records as they arrive; an error record ends the
+                   stream if the server is busy or a record times out.
+        """
+        if not self._slots.acquire(blocking=False):
+            yield {"success": False, "error": "Simulation server is busy"}
+            return
+        try:
+            with self._manager_lock:
+                if self._manager is None:
+                    self._manager = multiprocessing.Manager()
+            records = self._manager.Queue()
+        except Exception as e:
+            self._slots.release()
+            yield {"success": False, "error": str(e)}
+            return
+        try:
+            future = self._submit_holding_slot(job, payload, records)
+        except Exception as e:
+            yield {"success": False, "error": str(e)}
+            return
+        try:
+            while True:
+                try:
+                    record = records.get(timeout=self.timeout)
+                except queue.Empty:
+                    future.cancel()
+                    yield {
+                        "success": False,
+                        "error": f"Request timed out after {self.timeout} seconds",
+                    }
+                    return
+                if record is None:
+                    return
+                yield record
+        finally:
+            # A client that went away leaves the job running, like a timeout
+            future.cancel()
+
+    def _submit_holding_slot(self, job, *args):
+        """
+        Submits a job that holds an acquired slot until it finishes.
+
+        A job already running in a worker cannot be cancelled, so the slot is
+        released when the job is done rather than when its request gives up.
+
+        Parameters:
+        job (callable): Function to run in a worker.
+        *args: Arguments of the job.
+
+        Returns:
+        Future: The submitted job.
+
+        A broken pool is restarted, both when submitting to it and when a job
+        on it fails because its worker died.
+
+        Raises:
+        Exception: Whatever the executor raised; the slot is released first.
+        """
+        try:
+            executor = self.executor
+            try:
+                future = executor.submit(job, *args)
+            except BrokenProcessPool:
+                self._restart_executor(executor)
+                executor = self.executor
+                future = executor.submit(job, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def done(future):
+            self._slots.release()
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._restart_executor(executor)
+
+        future.add_done_callback(done)
+        return future
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-queue", type=int, default=32)
+    args = parser.parse_args()
+
+    server = SimulationServer(
+        (args.host, args.port),
+        workers=args.workers,
+        timeout=args.timeout,
+        max_queue=args.max_queue,
+    )
+    print(
+        f"Simulation server listening on {args.host}:{server.server_address[1]} "
+        f"with {args.workers} workers",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
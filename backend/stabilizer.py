@@ -0,0 +1,555 @@
+import numpy as np
+
+from gates import GATE_GENERATORS
+from noise_models import pauli_strings
+
+"""
+Stabilizer Simulation
+
+Without T gates, the gate windows of the simulator are Clifford operations, and
+an n-qubit stabilizer state is described by n Pauli generators. A
+StabilizerTableau stores them as in Aaronson and Gottesman's CHP simulator:
+rows 0..n-1 hold the destabilizers and rows n..2n-1 the stabilizers, each as
+X/Z bits (I = (0, 0), X = (1, 0), Y = (1, 1), Z = (0, 1)) and a sign bit. A gate
+updates every row in O(n), so circuits on hundreds of qubits run in polynomial
+time and memory.
+
+A window evolves under U = exp(-i theta P) for theta = scaling * duration and
+P = (x)_q G_q (see quantum_simulator.gate_windows). U is Clifford when P is the
+identity, when theta is a multiple of pi/2 (U is P up to a phase, a product of
+X, Y, Z and H), or when theta is an odd multiple of pi/4 and P is a Pauli string
+(a pi/4 Pauli rotation, e.g. S and every CNOT pulse). A T gate that sets the
+scaling of its run (theta = pi/8), or an identity that does (theta = 1), is not.
+
+Measuring every qubit of a stabilizer state gives a uniform distribution over
+an affine subspace: outcome = c + A b (mod 2) for uniformly random bits b.
+measurement_form() runs the CHP measurements with the sign bits carried as
+GF(2) vectors over the random bits, which yields c and A without sampling.
+
+Noise: a trace-preserving LocalNoiseModel whose sites are Pauli channels acts
+during a window of duration d as exp(d (E - id)), i.e. the channel E is applied
+at the events of a rate-1 Poisson process. Each shot samples these Pauli errors
+and carries them as a Pauli frame (as in pauli_frames.py) to the end of the
+circuit, where the X bits of the frame flip the measured outcomes. An error Q
+at time t of a window whose generator P is a Pauli string acts from the start
+of the window as U(t)^dag Q U(t) = cos(2 s t) Q + i sin(2 s t) Q P when Q and P
+anticommute, and is Pauli-twirled to Q or Q P with probabilities cos^2 and sin^2.
+This keeps the Pauli-transfer diagonal of the window exact and only drops the
+coherent cross terms, which vanish whenever the noise commutes with the window
+Hamiltonian, i.e. the noise decays every Pauli string R anticommuting with P at
+the same rate as R P. Depolarizing noise during a single-qubit window does, but
+not during a window on several qubits such as a CNOT pulse: it decays X I at
+the rate of one qubit and X I . Z X = Y X at the rate of two, so the twirl
+biases the outcome probabilities. Errors during windows with H factors are
+applied after the window, which is likewise exact only when the noise commutes
+with the window. noise_is_exact checks both, and results with other windows
+are flagged as approximate.
+"""
+
+DEFAULT_NUM_SHOTS = 1024
+MAX_HISTOGRAM_OUTCOMES = 64
+
+PAULI_LABELS = np.array(["I", "X", "Z", "Y"])  # indexed by x + 2 z
+PAULI_BITS = {"X": (1, 0), "Y": (1, 1), "Z": (0, 1)}
+
+# Window angles must be multiples of pi/4 up to this tolerance
+ANGLE_ATOL = 1e-9
+
+
+_GENERATOR_NAMES = {GATE_GENERATORS[name].tobytes(): name for name in ("I", "X", "Y", "Z", "H")}
+
+
+def _generator_name(op):
+    """Name of a 2x2 window factor among I, X, Y, Z and H, or None."""
+    op = np.asarray(op, dtype=complex)
+    if op.tobytes() in _GENERATOR_NAMES:
+        return _GENERATOR_NAMES[op.tobytes()]
+    for name in ("I", "X", "Y", "Z", "H"):
+        if np.allclose(op, GATE_GENERATORS[name]):
+            return name
+    return None
+
+
+def _phase_exponent(x1, z1, x2, z2):
+    """
+    Power of i in P1 P2 = i^k P3 per qubit, for Hermitian Paulis given as bits.
+
+    The g function of Aaronson and Gottesman: X Y = iZ, Y Z = iX, Z X = iY.
+    """
+    x1, z1, x2, z2 = (np.asarray(a, dtype=np.int64) for a in (x1, z1, x2, z2))
+    return np.where(
+        x1 & z1,
+        z2 - x2,
+        np.where(x1, z2 * (2 * x2 - 1), np.where(z1, x2 * (1 - 2 * z2), 0)),
+    )
+
+
+def _anticommutes(x, z, px, pz):
+    """Whether each Pauli (x, z), qubits on the last axis, anticommutes with (px, pz)."""
+    return np.bitwise_xor.reduce((x & pz) ^ (z & px), axis=-1)
+
+
+class CliffordWindow:
+    def __init__(self, scaling, local_ops, duration, num_qubits):
+        """
+        Compiles one gate window into its Clifford action.
+
+        Parameters:
+        scaling (float): Scaling factor of the window Hamiltonian.
+        local_ops (dict): Qubit index -> 2x2 factor of the Hamiltonian.
+        duration (float): Length of the window.
+        num_qubits (int): Number of qubits of the circuit.
+
+        Raises:
+        ValueError: If the window is not a Clifford operation.
+        """
+        self.scaling = scaling
+        self.duration = duration
+        # Qubits with a Pauli factor (and its bits), and qubits with an H factor
+        qubits, px, pz, hadamards = [], [], [], []
+        for qubit, op in sorted(local_ops.items()):
+            if not 0 <= qubit < num_qubits:
+                raise ValueError(f"Qubit index {qubit} out of range for {num_qubits} qubits.")
+            name = _generator_name(op)
+            if name is None:
+                raise ValueError(f"The window factor on qubit {qubit} is not a Clifford generator.")
+            if name == "H":
+                hadamards.append(qubit)
+            elif name != "I":
+                qubits.append(qubit)
+                px.append(PAULI_BITS[name][0])
+                pz.append(PAULI_BITS[name][1])
+        self.qubits = np.array(qubits, dtype=np.intp)
+        self.px = np.array(px, dtype=bool)
+        self.pz = np.array(pz, dtype=bool)
+        self.hadamards = np.array(hadamards, dtype=np.intp)
+        self.support = np.concatenate([self.qubits, self.hadamards])
+        self.pauli_generator = not hadamards
+
+        quarter_turns = scaling * duration / (np.pi / 4)
+        steps = int(np.round(quarter_turns))
+        if self.support.size and abs(quarter_turns - steps) > ANGLE_ATOL:
+            raise ValueError(
+                f"A window rotating by {scaling * duration:.6g} is not a Clifford operation."
+            )
+        if not self.support.size or steps % 4 == 0:
+            self.kind = "identity"
+        elif steps % 4 == 2:
+            self.kind = "product"
+        elif not self.pauli_generator:
+            raise ValueError("A pi/4 rotation about a product with H factors is not Clifford.")
+        else:
+            self.kind = "rotation"
+            self.sign = 1 if steps % 4 == 1 else -1
+
+    def apply_tableau(self, tableau):
+        """Conjugates the generators of a StabilizerTableau by the window."""
+        if self.kind == "product":
+            tableau.apply_pauli(self.qubits, self.px, self.pz)
+            tableau.apply_hadamard(self.hadamards)
+        elif self.kind == "rotation":
+            tableau.apply_rotation(self.qubits, self.px, self.pz, self.sign)
+
+    def apply_frames(self, x, z):
+        """
+        Conjugates Pauli frames by the window, in place; signs are dropped.
+
+        Parameters:
+        x (np.ndarray): X bits, shape (num_qubits, shots).
+        z (np.ndarray): Z bits, same shape as x.
+        """
+        if self.kind == "product" and self.hadamards.size:
+            x[self.hadamards], z[self.hadamards] = z[self.hadamards], x[self.hadamards]
+        elif self.kind == "rotation":
+            flip = _anticommutes(x[self.qubits].T, z[self.qubits].T, self.px, self.pz)
+            x[self.qubits] ^= np.outer(self.px, flip)
+            z[self.qubits] ^= np.outer(self.pz, flip)
+
+    def rotation_probability(self):
+        """
+        Probability sin^2(2 s t), averaged over a uniform time t in the window,
+        that the twirl maps an anticommuting error Q to Q P.
+        """
+        angle = 4 * self.scaling * self.duration
+        return 0.5 if angle == 0 else 0.5 - np.sin(angle) / (2 * angle)
+
+    def __repr__(self):
+        return f"CliffordWindow({self.kind}, scaling={self.scaling:.4g}, duration={self.duration})"
+
+
+class StabilizerTableau:
+    def __init__(self, num_qubits):
+        """
+        Initializes the tableau of |0...0>: destabilizers X_q, stabilizers Z_q.
+
+        Parameters:
+        num_qubits (int): Number of qubits.
+        """
+        n = num_qubits
+        self.num_qubits = n
+        self.x = np.zeros((2 * n, n), dtype=bool)
+        self.z = np.zeros((2 * n, n), dtype=bool)
+        self.r = np.zeros(2 * n, dtype=bool)
+        self.x[:n] = np.eye(n, dtype=bool)
+        self.z[n:] = np.eye(n, dtype=bool)
+
+    def apply_pauli(self, qubits, px, pz):
+        """Conjugates by a Pauli string on the listed qubits: anticommuting rows change sign."""
+        self.r ^= _anticommutes(self.x[:, qubits], self.z[:, qubits], px, pz)
+
+    def apply_hadamard(self, qubits):
+        """Conjugates by H on each listed qubit: X <-> Z, Y -> -Y."""
+        self.r ^= np.bitwise_xor.reduce(self.x[:, qubits] & self.z[:, qubits], axis=1)
+        self.x[:, qubits], self.z[:, qubits] = self.z[:, qubits], self.x[:, qubits]
+
+    def apply_rotation(self, qubits, px, pz, sign):
+        """
+        Conjugates by exp(-i sign pi/4 P) for a Pauli string P on the listed qubits.
+
+        A row R anticommuting with P maps to U R U^dag = R exp(i sign pi/2 P) = i sign R P.
+        """
+        x, z = self.x[:, qubits], self.z[:, qubits]
+        rows = np.flatnonzero(_anticommutes(x, z, px, pz))
+        exponent = _phase_exponent(x[rows], z[rows], px, pz).sum(axis=1)
+        exponent += 2 * self.r[rows] + 1 + (0 if sign > 0 else 2)
+        self.r[rows] = exponent % 4 == 2
+        self.x[np.ix_(rows, qubits)] = x[rows] ^ px
+        self.z[np.ix_(rows, qubits)] = z[rows] ^ pz
+
+    def stabilizers(self):
+        """
+        Returns the stabilizer generators as signed Pauli strings, qubit 0 first.
+        """
+        n = self.num_qubits
+        labels = PAULI_LABELS[self.x[n:].astype(np.intp) + 2 * self.z[n:].astype(np.intp)]
+        return [("-" if sign else "+") + "".join(row) for sign, row in zip(self.r[n:], labels)]
+
+    def measurement_form(self):
+        """
+        Describes the outcomes of measuring every qubit in the computational basis.
+
+        Returns:
+        tuple: (c, A), bool arrays of shape (n,) and (n, k): the outcomes are
+               c + A b (mod 2) for k uniformly random bits b.
+        """
+        n = self.num_qubits
+        x, z = self.x.copy(), self.z.copy()
+        # Sign bits as GF(2) vectors: constant, then one column per random outcome
+        phases = np.zeros((2 * n, n + 1), dtype=bool)
+        phases[:, 0] = self.r
+        outcomes = np.zeros((n, n + 1), dtype=bool)
+        num_random = 0
+        for a in range(n):
+            candidates = np.flatnonzero(x[n:, a])
+            if candidates.size:
+                p = n + candidates[0]
+                rows = np.flatnonzero(x[:, a])
+                rows = rows[rows != p]
+                _rowsum(x, z, phases, rows, x[p], z[p], phases[p])
+                x[p - n], z[p - n], phases[p - n] = x[p], z[p], phases[p]
+                x[p], z[p], phases[p] = False, False, False
+                z[p, a] = True
+                num_random += 1
+                phases[p, num_random] = True
+                outcomes[a] = phases[p]
+                continue
+            scratch = np.zeros((1, n), dtype=bool), np.zeros((1, n), dtype=bool)
+            scratch_phase = np.zeros((1, n + 1), dtype=bool)
+            for i in n + np.flatnonzero(x[:n, a]):
+                _rowsum(*scratch, scratch_phase, [0], x[i], z[i], phases[i])
+            outcomes[a] = scratch_phase[0]
+        return outcomes[:, 0], outcomes[:, 1 : 1 + num_random]
+
+    def to_density_matrix(self):
+        """
+        Builds the dense 2^n x 2^n projector prod_i (I + S_i) / 2 (qubit 0 most significant).
+        """
+        n = self.num_qubits
+        paulis = pauli_strings(1)
+        rho = np.eye(2**n, dtype=complex)
+        for row in range(n, 2 * n):
+            op = np.array([[-1.0 if self.r[row] else 1.0]], dtype=complex)
+            for q in range(n):
+                op = np.kron(op, paulis[int(self.x[row, q]) + 2 * int(self.z[row, q])])
+            rho = rho @ (np.eye(2**n) + op) / 2
+        return rho
+
+    def __repr__(self):
+        return f"StabilizerTableau({self.num_qubits} qubits)"
+
+
+def _rowsum(x, z, phases, rows, source_x, source_z, source_phase):
+    """Multiplies the listed rows by a source row in place, tracking signs as GF(2) vectors."""
+    exponent = _phase_exponent(source_x, source_z, x[rows], z[rows]).sum(axis=-1)
+    phases[rows] ^= source_phase
+    phases[rows, 0] ^= exponent % 4 == 2
+    x[rows] ^= source_x
+    z[rows] ^= source_z
+
+
+class _NoisyFrames:
+    """
+    Pauli frames of the shots under a Pauli LocalNoiseModel.
+
+    Every event of E draws an error on every site, but an error on a site that
+    no window acts on commutes with the circuit until the next window that does.
+    The events are therefore only counted per shot, and a site draws the product
+    of its pending m errors when it is next acted on (or at the end): with the
+    character table C_ab = (-1)^<a, b> (symplectic product) and eigenvalues
+    lambda = C p, the product of m draws from p is distributed as C lambda^m / 4^k.
+    """
+
+    def __init__(self, noise_model, num_qubits, num_shots, rng):
+        probabilities = noise_model.pauli_probabilities()
+        if probabilities is None:
+            raise ValueError(
+                "The stabilizer engine requires an unbatched, trace-preserving Pauli noise model."
+            )
+        self.rng = rng
+        self.num_shots = num_shots
+        self.x = np.zeros((num_qubits, num_shots), dtype=bool)
+        self.z = np.zeros((num_qubits, num_shots), dtype=bool)
+        self.sites = []
+        self.site_of_qubit = {}
+        for site, probs in probabilities.items():
+            if probs[0] >= 1 - 1e-15:
+                continue
+            probs = probs / probs.sum()
+            characters = _character_table(len(site))
+            self.site_of_qubit.update({q: len(self.sites) for q in site})
+            self.sites.append((np.array(site, dtype=np.intp), probs, characters, characters @ probs))
+        # Events so far, and the events each site has drawn its errors for
+        self.clock = np.zeros(num_shots, dtype=np.int64)
+        self.drawn = np.zeros((len(self.sites), num_shots), dtype=np.int64)
+
+    def _decode(self, index, strings):
+        """X and Z bits, shape (k,) + strings.shape, of Pauli string indices on a site."""
+        qubits = self.sites[index][0]
+        shifts = 2 * np.arange(len(qubits) - 1, -1, -1).reshape((-1,) + (1,) * strings.ndim)
+        paulis = (strings >> shifts) & 3
+        return (paulis & 1).astype(bool), (paulis >> 1).astype(bool)
+
+    def _flush(self, index, until):
+        """Applies the product of the errors of a site's pending events."""
+        qubits, _, characters, eigenvalues = self.sites[index]
+        pending = until - self.drawn[index]
+        if pending.any():
+            probabilities = np.clip(
+                np.power(eigenvalues, pending[:, None]) @ characters / len(eigenvalues), 0, None
+            )
+            cdf = np.cumsum(probabilities, axis=1)
+            draws = self.rng.random(self.num_shots) * cdf[:, -1]
+            strings = np.minimum((cdf <= draws[:, None]).sum(axis=1), cdf.shape[1] - 1)
+            x, z = self._decode(index, strings)
+            self.x[qubits] ^= x
+            self.z[qubits] ^= z
+        self.drawn[index] = until
+
+    def _window_events(self, indices, events, window):
+        """Draws the twirled errors of the events during a window with a Pauli generator."""
+        num_events = events.max(initial=0)
+        if not num_events:
+            return
+        site_qubits = [self.sites[i][0] for i in indices]
+        qubits = np.union1d(np.concatenate(site_qubits), window.qubits)
+        shape = (len(qubits), num_events, self.num_shots)
+        x, z = np.zeros(shape, dtype=bool), np.zeros(shape, dtype=bool)
+        for index, site in zip(indices, site_qubits):
+            cdf = np.cumsum(self.sites[index][1])
+            strings = np.searchsorted(cdf, self.rng.random(shape[1:]) * cdf[-1], side="right")
+            position = np.searchsorted(qubits, site)
+            x[position], z[position] = self._decode(index, np.minimum(strings, len(cdf) - 1))
+        active = np.arange(num_events)[:, None] < events
+        x &= active
+        z &= active
+
+        positions = np.searchsorted(qubits, window.qubits)
+        px, pz = window.px[:, None, None], window.pz[:, None, None]
+        flip = np.bitwise_xor.reduce((x[positions] & pz) ^ (z[positions] & px), axis=0)
+        flip &= self.rng.random(shape[1:]) < window.rotation_probability()
+        x[positions] ^= px & flip
+        z[positions] ^= pz & flip
+        self.x[qubits] ^= np.bitwise_xor.reduce(x, axis=1)
+        self.z[qubits] ^= np.bitwise_xor.reduce(z, axis=1)
+
+    def apply(self, window):
+        """Advances the frames through one window and the noise during it."""
+        events = self.rng.poisson(window.duration, size=self.num_shots)
+        indices = sorted({self.site_of_qubit[q] for q in window.support if q in self.site_of_qubit})
+        for index in indices:
+            self._flush(index, self.clock)
+        if window.pauli_generator and indices:
+            # Errors during the window act from its start after twirling
+            self._window_events(indices, events, window)
+            self.drawn[indices] = self.clock + events
+        # Otherwise they stay pending and act after the window
+        window.apply_frames(self.x, self.z)
+        self.clock += events
+
+    def finish(self):
+        """Applies every pending error and returns the X bits of the frames."""
+        for index in range(len(self.sites)):
+            self._flush(index, self.clock)
+        return self.x
+
+
+def _commutes_with_noise(window, probabilities):
+    """
+    Whether the noise on the support of a window commutes with it.
+
+    For a Pauli generator P, the noise commutes with the window when it decays
+    every Pauli string R that anticommutes with P at the same rate as R P. The
+    difference of the two rates is proportional to sum_Q p_Q (-1)^<Q, R> over
+    the errors Q anticommuting with P, and only involves the sites that meet P.
+
+    With H factors, only a lone H factor commutes with single-qubit depolarizing
+    noise: the window then rotates its qubit about the H axis, and only
+    depolarizing noise is invariant under every such rotation. Several factors
+    couple the qubits, and no noise on them commutes with the product.
+    """
+    noisy = [
+        (site, probs)
+        for site, probs in probabilities.items()
+        if probs[0] < 1 - 1e-15 and np.isin(site, window.support).any()
+    ]
+    if not noisy:
+        return True
+    if window.pauli_generator:
+        return _rates_match(window, noisy)
+    if window.support.size != 1:
+        return False
+    return all(len(site) == 1 and np.ptp(probs[1:]) < 1e-12 for site, probs in noisy)
+
+
+def _rates_match(window, noisy):
+    """
+    Whether the noise of the sites meeting a window decays each Pauli string R
+    anticommuting with its generator P at the same rate as R P.
+    """
+    qubits = np.unique(np.concatenate([site for site, _ in noisy]))
+    strings = np.arange(4 ** len(qubits))
+    # Probability of every Pauli string on these qubits, qubit i at digit 4^i
+    errors = np.ones(len(strings))
+    for site, probs in noisy:
+        # The first qubit of a site is its most significant digit (pauli_strings)
+        weights = 4 ** np.arange(len(site) - 1, -1, -1)
+        positions = np.searchsorted(qubits, site)
+        errors *= probs[((strings[:, None] >> (2 * positions)) & 3) @ weights]
+    # Errors only see P on the noisy qubits
+    on_noisy = np.isin(window.qubits, qubits)
+    positions = np.searchsorted(qubits, window.qubits[on_noisy])
+    paulis = window.px[on_noisy] + 2 * window.pz[on_noisy].astype(int)
+    generator = int(np.sum(paulis << (2 * positions)))
+    characters = _character_table(len(qubits))
+    anticommuting = characters[:, generator] < 0
+    differences = (errors * anticommuting) @ characters[:, anticommuting]
+    return bool(np.all(np.abs(differences) < 1e-12))
+
+
+def noise_is_exact(windows, noise_model):
+    """
+    Returns True if the Pauli frames sample the noise of every window exactly.
+
+    Args:
+        windows (iterable): CliffordWindow of the circuit
+        noise_model (LocalNoiseModel): Pauli noise model, or None for ideal gates
+
+    Returns:
+        bool: False if the noise during some window does not commute with it, so
+            that twirling the errors during a window with a Pauli generator, or
+            applying them after a window with H factors, only approximates it
+
+    Raises:
+        ValueError: If the noise is not a Pauli channel
+    """
+    if noise_model is None or noise_model.is_noiseless():
+        return True
+    probabilities = noise_model.pauli_probabilities()
+    if probabilities is None:
+        raise ValueError(
+            "The stabilizer engine requires an unbatched, trace-preserving Pauli noise model."
+        )
+    return all(_commutes_with_noise(window, probabilities) for window in windows)
+
+
+def _character_table(num_qubits):
+    """(-1)^<a, b> for all pairs of Pauli strings a, b on num_qubits qubits (symplectic product)."""
+    strings = np.arange(4**num_qubits)
+    x = np.stack([(strings >> (2 * j)) & 1 for j in range(num_qubits)], axis=1)
+    z = np.stack([(strings >> (2 * j + 1)) & 1 for j in range(num_qubits)], axis=1)
+    products = (x @ z.T + z @ x.T) & 1
+    return 1 - 2 * products.astype(float)
+
+
+def _histogram(outcomes):
+    """Counts the outcome bitstrings (qubit 0 first), most frequent first."""
+    num_qubits, num_shots = outcomes.shape
+    packed = np.packbits(outcomes, axis=0).T
+    unique, counts = np.unique(packed, axis=0, return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:MAX_HISTOGRAM_OUTCOMES]
+    bits = np.unpackbits(unique[order], axis=1)[:, :num_qubits]
+    return {
+        "".join(map(str, row)): int(count) for row, count in zip(bits, counts[order])
+    }
+
+
+def simulate_clifford_windows(
+    windows, num_qubits, noise_model=None, num_shots=DEFAULT_NUM_SHOTS, seed=None
+):
+    """
+    Simulates a Clifford circuit given as gate windows and measures every qubit.
+
+    Args:
+        windows (iterable): (scaling, local_ops, duration) per gate window
+        num_qubits (int): Number of qubits
+        noise_model (LocalNoiseModel): Pauli noise model, or None for ideal gates
+        num_shots (int): Number of sampled measurement shots
+        seed (int or np.random.Generator): Seed of the random number generator
+
+    Returns:
+        dict: stabilizers, the generators of the ideal final state; random_bits,
+            the number of uniformly random outcome bits of the ideal circuit;
+            num_shots; histogram of the sampled outcomes (qubit 0 first, at most
+            MAX_HISTOGRAM_OUTCOMES, most frequent first); qubit_probabilities,
+            the probability of measuring 1 on every qubit, exact without noise
+            and estimated from the shots with it; approximate, whether the noise
+            of some window is only approximated (see noise_is_exact)
+
+    Raises:
+        ValueError: If a window is not Clifford, the noise is not a Pauli
+            channel, or num_shots is not positive
+    """
+    if num_shots < 1:
+        raise ValueError("num_shots must be positive.")
+    compiled = [
+        CliffordWindow(scaling, local_ops, duration, num_qubits)
+        for scaling, local_ops, duration in windows
+    ]
+    noisy = noise_model is not None and not noise_model.is_noiseless()
+
+    tableau = StabilizerTableau(num_qubits)
+    for window in compiled:
+        window.apply_tableau(tableau)
+    constant, basis = tableau.measurement_form()
+
+    rng = np.random.default_rng(seed)
+    random_bits = rng.integers(0, 2, size=(basis.shape[1], num_shots))
+    outcomes = constant[:, None] ^ ((basis.astype(np.int64) @ random_bits) & 1).astype(bool)
+
+    if noisy:
+        frames = _NoisyFrames(noise_model, num_qubits, num_shots, rng)
+        for window in compiled:
+            frames.apply(window)
+        outcomes ^= frames.finish()
+        qubit_probabilities = outcomes.mean(axis=1)
+    else:
+        qubit_probabilities = np.where(basis.any(axis=1), 0.5, constant.astype(float))
+
+    return {
+        "stabilizers": tableau.stabilizers(),
+        "random_bits": int(basis.shape[1]),
+        "num_shots": num_shots,
+        "histogram": _histogram(outcomes),
+        "qubit_probabilities": qubit_probabilities.tolist(),
+        "approximate": not noise_is_exact(compiled, noise_model),
+    }
@@ -0,0 +1,40 @@
+import json
+import unittest
+from benchmarks import BENCHMARKS, compare_results, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_quick_run(self):
+        results = run_benchmarks(
+            "get_depolarizing_ops|propagate", quick=True, isolate=False, min_time=0.0
+        )
+        self.assertEqual(
+            [result["benchmark"] for result in results["results"]],
+            ["get_depolarizing_ops"] * 2 + ["propagate_error_layer_through_layer"],
+        )
+        for result in results["results"]:
+            self.assertEqual(result["repeat"], 1)
+            self.assertGreater(result["peak_rss_bytes"], 0)
+            self.assertGreater(result["peak_traced_bytes"], 0)
+        # The results are plain JSON
+        self.assertEqual(json.loads(json.dumps(results)), results)
+
+    def test_compare_results(self):
+        baseline = run_benchmarks("propagate", quick=True, isolate=False, min_time=0.0)
+        current = json.loads(json.dumps(baseline))
+        current["results"][0]["seconds"]["median"] *= 2
+        [case] = compare_results(baseline, current, threshold=1.5)
+        self.assertTrue(case["regressed"])
+        self.assertAlmostEqual(case["time_ratio"], 2.0)
+        self.assertFalse(compare_results(baseline, baseline)[0]["regressed"])
+
+    def test_registered_grids(self):
+        setup, full_params, _ = BENCHMARKS["rep_to_evolution"]
+        self.assertEqual({p["num_qubits"] for p in full_params}, {1, 2, 4, 8})
+        self.assertEqual(max(p["num_layers"] for p in full_params), 200)
+        # Setup builds the callable without running it
+        self.assertTrue(callable(setup(num_qubits=2, num_layers=3)))
+
+
+if __name__ == "__main__":
+    unittest.main()
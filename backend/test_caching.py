@@ -0,0 +1,109 @@
+import os
+import time
+import unittest
+import tempfile
+from caching import DiskCache, LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("b", 0), 0)
+        self.assertIn("a", cache)
+        self.assertEqual(len(cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_hit_miss_counters(self):
+        cache = LRUCache(maxsize=4)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("missing")
+        self.assertEqual(
+            cache.info(), {"hits": 2, "misses": 1, "size": 1, "maxsize": 4}
+        )
+        cache.clear()
+        self.assertEqual(
+            cache.info(), {"hits": 0, "misses": 0, "size": 0, "maxsize": 4}
+        )
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            LRUCache(maxsize=0)
+        with self.assertRaises(ValueError):
+            LRUCache(max_bytes=100)
+
+    def test_evicts_by_bytes(self):
+        cache = LRUCache(maxsize=100, max_bytes=10, sizeof=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "xxxx")
+        cache.put("a", "xxx")  # replacing an entry updates the total
+        self.assertEqual(cache.nbytes, 7)
+        cache.put("c", "xxxx")  # "b" is the least recently used entry
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.info()["nbytes"], 7)
+        cache.put("d", "x" * 11)  # larger than the whole budget
+        self.assertNotIn("d", cache)
+        self.assertEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(cache.nbytes, 0)
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_get_and_put(self):
+        cache = DiskCache(self.directory.name)
+        cache.put("ab12", {"success": True, "values": [1, 2]})
+        self.assertEqual(cache.get("ab12"), {"success": True, "values": [1, 2]})
+        self.assertIsNone(cache.get("cd34"))
+        self.assertIn("ab12", cache)
+        # A second instance sharing the directory sees the same entries
+        self.assertEqual(DiskCache(self.directory.name).get("ab12")["values"], [1, 2])
+        with self.assertRaises(ValueError):
+            cache.put("../escape", 1)
+
+    def test_evicts_least_recently_used_bytes(self):
+        cache = DiskCache(self.directory.name, max_bytes=250)
+        payload = "x" * 90
+        cache.put("aa", payload)
+        cache.put("bb", payload)
+        # Make "aa" the most recently used entry
+        past = time.time() - 100
+        os.utime(os.path.join(self.directory.name, "bb.json"), (past, past))
+        cache.get("aa")
+        cache.put("cc", payload)
+        self.assertIn("aa", cache)
+        self.assertNotIn("bb", cache)
+        self.assertIn("cc", cache)
+        self.assertLessEqual(cache.info()["bytes"], 250)
+
+    def test_ttl(self):
+        cache = DiskCache(self.directory.name, ttl=60)
+        cache.put("aa", 1)
+        cache.put("bb", 2)
+        past = time.time() - 120
+        os.utime(os.path.join(self.directory.name, "aa.json"), (past, past))
+        self.assertIsNone(cache.get("aa"))
+        self.assertEqual(cache.get("bb"), 2)
+        self.assertEqual(cache.info()["size"], 1)
+        with self.assertRaises(ValueError):
+            DiskCache(self.directory.name, ttl=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
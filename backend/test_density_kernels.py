@@ -0,0 +1,122 @@
+import unittest
+import numpy as np
+import qutip as qt
+from density_kernels import (
+    apply_local_operator,
+    apply_local_superoperator,
+    apply_state_operator,
+    apply_unitary,
+    kraus_to_superoperator,
+    integrate_linear,
+)
+
+
+def random_density_matrix(num_qubits, seed=0):
+    rng = np.random.default_rng(seed)
+    dim = 2**num_qubits
+    a = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    rho = a @ a.conj().T
+    return rho / np.trace(rho)
+
+
+def embed(op, qubits, num_qubits):
+    """Full operator of a one- or two-qubit op via qutip (reference path)."""
+    local_dims = [2] * len(qubits)
+    oper = qt.Qobj(op, dims=[local_dims, local_dims])
+    return qt.expand_operator(oper, dims=[2] * num_qubits, targets=list(qubits)).full()
+
+
+class TestDensityKernels(unittest.TestCase):
+    def setUp(self):
+        self.num_qubits = 3
+        self.rho = random_density_matrix(self.num_qubits)
+        self.hadamard = np.array([[1, 1], [1, -1]]) / np.sqrt(2)
+        self.cnot = np.array(
+            [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]], dtype=complex
+        )
+
+    def test_one_qubit_operator_matches_full_operator(self):
+        for qubit in range(self.num_qubits):
+            full = embed(self.hadamard, [qubit], self.num_qubits)
+            np.testing.assert_allclose(
+                apply_local_operator(self.rho, self.hadamard, [qubit], self.num_qubits),
+                full @ self.rho,
+                atol=1e-12,
+            )
+            np.testing.assert_allclose(
+                apply_local_operator(
+                    self.rho, self.hadamard, [qubit], self.num_qubits, side="right"
+                ),
+                self.rho @ full,
+                atol=1e-12,
+            )
+
+    def test_two_qubit_operator_matches_full_operator(self):
+        for qubits in [(0, 1), (2, 0), (0, 2)]:
+            full = embed(self.cnot, list(qubits), self.num_qubits)
+            np.testing.assert_allclose(
+                apply_local_operator(self.rho, self.cnot, qubits, self.num_qubits),
+                full @ self.rho,
+                atol=1e-12,
+            )
+
+    def test_unitary_conjugation_matches_full_operator(self):
+        full = embed(self.cnot, [2, 0], self.num_qubits)
+        np.testing.assert_allclose(
+            apply_unitary(self.rho, self.cnot, [2, 0], self.num_qubits),
+            full @ self.rho @ full.conj().T,
+            atol=1e-12,
+        )
+
+    def test_state_operator_matches_full_operator(self):
+        rng = np.random.default_rng(1)
+        states = rng.normal(size=(5, 8)) + 1j * rng.normal(size=(5, 8))
+        full = embed(self.cnot, [1, 2], self.num_qubits)
+        np.testing.assert_allclose(
+            apply_state_operator(states, self.cnot, [1, 2], self.num_qubits),
+            states @ full.T,
+            atol=1e-12,
+        )
+
+    def test_superoperator_matches_kraus_sum(self):
+        kraus = np.array([np.sqrt(0.7) * np.eye(2), np.sqrt(0.3) * self.hadamard])
+        superop = kraus_to_superoperator(kraus)
+        expected = sum(
+            embed(k, [1], self.num_qubits) @ self.rho @ embed(k, [1], self.num_qubits).conj().T
+            for k in kraus
+        )
+        np.testing.assert_allclose(
+            apply_local_superoperator(self.rho, superop, [1], self.num_qubits),
+            expected,
+            atol=1e-12,
+        )
+
+    def test_batched_operands(self):
+        batch = np.stack([self.rho, random_density_matrix(self.num_qubits, seed=1)])
+        shared = apply_local_operator(batch, self.hadamard, [0], self.num_qubits)
+        for b in range(2):
+            np.testing.assert_allclose(
+                shared[b],
+                apply_local_operator(batch[b], self.hadamard, [0], self.num_qubits),
+                atol=1e-12,
+            )
+
+        ops = np.stack([self.hadamard, np.eye(2)])
+        per_entry = apply_local_operator(batch, ops, [0], self.num_qubits)
+        np.testing.assert_allclose(per_entry[1], batch[1], atol=1e-12)
+
+        with self.assertRaises(ValueError):
+            apply_local_operator(self.rho, ops, [0], self.num_qubits)
+        with self.assertRaises(ValueError):
+            apply_local_operator(self.rho, self.hadamard, [0], self.num_qubits, side="up")
+
+    def test_integrate_linear_matches_expm(self):
+        generator = np.array([[0, 1], [-1, 0]], dtype=complex) * 3
+        rho = np.array([[1, 0], [0, 0]], dtype=complex)
+        result = integrate_linear(lambda x: generator @ x, rho, 2.0, 3.0)
+        expected = qt.Qobj(generator * 2.0).expm().full() @ rho
+        np.testing.assert_allclose(result, expected, atol=1e-10)
+
+
+if __name__ == "__main__":
+    unittest.main()
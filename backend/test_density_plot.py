@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from matplotlib.figure import Figure
+from visualizations.Density_Plot import (
+    PHASE_LUT,
+    create_density_matrix_heatmap,
+    density_matrix_rgba,
+    downsample_matrix,
+    plot_density_matrix,
+)
+
+
+class TestDensityPlot(unittest.TestCase):
+    def test_downsample_merges_blocks(self):
+        matrix = np.zeros((8, 8), dtype=complex)
+        matrix[:2, :2] = 1j
+        magnitudes, phases = downsample_matrix(matrix, max_pixels=4)
+        self.assertEqual(magnitudes.shape, (4, 4))
+        self.assertAlmostEqual(magnitudes[0, 0], 1.0)
+        self.assertAlmostEqual(phases[0, 0], np.pi / 2)
+        self.assertEqual(magnitudes[1:, 1:].max(), 0)
+
+        magnitudes, _ = downsample_matrix(matrix, max_pixels=8)
+        self.assertEqual(magnitudes.shape, (8, 8))
+
+    def test_rgba_encodes_phase_and_magnitude(self):
+        rgba = density_matrix_rgba(np.array([[1.0, 0.5]]), np.array([[-np.pi, 0.0]]))
+        self.assertEqual(rgba.shape, (1, 2, 4))
+        np.testing.assert_allclose(rgba[0, 0, :3], PHASE_LUT[0, :3])
+        np.testing.assert_allclose(rgba[..., 3], [[1.0, 0.5]])
+
+    def test_plot_dispatch(self):
+        small = np.eye(4) / 4
+        large = np.eye(64) / 64
+        self.assertTrue(hasattr(plot_density_matrix(small).axes[0], "zaxis"))
+        self.assertFalse(hasattr(plot_density_matrix(large).axes[0], "zaxis"))
+        self.assertIsInstance(create_density_matrix_heatmap(large, max_pixels=16), Figure)
+
+        with self.assertRaises(ValueError):
+            create_density_matrix_heatmap(np.eye(6))
+
+
+if __name__ == "__main__":
+    unittest.main()
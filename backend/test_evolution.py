@@ -254,6 +254,99 @@ class TestQuantumCircuitEvolution(unittest.TestCase):
             rep_to_evolution(cnot_circuit, input_state, self.no_ops), expected_output
         )
 
+    def test_propagator_engine_matches_mesolve(self):
+        c_ops = get_depolarizing_ops(1e-2, 2)
+        circuits = [
+            [self.create_layer([("X", 0), ("Z", 1)])],
+            [self.create_layer([("H", 0)]), self.create_layer([("CX", 0, 1)])],
+            [self.create_layer([("S", 0), ("T", 1)]), self.create_layer([("Y", 1)])],
+        ]
+        input_state = qt.ket2dm(qt.tensor(zero, zero))
+        for circuit in circuits:
+            self.assertStateAlmostEqual(
+                rep_to_evolution(circuit, input_state, c_ops, engine="propagator"),
+                rep_to_evolution(circuit, input_state, c_ops, engine="mesolve"),
+            )
+
+        # Noiseless CNOT on |10>
+        self.assertStateAlmostEqual(
+            rep_to_evolution(
+                [self.create_layer([("CX", 0, 1)])],
+                qt.ket2dm(qt.tensor(one, zero)),
+                self.no_ops,
+                engine="propagator",
+            ),
+            qt.ket2dm(qt.tensor(one, one)),
+        )
+
+    def test_propagator_cache_reuses_layers(self):
+        clear_propagator_cache()
+        c_ops = get_depolarizing_ops(1e-2, 2)
+        circuit = [
+            self.create_layer([("H", 0), ("H", 1)]),
+            self.create_layer([("CX", 0, 1)]),
+        ] * 3
+        input_state = qt.ket2dm(qt.tensor(zero, zero))
+        rep_to_evolution(circuit, input_state, c_ops, engine="propagator")
+        info = propagator_cache_info()
+        self.assertEqual(info["misses"], 2)
+        self.assertEqual(info["hits"], 4)
+
+        # A different noise model compiles new propagators
+        rep_to_evolution(
+            circuit, input_state, get_depolarizing_ops(1e-3, 2), engine="propagator"
+        )
+        self.assertEqual(propagator_cache_info()["misses"], 4)
+        clear_propagator_cache()
+
+    def test_c_ops_fingerprint_follows_operators(self):
+        c_ops = get_depolarizing_ops(1e-2, 2)
+        fingerprint = c_ops_fingerprint(c_ops)
+        self.assertEqual(c_ops_fingerprint(c_ops), fingerprint)
+        self.assertEqual(c_ops_fingerprint(list(c_ops)), fingerprint)
+
+        # Replacing an operator of the same list changes the fingerprint
+        c_ops[0] = 2 * c_ops[0]
+        self.assertNotEqual(c_ops_fingerprint(c_ops), fingerprint)
+
+    def test_tensor_engine_matches_mesolve(self):
+        no_ops = [qt.tensor(I, I, I)]
+        circuit = [
+            self.create_layer([("H", 0), ("S", 1), ("T", 2)]),
+            self.create_layer([("CX", 0, 2)]),
+            self.create_layer([("X", 1), ("Y", 2)]),
+            self.create_layer([("CX", 2, 1)]),
+            self.create_layer([("H", 1), ("Z", 0)]),
+        ]
+        input_state = qt.ket2dm(qt.tensor(zero, one, zero))
+        self.assertStateAlmostEqual(
+            rep_to_evolution(circuit, input_state, no_ops, engine="tensor"),
+            rep_to_evolution(circuit, input_state, no_ops, engine="mesolve"),
+        )
+
+        # Noisy models must go through a Lindblad engine
+        with self.assertRaises(ValueError):
+            rep_to_evolution(
+                circuit[:1],
+                input_state,
+                get_depolarizing_ops(1e-2, 3),
+                engine="tensor",
+            )
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            rep_to_evolution(
+                [self.create_layer([("X", 0)])],
+                qt.ket2dm(qt.tensor(zero, zero)),
+                self.no_ops,
+                engine="INVALID",
+            )
+
+        result = simulate_quantum_circuit(
+            [self.create_layer([("H", 0)])], engine="propagator"
+        )
+        self.assertTrue(self.is_valid_base64_png(result["plot_image"]))
+
     def test_simulate_quantum_circuit_coverage(self):
         # Test single-qubit gates
         result = simulate_quantum_circuit([self.create_layer([("X", 0)])])
@@ -316,6 +409,29 @@ class TestQuantumCircuitEvolution(unittest.TestCase):
         self.assertEqual(serialized[0][0]["real"], 1.0)
         self.assertEqual(serialized[0][0]["imag"], 1.0)
 
+    def test_data_output_mode(self):
+        circuit = [self.create_layer([("H", 0)]), self.create_layer([("CX", 0, 1)])]
+        expected = rep_to_evolution(
+            circuit, qt.ket2dm(qt.tensor(zero, zero)), LocalNoiseModel.depolarizing(1e-2, 2)
+        ).full()
+
+        result = simulate_quantum_circuit(circuit, output="data")
+        self.assertTrue(result["success"])
+        self.assertNotIn("plot_image", result)
+        self.assertEqual(result["density_matrix"]["shape"], [4, 4])
+        self.assertEqual(result["density_matrix"]["dtype"], "<c16")
+        np.testing.assert_array_equal(buffer_to_matrix(result["density_matrix"]), expected)
+
+        result = simulate_quantum_circuit(circuit, output="both", dtype="complex64")
+        self.assertTrue(self.is_valid_base64_png(result["plot_image"]))
+        decoded = buffer_to_matrix(result["density_matrix"])
+        self.assertEqual(decoded.dtype, np.complex64)
+        np.testing.assert_allclose(decoded, expected, atol=1e-6)
+
+        for kwargs in ({"output": "svg"}, {"output": "data", "dtype": "float32"}):
+            result = simulate_quantum_circuit(circuit, **kwargs)
+            self.assertFalse(result["success"])
+
 
 if __name__ == "__main__":
     unittest.main()
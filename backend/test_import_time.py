@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+"""
+Import-time budget of the simulator entry points, measured with python -X importtime
+in a fresh interpreter. Heavy dependencies must only load on the code paths that
+need them (see the quantum_simulator module docstring).
+"""
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+
+# Cumulative import time of each entry point; numpy alone takes about 0.1 s
+IMPORT_TIME_BUDGET = 0.5
+HEAVY_MODULES = ("qutip", "matplotlib", "scipy", "mpl_toolkits")
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BACKEND_DIR, PROJECT_ROOT]))
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, check=True
+    )
+
+
+def import_times(module):
+    """Cumulative import time in seconds of every module imported by `import module`."""
+    stderr = run_python("-X", "importtime", "-c", f"import {module}").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_import_budget(self):
+        for module in ("quantum_simulator", "error_step_propagator", "simulation_server"):
+            times = import_times(module)
+            heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+            self.assertEqual(heavy, [], f"{module} imports {heavy[:5]}")
+            self.assertLess(times[module], IMPORT_TIME_BUDGET, module)
+
+    def test_validation_error_is_fast(self):
+        script = (
+            "import sys, time, json\n"
+            "from quantum_simulator import simulate_quantum_circuit\n"
+            "start = time.perf_counter()\n"
+            "result = simulate_quantum_circuit([{'numRows': 1, 'gates': [['BAD', 0]]}])\n"
+            "print(json.dumps([result['success'], time.perf_counter() - start,\n"
+            "                  'qutip' in sys.modules, 'matplotlib' in sys.modules]))\n"
+        )
+        success, seconds, qutip_loaded, matplotlib_loaded = json.loads(
+            run_python("-c", script).stdout
+        )
+        self.assertFalse(success)
+        self.assertLess(seconds, 0.1)
+        self.assertFalse(qutip_loaded or matplotlib_loaded)
+
+    def test_server_workers_preload_heavy_modules(self):
+        script = (
+            "import sys, json\n"
+            "from simulation_server import _warm_worker\n"
+            "_warm_worker()\n"
+            "print(json.dumps([name in sys.modules for name in ('qutip', 'matplotlib')]))\n"
+        )
+        self.assertEqual(json.loads(run_python("-c", script).stdout), [True, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
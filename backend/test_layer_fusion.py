@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+import qutip as qt
+from layer_fusion import fuse_layers
+from noise_models import LocalNoiseModel
+from quantum_simulator import rep_to_evolution, simulate_quantum_circuit
+
+
+def random_circuit(rng, num_qubits, num_layers):
+    """Random simulator IR over the full gate set, including identities."""
+    circuit = []
+    for _ in range(num_layers):
+        qubits = list(rng.permutation(num_qubits))
+        gates = []
+        while qubits:
+            if len(qubits) >= 2 and rng.random() < 0.25:
+                gates.append(("CX", int(qubits.pop()), int(qubits.pop())))
+            elif rng.random() < 0.7:
+                gates.append((str(rng.choice(["I", "X", "Y", "Z", "H", "S", "T"])), int(qubits.pop())))
+            else:
+                qubits.pop()
+        circuit.append({"numRows": num_qubits, "gates": gates})
+    return circuit
+
+
+class TestLayerFusion(unittest.TestCase):
+    def setUp(self):
+        self.num_qubits = 3
+        dim = 2**self.num_qubits
+        self.input_state = qt.Qobj(
+            np.diag([1.0] + [0.0] * (dim - 1)), dims=[[2] * self.num_qubits] * 2
+        )
+
+    def evolve(self, circuit, c_ops):
+        return rep_to_evolution(circuit, self.input_state, c_ops).full()
+
+    def test_cancellations_and_report(self):
+        circuit = [
+            {"numRows": 2, "gates": [("H", 0), ("X", 1)]},
+            {"numRows": 2, "gates": [("H", 0), ("X", 1)]},
+            {"numRows": 2, "gates": [("CX", 0, 1)]},
+            {"numRows": 2, "gates": [("CX", 0, 1)]},
+            {"numRows": 2, "gates": [("T", 1)]},
+            {"numRows": 2, "gates": [("I", 0), ("T", 1)]},
+        ]
+        fused, report = fuse_layers(circuit, noiseless=True)
+        self.assertEqual(fused, [{"numRows": 2, "gates": [("S", 1)]}])
+
+        self.assertEqual(report["before"], {"layers": 6, "gates": 9, "blocks": 6})
+        self.assertEqual(report["after"], {"layers": 1, "gates": 1, "blocks": 1})
+
+        # An identity that sets the scaling of its run changes the gate: kept as is
+        circuit[-1]["gates"] = [("T", 0), ("I", 1)]
+        fused, _ = fuse_layers(circuit, noiseless=True)
+        self.assertEqual(fused[-1]["gates"], [("T", 0), ("I", 1)])
+
+    def test_noiseless_fusion_preserves_state(self):
+        rng = np.random.default_rng(2)
+        for _ in range(15):
+            circuit = random_circuit(rng, self.num_qubits, 8)
+            fused, report = fuse_layers(circuit, noiseless=True)
+            self.assertLessEqual(report["after"]["blocks"], report["before"]["blocks"])
+            np.testing.assert_allclose(
+                self.evolve(fused, None), self.evolve(circuit, None), atol=1e-10
+            )
+
+    def test_noise_aware_fusion_preserves_noisy_state(self):
+        rng = np.random.default_rng(3)
+        model = LocalNoiseModel.depolarizing(0.05, self.num_qubits)
+        for _ in range(5):
+            circuit = random_circuit(rng, self.num_qubits, 6)
+            fused, report = fuse_layers(circuit)
+            self.assertEqual(report["after"]["blocks"], report["before"]["blocks"])
+            self.assertLessEqual(report["after"]["layers"], report["before"]["layers"])
+            np.testing.assert_allclose(
+                self.evolve(fused, model), self.evolve(circuit, model), atol=1e-10
+            )
+
+    def test_simulation_reports_fusion(self):
+        circuit = [
+            {"numRows": 2, "gates": [["H", 0], ["X", 1]]},
+            {"numRows": 2, "gates": [["I", 0], ["H", 1]]},
+            {"numRows": 2, "gates": [["CX", 0, 1]]},
+        ]
+        plain = simulate_quantum_circuit(circuit, output="data")
+        fused = simulate_quantum_circuit(circuit, output="data", fuse=True)
+        self.assertNotIn("fusion", plain)
+        self.assertEqual(fused["fusion"]["mode"], "noise-aware")
+        self.assertEqual(fused["fusion"]["after"]["gates"], 4)
+        self.assertEqual(fused["density_matrix"], plain["density_matrix"])
+
+        input_state = qt.Qobj(np.diag([1.0, 0, 0, 0]), dims=[[2, 2], [2, 2]])
+        np.testing.assert_allclose(
+            rep_to_evolution(circuit, input_state, None, fuse=True).full(),
+            rep_to_evolution(circuit, input_state, None).full(),
+            atol=1e-10,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
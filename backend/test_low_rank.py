@@ -0,0 +1,137 @@
+import unittest
+import numpy as np
+import qutip as qt
+from low_rank import LowRankDensity, apply_noise, evolve_window
+from noise_models import LocalNoiseModel
+from quantum_simulator import (
+    EVOLUTION_ENGINES,
+    buffer_to_matrix,
+    cnot_pulse_generators,
+    evolve_layers,
+    rep_to_evolution,
+    simulate_quantum_circuit,
+)
+from test_layer_fusion import random_circuit
+
+
+def ground_state(num_qubits):
+    dim = 2**num_qubits
+    return qt.Qobj(np.diag([1.0] + [0.0] * (dim - 1)), dims=[[2] * num_qubits] * 2)
+
+
+class TestLowRank(unittest.TestCase):
+    def test_compression(self):
+        rng = np.random.default_rng(0)
+        states = np.linalg.qr(rng.normal(size=(8, 3)) + 1j * rng.normal(size=(8, 3)))[0].T
+        weights = [0.7, 0.3 - 1e-12, 1e-12]
+        rho = sum(w * np.outer(s, s.conj()) for w, s in zip(weights, states))
+
+        state = LowRankDensity.from_dense(rho, tol=1e-9)
+        self.assertEqual(state.rank, 2)
+        self.assertAlmostEqual(state.truncation_error, 1e-12, delta=1e-14)
+        np.testing.assert_allclose(state.to_dense(), rho, atol=1e-11)
+
+        # Repeated vectors are merged into one eigenvector per direction
+        state = LowRankDensity(np.concatenate([states, states]) / np.sqrt(2))
+        state.compress()
+        self.assertEqual(state.rank, 3)
+        np.testing.assert_allclose(state.to_dense(), states.T @ states.conj(), atol=1e-12)
+
+        # A pure state is read off a column without diagonalizing rho
+        pure = LowRankDensity.from_dense(np.outer(states[0], states[0].conj()))
+        self.assertEqual(pure.rank, 1)
+        np.testing.assert_allclose(pure.to_dense(), np.outer(states[0], states[0].conj()), atol=1e-12)
+
+    def test_noiseless_evolution_stays_pure(self):
+        rng = np.random.default_rng(1)
+        num_qubits = 5
+        for _ in range(5):
+            circuit = random_circuit(rng, num_qubits, 8)
+            state = evolve_layers(
+                circuit,
+                LowRankDensity.from_dense(ground_state(num_qubits).full()),
+                None,
+                *EVOLUTION_ENGINES["lowrank"],
+            )
+            self.assertEqual(state.rank, 1)
+            expected = rep_to_evolution(circuit, ground_state(num_qubits), None, engine="tensor")
+            np.testing.assert_allclose(state.to_dense(), expected.full(), atol=1e-10)
+
+    def test_noisy_evolution_matches_local_engine(self):
+        rng = np.random.default_rng(2)
+        num_qubits = 3
+        model = LocalNoiseModel.depolarizing(1e-3, num_qubits)
+        for _ in range(3):
+            circuit = random_circuit(rng, num_qubits, 4)
+            expected = rep_to_evolution(circuit, ground_state(num_qubits), model, engine="local")
+            state = evolve_layers(
+                circuit,
+                LowRankDensity.from_dense(ground_state(num_qubits).full(), max_rank=8),
+                model,
+                *EVOLUTION_ENGINES["lowrank"],
+            )
+            self.assertIsInstance(state, LowRankDensity)
+            self.assertLess(state.truncation_error, 1e-8)
+            # The discarded weight bounds the error in trace norm, hence every entry
+            np.testing.assert_allclose(
+                state.to_dense(), expected.full(), rtol=0, atol=state.truncation_error
+            )
+
+            # Past max_rank the state is handed over to the dense local engine
+            fallback = rep_to_evolution(circuit, ground_state(num_qubits), model, engine="lowrank")
+            np.testing.assert_allclose(fallback.full(), expected.full(), atol=1e-8)
+
+    def test_rank_limit_within_window(self):
+        num_qubits = 4
+        model = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+        state = LowRankDensity.from_dense(ground_state(num_qubits).full(), max_rank=2)
+        scaling, factors, duration = cnot_pulse_generators(0, 1)[1]
+        # Noise on every qubit outgrows the rank limit long before the end of the pulse
+        self.assertFalse(evolve_window(state, scaling, factors, duration, model))
+        self.assertEqual(state.rank, 1)
+        self.assertEqual(state.truncation_error, 0)
+
+        circuit = [{"numRows": num_qubits, "gates": [("H", 0)]}]
+        circuit += [{"numRows": num_qubits, "gates": [("CX", 0, q)]} for q in range(1, num_qubits)]
+        expected = rep_to_evolution(circuit, ground_state(num_qubits), model, engine="local")
+        state = evolve_layers(
+            circuit,
+            LowRankDensity.from_dense(ground_state(num_qubits).full(), max_rank=2),
+            model,
+            *EVOLUTION_ENGINES["lowrank"],
+        )
+        self.assertIsInstance(state, np.ndarray)
+        np.testing.assert_allclose(state, expected.full(), atol=1e-9)
+
+    def test_simulation_options(self):
+        num_qubits = 3
+        model = LocalNoiseModel.depolarizing(1e-2, num_qubits)
+        circuit = random_circuit(np.random.default_rng(3), num_qubits, 4)
+        expected = rep_to_evolution(circuit, ground_state(num_qubits), model, engine="local")
+
+        def simulate(**options):
+            result = simulate_quantum_circuit(
+                circuit, model, engine="lowrank", output="data", **options
+            )
+            return buffer_to_matrix(result["density_matrix"])
+
+        np.testing.assert_allclose(simulate(), expected.full(), atol=1e-8)
+        np.testing.assert_allclose(simulate(max_rank=1), expected.full(), atol=1e-8)
+        # A loose tolerance drops the least likely error directions
+        self.assertGreater(np.abs(simulate(rank_tol=1e-2) - expected.full()).max(), 1e-6)
+
+    def test_noise_channel(self):
+        # Without a Hamiltonian, exp(t (E - id)) of a depolarizing channel only
+        # shrinks the Bloch vector, by 1 - 4p/3 per application of E
+        p, duration = 0.2, 0.7
+        state = LowRankDensity(np.array([[1.0, 0.0]]))
+        apply_noise(state, LocalNoiseModel.depolarizing(p, 1), duration)
+        z = np.exp(-4 * p / 3 * duration)
+        np.testing.assert_allclose(state.to_dense(), np.diag([1 + z, 1 - z]) / 2, atol=1e-10)
+
+        with self.assertRaises(ValueError):
+            LowRankDensity(np.ones((2, 3)))
+
+
+if __name__ == "__main__":
+    unittest.main()
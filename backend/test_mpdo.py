@@ -0,0 +1,159 @@
+import unittest
+import numpy as np
+from mpdo import MatrixProductDensity, SiteNoise
+from noise_models import LocalNoiseModel, depolarizing_kraus
+from quantum_simulator import (
+    EVOLUTION_ENGINES,
+    evolve_density_matrix,
+    evolve_layers,
+    resolve_engine,
+    simulate_quantum_circuit,
+)
+from test_layer_fusion import random_circuit
+from test_noise_models import random_density_matrix
+
+
+def ground_state(num_qubits):
+    rho = np.zeros((2**num_qubits, 2**num_qubits), dtype=complex)
+    rho[0, 0] = 1
+    return rho
+
+
+def correlated_model():
+    """Correlated dephasing of two qubits, which the mpdo engine does not support."""
+    zz = np.kron(np.diag([1, -1]), np.diag([1, -1]))
+    return LocalNoiseModel(2, {(0, 1): [np.sqrt(0.9) * np.eye(4), np.sqrt(0.1) * zz]})
+
+
+class TestMatrixProductDensity(unittest.TestCase):
+    def test_from_dense(self):
+        rho = random_density_matrix(4, seed=1)
+        state = MatrixProductDensity.from_dense(rho, max_kraus=16)
+        self.assertLess(state.truncation_error, 1e-12)
+        self.assertAlmostEqual(state.trace(), 1)
+        np.testing.assert_allclose(state.to_dense(), rho, atol=1e-12)
+        diagonal = np.real(np.diag(rho)).reshape([2] * 4)
+        np.testing.assert_allclose(
+            state.qubit_probabilities(),
+            [diagonal.take(1, axis=q).sum() for q in range(4)],
+            atol=1e-12,
+        )
+
+        # A pure state is a matrix-product state, without Kraus indices
+        state = MatrixProductDensity.from_dense(ground_state(3))
+        self.assertEqual(state.kraus_dimensions, [1, 1, 1])
+        self.assertEqual(state.bond_dimensions, [1, 1])
+
+        with self.assertRaises(ValueError):
+            MatrixProductDensity.from_dense(np.diag([1.0, -0.5]))
+
+    def test_noiseless_matches_tensor_engine(self):
+        rng = np.random.default_rng(6)
+        for num_qubits in (1, 2, 4):
+            for _ in range(5):
+                circuit = random_circuit(rng, num_qubits, 6)
+                expected = evolve_density_matrix(
+                    circuit, ground_state(num_qubits), None, engine="tensor"
+                )
+                actual = evolve_density_matrix(
+                    circuit, ground_state(num_qubits), None, engine="mpdo"
+                )
+                np.testing.assert_allclose(actual, expected, atol=1e-10)
+
+    def test_noisy_matches_local_engine(self):
+        rng = np.random.default_rng(7)
+        # With one noisy qubit the per-site noise is the noise of the register;
+        # only the splitting of noisy windows on several qubits differs
+        for model, atol in (
+            (LocalNoiseModel(3, {1: depolarizing_kraus(1e-3)}), 1e-4),
+            # Correlations of the errors on several qubits differ at O(p^2)
+            (LocalNoiseModel.depolarizing(1e-3, 3), 1e-3),
+        ):
+            for _ in range(4):
+                circuit = random_circuit(rng, 3, 6)
+                expected = evolve_density_matrix(circuit, ground_state(3), model, engine="local")
+                actual = evolve_density_matrix(circuit, ground_state(3), model, engine="mpdo")
+                np.testing.assert_allclose(actual, expected, atol=atol, err_msg=repr(model))
+
+    def test_truncation(self):
+        num_qubits = 6
+        circuit = [{"numRows": num_qubits, "gates": [("H", q) for q in range(0, num_qubits, 2)]}]
+        circuit += [
+            {"numRows": num_qubits, "gates": [("CX", q, (q + 3) % num_qubits)]}
+            for q in range(num_qubits)
+        ]
+        circuit += [{"numRows": num_qubits, "gates": [("T", 1)]}]
+        expected = evolve_density_matrix(circuit, ground_state(num_qubits), None, engine="tensor")
+
+        exact = evolve_layers(
+            circuit,
+            MatrixProductDensity.ground_state(num_qubits),
+            None,
+            *EVOLUTION_ENGINES["mpdo"],
+        )
+        self.assertLess(exact.truncation_error, 1e-12)
+        np.testing.assert_allclose(exact.to_dense(), expected, atol=1e-10)
+
+        truncated = evolve_layers(
+            circuit,
+            MatrixProductDensity.ground_state(num_qubits, max_bond=2),
+            None,
+            *EVOLUTION_ENGINES["mpdo"],
+        )
+        self.assertLessEqual(max(truncated.bond_dimensions), 2)
+        self.assertGreater(truncated.truncation_error, 1e-3)
+        # Truncations keep the trace and a positive state
+        rho = truncated.to_dense()
+        self.assertAlmostEqual(np.trace(rho).real, 1)
+        self.assertGreater(np.linalg.eigvalsh(rho).min(), -1e-12)
+
+    def test_engine_resolution(self):
+        depolarizing = LocalNoiseModel.depolarizing(1e-2, 2)
+        engine, noise = resolve_engine("mpdo", depolarizing)
+        self.assertEqual(engine, "mpdo")
+        self.assertIsInstance(noise, SiteNoise)
+        self.assertEqual(resolve_engine("mpdo", None), ("mpdo", None))
+        self.assertEqual(resolve_engine("auto", depolarizing)[0], "pauli")
+
+        with self.assertRaises(ValueError):
+            resolve_engine("mpdo", correlated_model())
+
+    def test_large_circuit(self):
+        # Beyond the dense limit, "auto" simulates a non-Clifford circuit on 40 qubits
+        num_qubits = 40
+        circuit = [{"numRows": num_qubits, "gates": [("H", 0)]}]
+        circuit += [
+            {"numRows": num_qubits, "gates": [("CX", q, q + 1)]} for q in range(num_qubits - 1)
+        ]
+        circuit += [{"numRows": num_qubits, "gates": [("T", 0)]}]
+        model = LocalNoiseModel.depolarizing(1e-5, num_qubits)
+        result = simulate_quantum_circuit(circuit, model, max_bond=8)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["engine"], "mpdo")
+        self.assertEqual(result["max_bond"], 8)
+        self.assertTrue(result["approximate"])
+        self.assertLessEqual(max(result["bond_dimensions"]), 8)
+        self.assertLess(result["truncation_error"], 1e-2)
+        # A GHZ state measures 1 on every qubit with probability 1/2
+        np.testing.assert_allclose(result["qubit_probabilities"], 0.5, atol=1e-3)
+
+        result = simulate_quantum_circuit(
+            [{"numRows": 2, "gates": [("H", 0)]}], correlated_model(), engine="mpdo"
+        )
+        self.assertFalse(result["success"])
+
+    def test_kraus_limit(self):
+        circuit = [{"numRows": 2, "gates": [("H", 0)]}, {"numRows": 2, "gates": [("CX", 0, 1)]}]
+        model = LocalNoiseModel.depolarizing(1e-2, 2)
+        truncated = simulate_quantum_circuit(circuit, model, engine="mpdo", max_bond=64)
+        self.assertEqual(truncated["max_kraus"], 8)
+        self.assertGreater(truncated["truncation_error"], 0)
+        # Beyond the default Kraus limit only the cutoff discards weight
+        exact = simulate_quantum_circuit(circuit, model, engine="mpdo", max_kraus=32)
+        self.assertLess(exact["truncation_error"], 1e-10)
+        noiseless = LocalNoiseModel(2, {})
+        self.assertFalse(simulate_quantum_circuit(circuit, noiseless, engine="mpdo")["approximate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import qutip as qt
+from noise_models import LocalNoiseModel, depolarizing_kraus
+from quantum_simulator import (
+    get_depolarizing_ops,
+    load_noise_model,
+    rep_to_evolution,
+    simulate_noise_sweep,
+    simulate_quantum_circuit,
+    zero,
+    one,
+)
+
+
+def random_density_matrix(num_qubits, seed=0):
+    rng = np.random.default_rng(seed)
+    dim = 2**num_qubits
+    a = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    rho = a @ a.conj().T
+    return rho / np.trace(rho)
+
+
+class TestLocalNoiseModel(unittest.TestCase):
+    def setUp(self):
+        self.atol = 5e-4
+        self.rtol = 5e-4
+
+    def create_layer(self, gates, num_qubits=2):
+        return {"numRows": num_qubits, "gates": gates}
+
+    def test_depolarizing_matches_dense_c_ops(self):
+        dense = get_depolarizing_ops(1e-2, 2)
+        local = LocalNoiseModel.depolarizing(1e-2, 2).to_c_ops()
+        self.assertEqual(len(dense), len(local))
+        for expected, actual in zip(dense, local):
+            np.testing.assert_allclose(actual.full(), expected.full(), atol=1e-12)
+
+    def test_dissipator_matches_lindblad(self):
+        kraus = {0: depolarizing_kraus(0.1), (1, 2): np.array([0.5 * np.eye(4)])}
+        model = LocalNoiseModel(3, kraus)
+        self.assertFalse(model.trace_preserving)
+        rho = random_density_matrix(3)
+        expected = qt.lindblad_dissipator(model.to_c_ops()[0])
+        for op in model.to_c_ops()[1:]:
+            expected = expected + qt.lindblad_dissipator(op)
+        rho_qobj = qt.Qobj(rho, dims=[[2] * 3, [2] * 3])
+        np.testing.assert_allclose(
+            model.dissipator(rho), expected(rho_qobj).full(), atol=1e-12
+        )
+
+    def test_memory_is_linear_in_qubits(self):
+        small = LocalNoiseModel.depolarizing(1e-2, 4).nbytes
+        large = LocalNoiseModel.depolarizing(1e-2, 8).nbytes
+        self.assertEqual(large, 2 * small)
+
+    def test_invalid_sites(self):
+        with self.assertRaises(ValueError):
+            LocalNoiseModel(2, {2: depolarizing_kraus(0.1)})
+        with self.assertRaises(ValueError):
+            LocalNoiseModel(3, {0: depolarizing_kraus(0.1), (0, 1): [np.eye(4)]})
+        with self.assertRaises(ValueError):
+            LocalNoiseModel(2, {0: [np.eye(4)]})
+
+    def test_uploaded_kraus_set(self):
+        # A global channel: a random unitary mixed with a bit flip on qubit 1
+        rng = np.random.default_rng(1)
+        unitary = np.linalg.qr(rng.normal(size=(8, 8)) + 1j * rng.normal(size=(8, 8)))[0]
+        flip = np.kron(np.kron(np.eye(2), [[0, 1], [1, 0]]), np.eye(2))
+        kraus = np.stack([np.sqrt(0.9) * unitary, np.sqrt(0.1) * flip])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "noise.npy")
+            np.save(path, kraus)
+            model = load_noise_model(path)
+            self.assertIs(load_noise_model(path), model)
+            np.save(path, 2 * kraus)
+            with self.assertRaises(ValueError):
+                load_noise_model(path)
+
+        self.assertEqual(list(model.kraus), [(0, 1, 2)])
+        self.assertEqual(model.superops, {})
+        self.assertTrue(model.trace_preserving)
+        self.assertFalse(model.is_noiseless())
+        rho = random_density_matrix(3)
+        expected = sum(k @ rho @ k.conj().T for k in kraus)
+        np.testing.assert_allclose(model.apply_channel(rho), expected, atol=1e-12)
+        np.testing.assert_allclose(
+            model.apply_channel(np.stack([rho, rho]))[1], expected, atol=1e-12
+        )
+        self.assertGreaterEqual(model.channel_norm_bound(), 1.0)
+
+        circuit = [self.create_layer([("H", 0), ("X", 2)], num_qubits=3)]
+        self.assertTrue(simulate_quantum_circuit(circuit, model)["success"])
+        self.assertTrue(LocalNoiseModel.from_kraus([np.eye(8)]).is_noiseless())
+
+    def test_fingerprint(self):
+        a = LocalNoiseModel.depolarizing(1e-2, 2)
+        b = LocalNoiseModel.depolarizing(1e-2, 2)
+        c = LocalNoiseModel.depolarizing(1e-3, 2)
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+        self.assertNotEqual(a.fingerprint(), c.fingerprint())
+
+    def test_local_engine_matches_mesolve(self):
+        model = LocalNoiseModel.depolarizing(1e-2, 2)
+        circuit = [
+            self.create_layer([("H", 0), ("S", 1)]),
+            self.create_layer([("CX", 0, 1)]),
+            self.create_layer([("T", 0)]),
+        ]
+        input_state = qt.ket2dm(qt.tensor(zero, one))
+        np.testing.assert_allclose(
+            rep_to_evolution(circuit, input_state, model).full(),
+            rep_to_evolution(
+                circuit, input_state, get_depolarizing_ops(1e-2, 2), engine="mesolve"
+            ).full(),
+            atol=self.atol,
+            rtol=self.rtol,
+        )
+
+        with self.assertRaises(ValueError):
+            rep_to_evolution(
+                circuit, input_state, get_depolarizing_ops(1e-2, 2), engine="local"
+            )
+
+    def test_simulate_accepts_local_model(self):
+        circuit = [self.create_layer([("H", 0), ("X", 1)])]
+        result = simulate_quantum_circuit(circuit, LocalNoiseModel.depolarizing(1e-3, 2))
+        self.assertTrue(result["success"])
+
+        result = simulate_quantum_circuit(circuit, LocalNoiseModel.depolarizing(1e-3, 3))
+        self.assertFalse(result["success"])
+        self.assertIn("Noise model is defined for 3 qubits", result["error"])
+
+    def test_batched_model_matches_individual_models(self):
+        rho = random_density_matrix(2)
+        probabilities = [0.0, 1e-2, 0.2]
+        batched = LocalNoiseModel.depolarizing(probabilities, 2)
+        self.assertEqual(batched.batch_size, 3)
+        stacked = LocalNoiseModel.stack(
+            [LocalNoiseModel.depolarizing(p, 2) for p in probabilities]
+        )
+        rho_batch = np.stack([rho] * 3)
+        for model in (batched, stacked):
+            result = model.dissipator(rho_batch)
+            for i, p in enumerate(probabilities):
+                np.testing.assert_allclose(
+                    result[i],
+                    LocalNoiseModel.depolarizing(p, 2).dissipator(rho),
+                    atol=1e-12,
+                )
+        with self.assertRaises(ValueError):
+            batched.to_c_ops()
+
+    def test_noise_sweep_matches_individual_runs(self):
+        circuit = [
+            self.create_layer([("H", 0), ("T", 1)]),
+            self.create_layer([("CX", 0, 1)]),
+        ]
+        probabilities = [0.0, 1e-2, 5e-2]
+        states = simulate_noise_sweep(circuit, noise_params=probabilities)
+        self.assertEqual(states.shape, (3, 4, 4))
+
+        input_state = qt.ket2dm(qt.tensor(zero, zero))
+        for state, p in zip(states, probabilities):
+            np.testing.assert_allclose(
+                state,
+                rep_to_evolution(
+                    circuit, input_state, LocalNoiseModel.depolarizing(p, 2)
+                ).full(),
+                atol=1e-10,
+            )
+
+        # Kraus sets of different lengths are padded into one batch
+        bit_flip = [np.sqrt(0.9) * np.eye(2), np.sqrt(0.1) * np.array([[0, 1], [1, 0]])]
+        states = simulate_noise_sweep(
+            circuit, kraus_sets=[bit_flip, depolarizing_kraus(1e-2)]
+        )
+        np.testing.assert_allclose(states[1], simulate_noise_sweep(circuit, [1e-2])[0])
+        np.testing.assert_allclose(np.trace(states, axis1=1, axis2=2), [1, 1])
+
+        with self.assertRaises(ValueError):
+            simulate_noise_sweep(circuit)
+        with self.assertRaises(ValueError):
+            simulate_noise_sweep(circuit, [1.5])
+        with self.assertRaises(ValueError):
+            simulate_noise_sweep(circuit, [1e-2], engine="mesolve")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from pauli_frames import sample_pauli_frames
+
+
+class TestPauliFrames(unittest.TestCase):
+    def create_layer(self, gates, num_qubits=3):
+        return {"numRows": num_qubits, "gates": gates}
+
+    def setUp(self):
+        self.circuit = [
+            self.create_layer([("H", 0), ("S", 1)]),
+            self.create_layer([("CX", 0, 1), ("X", 2)]),
+            self.create_layer([("H", 1), ("Z", 2)]),
+        ]
+
+    def test_deterministic_errors(self):
+        circuit = [{"type": "error", "gates": [("X", 0), ("Y", 2)]}] + self.circuit
+        result = sample_pauli_frames(circuit, {}, num_shots=1003, batch_shots=500)
+        # X0 -> Z0 (H) -> Z0 (CX); Y2 is unchanged by the Pauli gates
+        self.assertEqual(result["histogram"], {"ZIY": 1003})
+        self.assertEqual(result["error_rate"], 1.0)
+        self.assertEqual(result["qubit_error_rates"], [1.0, 0.0, 1.0])
+
+    def test_sampled_errors_match_exact_rates(self):
+        num_shots = 200000
+        result = sample_pauli_frames(
+            self.circuit,
+            {"H": (0.02, 0.0, 0.0), "X": 0.3},
+            num_shots=num_shots,
+            qubits=[0, 1],
+            batch_shots=65531,
+            seed=5,
+        )
+        # X after the first H on qubit 0 spreads to X0 X1, then H turns X1 into Z1;
+        # X after the second H on qubit 1 stays X1
+        expected = {
+            "II": 0.98 * 0.98,
+            "XZ": 0.02 * 0.98,
+            "IX": 0.98 * 0.02,
+            "XY": 0.02 * 0.02,
+        }
+        self.assertEqual(sum(result["histogram"].values()), num_shots)
+        self.assertEqual(set(result["histogram"]), set(expected))
+        for label, p in expected.items():
+            stderr = np.sqrt(p * (1 - p) / num_shots)
+            self.assertLess(abs(result["histogram"][label] / num_shots - p), 5 * stderr)
+
+        full = sample_pauli_frames(self.circuit, {"X": 0.3}, num_shots=num_shots, seed=6)
+        # Depolarizing noise after X on qubit 2: X or Y survive the Z gate as errors
+        self.assertAlmostEqual(full["qubit_error_rates"][2], 0.3, delta=0.01)
+        self.assertEqual(full["qubit_error_rates"][:2], [0.0, 0.0])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            sample_pauli_frames([self.create_layer([("T", 0)])], {})
+        with self.assertRaises(ValueError):
+            sample_pauli_frames(self.circuit, {"H": (0.5, 0.5, 0.5)})
+        with self.assertRaises(ValueError):
+            sample_pauli_frames(self.circuit, {}, qubits=[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
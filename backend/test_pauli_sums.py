@@ -0,0 +1,110 @@
+import unittest
+import numpy as np
+from pauli_sums import PauliSum, propagate_error_sum
+from pauli_tableau import propagate_all_error_layers
+from test_pauli_tableau import random_circuit
+
+SINGLE_QUBIT_GATES = {
+    "I": np.eye(2),
+    "X": np.array([[0, 1], [1, 0]]),
+    "Y": np.array([[0, -1j], [1j, 0]]),
+    "Z": np.diag([1, -1]),
+    "H": np.array([[1, 1], [1, -1]]) / np.sqrt(2),
+    "S": np.diag([1, 1j]),
+    "SDG": np.diag([1, -1j]),
+    "T": np.diag([1, np.exp(1j * np.pi / 4)]),
+    "TDG": np.diag([1, np.exp(-1j * np.pi / 4)]),
+}
+
+
+def gate_matrix(gate, num_qubits):
+    """Dense unitary of one gate, qubit 0 most significant."""
+    dim = 2**num_qubits
+    if gate[0] == "CX":
+        control, target = gate[1:]
+        matrix = np.zeros((dim, dim))
+        for basis in range(dim):
+            bits = [(basis >> (num_qubits - 1 - q)) & 1 for q in range(num_qubits)]
+            bits[target] ^= bits[control]
+            matrix[int("".join(map(str, bits)), 2), basis] = 1
+        return matrix
+    matrix = np.eye(1)
+    for q in range(num_qubits):
+        matrix = np.kron(matrix, SINGLE_QUBIT_GATES[gate[0]] if q == gate[1] else np.eye(2))
+    return matrix
+
+
+def dense_error(circuit, num_qubits):
+    """Exact error operator at the end of the circuit."""
+    error = np.eye(2**num_qubits, dtype=complex)
+    for layer in circuit:
+        for gate in layer["gates"]:
+            matrix = gate_matrix(gate, num_qubits)
+            if layer["type"] == "error":
+                error = matrix @ error
+            else:
+                error = matrix @ error @ matrix.conj().T
+    return error
+
+
+class TestPauliSums(unittest.TestCase):
+    def test_error_products_keep_phase(self):
+        pauli_sum = PauliSum.from_errors([("X", 0), ("Z", 0), ("Y", 1), ("Y", 1)], 2)
+        self.assertEqual(pauli_sum.terms(), [(1j, "YI")])
+
+    def test_gates_match_dense_conjugation(self):
+        rng = np.random.default_rng(3)
+        gate_names = ["H", "S", "SDG", "T", "TDG", "X", "Y", "Z", "I"]
+        for _ in range(10):
+            circuit = []
+            for _ in range(8):
+                if rng.random() < 0.3:
+                    qubit = int(rng.integers(3))
+                    circuit.append({"type": "error", "gates": [(str(rng.choice(["X", "Y", "Z"])), qubit)]})
+                elif rng.random() < 0.4:
+                    control, target = rng.choice(3, size=2, replace=False)
+                    circuit.append({"type": "normal", "gates": [("CX", int(control), int(target))]})
+                else:
+                    gates = [(str(rng.choice(gate_names)), q) for q in range(3)]
+                    circuit.append({"type": "normal", "gates": gates})
+            circuit.insert(0, {"type": "error", "gates": [("X", 0), ("Y", 2)]})
+
+            result = propagate_error_sum(circuit)
+            np.testing.assert_allclose(result.to_matrix(), dense_error(circuit, 3), atol=1e-12)
+            self.assertEqual(result.discarded_weight, 0.0)
+
+    def test_clifford_circuits_match_tableau(self):
+        rng = np.random.default_rng(4)
+        for _ in range(10):
+            circuit = random_circuit(rng, 5, 10)
+            circuit = [
+                {"type": layer["type"], "gates": [g for g in layer["gates"] if g[0] != "T"]}
+                for layer in circuit
+            ]
+            if not any(layer["type"] == "error" for layer in circuit):
+                continue
+            expected = propagate_all_error_layers(circuit)[-1]["gates"]
+            [(coefficient, label)] = propagate_error_sum(circuit).terms()
+            self.assertAlmostEqual(abs(coefficient), 1.0)
+            self.assertEqual([(p, q) for q, p in enumerate(label) if p != "I"], expected)
+
+    def test_term_bound(self):
+        num_qubits = 6
+        circuit = [{"type": "error", "gates": [("X", q) for q in range(num_qubits)]}]
+        circuit += [{"type": "normal", "gates": [("T", q) for q in range(num_qubits)]}] * 2
+        result = propagate_error_sum(circuit, max_terms=10)
+        self.assertEqual(result.num_terms, 10)
+        self.assertGreater(result.discarded_weight, 0)
+
+        # Two T gates make S: X -> Y on every qubit, without truncation
+        exact = propagate_error_sum(circuit)
+        self.assertEqual(len(exact.terms()), 1)
+        self.assertAlmostEqual(exact.terms()[0][0], 1.0)
+        self.assertEqual(exact.terms()[0][1], "Y" * num_qubits)
+
+        with self.assertRaises(ValueError):
+            PauliSum.identity(1).apply_gate(("RX", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
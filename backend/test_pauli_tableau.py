@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+from error_propagation import (
+    ErrorLayer,
+    Layer,
+    propagate_error_layer_through_layer,
+    simplify_propagated_errors,
+)
+from error_step_propagator import propagate_first_error_layer
+from pauli_tableau import (
+    CliffordLayer,
+    bits_to_errors,
+    errors_to_bits,
+    propagate_all_error_layers,
+)
+
+
+def random_circuit(rng, num_qubits, num_layers, error_rate=0.3):
+    """Random circuit of H/S/CX/Pauli/T layers interleaved with error layers."""
+    circuit = []
+    for _ in range(num_layers):
+        qubits = list(rng.permutation(num_qubits))
+        if rng.random() < error_rate:
+            gates = [(str(rng.choice(["X", "Y", "Z"])), int(q)) for q in qubits[: rng.integers(1, 3)]]
+            circuit.append({"type": "error", "gates": gates})
+            continue
+        gates = []
+        while qubits:
+            if len(qubits) >= 2 and rng.random() < 0.3:
+                gates.append(("CX", int(qubits.pop()), int(qubits.pop())))
+            else:
+                gates.append((str(rng.choice(["H", "S", "X", "Y", "Z", "T", "I"])), int(qubits.pop())))
+        circuit.append({"type": "normal", "gates": gates})
+    return circuit
+
+
+def step_by_step_errors(circuit, num_qubits):
+    """Final errors from the gate-by-gate rules of error_propagation."""
+    errors = []
+    for layer in circuit:
+        if layer["type"] == "error":
+            errors = simplify_propagated_errors(errors + layer["gates"])
+        else:
+            errors = propagate_error_layer_through_layer(
+                ErrorLayer(errors, num_qubits), Layer(layer["gates"], num_qubits)
+            ).gates
+    return sorted(errors, key=lambda error: error[1])
+
+
+class TestPauliTableau(unittest.TestCase):
+    def test_layer_updates(self):
+        x, z = errors_to_bits([("X", 0), ("Y", 1), ("Z", 2), ("X", 3)], 5)
+        CliffordLayer([("H", 0), ("S", 1), ("CX", 2, 3), ("T", 4)]).apply(x, z)
+        self.assertEqual(bits_to_errors(x, z), [("Z", 0), ("X", 1), ("Z", 2), ("X", 3)])
+
+        with self.assertRaises(ValueError):
+            CliffordLayer([("H", 0), ("CX", 0, 1)])
+        with self.assertRaises(ValueError):
+            CliffordLayer([("RX", 0)])
+
+    def test_matches_step_propagator(self):
+        circuit = [
+            {"type": "error", "gates": [("X", 0), ("Z", 1)]},
+            {"type": "normal", "gates": [("H", 0), ("S", 1)]},
+            {"type": "normal", "gates": [("CX", 0, 1)]},
+            {"type": "normal", "gates": [("S", 0), ("H", 1)]},
+        ]
+        stepped = circuit
+        while stepped[-1]["type"] != "error":
+            stepped = propagate_first_error_layer(stepped)
+
+        result = propagate_all_error_layers(circuit)
+        self.assertEqual(result[:-1], stepped[:-1])
+        self.assertEqual(result[-1]["gates"], sorted(stepped[-1]["gates"], key=lambda e: e[1]))
+
+        # Error layers without gates propagate to an empty error layer
+        empty = [{"type": "error", "gates": []}]
+        self.assertEqual(propagate_all_error_layers(empty), empty)
+        self.assertEqual(
+            propagate_all_error_layers(empty + [{"type": "normal", "gates": []}]),
+            [{"type": "normal", "gates": []}] + empty,
+        )
+
+    def test_random_circuits_match_rules(self):
+        rng = np.random.default_rng(11)
+        for _ in range(20):
+            num_qubits = int(rng.integers(2, 7))
+            circuit = random_circuit(rng, num_qubits, int(rng.integers(1, 15)))
+            result = propagate_all_error_layers(circuit)
+            if not any(layer["type"] == "error" for layer in circuit):
+                self.assertEqual(result, circuit)
+                continue
+            self.assertEqual(
+                result[:-1], [layer for layer in circuit if layer["type"] != "error"]
+            )
+            self.assertEqual(result[-1]["type"], "error")
+            self.assertEqual(result[-1]["gates"], step_by_step_errors(circuit, num_qubits))
+
+
+if __name__ == "__main__":
+    unittest.main()
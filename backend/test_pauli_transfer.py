@@ -0,0 +1,98 @@
+import unittest
+import numpy as np
+from noise_models import LocalNoiseModel, pauli_strings
+from pauli_transfer import PauliNoise, PauliTransferState
+from quantum_simulator import (
+    EVOLUTION_ENGINES,
+    evolve_density_matrix,
+    evolve_layers,
+    resolve_engine,
+)
+from test_layer_fusion import random_circuit
+from test_noise_models import random_density_matrix
+
+
+def ground_state(num_qubits):
+    rho = np.zeros((2**num_qubits, 2**num_qubits), dtype=complex)
+    rho[0, 0] = 1
+    return rho
+
+
+class TestPauliTransfer(unittest.TestCase):
+    def test_coefficients(self):
+        rho = random_density_matrix(3, seed=1)
+        state = PauliTransferState.from_dense(rho)
+        self.assertEqual(state.coefficients.shape, (4, 4, 4))
+        self.assertFalse(np.iscomplexobj(state.coefficients))
+        expected = np.einsum("aij,ji->a", pauli_strings(3), rho).real
+        np.testing.assert_allclose(state.coefficients.ravel(), expected, atol=1e-12)
+        self.assertAlmostEqual(state.trace(), 1)
+        np.testing.assert_allclose(state.to_dense(), rho, atol=1e-12)
+
+        # Non-Hermitian inputs keep complex coefficients
+        operator = rho + 1j * np.eye(8)
+        np.testing.assert_allclose(
+            PauliTransferState.from_dense(operator).to_dense(), operator, atol=1e-12
+        )
+
+    def test_noiseless_matches_tensor_engine(self):
+        rng = np.random.default_rng(4)
+        for num_qubits in (1, 2, 4):
+            for _ in range(5):
+                circuit = random_circuit(rng, num_qubits, 6)
+                expected = evolve_density_matrix(
+                    circuit, ground_state(num_qubits), None, engine="tensor"
+                )
+                actual = evolve_density_matrix(
+                    circuit, ground_state(num_qubits), None, engine="pauli"
+                )
+                np.testing.assert_allclose(actual, expected, atol=1e-10)
+
+        # Clifford gates are signed permutations of the coefficients
+        state = evolve_layers(
+            [{"numRows": 2, "gates": [("H", 0)]}, {"numRows": 2, "gates": [("CX", 0, 1)]}],
+            PauliTransferState.from_dense(ground_state(2)),
+            None,
+            *EVOLUTION_ENGINES["pauli"],
+        )
+        self.assertEqual(
+            sorted(np.round(state.coefficients.ravel(), 12)), [-1] + [0] * 12 + [1, 1, 1]
+        )
+
+    def test_noisy_matches_local_engine(self):
+        rng = np.random.default_rng(5)
+        dephasing = [np.sqrt(0.9) * np.eye(2), np.sqrt(0.1) * np.diag([1, -1])]
+        correlated = [
+            np.sqrt(0.95) * np.eye(4),
+            np.sqrt(0.05) * np.kron(np.diag([1, -1]), [[0, 1], [1, 0]]),
+        ]
+        models = [
+            LocalNoiseModel.depolarizing(0.05, 3),
+            # Not symmetric under H, so windows with H factors are integrated
+            LocalNoiseModel.uniform(dephasing, 3),
+            LocalNoiseModel(3, {(2, 0): correlated, 1: dephasing}),
+        ]
+        for model in models:
+            for _ in range(4):
+                circuit = random_circuit(rng, 3, 6)
+                expected = evolve_density_matrix(circuit, ground_state(3), model, engine="local")
+                actual = evolve_density_matrix(circuit, ground_state(3), model, engine="pauli")
+                np.testing.assert_allclose(actual, expected, atol=1e-9, err_msg=repr(model))
+
+    def test_engine_resolution(self):
+        depolarizing = LocalNoiseModel.depolarizing(1e-2, 2)
+        engine, noise = resolve_engine("auto", depolarizing)
+        self.assertEqual(engine, "pauli")
+        self.assertIsInstance(noise, PauliNoise)
+        self.assertIs(resolve_engine("pauli", depolarizing)[1], noise)
+        self.assertEqual(resolve_engine("pauli", None), ("pauli", None))
+
+        amplitude_damping = [[[1, 0], [0, np.sqrt(0.9)]], [[0, np.sqrt(0.1)], [0, 0]]]
+        model = LocalNoiseModel.uniform(amplitude_damping, 2)
+        self.assertEqual(resolve_engine("auto", model)[0], "local")
+        with self.assertRaises(ValueError):
+            resolve_engine("pauli", model)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+from noise_models import LocalNoiseModel
+from prefix_cache import PrefixStateCache, prefix_hashes
+from profiling import Profiler
+from quantum_simulator import (
+    clear_prefix_cache,
+    evolve_density_matrix,
+    evolve_from_cached_prefix,
+    prefix_cache_info,
+    simulate_quantum_circuit,
+)
+from test_layer_fusion import random_circuit
+
+
+class TestPrefixStateCache(unittest.TestCase):
+    def setUp(self):
+        self.circuit = random_circuit(np.random.default_rng(5), 3, 6)
+        self.noise_model = LocalNoiseModel.depolarizing(1e-2, 3)
+        self.rho = np.zeros((8, 8), dtype=complex)
+        self.rho[0, 0] = 1
+
+    def test_prefix_hashes(self):
+        hashes = prefix_hashes(self.circuit, "local")
+        self.assertEqual(len(hashes), len(self.circuit) + 1)
+        self.assertNotEqual(hashes[0], prefix_hashes(self.circuit, "mesolve")[0])
+
+        # Reordering a run and adding an empty layer keep the prefix
+        edited = [{"numRows": 3, "gates": []}] + [
+            {"numRows": 3, "gates": [["X", 1], ["Z", 0]]}
+        ]
+        reference = [{"numRows": 3, "gates": [["Z", 0], ["X", 1]]}]
+        self.assertEqual(
+            prefix_hashes(edited, "local")[-1], prefix_hashes(reference, "local")[-1]
+        )
+
+    def test_resumes_from_longest_prefix(self):
+        cache = PrefixStateCache()
+        expected = evolve_density_matrix(self.circuit, self.rho, self.noise_model)
+        first = evolve_from_cached_prefix(self.circuit, self.rho, self.noise_model, cache=cache)
+        np.testing.assert_allclose(first, expected, atol=1e-12)
+        self.assertEqual(len(cache), len(self.circuit))
+
+        # Editing the last layer only evolves that layer
+        edited = self.circuit[:-1] + [{"numRows": 3, "gates": [["H", 2]]}]
+        with Profiler(memory=False) as profiler:
+            second = evolve_from_cached_prefix(
+                edited, self.rho, self.noise_model, cache=cache, profiler=profiler
+            )
+        [lookup] = [span for span in profiler.spans if span["name"] == "prefix_lookup"]
+        self.assertEqual(lookup["cached_layers"], len(self.circuit) - 1)
+        self.assertEqual(len(profiler.summary()["layers"]), 1)
+        np.testing.assert_allclose(
+            second, evolve_density_matrix(edited, self.rho, self.noise_model), atol=1e-12
+        )
+
+        # A different noise model shares nothing
+        other = LocalNoiseModel.depolarizing(2e-2, 3)
+        size = len(cache)
+        third = evolve_from_cached_prefix(edited, self.rho, other, cache=cache)
+        np.testing.assert_allclose(
+            third, evolve_density_matrix(edited, self.rho, other), atol=1e-12
+        )
+        self.assertEqual(len(cache), size + len(edited))
+
+    def test_evicts_by_bytes(self):
+        cache = PrefixStateCache(max_bytes=3 * self.rho.nbytes)
+        evolve_from_cached_prefix(self.circuit, self.rho, self.noise_model, cache=cache)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.info()["nbytes"], 3 * self.rho.nbytes)
+        # The most recent states, i.e. the longest prefixes, are kept
+        edited = self.circuit[:-1] + [{"numRows": 3, "gates": [["H", 2]]}]
+        with Profiler(memory=False) as profiler:
+            evolve_from_cached_prefix(
+                edited, self.rho, self.noise_model, cache=cache, profiler=profiler
+            )
+        [lookup] = [span for span in profiler.spans if span["name"] == "prefix_lookup"]
+        self.assertEqual(lookup["cached_layers"], len(self.circuit) - 1)
+
+    def test_simulation_cache_is_opt_in(self):
+        clear_prefix_cache()
+        self.assertTrue(simulate_quantum_circuit(self.circuit, output="data")["success"])
+        self.assertEqual(prefix_cache_info()["size"], 0)
+
+        simulate_quantum_circuit(self.circuit, output="data", use_prefix_cache=True)
+        self.assertEqual(prefix_cache_info()["size"], len(self.circuit))
+        clear_prefix_cache()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from profiling import LAYER, NULL_PROFILER, Profiler
+from quantum_simulator import simulate_quantum_circuit
+
+
+class TestProfiling(unittest.TestCase):
+    def test_nested_spans(self):
+        with Profiler() as profiler:
+            with profiler.span("outer"):
+                with profiler.span("inner", LAYER, index=0):
+                    data = np.ones(1 << 20)
+                del data
+        profile = profiler.summary()
+        [outer] = profile["stages"]
+        [inner] = profile["layers"]
+        self.assertEqual((outer["depth"], inner["depth"], inner["index"]), (0, 1, 0))
+        self.assertGreaterEqual(inner["allocated_bytes"], 8 << 20)
+        # The inner peak is also the outer peak, although the array was freed
+        self.assertGreaterEqual(outer["peak_bytes"], 8 << 20)
+        self.assertLess(outer["allocated_bytes"], 1 << 20)
+        self.assertGreaterEqual(outer["wall_seconds"], inner["wall_seconds"])
+
+        with NULL_PROFILER.span("ignored"):
+            pass
+        NULL_PROFILER.close()
+
+    def test_simulation_profile(self):
+        circuit = [
+            {"numRows": 2, "gates": [["H", 0]]},
+            {"numRows": 2, "gates": [["CX", 0, 1]]},
+            {"numRows": 2, "gates": [["X", 0], ["Z", 1]]},
+        ]
+        self.assertNotIn("profile", simulate_quantum_circuit(circuit, output="data"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            trace_path = os.path.join(directory, "trace.json")
+            result = simulate_quantum_circuit(circuit, trace_path=trace_path)
+            with open(trace_path) as f:
+                trace = json.load(f)
+
+        self.assertTrue(result["success"])
+        profile = result["profile"]
+        self.assertEqual(
+            [stage["name"] for stage in profile["stages"]],
+            [
+                "validation",
+                "initial_state",
+                "noise_model",
+                "evolution",
+                "resolve_engine",
+                "render",
+            ],
+        )
+        self.assertEqual([layer["index"] for layer in profile["layers"]], [0, 1, 2])
+        for layer in profile["layers"]:
+            self.assertEqual((layer["num_c_ops"], layer["hilbert_dim"]), (8, 4))
+            self.assertGreaterEqual(layer["cpu_seconds"], 0)
+        self.assertEqual(len(trace["traceEvents"]), 9)
+        self.assertEqual({event["ph"] for event in trace["traceEvents"]}, {"X"})
+
+
+if __name__ == "__main__":
+    unittest.main()
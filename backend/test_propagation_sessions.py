@@ -0,0 +1,69 @@
+import json
+import unittest
+from error_step_propagator import propagate_first_error_layer
+from propagation_sessions import PropagationSession, PropagationSessionStore
+
+
+def as_json(circuit):
+    """Drops extra keys and tuple/list differences, as the UI sees the circuit."""
+    return json.loads(json.dumps([{"type": l["type"], "gates": l["gates"]} for l in circuit]))
+
+
+class TestPropagationSessions(unittest.TestCase):
+    def setUp(self):
+        self.circuit = [
+            {"type": "normal", "gates": [("H", 0)], "numRows": 3},
+            {"type": "error", "gates": [("X", 0), ("Z", 2)], "numRows": 3},
+            {"type": "normal", "gates": [("CX", 0, 1), ("S", 2)], "numRows": 3},
+            {"type": "error", "gates": [("Y", 1)], "numRows": 3},
+            {"type": "normal", "gates": [("H", 1), ("H", 2)], "numRows": 3},
+            {"type": "normal", "gates": [], "numRows": 3},
+            {"type": "normal", "gates": [("X", 0)], "numRows": 3},
+        ]
+
+    def test_steps_match_step_propagator(self):
+        session = PropagationSession(self.circuit)
+        expected = self.circuit
+        for _ in range(8):
+            expected = propagate_first_error_layer(expected)
+            session.step()
+            self.assertEqual(session.circuit(), as_json(expected))
+
+    def test_trajectory_and_diffs(self):
+        session = PropagationSession(self.circuit)
+        trajectory = session.trajectory()
+        self.assertEqual([len(step["changes"]) for step in trajectory], [2] * len(trajectory))
+        self.assertEqual(session.step(), [])
+
+        replay = PropagationSession(self.circuit)
+        for step in trajectory:
+            self.assertEqual(replay.changes(replay.step()), step["changes"])
+
+        # An error added before the cursor is found again
+        session.apply_diff([{"op": "insert", "index": 0, "layer": {"type": "error", "gates": [["Z", 0]]}}])
+        self.assertEqual(session.step(), [0, 1])
+        self.assertEqual(session.circuit()[1], {"type": "error", "gates": [["X", 0]]})
+
+        session.apply_diff([{"op": "delete", "index": 1}, {"op": "set", "index": 0, "layer": self.circuit[0]}])
+        layer_types = [layer["type"] for layer in session.circuit()]
+        self.assertEqual(session.first_error_index(), layer_types.index("error"))
+        with self.assertRaises(ValueError):
+            session.apply_diff([{"op": "set", "index": 99, "layer": self.circuit[0]}])
+        with self.assertRaises(ValueError):
+            session.apply_diff([{"op": "move", "index": 0}])
+
+    def test_session_store(self):
+        store = PropagationSessionStore(max_sessions=2)
+        first = store.create(self.circuit)
+        second = store.create(self.circuit)
+        store.get(first)
+        store.create(self.circuit)
+        self.assertEqual(len(store), 2)
+        with self.assertRaises(KeyError):
+            store.get(second)
+        self.assertTrue(store.close(first))
+        self.assertFalse(store.close(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
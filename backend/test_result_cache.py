@@ -0,0 +1,84 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+import result_cache
+from result_cache import cached_simulation, canonicalize_circuit, simulation_cache_key
+from quantum_simulator import buffer_to_matrix, simulate_quantum_circuit
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        os.environ["SIMULATION_CACHE_DIR"] = self.directory.name
+        result_cache._result_cache = None
+
+    def tearDown(self):
+        del os.environ["SIMULATION_CACHE_DIR"]
+        result_cache._result_cache = None
+        self.directory.cleanup()
+
+    def create_layer(self, gates, num_qubits=3):
+        return {"numRows": num_qubits, "gates": gates}
+
+    def test_canonical_form(self):
+        circuit = [
+            self.create_layer([["X", 2], ["I", 0], ["H", 1]]),
+            self.create_layer([]),
+            self.create_layer([["Z", 2], ["CX", 0, 1]]),
+            self.create_layer([["I", 2], ["X", 0]]),
+        ]
+        self.assertEqual(
+            canonicalize_circuit(circuit),
+            {
+                "num_qubits": 3,
+                "layers": [
+                    [["H", 1], ["X", 2]],
+                    [["Z", 2], ["CX", 0, 1]],
+                    # The last gate of a run sets its scaling and is kept
+                    [["X", 0], ["I", 2]],
+                ],
+            },
+        )
+
+    def test_equivalent_circuits_simulate_identically(self):
+        circuit = [self.create_layer([["T", 2], ["I", 0], ["H", 1]]), self.create_layer([])]
+        equivalent = [self.create_layer([["H", 1], ["T", 2]])]
+        self.assertEqual(simulation_cache_key(circuit), simulation_cache_key(equivalent))
+        np.testing.assert_allclose(
+            buffer_to_matrix(simulate_quantum_circuit(circuit, output="data")["density_matrix"]),
+            buffer_to_matrix(simulate_quantum_circuit(equivalent, output="data")["density_matrix"]),
+            atol=1e-12,
+        )
+
+        self.assertNotEqual(
+            simulation_cache_key(circuit), simulation_cache_key(circuit, b"noise")
+        )
+        self.assertNotEqual(
+            simulation_cache_key(circuit, engine="auto"),
+            simulation_cache_key(circuit, engine="mesolve"),
+        )
+
+    def test_cached_simulation(self):
+        calls = []
+
+        def simulate():
+            calls.append(1)
+            return {"success": True, "plot_image": "png"}
+
+        circuit = [self.create_layer([["X", 0]])]
+        for _ in range(3):
+            self.assertEqual(
+                cached_simulation(circuit, None, simulate, engine="auto"),
+                {"success": True, "plot_image": "png"},
+            )
+        self.assertEqual(len(calls), 1)
+
+        # Failures are not cached
+        failing = lambda: {"success": False, "error": "boom"}
+        cached_simulation([self.create_layer([["Y", 0]])], None, failing)
+        self.assertEqual(result_cache.get_result_cache().info()["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+import unittest
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+import urllib.error
+import result_cache
+from simulation_server import SimulationServer
+
+
+def sleep_job(payload):
+    time.sleep(payload["seconds"])
+    return {"success": True}
+
+
+def crash_job(payload):
+    os._exit(1)
+
+
+class TestSimulationServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Keep results of the test run out of the real cache directory
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        os.environ["SIMULATION_CACHE_DIR"] = cls.cache_dir.name
+        result_cache._result_cache = None
+        cls.server = SimulationServer(("127.0.0.1", 0), workers=1, timeout=60.0)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        del os.environ["SIMULATION_CACHE_DIR"]
+        result_cache._result_cache = None
+        cls.cache_dir.cleanup()
+
+    def post(self, path, body):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_health(self):
+        with urllib.request.urlopen(self.base_url + "/health") as response:
+            self.assertEqual(json.loads(response.read())["status"], "ok")
+
+    def test_propagate(self):
+        circuit = [
+            {"type": "error", "gates": [["X", 0]]},
+            {"type": "normal", "gates": [["H", 0]]},
+        ]
+        status, body = self.post("/propagate", {"circuit_ir": circuit})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["data"][1]["gates"], [["Z", 0]])
+
+    def test_propagation_session(self):
+        circuit = [
+            {"type": "error", "gates": [["X", 0]]},
+            {"type": "normal", "gates": [["H", 0]]},
+            {"type": "normal", "gates": [["CX", 0, 1]]},
+        ]
+        status, body = self.post("/propagate/session", {"circuit_ir": circuit})
+        self.assertEqual(status, 200)
+        session_id = body["session_id"]
+
+        status, body = self.post("/propagate/step", {"session_id": session_id})
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            body["changes"],
+            [
+                {"index": 0, "layer": {"type": "normal", "gates": [["H", 0]]}},
+                {"index": 1, "layer": {"type": "error", "gates": [["Z", 0]]}},
+            ],
+        )
+
+        status, body = self.post("/propagate/trajectory", {"session_id": session_id})
+        self.assertEqual(len(body["steps"]), 1)
+        self.assertEqual(body["data"][2], {"type": "error", "gates": [["Z", 0]]})
+
+        status, body = self.post("/propagate/close", {"session_id": session_id})
+        self.assertTrue(body["closed"])
+        status, _ = self.post("/propagate/step", {"session_id": session_id})
+        self.assertEqual(status, 404)
+
+    def test_simulate(self):
+        circuit = [{"numRows": 1, "gates": [["X", 0]]}]
+        status, body = self.post(
+            "/simulate", {"circuit_ir": circuit, "engine": "propagator"}
+        )
+        self.assertEqual(status, 200)
+        self.assertTrue(body["success"])
+        self.assertIn("plot_image", body)
+
+        # The repeated request is served from the result cache
+        hits = result_cache.get_result_cache().hits
+        status, cached = self.post(
+            "/simulate", {"circuit_ir": circuit, "engine": "propagator"}
+        )
+        self.assertEqual(cached, body)
+        self.assertEqual(result_cache.get_result_cache().hits, hits + 1)
+
+        status, body = self.post(
+            "/simulate", {"circuit_ir": [{"numRows": 1, "gates": [["BAD", 0]]}]}
+        )
+        self.assertEqual(status, 200)
+        self.assertFalse(body["success"])
+
+    def test_simulate_stream(self):
+        circuit = [
+            {"numRows": 2, "gates": [["H", 0]]},
+            {"numRows": 2, "gates": [["CX", 0, 1]]},
+        ]
+        request = urllib.request.Request(
+            self.base_url + "/simulate/stream",
+            data=json.dumps({"circuit_ir": circuit, "reductions": ["purity"]}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+            events = [
+                json.loads(line[len("data: ") :])
+                for line in response.read().decode("utf-8").splitlines()
+                if line.startswith("data: ")
+            ]
+        self.assertEqual([event.get("layer") for event in events], [0, 1, None])
+        self.assertLess(events[1]["purity"], events[0]["purity"])
+        self.assertEqual(events[-1], {"success": True, "done": True, "num_layers": 2})
+
+    def test_invalid_requests(self):
+        status, _ = self.post("/unknown", {"circuit_ir": []})
+        self.assertEqual(status, 404)
+        status, body = self.post("/simulate", {})
+        self.assertEqual(status, 400)
+        self.assertIn("No circuit IR provided", body["error"])
+        for path in ("/simulate", "/propagate/step"):
+            status, body = self.post(path, [])
+            self.assertEqual(status, 400)
+            self.assertIn("JSON object", body["error"])
+
+
+class TestSimulationServerTimeout(unittest.TestCase):
+    def test_timed_out_job_keeps_its_slot(self):
+        server = SimulationServer(("127.0.0.1", 0), workers=1, timeout=0.5, max_queue=0)
+        try:
+            # Wait for the warm worker so the timeout covers the job only
+            server.executor.submit(sleep_job, {"seconds": 0}).result()
+            status, _ = server.submit(sleep_job, {"seconds": 2})
+            self.assertEqual(status, 504)
+            # The timed out job still runs in the only worker, which stays taken
+            status, body = server.submit(sleep_job, {"seconds": 0})
+            self.assertEqual(status, 503)
+            self.assertIn("busy", body["error"])
+
+            time.sleep(2)
+            self.assertEqual(server.submit(sleep_job, {"seconds": 0})[0], 200)
+        finally:
+            server.server_close()
+
+    def test_dead_worker_restarts_pool(self):
+        server = SimulationServer(("127.0.0.1", 0), workers=1, timeout=30.0)
+        try:
+            status, _ = server.submit(crash_job, {})
+            self.assertEqual(status, 500)
+            self.assertEqual(server.submit(sleep_job, {"seconds": 0}), (200, {"success": True}))
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
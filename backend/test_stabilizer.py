@@ -0,0 +1,154 @@
+import unittest
+import numpy as np
+from noise_models import LocalNoiseModel, depolarizing_kraus
+from quantum_simulator import (
+    evolve_density_matrix,
+    gate_windows,
+    simulate_quantum_circuit,
+    simulate_stabilizer,
+    supports_stabilizer,
+)
+from stabilizer import CliffordWindow, StabilizerTableau
+from test_layer_fusion import random_circuit
+
+
+class TestStabilizer(unittest.TestCase):
+    def create_layer(self, gates, num_qubits=3):
+        return {"numRows": num_qubits, "gates": gates}
+
+    def initial_state(self, num_qubits):
+        rho = np.zeros((2**num_qubits, 2**num_qubits), dtype=complex)
+        rho[0, 0] = 1
+        return rho
+
+    def test_matches_dense_engine(self):
+        rng = np.random.default_rng(0)
+        checked = 0
+        while checked < 20:
+            num_qubits = int(rng.integers(1, 5))
+            circuit = random_circuit(rng, num_qubits, 5)
+            if not supports_stabilizer(circuit, LocalNoiseModel(num_qubits, {})):
+                continue
+            tableau = StabilizerTableau(num_qubits)
+            for window in gate_windows(circuit):
+                CliffordWindow(*window, num_qubits).apply_tableau(tableau)
+            expected = evolve_density_matrix(
+                circuit, self.initial_state(num_qubits), None, engine="tensor"
+            )
+            np.testing.assert_allclose(tableau.to_density_matrix(), expected, atol=1e-9)
+
+            # The affine form reproduces the exact outcome distribution
+            constant, basis = tableau.measurement_form()
+            distribution = np.zeros(2**num_qubits)
+            for bits in range(2 ** basis.shape[1]):
+                b = (bits >> np.arange(basis.shape[1])) & 1
+                outcome = constant ^ ((basis.astype(int) @ b) & 1).astype(bool)
+                distribution[int("".join("1" if v else "0" for v in outcome), 2)] += 1
+            np.testing.assert_allclose(
+                distribution / 2 ** basis.shape[1], np.real(np.diag(expected)), atol=1e-9
+            )
+            checked += 1
+
+    def test_bell_state(self):
+        circuit = [self.create_layer([("H", 0)], 2), self.create_layer([("CX", 0, 1)], 2)]
+        result = simulate_stabilizer(circuit, num_shots=2000, seed=1)
+        self.assertEqual(sorted(result["stabilizers"]), ["+XX", "+ZZ"])
+        self.assertEqual(result["random_bits"], 1)
+        self.assertEqual(set(result["histogram"]), {"00", "11"})
+        self.assertEqual(result["qubit_probabilities"], [0.5, 0.5])
+
+    def test_noisy_matches_local_engine(self):
+        # Single-qubit windows, whose depolarizing noise the frames sample exactly
+        circuit = [
+            self.create_layer([("H", 0)]),
+            self.create_layer([("Y", 1)]),
+            self.create_layer([("S", 0)]),
+            self.create_layer([("H", 1)]),
+            self.create_layer([("X", 2)]),
+            self.create_layer([("H", 0)]),
+        ]
+        model = LocalNoiseModel.depolarizing(0.1, 3)
+        # Enough shots to resolve a bias of 1e-3, like that of twirling a noisy CNOT pulse
+        num_shots = 2_000_000
+        result = simulate_stabilizer(circuit, model, num_shots=num_shots, seed=2)
+        self.assertFalse(result["approximate"])
+        probabilities = np.real(
+            np.diag(evolve_density_matrix(circuit, self.initial_state(3), model, engine="local"))
+        )
+        estimate = np.zeros(8)
+        for bits, count in result["histogram"].items():
+            estimate[int(bits, 2)] = count / num_shots
+        # Within five standard deviations of the sampled frequencies
+        bound = 5 * np.sqrt(probabilities * (1 - probabilities) / num_shots)
+        np.testing.assert_array_less(np.abs(estimate - probabilities), bound)
+
+    def test_noisy_pauli_windows(self):
+        # Depolarizing noise decays X I and X I . Z X = Y X at different rates, so
+        # twirling it during a CNOT pulse or a product window drops cross terms
+        model = LocalNoiseModel.depolarizing(0.1, 3)
+        for gates in ([("CX", 0, 1)], [("Z", 1), ("X", 2)]):
+            circuit = [self.create_layer([("Y", 0)]), self.create_layer(gates)]
+            self.assertTrue(simulate_stabilizer(circuit, model, num_shots=16, seed=0)["approximate"])
+            self.assertFalse(supports_stabilizer(circuit, model))
+            self.assertTrue(supports_stabilizer(circuit, LocalNoiseModel(3, {})))
+        # Noise on qubits outside the window does not matter
+        circuit = [self.create_layer([("CX", 0, 1)])]
+        model = LocalNoiseModel(3, {(2,): depolarizing_kraus(0.1)})
+        self.assertTrue(supports_stabilizer(circuit, model))
+
+    def test_noisy_hadamard_windows(self):
+        # Noise during a window with several factors, one of them H, does not commute with it
+        circuit = [self.create_layer([("H", 0), ("X", 2)]), self.create_layer([("H", 1)])]
+        model = LocalNoiseModel.depolarizing(0.05, 3)
+        self.assertTrue(simulate_stabilizer(circuit, model, num_shots=16, seed=0)["approximate"])
+        self.assertFalse(supports_stabilizer(circuit, model))
+        self.assertFalse(supports_stabilizer(circuit, None))
+        self.assertTrue(supports_stabilizer(circuit, LocalNoiseModel(3, {})))
+
+        # A lone H factor commutes with depolarizing noise, but not with dephasing
+        self.assertTrue(supports_stabilizer(circuit[1:], model))
+        dephasing = [np.sqrt(0.95) * np.eye(2), np.sqrt(0.05) * np.diag([1, -1])]
+        self.assertFalse(supports_stabilizer(circuit[1:], LocalNoiseModel.uniform(dephasing, 3)))
+
+        # Beyond the dense limit, "auto" runs such circuits on another engine
+        num_qubits = 20
+        wide = [self.create_layer([("H", 0), ("X", 1)], num_qubits)]
+        result = simulate_quantum_circuit(wide, LocalNoiseModel.depolarizing(0.01, num_qubits))
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertNotEqual(result["engine"], "stabilizer")
+
+    def test_dispatch(self):
+        circuit = [self.create_layer([("H", 0), ("Y", 1)]), self.create_layer([("CX", 0, 1)])]
+        self.assertTrue(supports_stabilizer(circuit, LocalNoiseModel(3, {})))
+        amplitude_damping = [[[1, 0], [0, np.sqrt(0.9)]], [[0, np.sqrt(0.1)], [0, 0]]]
+        self.assertFalse(
+            supports_stabilizer(circuit, LocalNoiseModel.uniform(amplitude_damping, 3))
+        )
+        # T sets the scaling of its run, and so does the identity on qubit 1
+        noiseless = LocalNoiseModel(3, {})
+        self.assertFalse(supports_stabilizer([self.create_layer([("T", 0)])], noiseless))
+        self.assertFalse(
+            supports_stabilizer([self.create_layer([("X", 0), ("I", 1)])], noiseless)
+        )
+        # T acts as Z when another gate sets the scaling
+        self.assertTrue(
+            supports_stabilizer([self.create_layer([("T", 0), ("X", 1)])], noiseless)
+        )
+
+        # Beyond the dense limit, "auto" simulates a GHZ circuit on 200 qubits
+        num_qubits = 200
+        ghz = [self.create_layer([("H", 0)], num_qubits)] + [
+            self.create_layer([("CX", q, q + 1)], num_qubits) for q in range(num_qubits - 1)
+        ]
+        result = simulate_quantum_circuit(ghz, LocalNoiseModel.uniform(depolarizing_kraus(0), num_qubits))
+        self.assertTrue(result["success"])
+        self.assertEqual(result["engine"], "stabilizer")
+        self.assertEqual(result["random_bits"], 1)
+        self.assertEqual(set(result["histogram"]), {"0" * num_qubits, "1" * num_qubits})
+
+        result = simulate_quantum_circuit([self.create_layer([("T", 0)])], engine="stabilizer")
+        self.assertFalse(result["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+import qutip as qt
+from noise_models import LocalNoiseModel
+from quantum_simulator import (
+    buffer_to_matrix,
+    iter_evolution,
+    reduce_state,
+    rep_to_evolution,
+    stream_simulation,
+    zero,
+)
+from test_layer_fusion import random_circuit
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.circuit = random_circuit(np.random.default_rng(3), 3, 5)
+        self.input_state = qt.ket2dm(qt.tensor(zero, zero, zero))
+
+    def test_snapshots_match_prefixes(self):
+        noise_model = LocalNoiseModel.depolarizing(1e-3, 3)
+        for engine, c_ops in [
+            ("local", noise_model),
+            ("lowrank", noise_model),
+            ("pauli", noise_model),
+            ("mpdo", noise_model),
+            ("propagator", noise_model),
+            ("tensor", None),
+        ]:
+            snapshots = list(iter_evolution(self.circuit, self.input_state, c_ops, engine=engine))
+            self.assertEqual(len(snapshots), len(self.circuit))
+            for k in (1, 3, 5):
+                expected = rep_to_evolution(self.circuit[:k], self.input_state, c_ops, engine=engine)
+                np.testing.assert_allclose(
+                    snapshots[k - 1].full(), expected.full(), atol=1e-6, err_msg=engine
+                )
+
+        # numpy in, numpy out
+        arrays = list(iter_evolution(self.circuit, self.input_state.full(), noise_model))
+        np.testing.assert_allclose(
+            arrays[-1],
+            rep_to_evolution(self.circuit, self.input_state, noise_model).full(),
+            atol=1e-12,
+        )
+
+    def test_stream_records(self):
+        records = list(
+            stream_simulation(
+                self.circuit,
+                reductions=["density_matrix", "probabilities", "purity", "bloch_vectors"],
+            )
+        )
+        self.assertEqual(records[-1], {"success": True, "done": True, "num_layers": 5})
+        final = buffer_to_matrix(records[-2]["density_matrix"])
+        self.assertAlmostEqual(sum(records[-2]["probabilities"]), 1.0)
+        self.assertAlmostEqual(records[-2]["purity"], np.trace(final @ final).real)
+
+        # Bloch vectors of a product state
+        plus = np.full((2, 2), 0.5)
+        one = np.diag([0.0, 1.0])
+        vectors = reduce_state(np.kron(plus, one), ["bloch_vectors"])["bloch_vectors"]
+        np.testing.assert_allclose(vectors, [[1, 0, 0], [0, 0, -1]], atol=1e-12)
+
+        [error] = stream_simulation([{"numRows": 1, "gates": [["BAD", 0]]}])
+        self.assertFalse(error["success"])
+        [error] = stream_simulation(self.circuit, reductions=["entropy"])
+        self.assertIn("Unsupported reduction", error["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+import qutip as qt
+from noise_models import LocalNoiseModel
+from trajectories import pauli_expectations
+from quantum_simulator import rep_to_evolution, simulate_trajectories, zero
+
+
+class TestTrajectories(unittest.TestCase):
+    def create_layer(self, gates, num_qubits=2):
+        return {"numRows": num_qubits, "gates": gates}
+
+    def setUp(self):
+        self.circuit = [
+            self.create_layer([("H", 0), ("T", 1)]),
+            self.create_layer([("CX", 0, 1)]),
+            self.create_layer([("Y", 1)]),
+        ]
+        self.input_state = qt.ket2dm(qt.tensor(zero, zero))
+
+    def test_noiseless_trajectories_are_exact(self):
+        result = simulate_trajectories(self.circuit, num_trajectories=3)
+        expected = rep_to_evolution(self.circuit, self.input_state, None).full()
+        np.testing.assert_allclose(result["density_matrix"], expected, atol=1e-12)
+        np.testing.assert_allclose(result["density_matrix_stderr"], 0, atol=1e-7)
+
+    def test_noisy_trajectories_match_local_engine(self):
+        model = LocalNoiseModel.depolarizing(0.05, 2)
+        result = simulate_trajectories(
+            self.circuit,
+            model,
+            num_trajectories=4000,
+            observables=["ZZ", "XI"],
+            seed=7,
+        )
+        expected = rep_to_evolution(self.circuit, self.input_state, model).full()
+
+        self.assertEqual(result["num_trajectories"], 4000)
+        error = np.abs(result["density_matrix"] - expected)
+        self.assertTrue(np.all(error <= 5 * result["density_matrix_stderr"] + 1e-9))
+
+        observables = {
+            "ZZ": qt.tensor(qt.sigmaz(), qt.sigmaz()),
+            "XI": qt.tensor(qt.sigmax(), qt.qeye(2)),
+        }
+        for label, op in observables.items():
+            exact = np.real(np.trace(expected @ op.full()))
+            self.assertLess(
+                abs(result["expectations"][label] - exact),
+                5 * result["expectation_stderr"][label],
+            )
+
+    def test_pauli_expectations(self):
+        states = np.array([[1, 0, 0, 0], [0, 0, 0, 1], [0.5, 0.5, 0.5, 0.5]], dtype=complex)
+        np.testing.assert_allclose(pauli_expectations(states, "ZI"), [1, -1, 0])
+        np.testing.assert_allclose(pauli_expectations(states, "XX"), [0, 0, 1])
+        with self.assertRaises(ValueError):
+            pauli_expectations(states, "ZQ")
+
+    def test_invalid_noise_models(self):
+        amplitude_loss = {0: [np.diag([1, np.sqrt(0.9)])]}
+        with self.assertRaises(ValueError):
+            simulate_trajectories(self.circuit, LocalNoiseModel(2, amplitude_loss))
+        with self.assertRaises(ValueError):
+            simulate_trajectories(self.circuit, LocalNoiseModel.depolarizing([0.1, 0.2], 2))
+        with self.assertRaises(ValueError):
+            simulate_trajectories(self.circuit, observables=["Z"])
+
+
+if __name__ == "__main__":
+    unittest.main()
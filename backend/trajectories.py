@@ -0,0 +1,290 @@
+import numpy as np
+
+from density_kernels import apply_state_operator
+
+"""
+Monte-Carlo Trajectories
+
+Statevector unraveling of the simulator's Lindblad dynamics. Every gate window
+evolves under scaling * P (P a tensor product of involutions) plus, for a
+trace-preserving LocalNoiseModel, the dissipator E - id. Since E is a channel,
+this generator is unraveled exactly by quantum jumps:
+
+   - jumps happen at the times of a rate-1 Poisson process over the window;
+   - between jumps the state rotates by exp(-i scaling * P * dt)
+     = cos(scaling dt) - i sin(scaling dt) P;
+   - at a jump one Kraus operator of every site channel is sampled with
+     probability ||K psi||^2 and the state is renormalized.
+
+Averaging |psi><psi| over trajectories reproduces the density matrix of the
+"local" engine, while each trajectory only stores O(2^n) amplitudes.
+Trajectories are evolved together as a (batch, 2^n) array.
+
+When every site channel is a mixture of unitaries (e.g. depolarizing noise),
+the jump probabilities do not depend on the state. Jumps that would pick the
+identity on every site are then dropped from the Poisson process (thinning),
+so only jumps that change the state are simulated.
+"""
+
+PAULI_MATRICES = {
+    "I": np.eye(2, dtype=complex),
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+}
+
+
+class TrajectorySampler:
+    def __init__(self, num_qubits, noise_model=None, seed=None):
+        """
+        Initializes a sampler of jump trajectories.
+
+        Parameters:
+        num_qubits (int): The total number of qubits in the circuit.
+        noise_model (LocalNoiseModel): Trace-preserving, unbatched error model,
+                                       or None for noiseless evolution.
+        seed (int or np.random.Generator): Seed of the random number generator.
+
+        Raises:
+        ValueError: If the noise model cannot be unraveled.
+        """
+        if noise_model is not None:
+            if noise_model.num_qubits != num_qubits:
+                raise ValueError(
+                    f"Noise model is defined for {noise_model.num_qubits} qubits, but the circuit has {num_qubits}"
+                )
+            if noise_model.batch_size is not None:
+                raise ValueError("Trajectories require an unbatched noise model.")
+            if not noise_model.trace_preserving:
+                raise ValueError("Trajectories require a trace-preserving noise model.")
+        self.num_qubits = num_qubits
+        self.noise_model = noise_model
+        self.rng = np.random.default_rng(seed)
+        self.mixtures = unitary_mixtures(noise_model) if noise_model is not None else None
+        if self.mixtures is None:
+            self.jump_rate = 1.0
+        else:
+            no_op_probability = np.prod(
+                [probs[identity].sum() for probs, _, identity in self.mixtures.values()]
+            )
+            self.jump_rate = 1.0 - no_op_probability
+
+    def evolve(self, states, scaling, factors, duration):
+        """
+        Evolves a batch of trajectories through one gate window.
+
+        Parameters:
+        states (np.ndarray): Normalized statevectors, shape (batch, 2^n).
+        scaling (float): Scaling factor of the Hamiltonian.
+        factors (dict): Qubit index -> 2x2 involution factor of the Hamiltonian.
+        duration (float): Length of the gate window.
+
+        Returns:
+        np.ndarray: The evolved statevectors.
+        """
+        num_trajectories = states.shape[0]
+        if self.noise_model is None:
+            return self.rotate(states, scaling, factors, np.full(num_trajectories, duration))
+
+        num_jumps = self.rng.poisson(duration * self.jump_rate, size=num_trajectories)
+        max_jumps = num_jumps.max()
+        # Unused jump slots are parked at the end of the window before sorting,
+        # so the first num_jumps[i] entries are sorted uniform jump times
+        times = self.rng.uniform(0, duration, size=(num_trajectories, max_jumps))
+        times[np.arange(max_jumps) >= num_jumps[:, None]] = duration
+        times.sort(axis=1)
+
+        elapsed = np.zeros(num_trajectories)
+        for j in range(max_jumps):
+            states = self.rotate(states, scaling, factors, times[:, j] - elapsed)
+            jumping = j < num_jumps
+            states[jumping] = self.jump(states[jumping])
+            elapsed = times[:, j]
+        return self.rotate(states, scaling, factors, duration - elapsed)
+
+    def rotate(self, states, scaling, factors, durations):
+        """
+        Applies exp(-i scaling * P * t) with a per-trajectory duration t.
+        """
+        angles = scaling * durations
+        moving = angles != 0
+        if not moving.all():
+            # Trajectories already parked at the end of the window stay put
+            if not moving.any():
+                return states
+            states = states.copy()
+            states[moving] = self.rotate(states[moving], scaling, factors, durations[moving])
+            return states
+        p_states = states
+        for qubit, op in factors.items():
+            p_states = apply_state_operator(p_states, op, [qubit], self.num_qubits)
+        return np.cos(angles)[:, None] * states - 1j * np.sin(angles)[:, None] * p_states
+
+    def jump(self, states):
+        """
+        Applies one sampled Kraus operator of every site channel.
+        """
+        if self.mixtures is not None:
+            return self.mixture_jump(states)
+        rows = np.arange(states.shape[0])
+        for site, kraus_ops in self.noise_model.kraus.items():
+            candidates = np.stack(
+                [apply_state_operator(states, k, site, self.num_qubits) for k in kraus_ops]
+            )
+            weights = np.sum(np.abs(candidates) ** 2, axis=-1)
+            thresholds = self.rng.uniform(size=states.shape[0]) * weights.sum(axis=0)
+            choice = np.minimum(
+                (np.cumsum(weights, axis=0) < thresholds).sum(axis=0), len(kraus_ops) - 1
+            )
+            states = candidates[choice, rows] / np.sqrt(weights[choice, rows])[:, None]
+        return states
+
+    def mixture_jump(self, states):
+        """
+        Applies one sampled unitary per site, conditioned on not all being identities.
+        """
+        num_states = states.shape[0]
+        choices = {site: np.zeros(num_states, dtype=int) for site in self.mixtures}
+        pending = np.ones(num_states, dtype=bool)
+        while pending.any():
+            count = pending.sum()
+            trivial = np.ones(count, dtype=bool)
+            for site, (probs, _, identity) in self.mixtures.items():
+                sampled = self.rng.choice(len(probs), size=count, p=probs)
+                choices[site][pending] = sampled
+                trivial &= identity[sampled]
+            pending[pending] = trivial
+
+        states = states.copy()
+        for site, (_, unitaries, identity) in self.mixtures.items():
+            for k in np.flatnonzero(~identity):
+                rows = choices[site] == k
+                if rows.any():
+                    states[rows] = apply_state_operator(
+                        states[rows], unitaries[k], site, self.num_qubits
+                    )
+        return states
+
+
+def unitary_mixtures(noise_model, atol=1e-10):
+    """
+    Writes every site channel as sum_k p_k U_k . U_k^dag, if possible.
+
+    Args:
+        noise_model (LocalNoiseModel): Trace-preserving, unbatched error model
+        atol (float): Tolerance of the unitarity checks
+
+    Returns:
+        dict or None: Site -> (probabilities, unitaries, identity mask), or None
+            if some Kraus operator is not proportional to a unitary
+    """
+    mixtures = {}
+    for site, kraus_ops in noise_model.kraus.items():
+        dim = kraus_ops.shape[-1]
+        products = np.einsum("kba,kbc->kac", kraus_ops.conj(), kraus_ops)
+        weights = np.real(np.trace(products, axis1=1, axis2=2)) / dim
+        if not np.allclose(products, weights[:, None, None] * np.eye(dim), atol=atol):
+            return None
+        keep = weights > atol
+        weights = weights[keep]
+        unitaries = kraus_ops[keep] / np.sqrt(weights)[:, None, None]
+        identity = np.array(
+            [np.allclose(u, u[0, 0] * np.eye(dim), atol=atol) for u in unitaries]
+        )
+        mixtures[site] = (weights / weights.sum(), unitaries, identity)
+    return mixtures
+
+
+def pauli_expectations(states, label):
+    """
+    Computes <psi|P|psi> for every trajectory.
+
+    Args:
+        states (np.ndarray): Statevectors, shape (batch, 2^n)
+        label (str): Pauli string with one of I, X, Y, Z per qubit, qubit 0 first
+
+    Returns:
+        np.ndarray: Real expectation values, shape (batch,)
+    """
+    num_qubits = len(label)
+    if states.shape[-1] != 2**num_qubits or set(label) - set(PAULI_MATRICES):
+        raise ValueError(
+            f"Invalid Pauli string {label} for {int(np.log2(states.shape[-1]))} qubits."
+        )
+    p_states = states
+    for qubit, name in enumerate(label):
+        if name != "I":
+            p_states = apply_state_operator(
+                p_states, PAULI_MATRICES[name], [qubit], num_qubits
+            )
+    return np.real(np.sum(states.conj() * p_states, axis=-1))
+
+
+class TrajectoryStatistics:
+    def __init__(self, dim, observables=(), track_density=True):
+        """
+        Accumulates trajectory averages and their standard errors.
+
+        Parameters:
+        dim (int): Dimension of the statevectors.
+        observables (sequence of str): Pauli strings to average.
+        track_density (bool): Whether to accumulate the O(4^n) density estimate.
+        """
+        self.count = 0
+        self.observables = list(observables)
+        self.sums = {label: 0.0 for label in self.observables}
+        self.squares = {label: 0.0 for label in self.observables}
+        self.density_sum = np.zeros((dim, dim), dtype=complex) if track_density else None
+        self.density_squares = np.zeros((dim, dim)) if track_density else None
+
+    def add(self, states):
+        """
+        Adds a batch of final statevectors.
+        """
+        self.count += states.shape[0]
+        for label in self.observables:
+            values = pauli_expectations(states, label)
+            self.sums[label] += values.sum()
+            self.squares[label] += np.sum(values**2)
+        if self.density_sum is not None:
+            self.density_sum += states.T @ states.conj()
+            # |psi_i psi_j^*|^2 = |psi_i|^2 |psi_j|^2
+            probabilities = np.abs(states) ** 2
+            self.density_squares += probabilities.T @ probabilities
+
+    def result(self):
+        """
+        Returns the averages and standard errors of the mean.
+
+        Returns:
+        dict: num_trajectories, expectations and expectation_stderr (keyed by
+              Pauli string) and, if tracked, density_matrix and
+              density_matrix_stderr.
+        """
+        n = self.count
+        result = {
+            "num_trajectories": n,
+            "expectations": {},
+            "expectation_stderr": {},
+        }
+        for label in self.observables:
+            mean = self.sums[label] / n
+            result["expectations"][label] = mean
+            result["expectation_stderr"][label] = _standard_error(
+                self.squares[label], mean, n
+            )
+        if self.density_sum is not None:
+            density = self.density_sum / n
+            result["density_matrix"] = density
+            result["density_matrix_stderr"] = _standard_error(
+                self.density_squares, density, n
+            )
+        return result
+
+
+def _standard_error(sum_of_squares, mean, n):
+    """Standard error of the mean from the running sum of |x|^2."""
+    if n < 2:
+        return np.zeros_like(np.abs(mean)) if np.ndim(mean) else 0.0
+    variance = np.maximum(sum_of_squares - n * np.abs(mean) ** 2, 0) / (n - 1)
+    return np.sqrt(variance / n)
@@ -1,12 +1,28 @@
 import { NextResponse } from 'next/server';
 import path from 'path';
 import { spawn } from 'child_process';
+import { callSimulationServer } from '@/lib/simulationServer';
 
 export async function POST(request) {
     try {
         const data = await request.json();
         const { circuit_ir } = data;
 
+        // Prefer the persistent simulation server when it is running
+        const serverResult = await callSimulationServer('/propagate', { circuit_ir });
+        if (serverResult) {
+            if (serverResult.status !== 200) {
+                return new NextResponse(JSON.stringify({ error: serverResult.body.error }), {
+                    status: serverResult.status,
+                    headers: { 'Content-Type': 'application/json' },
+                });
+            }
+            return new NextResponse(JSON.stringify({ data: serverResult.body.data }), {
+                status: 200,
+                headers: { 'Content-Type': 'application/json' },
+            });
+        }
+
         // Call your Python script using spawn
         const pythonScript = path.join(process.cwd(), '..', 'backend', 'error_step_propagator.py');
         const pythonProcess = spawn('python3', [pythonScript, JSON.stringify(circuit_ir)]);
@@ -0,0 +1,27 @@
+import { NextResponse } from 'next/server';
+import { callSimulationServer } from '@/lib/simulationServer';
+
+// Stateful error propagation (backend/propagation_sessions.py). Sessions live in the
+// persistent simulation server, so there is no python3 fallback: callers fall back
+// to /api/propagate when this route answers 503.
+const SESSION_ACTIONS = ['session', 'step', 'trajectory', 'close'];
+
+export async function POST(request) {
+    try {
+        const { action, ...payload } = await request.json();
+        if (!SESSION_ACTIONS.includes(action)) {
+            return NextResponse.json({ error: `Unknown session action: ${action}` }, { status: 400 });
+        }
+
+        const serverResult = await callSimulationServer(`/propagate/${action}`, payload);
+        if (!serverResult) {
+            return NextResponse.json(
+                { error: 'Propagation sessions require the simulation server' },
+                { status: 503 }
+            );
+        }
+        return NextResponse.json(serverResult.body, { status: serverResult.status });
+    } catch (error) {
+        return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+}
@@ -3,6 +3,8 @@ import { spawn } from 'child_process';
 import path from 'path';
 import fs from 'fs';
 import { v4 as uuidv4 } from 'uuid';
+import { callSimulationServer } from '@/lib/simulationServer';
+
 export async function POST(request) {
     console.log('API route /api/simulate called');
     let tempFilePath = null;
@@ -11,6 +13,9 @@ export async function POST(request) {
         const formData = await request.formData();
         const circuitIRData = formData.get('circuit_ir');
         const noiseModelFile = formData.get('noise_model');
+        // "plot" (default), "data" (raw density matrix buffer) or "both"
+        const output = formData.get('output') || 'plot';
+        const dtype = formData.get('dtype') || 'complex128';
 
         console.log('Received noise model file:', noiseModelFile);
 
@@ -35,14 +40,33 @@ export async function POST(request) {
         }
 
 
+        // Prefer the persistent simulation server; it reads the noise model from tempFilePath
+        const serverResult = await callSimulationServer('/simulate', {
+            circuit_ir,
+            noise_model_path: tempFilePath,
+            output,
+            dtype,
+        });
+
+        if (serverResult) {
+            if (tempFilePath && fs.existsSync(tempFilePath)) {
+                fs.unlinkSync(tempFilePath);
+            }
+            if (serverResult.status !== 200) {
+                throw new Error(serverResult.body.error || `Simulation server returned ${serverResult.status}`);
+            }
+        }
+
         // Path to Python script
         const scriptPath = path.join(process.cwd(), '..', 'backend', 'quantum_simulator.py');
 
-        // Create promise to handle Python script execution
-        const simulationResult = await new Promise((resolve, reject) => {
+        // Create promise to handle Python script execution, unless the server already answered
+        const simulationResult = serverResult ? serverResult.body : await new Promise((resolve, reject) => {
             const pythonArgs = [
                 scriptPath,
-                JSON.stringify(circuit_ir)
+                JSON.stringify(circuit_ir),
+                '--output', output,
+                '--dtype', dtype
             ];
 
             if (tempFilePath) {
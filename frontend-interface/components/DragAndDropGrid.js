@@ -8,7 +8,7 @@
 'use client'; // Next.js directive for client-side component rendering
 
 // Core React and functionality imports
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
     DragDropContext, // Manages overall drag and drop functionality
     Droppable,       // Defines valid drop target areas
@@ -159,6 +159,7 @@ export default function DragAndDropGrid() {
     const [simulationResults, setSimulationResults] = useState(null);  // Simulation output
     const [isSimulating, setIsSimulating] = useState(false);           // Simulation status
     const [fileContent, setFileContent] = useState(null);              // Uploaded noise model
+    const propagationSession = useRef(null); // { id, ir } of the server-side propagation session
 
     /**
      * Fetches and initializes the visual style configuration on component mount
@@ -674,15 +675,61 @@ export default function DragAndDropGrid() {
         setSimulationResults(null);
     };
 
+    const postPropagationSession = async (body) => {
+        const response = await fetch('/api/propagate/session', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body),
+        });
+        return response.ok ? response.json() : null;
+    };
+
+    // Steps the server-side session, sending only the layers edited since the last step.
+    // Returns the propagated IR, or null when sessions are unavailable.
+    const stepPropagationSession = async (ir) => {
+        const layerKey = (layer) => JSON.stringify([layer.type, layer.gates]);
+        let session = propagationSession.current;
+        let stepped = null;
+        if (session && session.ir.length === ir.length) {
+            const diff = ir.flatMap((layer, index) =>
+                layerKey(layer) === layerKey(session.ir[index]) ? [] : [{ op: 'set', index, layer }]
+            );
+            stepped = await postPropagationSession({ action: 'step', session_id: session.id, diff });
+        }
+        if (!stepped) {
+            const created = await postPropagationSession({ action: 'session', circuit_ir: ir });
+            if (!created) {
+                propagationSession.current = null;
+                return null;
+            }
+            session = { id: created.session_id, ir: created.data };
+            stepped = await postPropagationSession({ action: 'step', session_id: session.id });
+            if (!stepped) return null;
+        }
+
+        const data = [...ir];
+        stepped.changes.forEach(({ index, layer }) => {
+            data[index] = layer;
+        });
+        propagationSession.current = { id: session.id, ir: data };
+        return data;
+    };
+
     const handlePropagateErrors = async () => {
         try {
             const ir = convertGridToIR();
-            const response = await fetch('/api/propagate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ circuit_ir: ir }),
-            });
-            const result = await response.json();
+            let result;
+            const sessionData = await stepPropagationSession(ir);
+            if (sessionData) {
+                result = { data: sessionData };
+            } else {
+                const response = await fetch('/api/propagate', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ circuit_ir: ir }),
+                });
+                result = await response.json();
+            }
             if (result.data) {
                 const newGrid = Array(numRows)
                     .fill(null)
@@ -0,0 +1,41 @@
+// Client for the persistent Python simulation server (backend/simulation_server.py).
+// Routes try the warm server first and fall back to spawning python3 when it is
+// not running, so local development works without starting the server.
+
+const SIMULATION_SERVER_URL =
+    process.env.SIMULATION_SERVER_URL ||
+    `http://127.0.0.1:${process.env.SIMULATION_SERVER_PORT || 8765}`;
+
+// Client-side bound on a request; the server enforces its own per-request timeout
+const SIMULATION_SERVER_TIMEOUT_MS = Number(process.env.SIMULATION_SERVER_TIMEOUT_MS || 120000);
+
+/**
+ * POST a JSON payload to the simulation server.
+ *
+ * @param {string} endpoint - '/simulate' or '/propagate'
+ * @param {object} payload - Request body
+ * @returns {Promise<{status: number, body: object} | null>} The server response,
+ *          or null if the server is unreachable and the caller should fall back.
+ */
+export async function callSimulationServer(endpoint, payload) {
+    let response;
+    try {
+        response = await fetch(`${SIMULATION_SERVER_URL}${endpoint}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload),
+            signal: AbortSignal.timeout(SIMULATION_SERVER_TIMEOUT_MS),
+        });
+    } catch (error) {
+        if (error.name === 'TimeoutError') {
+            return {
+                status: 504,
+                body: { success: false, error: 'Simulation server request timed out' },
+            };
+        }
+        console.log('Simulation server unavailable, falling back to python3:', error.message);
+        return null;
+    }
+
+    return { status: response.status, body: await response.json() };
+}
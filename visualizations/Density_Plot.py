@@ -1,7 +1,200 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import LinearSegmentedColormap, Normalize
+from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.colors import LinearSegmentedColormap
+
+"""
+Density Matrix Plots
+
+Figures are created directly on the Agg canvas rather than through pyplot, so
+rendering never touches an interactive backend and figures are freed as soon as
+they go out of scope.
+
+create_density_matrix_plot draws one 3D bar per matrix element and is meant for
+small matrices; create_density_matrix_heatmap draws the whole matrix as a single
+image (phase as hue, magnitude as opacity) and scales to large matrices.
+plot_density_matrix picks between them.
+"""
+
+# Rainbow phase colormap, red through violet and back to red, built once
+PHASE_COLORS = [
+    (1.0, 0.0, 0.0),  # Red
+    (1.0, 0.5, 0.0),  # Orange
+    (1.0, 1.0, 0.0),  # Yellow
+    (0.0, 1.0, 0.0),  # Green
+    (0.0, 1.0, 1.0),  # Cyan
+    (0.0, 0.0, 1.0),  # Blue
+    (0.5, 0.0, 0.5),  # Purple
+    (1.0, 0.0, 0.0),  # Back to Red
+]
+PHASE_CMAP = LinearSegmentedColormap.from_list(
+    "rainbow_phase", list(zip(np.linspace(0, 1, len(PHASE_COLORS)), PHASE_COLORS)), N=256
+)
+# RGBA lookup table of PHASE_CMAP, indexed by the quantized phase
+PHASE_LUT = PHASE_CMAP(np.linspace(0, 1, PHASE_CMAP.N))
+
+PHASE_TICKS = [
+    -np.pi,
+    -3 * np.pi / 4,
+    -np.pi / 2,
+    -np.pi / 4,
+    0,
+    np.pi / 4,
+    np.pi / 2,
+    3 * np.pi / 4,
+    np.pi,
+]
+PHASE_TICK_LABELS = ["-π", "-3π/4", "-π/2", "-π/4", "0", "π/4", "π/2", "3π/4", "π"]
+
+# Largest matrix dimension drawn as 3D bars by plot_density_matrix
+BAR3D_MAX_DIM = 16
+# Largest image side of the heatmap before blocks of elements are merged
+HEATMAP_MAX_PIXELS = 256
+# Basis state labels are only drawn up to this dimension
+MAX_LABELED_DIM = 16
+
+
+def validate_density_matrix(quantum_matrix):
+    """
+    Checks that the matrix is square with a power of 2 dimension.
+
+    Returns:
+        int: Number of qubits
+    """
+    n = quantum_matrix.shape[0]
+    if quantum_matrix.shape != (n, n):
+        raise ValueError("Matrix must be square")
+    if not (n & (n - 1) == 0):
+        raise ValueError("Matrix dimensions must be powers of 2")
+    return int(np.log2(n))
+
+
+def generate_basis_labels(num_qubits):
+    return [f"|{format(i, f'0{num_qubits}b')}⟩" for i in range(2**num_qubits)]
+
+
+def add_phase_colorbar(fig, ax, cax=None):
+    """
+    Adds the phase colorbar with ticks at multiples of π/4.
+
+    With cax the colorbar is drawn into that axes; otherwise space is taken
+    from ax.
+    """
+    sm = ScalarMappable(cmap=PHASE_CMAP, norm=Normalize(-np.pi, np.pi))
+    sm.set_array([])
+    cbar = fig.colorbar(
+        sm, ax=ax, cax=cax, orientation="vertical", label="Phase (radians)"
+    )
+    cbar.set_ticks(PHASE_TICKS)
+    cbar.set_ticklabels(PHASE_TICK_LABELS)
+    return cbar
+
+
+def plot_density_matrix(quantum_matrix):
+    """
+    Plots a density matrix with the renderer suited to its size: 3D bars up to
+    BAR3D_MAX_DIM, a heatmap above.
+
+    Args:
+        quantum_matrix: numpy array of shape (2^n, 2^n)
+
+    Returns:
+        matplotlib figure object
+    """
+    if quantum_matrix.shape[0] <= BAR3D_MAX_DIM:
+        return create_density_matrix_plot(quantum_matrix)
+    return create_density_matrix_heatmap(quantum_matrix)
+
+
+def downsample_matrix(quantum_matrix, max_pixels=HEATMAP_MAX_PIXELS):
+    """
+    Merges square blocks of elements until the matrix side is at most max_pixels.
+
+    Each block keeps its mean magnitude and the phase of its complex mean, so
+    coherences that cancel within a block keep their size but lose their phase.
+
+    Args:
+        quantum_matrix: numpy array of shape (2^n, 2^n)
+        max_pixels (int): Largest side of the result
+
+    Returns:
+        tuple: (magnitudes, phases), each of shape (m, m)
+    """
+    n = quantum_matrix.shape[0]
+    if n <= max_pixels:
+        return np.abs(quantum_matrix), np.angle(quantum_matrix)
+    block = int(np.ceil(n / max_pixels))
+    m = n // block
+    blocks = quantum_matrix[: m * block, : m * block].reshape(m, block, m, block)
+    magnitudes = np.abs(blocks).mean(axis=(1, 3))
+    phases = np.angle(blocks.sum(axis=(1, 3)))
+    return magnitudes, phases
+
+
+def density_matrix_rgba(magnitudes, phases):
+    """
+    Encodes phase as hue (through PHASE_LUT) and magnitude as opacity.
+
+    Returns:
+        np.ndarray: RGBA image of shape magnitudes.shape + (4,)
+    """
+    index = ((phases + np.pi) / (2 * np.pi) * (len(PHASE_LUT) - 1)).round().astype(int)
+    rgba = PHASE_LUT[index]
+    peak = magnitudes.max()
+    rgba[..., 3] = magnitudes / peak if peak > 0 else 0
+    return rgba
+
+
+def create_density_matrix_heatmap(quantum_matrix, max_pixels=HEATMAP_MAX_PIXELS):
+    """
+    Create a 2D image of a density matrix: phase as color, magnitude as opacity.
+
+    Matrices larger than max_pixels per side are block-averaged first (see
+    downsample_matrix), so drawing cost is bounded regardless of qubit count.
+
+    Args:
+        quantum_matrix: numpy array of shape (2^n, 2^n) representing the density matrix
+                       for n qubits
+        max_pixels (int): Largest image side before downsampling
+
+    Returns:
+        matplotlib figure object containing the heatmap
+    """
+    num_qubits = validate_density_matrix(quantum_matrix)
+    n = quantum_matrix.shape[0]
+    magnitudes, phases = downsample_matrix(quantum_matrix, max_pixels)
+    image = density_matrix_rgba(magnitudes, phases)
+
+    fig = Figure(figsize=(9, 7.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.imshow(
+        image,
+        interpolation="nearest",
+        extent=(-0.5, n - 0.5, n - 0.5, -0.5),
+    )
+
+    if n <= MAX_LABELED_DIM:
+        basis_labels = generate_basis_labels(num_qubits)
+        ax.set_xticks(range(n))
+        ax.set_yticks(range(n))
+        ax.set_xticklabels(basis_labels, rotation=90)
+        ax.set_yticklabels(basis_labels)
+    ax.set_xlabel("Column basis state")
+    ax.set_ylabel("Row basis state")
+
+    # Fixed colorbar placement skips the layout pass of fig.colorbar(ax=...)
+    fig.subplots_adjust(left=0.12, right=0.82, bottom=0.12, top=0.88)
+    add_phase_colorbar(fig, ax, cax=fig.add_axes([0.86, 0.12, 0.03, 0.76]))
+
+    subtitle = "Magnitude (Opacity) and Phase (Color)"
+    if magnitudes.shape[0] < n:
+        block = n // magnitudes.shape[0]
+        subtitle += f", {block}x{block} blocks averaged"
+    ax.set_title(f"Density Matrix for {num_qubits}-Qubit State\n{subtitle}", pad=12)
+    return fig
 
 
 def create_density_matrix_plot(quantum_matrix):
@@ -17,45 +210,22 @@ def create_density_matrix_plot(quantum_matrix):
         matplotlib figure object containing the 3D visualization
     """
     # Verify matrix is square and dimensions are powers of 2
+    num_qubits = validate_density_matrix(quantum_matrix)
     n = quantum_matrix.shape[0]
-    if quantum_matrix.shape != (n, n):
-        raise ValueError("Matrix must be square")
-    if not (n & (n - 1) == 0):
-        raise ValueError("Matrix dimensions must be powers of 2")
-
-    # Calculate number of qubits
-    num_qubits = int(np.log2(n))
 
     # Calculate magnitude and phase of each element
     magnitudes = np.abs(quantum_matrix)
     phases = np.angle(quantum_matrix)
 
-    # Create rainbow colormap
-    colors = [
-        (1.0, 0.0, 0.0),  # Red
-        (1.0, 0.5, 0.0),  # Orange
-        (1.0, 1.0, 0.0),  # Yellow
-        (0.0, 1.0, 0.0),  # Green
-        (0.0, 1.0, 1.0),  # Cyan
-        (0.0, 0.0, 1.0),  # Blue
-        (0.5, 0.0, 0.5),  # Purple
-        (1.0, 0.0, 0.0),  # Back to Red
-    ]
-
-    # Create custom colormap with more interpolation points for smoother transitions
-    nodes = np.linspace(0, 1, len(colors))
-    custom_cmap = LinearSegmentedColormap.from_list(
-        "rainbow_phase", list(zip(nodes, colors)), N=256
-    )
-
     # Normalize phases to [0, 1] interval for colormap
     normalized_phases = (phases + np.pi) / (2 * np.pi)
 
     # Apply colormap to get colors for each bar
-    colors = custom_cmap(normalized_phases.flatten())
+    colors = PHASE_CMAP(normalized_phases.flatten())
 
     # Set up 3D plot with larger figure size
-    fig = plt.figure(figsize=(12, 10))
+    fig = Figure(figsize=(12, 10))
+    FigureCanvasAgg(fig)
     ax = fig.add_subplot(111, projection="3d")
 
     # Define grid positions
@@ -72,9 +242,6 @@ def create_density_matrix_plot(quantum_matrix):
     bars = ax.bar3d(x_pos, y_pos, z_pos, dx, dy, dz, color=colors, shade=True)
 
     # Generate basis state labels
-    def generate_basis_labels(num_qubits):
-        return [f"|{format(i, f'0{num_qubits}b')}⟩" for i in range(2**num_qubits)]
-
     basis_labels = generate_basis_labels(num_qubits)
 
     # Set axis labels and limits
@@ -87,36 +254,17 @@ def create_density_matrix_plot(quantum_matrix):
     # Adjust the viewing angle for better visibility
     ax.view_init(elev=25, azim=45)
 
-    # Add colorbar for phase mapping with rainbow colors
-    norm = plt.Normalize(-np.pi, np.pi)
-    sm = plt.cm.ScalarMappable(cmap=custom_cmap, norm=norm)
-    sm.set_array([])
-    cbar = plt.colorbar(sm, ax=ax, orientation="vertical", label="Phase (radians)")
-
-    # Set colorbar ticks to show π values
-    cbar.set_ticks(
-        [
-            -np.pi,
-            -3 * np.pi / 4,
-            -np.pi / 2,
-            -np.pi / 4,
-            0,
-            np.pi / 4,
-            np.pi / 2,
-            3 * np.pi / 4,
-            np.pi,
-        ]
-    )
-    cbar.set_ticklabels(["-π", "-3π/4", "-π/2", "-π/4", "0", "π/4", "π/2", "3π/4", "π"])
+    # Add colorbar for phase mapping with rainbow colors, ticks at π values
+    add_phase_colorbar(fig, ax)
 
     # Add title
-    plt.title(
+    ax.set_title(
         f"Density Matrix for {num_qubits}-Qubit State\nMagnitude (Height) and Phase (Color)",
         pad=20,
     )
 
     # Adjust layout to prevent label clipping
-    plt.tight_layout()
+    fig.tight_layout()
 
     # Add grid lines for better visibility
     ax.grid(True, alpha=0.3)